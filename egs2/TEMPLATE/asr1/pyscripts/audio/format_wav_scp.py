@@ -100,13 +100,53 @@ class SegmentsExtractor:
                     )
 
     def generator(self):
+        # Read the segments of each recording in the order of their start times
+        # so that the audio files are read sequentially.
+        # Note that the order of the output is restored in main()
+        recodeid_order = {}
+        for utt, (recodeid, st, et) in self.segments_dict.items():
+            recodeid_order.setdefault(recodeid, len(recodeid_order))
+        utts = sorted(
+            self.segments_dict,
+            key=lambda u: (
+                recodeid_order[self.segments_dict[u][0]],
+                self.segments_dict[u][1],
+            ),
+        )
+
         recodeid_counter = {}
         for utt, (recodeid, st, et) in self.segments_dict.items():
             recodeid_counter[recodeid] = recodeid_counter.get(recodeid, 0) + 1
 
         cached = {}
-        for utt, (recodeid, st, et) in self.segments_dict.items():
+        info = None
+        for utt in utts:
+            recodeid, st, et = self.segments_dict[utt]
             wavpath = self.wav_dict[recodeid]
+            recodeid_counter[recodeid] -= 1
+
+            if not wavpath.endswith("|"):
+                # Read only the segment from the seekable files
+                if info is None or info[0] != recodeid:
+                    info = (recodeid, *self._seekable_info(wavpath))
+                _, seekable, rate, num_frames = info
+                if seekable:
+                    start = min(int(st * rate), num_frames)
+                    if et != -1:
+                        end = min(max(int(et * rate), start), num_frames)
+                    else:
+                        end = None
+                    array, rate = soundfile_read(
+                        wavs=wavpath.split() if self.multi_columns else wavpath,
+                        dtype=None,
+                        always_2d=False,
+                        concat_axis=1,
+                        start=start,
+                        end=end,
+                    )
+                    yield utt, (array, rate), None, None
+                    continue
+
             if recodeid not in cached:
                 if wavpath.endswith("|"):
                     if self.multi_columns:
@@ -132,7 +172,6 @@ class SegmentsExtractor:
 
             array, rate = cached[recodeid]
             # Keep array until the last query
-            recodeid_counter[recodeid] -= 1
             if recodeid_counter[recodeid] == 0:
                 cached.pop(recodeid)
             # Convert starting time of the segment to corresponding sample number.
@@ -144,6 +183,29 @@ class SegmentsExtractor:
 
             yield utt, (array, rate), None, None
 
+    def _seekable_info(self, wavpath: str) -> Tuple[bool, int, int]:
+        """Return whether the files are seekable, the sampling rate and length."""
+        wavs = wavpath.split() if self.multi_columns else [wavpath]
+        seekable, rate, num_frames = True, None, None
+        for wav in wavs:
+            with soundfile.SoundFile(wav) as f:
+                seekable = seekable and f.seekable()
+                rate = f.samplerate
+                num_frames = (
+                    f.frames if num_frames is None else min(num_frames, f.frames)
+                )
+        return seekable, rate, num_frames
+
+
+def restore_order(path: Path, keys):
+    """Rewrite the lines of a kaldi-style file in the order of the given keys."""
+    with path.open("r", encoding="utf-8") as f:
+        lines = {line.split(None, 1)[0]: line for line in f}
+    with path.open("w", encoding="utf-8") as f:
+        for key in keys:
+            if key in lines:
+                f.write(lines[key])
+
 
 def main():
     logfmt = "%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s"
@@ -373,6 +435,16 @@ def main():
                 writer[uttid] = rate, wave
             fnum_samples.write(f"{uttid} {len(wave)}\n")
 
+    if args.segments is not None:
+        # The segments are extracted in the order of their start times
+        if args.audio_format.endswith("ark"):
+            fark.close()
+            fscp_out.close()
+        else:
+            writer.close()
+        for path in (out_wavscp, out_num_samples):
+            restore_order(path, extractor.segments_dict)
+
 
 if __name__ == "__main__":
     main()
@@ -5,8 +5,14 @@
 
 import argparse
 import logging
+import multiprocessing
 import os
+import shutil
 import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import List, Optional, Tuple
 
 import kaldiio
 import numpy as np
@@ -16,6 +22,10 @@ from espnet2.speechlm.tokenizer.codec_tokenizer import CodecTokenizer
 from espnet2.utils.types import str2bool
 from espnet.nets.pytorch_backend.nets_utils import pad_list
 
+# NOTE: make pyscripts importable when this file is run as a script
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from pyscripts.utils.batch_utils import make_batches  # noqa: E402
+
 logging.basicConfig(
     format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
     datefmt="%Y-%m-%d %H:%M:%S",
@@ -30,6 +40,35 @@ def get_parser():
     parser.add_argument("--codec_choice", type=str, required=True)
     parser.add_argument("--codec_fs", type=int, default=16000)
     parser.add_argument("--batch_size", type=int, default=3)
+    parser.add_argument(
+        "--batch_bins",
+        type=int,
+        default=None,
+        help="Maximum number of the padded samples in a batch, "
+        "i.e., the memory budget of a batch. Not limited if None",
+    )
+    parser.add_argument(
+        "--bucket_size",
+        type=int,
+        default=1000,
+        help="Number of the utterances read ahead and sorted by length "
+        "to form the batches with less padding",
+    )
+    parser.add_argument(
+        "--nthreads",
+        type=int,
+        default=None,
+        help="Number of the intra-op threads of each worker on CPU. "
+        "If None, the threads are divided among the workers",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        help="Number of the worker processes. Each worker builds its own "
+        "tokenizer and processes a shard of the input, "
+        "and the outputs are merged into the single ark/scp files",
+    )
     parser.add_argument("--dump_audio", type=str2bool, default=False)
     parser.add_argument("--rank", type=int, default=1)
     parser.add_argument("--vocab_file", type=str, required=True)
@@ -62,10 +101,32 @@ def get_parser():
     return parser
 
 
-def dump_codec(
+def parse_ark_scp(wspecifier: str) -> Tuple[str, str]:
+    """Return the ark and scp paths of "ark,scp:<ark>,<scp>"."""
+    spec, paths = wspecifier.split(":", 1)
+    if spec.split(",")[:2] != ["ark", "scp"]:
+        raise ValueError(f"ark,scp:<ark>,<scp> is required: {wspecifier}")
+    ark_path, scp_path = paths.split(",")
+    return ark_path, scp_path
+
+
+def merge_ark_scp(shards: List[Tuple[str, str]], ark_path: str, scp_path: str):
+    """Concatenate the ark files and rewrite the offsets in the scp files."""
+    with open(ark_path, "wb") as ark_writer, open(scp_path, "w") as scp_writer:
+        for shard_ark, shard_scp in shards:
+            base = ark_writer.tell()
+            with open(shard_scp) as f:
+                for line in f:
+                    key, value = line.rstrip("\n").split(maxsplit=1)
+                    offset = int(value.rsplit(":", 1)[1])
+                    scp_writer.write(f"{key} {ark_path}:{base + offset}\n")
+            with open(shard_ark, "rb") as f:
+                shutil.copyfileobj(f, ark_writer)
+
+
+def tokenize(
     rspecifier: str,
     wspecifier: str,
-    vocab_file: str,
     wav_wspecifier: str,
     codec_choice: str,
     codec_fs: int,
@@ -75,7 +136,11 @@ def dump_codec(
     rank: int,
     checkpoint_path: str = None,
     config_path: str = None,
-):
+    batch_bins: Optional[int] = None,
+    bucket_size: int = 1000,
+    nthreads: Optional[int] = None,
+) -> Tuple[int, int]:
+    """Tokenize the audio and return the number and the size of the codebooks."""
     # (1) Device
     if torch.cuda.is_available():
         if torch.cuda.device_count() > 1:
@@ -85,8 +150,12 @@ def dump_codec(
         device = torch.device(f"cuda:{device_id}")
     else:
         device = torch.device("cpu")
-        logger.warning("Codec tokenization with CPU can be very slow.")
-        logger.warning("Change batch_size=1 for CPU tokenization")
+        if nthreads is not None:
+            torch.set_num_threads(nthreads)
+        logger.info(f"Codec tokenization with CPU: {torch.get_num_threads()} threads")
+
+    if codec_choice in ["beats", "beats_random"] and batch_size > 1:
+        logger.warning(f"{codec_choice} only supports batch_size=1")
         batch_size = 1
 
     # (2) Codec Tokenizer Implementation
@@ -110,54 +179,179 @@ def dump_codec(
     else:
         wav_scp_writer, wav_ark_writer = None, None
 
-    buffer, length_buffer, key_buffer = [], [], []
-    wav_reader_len = len(open(rspecifier.split(":")[1]).readlines())
-    for idx, (key, (sample_rate, wav)) in enumerate(wav_reader):
-        if sample_rate != tokenizer.sample_rate:
-            raise ValueError("Sample rate mismatch between input audio and codec model")
-
-        if wav.ndim != 1:
-            raise ValueError("Multi-Channel audio is not supported so far")
-
-        wav = torch.from_numpy(wav)
-        buffer.append(wav)
-        length_buffer.append(len(wav))
-        key_buffer.append(key)
-
-        if idx == wav_reader_len - 1 or len(buffer) % batch_size == 0:
-            wavs = pad_list(buffer, 0.0).to(device).unsqueeze(1).float()
+    def process(bucket):
+        # The utterances in the bucket are sorted by length and batched,
+        # and the results are written in the input order.
+        codes_dict, resyn_dict = {}, {}
+        lengths = [len(wav) for _, wav in bucket]
+        for batch in make_batches(lengths, batch_size, batch_bins):
+            wavs = pad_list([torch.from_numpy(bucket[i][1]) for i in batch], 0.0)
+            wavs = wavs.to(device).unsqueeze(1).float()
             with torch.no_grad():
                 codes, resyn_wavs = tokenizer(wavs)
             codes += bias
 
             codes = codes.detach().cpu().numpy()
-            for code, length, key in zip(codes, length_buffer, key_buffer):
+            for code, i in zip(codes, batch):
+                length = lengths[i]
                 code = code[: length // tokenizer.subsample * tokenizer.n_codebook]
-                codec_writer[key] = code
+                codes_dict[i] = code
 
             if dump_audio:
                 resyn_wavs = resyn_wavs.detach().cpu().numpy()
-                for wav, length, key in zip(resyn_wavs, length_buffer, key_buffer):
-                    wav = wav[:length]
-                    kaldiio.save_ark(
-                        wav_ark_writer,
-                        {key: (wav, sample_rate)},
-                        scp=wav_scp_writer,
-                        append=True,
-                        write_function="soundfile",
-                        write_kwargs={"format": "wav", "subtype": None},
-                    )
-
-            buffer, length_buffer, key_buffer = [], [], []
+                for wav, i in zip(resyn_wavs, batch):
+                    resyn_dict[i] = wav[: lengths[i]]
+
+        for i, (key, _) in enumerate(bucket):
+            codec_writer[key] = codes_dict[i]
+            if dump_audio:
+                kaldiio.save_ark(
+                    wav_ark_writer,
+                    {key: (resyn_dict[i], tokenizer.sample_rate)},
+                    scp=wav_scp_writer,
+                    append=True,
+                    write_function="soundfile",
+                    write_kwargs={"format": "wav", "subtype": None},
+                )
+
+    bucket, num_utts, start_time = [], 0, time.perf_counter()
+    for key, (sample_rate, wav) in wav_reader:
+        if sample_rate != tokenizer.sample_rate:
+            raise ValueError("Sample rate mismatch between input audio and codec model")
+
+        if wav.ndim != 1:
+            raise ValueError("Multi-Channel audio is not supported so far")
+
+        bucket.append((key, wav))
+        num_utts += 1
+        if len(bucket) == bucket_size:
+            process(bucket)
+            bucket = []
+    if len(bucket) > 0:
+        process(bucket)
+
+    logger.info(
+        f"Tokenized {num_utts} utterances in {time.perf_counter() - start_time:.2f}s"
+    )
+
+    codec_writer.close()
+    if wav_scp_writer is not None:
+        wav_scp_writer.close()
+        wav_ark_writer.close()
+
+    return tokenizer.n_codebook, tokenizer.size_codebook
+
+
+def dump_codec(
+    rspecifier: str,
+    wspecifier: str,
+    vocab_file: str,
+    wav_wspecifier: str,
+    codec_choice: str,
+    codec_fs: int,
+    batch_size: int,
+    bias: int,
+    dump_audio: bool,
+    rank: int,
+    checkpoint_path: str = None,
+    config_path: str = None,
+    batch_bins: Optional[int] = None,
+    bucket_size: int = 1000,
+    nthreads: Optional[int] = None,
+    num_workers: int = 1,
+):
+    kwargs = dict(
+        codec_choice=codec_choice,
+        codec_fs=codec_fs,
+        batch_size=batch_size,
+        bias=bias,
+        dump_audio=dump_audio,
+        rank=rank,
+        checkpoint_path=checkpoint_path,
+        config_path=config_path,
+        batch_bins=batch_bins,
+        bucket_size=bucket_size,
+    )
+    if num_workers <= 1:
+        n_codebook, size_codebook = tokenize(
+            rspecifier, wspecifier, wav_wspecifier, nthreads=nthreads, **kwargs
+        )
+    else:
+        n_codebook, size_codebook = tokenize_parallel(
+            rspecifier, wspecifier, wav_wspecifier, nthreads, num_workers, **kwargs
+        )
 
     # (4) dump vocabulary file
     if rank == 1:
         vocab_writer = open(vocab_file, "w")
-        for codebook_idx in range(tokenizer.n_codebook):
-            for code_idx in range(tokenizer.size_codebook):
+        for codebook_idx in range(n_codebook):
+            for code_idx in range(size_codebook):
                 vocab_writer.write(f"<codec_layer{codebook_idx}_code{code_idx}>\n")
 
 
+def tokenize_parallel(
+    rspecifier: str,
+    wspecifier: str,
+    wav_wspecifier: str,
+    nthreads: Optional[int],
+    num_workers: int,
+    **kwargs,
+) -> Tuple[int, int]:
+    """Tokenize the contiguous shards of the input with the worker processes."""
+    if not rspecifier.startswith("scp:"):
+        raise ValueError(f"scp:<scp> is required with --num_workers > 1: {rspecifier}")
+    ark_path, scp_path = parse_ark_scp(wspecifier)
+    dump_audio = wav_wspecifier is not None and kwargs["dump_audio"]
+    if dump_audio:
+        wav_ark_path, wav_scp_path = parse_ark_scp(wav_wspecifier)
+    if nthreads is None:
+        nthreads = max(torch.get_num_threads() // num_workers, 1)
+
+    with open(rspecifier[4:]) as f:
+        lines = f.readlines()
+    num_workers = max(min(num_workers, len(lines)), 1)
+    tmpdir = tempfile.mkdtemp(dir=Path(ark_path).parent, prefix=".dump_codec.")
+    codec_shards = [
+        (f"{tmpdir}/codec.{n}.ark", f"{tmpdir}/codec.{n}.scp")
+        for n in range(num_workers)
+    ]
+    resyn_shards = [
+        (f"{tmpdir}/resyn.{n}.ark", f"{tmpdir}/resyn.{n}.scp")
+        for n in range(num_workers)
+    ]
+    try:
+        jobs = []
+        for n in range(num_workers):
+            shard = Path(tmpdir) / f"input.{n}.scp"
+            start = n * len(lines) // num_workers
+            end = (n + 1) * len(lines) // num_workers
+            shard.write_text("".join(lines[start:end]))
+            jobs.append(
+                (
+                    f"scp:{shard}",
+                    "ark,scp:{},{}".format(*codec_shards[n]),
+                    "ark,scp:{},{}".format(*resyn_shards[n]) if dump_audio else None,
+                )
+            )
+
+        # spawn is safe with CUDA and the threads of the parent process
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(num_workers) as pool:
+            results = [
+                pool.apply_async(tokenize, job, dict(kwargs, nthreads=nthreads))
+                for job in jobs
+            ]
+            n_codebook, size_codebook = [r.get() for r in results][0]
+
+        merge_ark_scp(codec_shards, ark_path, scp_path)
+        if dump_audio:
+            merge_ark_scp(resyn_shards, wav_ark_path, wav_scp_path)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    return n_codebook, size_codebook
+
+
 if __name__ == "__main__":
     parser = get_parser()
     args = parser.parse_args()
@@ -8,7 +8,9 @@
 
 
 import argparse
+import collections
 import logging
+import multiprocessing
 import os
 import sys
 
@@ -52,6 +54,20 @@ def get_parser():
     parser.add_argument("--online_feature_extract", type=str2bool, default=False)
     parser.add_argument("--feature_conf", type=str, default=None)
     parser.add_argument("--batch_bins", type=int, default=1)
+    parser.add_argument(
+        "--batch_frames",
+        type=int,
+        default=10000,
+        help="Number of frames to assign in one matrix product "
+        "when reading dumped features",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        help="Number of processes to assign the labels on CPU. If > 1, the labels "
+        "are assigned in parallel with reading or extracting the next features",
+    )
     parser.add_argument(
         "--utt2num_samples",
         type=str,
@@ -96,6 +112,10 @@ class ApplyKmeans(object):
         self.km_model = joblib.load(km_path)
         self.C_np = self.km_model.cluster_centers_.transpose()
         self.Cnorm_np = (self.C_np**2).sum(0, keepdims=True)
+        # NOTE: the features are usually float32 while the centers are float64,
+        # so keep the float32 copies to avoid casting the features in each call
+        self.C_np32 = self.C_np.astype(np.float32)
+        self.Cnorm_np32 = self.Cnorm_np.astype(np.float32)
 
         self.C = torch.from_numpy(self.C_np)
         self.Cnorm = torch.from_numpy(self.Cnorm_np)
@@ -104,20 +124,85 @@ class ApplyKmeans(object):
             self.Cnorm = self.Cnorm.cuda()
 
     def __call__(self, x):
+        # NOTE: ||x||^2 is constant for each frame and does not change the argmin
         if isinstance(x, torch.Tensor):
-            x = x.to(self.C.device)
-            dist = (
-                x.pow(2).sum(1, keepdim=True) - 2 * torch.matmul(x, self.C) + self.Cnorm
-            )
+            x = x.to(self.C.device, self.C.dtype)
+            dist = self.Cnorm - 2 * torch.matmul(x, self.C)
             return dist.argmin(dim=1).cpu().numpy()
         else:
-            dist = (
-                (x**2).sum(1, keepdims=True)
-                - 2 * np.matmul(x, self.C_np)
-                + self.Cnorm_np
-            )
+            if x.dtype == np.float32:
+                C, Cnorm = self.C_np32, self.Cnorm_np32
+            else:
+                C, Cnorm = self.C_np, self.Cnorm_np
+            dist = Cnorm - 2 * np.matmul(x, C)
             return np.argmin(dist, axis=1)
 
+    def batch_call(self, xs):
+        """Assign the labels of multiple utterances with one matrix product.
+
+        Args:
+            xs (List[np.ndarray]): features of the utterances, (T_i, D)
+
+        Returns:
+            List[np.ndarray]: labels of the utterances, (T_i,)
+        """
+        lens = [len(x) for x in xs]
+        labs = self(np.concatenate(xs, axis=0))
+        return np.split(labs, np.cumsum(lens)[:-1])
+
+
+def iterate_batched_feats(rspecifier, in_filetype, batch_frames):
+    """Yield (utts, feats) of up to `batch_frames` frames."""
+    utts, feats, num_frames = [], [], 0
+    for utt, feat in file_reader_helper(rspecifier, in_filetype):
+        utts.append(utt)
+        feats.append(feat)
+        num_frames += len(feat)
+        if num_frames >= batch_frames:
+            yield utts, feats
+            utts, feats, num_frames = [], [], 0
+    if len(utts) > 0:
+        yield utts, feats
+
+
+_worker_kmeans = None
+
+
+def _init_worker(km_path):
+    global _worker_kmeans
+    _worker_kmeans = ApplyKmeans(km_path, use_gpu=False)
+
+
+def _worker_batch_call(feats):
+    return _worker_kmeans.batch_call(feats)
+
+
+def iterate_labels(batches, km_path, use_gpu, num_workers=1):
+    """Yield (utt, label) for the batches of (utts, feats).
+
+    If num_workers > 1, the batches are assigned over a process pool, where each
+    worker loads the k-means model once, while the next batches are read or
+    extracted in the main process. At most 2 * num_workers batches are pending,
+    and the labels are yielded in the order of the utterances.
+    """
+    if num_workers <= 1:
+        apply_kmeans = ApplyKmeans(km_path, use_gpu=use_gpu)
+        for utts, feats in batches:
+            yield from zip(utts, apply_kmeans.batch_call(feats))
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(num_workers, initializer=_init_worker, initargs=(km_path,)) as pool:
+        pending = collections.deque()
+        for utts, feats in batches:
+            pending.append((utts, pool.apply_async(_worker_batch_call, (feats,))))
+            if len(pending) >= 2 * num_workers:
+                utts, result = pending.popleft()
+                yield from zip(utts, result.get())
+        while len(pending) > 0:
+            utts, result = pending.popleft()
+            yield from zip(utts, result.get())
+
 
 def dump_label(
     rspecifier,
@@ -137,16 +222,18 @@ def dump_label(
     else:
         feature_conf = None
 
-    apply_kmeans = ApplyKmeans(km_path, use_gpu=use_gpu)
+    num_workers = kwargs.get("num_workers", 1)
 
     if not online_feature_extract:
         # dumped ssl feature in kaldi ark format
+        batches = iterate_batched_feats(
+            rspecifier, in_filetype, kwargs.get("batch_frames", 1)
+        )
         with file_writer_helper(
             wspecifier,
             filetype=out_filetype,
         ) as writer:
-            for utt, feat in file_reader_helper(rspecifier, in_filetype):
-                lab = apply_kmeans(feat)
+            for utt, lab in iterate_labels(batches, km_path, use_gpu, num_workers):
                 writer[utt] = lab
     else:
         assert feature_conf["type"] in feature_reader_choice
@@ -168,18 +255,24 @@ def dump_label(
             utt2num_samples=args.utt2num_samples,
             batch_bins=kwargs.get("batch_bins", 1),
         )
-        with file_writer_helper(
-            wspecifier,
-            filetype=out_filetype,
-        ) as writer:
+
+        def iterate_extracted_feats():
             for utt_ids, data in iterator:
                 feats, feats_lens = reader.get_feats(
                     data["speech"], data["speech_lengths"]
                 )
+                yield utt_ids, [
+                    feats[idx][: feats_lens[idx]].numpy() for idx in range(len(utt_ids))
+                ]
 
-                for idx, utt in enumerate(utt_ids):
-                    lab = apply_kmeans(feats[idx][: feats_lens[idx]].numpy())
-                    writer[utt] = lab
+        with file_writer_helper(
+            wspecifier,
+            filetype=out_filetype,
+        ) as writer:
+            for utt, lab in iterate_labels(
+                iterate_extracted_feats(), km_path, use_gpu, num_workers
+            ):
+                writer[utt] = lab
 
     logger.info("finished successfully")
 
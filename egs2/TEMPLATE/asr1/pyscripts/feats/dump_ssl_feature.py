@@ -67,6 +67,12 @@ def get_parser():
     parser.add_argument(
         "--batch_bins", type=int, default=1, help="Number of sample points in a batch."
     )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=2,
+        help="Number of DataLoader workers to prefetch the audio batches.",
+    )
     parser.add_argument(
         "rspecifier", type=str, help="Read specifier for feats. e.g. ark:some.ark"
     )
@@ -101,6 +107,7 @@ def main(args):
         utt2num_samples=args.utt2num_samples,
         write_num_frames=args.write_num_frames,
         batch_bins=args.batch_bins,
+        num_workers=args.num_workers,
     )
 
 
@@ -47,7 +47,17 @@ def build_data_iterator(
     in_filetype: str,
     utt2num_samples: str,
     batch_bins: Optional[int] = 1,
+    num_workers: int = 2,
+    pin_memory: bool = False,
 ):
+    """Build the iterator of length-bucketed mini-batches.
+
+    The utterances are sorted by `utt2num_samples` and grouped into batches of
+    at most `batch_bins` samples (including padding), so that the padding
+    in each batch is small. The DataLoader workers load the next batches
+    in the background, and the batches are copied into the pinned memory
+    if `pin_memory` is True.
+    """
     dataset = ESPnetDataset(
         [(rspecifier[4:], "speech", in_filetype)],
         preprocess=None,
@@ -61,7 +71,8 @@ def build_data_iterator(
         dataset=dataset,
         batches=batches,
         collate_fn=CommonCollateFn(float_pad_value=0.0, int_pad_value=-1),
-        num_workers=2,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
     ).build_iter(0)
     return iterator
 
@@ -75,10 +86,20 @@ def dump_feature(
     utt2num_samples: Optional[str] = None,
     batch_bins: Optional[int] = None,
     write_num_frames: bool = None,
+    num_workers: int = 2,
 ):
     assert os.path.exists(utt2num_samples), f"{utt2num_samples} does not exist."
 
-    iterator = build_data_iterator(rspecifier, in_filetype, utt2num_samples, batch_bins)
+    # pinned memory is only useful for the asynchronous copy to GPU
+    pin_memory = str(getattr(reader, "device", "cpu")).startswith("cuda")
+    iterator = build_data_iterator(
+        rspecifier,
+        in_filetype,
+        utt2num_samples,
+        batch_bins,
+        num_workers=num_workers,
+        pin_memory=pin_memory,
+    )
 
     with file_writer_helper(
         wspecifier,
@@ -88,7 +109,7 @@ def dump_feature(
         for utt_ids, data in iterator:
             feats, feats_lens = reader.get_feats(data["speech"], data["speech_lengths"])
             for idx, utt in enumerate(utt_ids):
-                writer[utt] = feats[idx][: feats_lens[idx]].numpy()
+                writer[utt] = feats[idx][: int(feats_lens[idx])].numpy()
     logger.info("finished successfully")
 
 
@@ -172,8 +193,10 @@ class MfccFeatureReader(BaseFeatureReader):
                 x_lens = x_lens * self.sample_rate // self.audio_sample_rate
             batch_size = x.shape[0]
             for i in range(batch_size):
+                # NOTE: exclude the padding so that the features of the utterance
+                # do not depend on the other utterances in the batch
                 mfcc = torchaudio.compliance.kaldi.mfcc(
-                    waveform=x[i : i + 1],
+                    waveform=x[i : i + 1, : int(x_lens[i])],
                     sample_frequency=self.sample_rate,
                     use_energy=False,
                 ).transpose(
@@ -233,10 +256,11 @@ class HubertFeatureReader(BaseFeatureReader):
             if self.resample is not None:
                 x = self.resample(x)
                 x_lens = x_lens * self.sample_rate // self.audio_sample_rate
-            x = x.to(self.device)
-            mask = x.zeros_like(x, dtype=torch.long)
-            for i in range(x.shape[0]):
-                mask[i, x_lens[i] :].fill_(1)
+            x = x.to(self.device, non_blocking=True)
+            # True for the padded samples
+            x_lens = x_lens.to(self.device)
+            mask = torch.arange(x.size(1), device=self.device)
+            mask = mask[None, :] >= x_lens[:, None]
 
             feats, feats_padding_mask = [], []
             for start in range(0, x.size(1), self.max_chunk):
@@ -251,8 +275,11 @@ class HubertFeatureReader(BaseFeatureReader):
                 feats_padding_mask.append(feat_mask)
 
         feats = torch.cat(feats, 1).cpu()
-        feats_padding_mask = torch.cat(feats_padding_mask, 1).cpu()
-        feats_lens = (1 - feats_padding_mask).sum(dim=1)
+        if feats_padding_mask[0] is None:
+            feats_lens = torch.full((feats.size(0),), feats.size(1), dtype=torch.long)
+        else:
+            feats_padding_mask = torch.cat(feats_padding_mask, 1).cpu()
+            feats_lens = (~feats_padding_mask).sum(dim=1)
         return feats, feats_lens
 
 
@@ -301,8 +328,8 @@ class ESPnetHubertFeatureReader(BaseFeatureReader):
             if self.resample is not None:
                 x = self.resample(x)
                 x_lens = x_lens * self.sample_rate // self.audio_sample_rate
-            x = x.to(self.device)
-            x_lens = x_lens.to(self.device)
+            x = x.to(self.device, non_blocking=True)
+            x_lens = x_lens.to(self.device, non_blocking=True)
 
             feats, feats_lens = self.model.wav2vec2.extract_features(
                 waveforms=x,
@@ -310,7 +337,7 @@ class ESPnetHubertFeatureReader(BaseFeatureReader):
                 num_layers=self.layer,
             )
             feats = feats[-1].cpu()  # (batchsize, time, feat_dim)
-        return feats, feats_lens
+        return feats, feats_lens.cpu()
 
 
 class S3PRLFeatureReader(BaseFeatureReader):
@@ -355,7 +382,7 @@ class S3PRLFeatureReader(BaseFeatureReader):
             if self.resample is not None:
                 x = self.resample(x)
                 x_lens = x_lens * self.sample_rate // self.audio_sample_rate
-            x = x.to(self.device)
+            x = x.to(self.device, non_blocking=True)
 
             feats, feats_lens = self.model(x, x_lens)
         feats = feats.cpu()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Utilities to batch the utterances of the data processing scripts."""
+
+from typing import List, Optional
+
+
+def make_batches(
+    lengths: List[int], batch_size: int, batch_bins: Optional[int] = None
+) -> List[List[int]]:
+    """Group the utterances sorted by length into batches.
+
+    Each batch has at most batch_size utterances and at most batch_bins samples
+    including the padding. An utterance longer than batch_bins forms a batch
+    by itself.
+
+    Args:
+        lengths (List[int]): Numbers of the samples of the utterances.
+        batch_size (int): Maximum number of the utterances in a batch.
+        batch_bins (Optional[int]): Maximum number of the padded samples.
+
+    Returns:
+        List[List[int]]: Indices of the utterances in each batch.
+    """
+    batches, batch = [], []
+    for idx in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+        # the first utterance is the longest one in the batch
+        if len(batch) > 0 and (
+            len(batch) == batch_size
+            or (
+                batch_bins is not None
+                and (len(batch) + 1) * lengths[batch[0]] > batch_bins
+            )
+        ):
+            batches.append(batch)
+            batch = []
+        batch.append(idx)
+    if len(batch) > 0:
+        batches.append(batch)
+    return batches
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""Benchmark the nearest-codeword search of the residual vector quantizer.
+
+Measures the tokenization throughput (frames/s) of ResidualVectorQuantization
+with the full distance matrix used in training (reference), the chunked
+search with the cached codebook norms (exact), and the low-precision search
+verified in float32 (low_precision), together with the agreement of the codes
+with the reference.
+"""
+
+import argparse
+import logging
+import time
+import types
+
+import torch
+
+from espnet2.gan_codec.shared.quantizer.modules.core_vq import (
+    EuclideanCodebook,
+    ResidualVectorQuantization,
+    set_codebook_search,
+)
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark the nearest-codeword search of RVQ"
+    )
+    parser.add_argument(
+        "--codebook_sizes",
+        type=int,
+        nargs="+",
+        default=[256, 1024, 4096, 16384],
+        help="codebook sizes to benchmark",
+    )
+    parser.add_argument("--dim", type=int, default=128, help="codebook dimension")
+    parser.add_argument(
+        "--num_quantizers", type=int, default=8, help="number of the quantizers"
+    )
+    parser.add_argument(
+        "--num_frames", type=int, default=20000, help="number of the frames"
+    )
+    parser.add_argument(
+        "--chunk_size", type=int, default=4096, help="chunk size of the search"
+    )
+    parser.add_argument("--num_runs", type=int, default=3, help="number of the runs")
+    parser.add_argument("--device", type=str, default="cpu", help="device")
+    return parser
+
+
+def reference_quantize(self, x):
+    # the search used before the cached index, computing the full distance matrix
+    embed = self.embed.t()
+    dist = -(
+        x.pow(2).sum(1, keepdim=True)
+        - 2 * x @ embed
+        + embed.pow(2).sum(0, keepdim=True)
+    )
+    return dist.max(dim=-1).indices
+
+
+def measure(rvq, x, num_runs):
+    codes = rvq.encode(x)  # warm-up and build the indices
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(num_runs):
+        rvq.encode(x)
+    if x.is_cuda:
+        torch.cuda.synchronize()
+    elapsed = (time.perf_counter() - start) / num_runs
+    return codes, x.size(-1) / elapsed
+
+
+@torch.no_grad()
+def main():
+    args = get_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    torch.manual_seed(0)
+
+    print(
+        "| codebook size | reference (frames/s) | exact (frames/s) "
+        "| low_precision (frames/s) | agreement (exact / low_precision) |"
+    )
+    print("|---|---|---|---|---|")
+    for codebook_size in args.codebook_sizes:
+        rvq = ResidualVectorQuantization(
+            num_quantizers=args.num_quantizers,
+            dim=args.dim,
+            codebook_size=codebook_size,
+            kmeans_init=False,
+        )
+        for module in rvq.modules():
+            if isinstance(module, EuclideanCodebook):
+                module.embed.normal_()
+                module.inited.fill_(True)
+        rvq = rvq.to(args.device).eval()
+        x = torch.randn(1, args.dim, args.num_frames, device=args.device)
+
+        codebooks = [m for m in rvq.modules() if isinstance(m, EuclideanCodebook)]
+        for codebook in codebooks:
+            codebook.quantize = types.MethodType(reference_quantize, codebook)
+        ref_codes, ref_fps = measure(rvq, x, args.num_runs)
+        for codebook in codebooks:
+            del codebook.quantize
+
+        set_codebook_search(rvq, chunk_size=args.chunk_size)
+        codes, exact_fps = measure(rvq, x, args.num_runs)
+        exact_agreement = codes.eq(ref_codes).float().mean().item()
+
+        set_codebook_search(rvq, chunk_size=args.chunk_size, low_precision=True)
+        codes, low_fps = measure(rvq, x, args.num_runs)
+        low_agreement = codes.eq(ref_codes).float().mean().item()
+
+        print(
+            f"| {codebook_size} | {ref_fps:.0f} | {exact_fps:.0f} "
+            f"| {low_fps:.0f} | {exact_agreement:.4f} / {low_agreement:.4f} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
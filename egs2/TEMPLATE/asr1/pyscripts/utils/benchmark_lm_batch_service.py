@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+
+"""Benchmark the cross-utterance batched LM scoring of BatchScoringService.
+
+Decodes the same utterances with BatchBeamSearch using a TransformerLM, one
+utterance at a time (per-utterance scoring) and in parallel threads sharing
+the LM through BatchScoringService, and reports the decoding throughput
+(utterances/s), the number of LM calls and the mean number of hypotheses
+scored in one LM call, together with the agreement of the hypotheses.
+
+The service only pays off when several threads decode at the same time: a
+single thread gets no larger batches and waits up to --max_wait for other
+requests at every step, so "1 thread + service" is slower than per-utterance
+decoding. The default arguments give the rows of all these cases.
+"""
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+from espnet2.lm.transformer_lm import TransformerLM
+from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.scorers.batch_service import BatchScoringService, ServiceScorer
+from espnet.nets.scorers.length_bonus import LengthBonus
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark the cross-utterance batched LM scoring"
+    )
+    parser.add_argument(
+        "--num_threads",
+        type=int,
+        nargs="+",
+        default=[1, 4, 16],
+        help="numbers of the decoding threads sharing the LM",
+    )
+    parser.add_argument(
+        "--num_utts", type=int, default=16, help="number of the utterances"
+    )
+    parser.add_argument("--beam_size", type=int, default=5, help="beam size")
+    parser.add_argument(
+        "--output_len", type=int, default=30, help="length of the hypotheses"
+    )
+    parser.add_argument("--vocab_size", type=int, default=1000, help="vocabulary")
+    parser.add_argument("--unit", type=int, default=256, help="LM units")
+    parser.add_argument("--layer", type=int, default=4, help="LM layers")
+    parser.add_argument(
+        "--max_wait", type=float, default=0.002, help="max_wait of the service"
+    )
+    parser.add_argument("--device", type=str, default="cpu", help="device")
+    return parser
+
+
+class CountingScorer(ServiceScorer):
+    """Call the LM of the service directly while counting the calls.
+
+    The service is not started: the calls bypass its thread and its batching.
+    """
+
+    def __init__(self, service):
+        super().__init__(service)
+        self.num_calls = 0
+        self.num_hyps = 0
+
+    def batch_score(self, ys, states, xs):
+        self.num_calls += 1
+        self.num_hyps += len(ys)
+        return self.scorer.batch_score(ys, states, xs)
+
+
+def decode(lm_scorer, x, args):
+    beam = BatchBeamSearch(
+        beam_size=args.beam_size,
+        vocab_size=args.vocab_size,
+        weights={"lm": 1.0, "length_bonus": 1.0},
+        scorers={"lm": lm_scorer, "length_bonus": LengthBonus(args.vocab_size)},
+        sos=args.vocab_size - 1,
+        eos=args.vocab_size - 1,
+    ).to(args.device)
+    with torch.no_grad():
+        return beam(x=x, maxlenratio=-args.output_len)[0].yseq.tolist()
+
+
+def main():
+    args = get_parser().parse_args()
+    torch.manual_seed(0)
+    lm = (
+        TransformerLM(
+            args.vocab_size,
+            layer=args.layer,
+            unit=args.unit * 4,
+            att_unit=args.unit,
+            embed_unit=args.unit,
+            head=4,
+        )
+        .to(args.device)
+        .eval()
+    )
+    xs = [torch.randn(10, 2, device=args.device) for _ in range(args.num_utts)]
+
+    print(
+        "| mode | utterances/s | LM calls | mean batch size (hyps/call) "
+        "| agreement |"
+    )
+    print("|---|---|---|---|---|")
+
+    scorer = CountingScorer(BatchScoringService(lm))
+    decode(scorer, xs[0], args)  # warm-up
+    scorer.num_calls = scorer.num_hyps = 0
+    start = time.perf_counter()
+    expected = [decode(scorer, x, args) for x in xs]
+    elapsed = time.perf_counter() - start
+    print(
+        f"| per-utterance | {len(xs) / elapsed:.2f} | {scorer.num_calls} "
+        f"| {scorer.num_hyps / scorer.num_calls:.1f} | 1.0000 |"
+    )
+
+    for num_threads in args.num_threads:
+        service = BatchScoringService(lm, max_wait=args.max_wait)
+        with service, ThreadPoolExecutor(num_threads) as executor:
+            start = time.perf_counter()
+            hyps = list(
+                executor.map(lambda x: decode(ServiceScorer(service), x, args), xs)
+            )
+            elapsed = time.perf_counter() - start
+        agreement = sum(h == e for h, e in zip(hyps, expected)) / len(xs)
+        print(
+            f"| {num_threads} thread{'s' if num_threads > 1 else ''} + service "
+            f"| {len(xs) / elapsed:.2f} "
+            f"| {service.num_calls} | {service.mean_batch_size:.1f} "
+            f"| {agreement:.4f} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+"""Benchmark the successor scoring of NgramFullScorer.
+
+Decodes random utterances with BatchBeamSearch using an n-gram LM together with
+a random decoder, which keeps the hypotheses as diverse as in ASR decoding, and
+compares the ways NgramFullScorer scores the whole vocabulary:
+
+- per-token loop: kenlm BaseScore for each token, no cache (the old scorer)
+- cache + kenlm loop: per-token loop on a cache miss
+- cache + tensor ops: ArpaSuccessors on a cache miss
+
+The LM is either an existing ARPA file (--arpa, e.g. the lmplz output of asr.sh)
+or a word n-gram with interpolated absolute discounting estimated on --text.
+Reports the decoding throughput (utterances/s), the cache hit rate and whether
+the hypotheses are identical to the per-token loop.
+"""
+
+import argparse
+import math
+import re
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import torch
+
+from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.scorer_interface import BatchScorerInterface
+from espnet.nets.scorers.length_bonus import LengthBonus
+from espnet.nets.scorers.ngram import NgramFullScorer
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark the successor scoring of NgramFullScorer"
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--arpa", type=str, help="ARPA file of the n-gram LM")
+    group.add_argument(
+        "--text", type=str, nargs="+", help="text files to estimate the n-gram LM"
+    )
+    parser.add_argument("--order", type=int, default=4, help="n-gram order")
+    parser.add_argument(
+        "--vocab_size",
+        type=int,
+        default=5000,
+        help="number of the most frequent words in the vocabulary",
+    )
+    parser.add_argument("--discount", type=float, default=0.7, help="absolute discount")
+    parser.add_argument(
+        "--num_utts", type=int, default=10, help="number of the utterances"
+    )
+    parser.add_argument("--beam_size", type=int, default=10, help="beam size")
+    parser.add_argument(
+        "--output_len", type=int, default=30, help="length of the hypotheses"
+    )
+    parser.add_argument(
+        "--cache_size", type=int, default=1024, help="cache_size of the scorer"
+    )
+    parser.add_argument(
+        "--ngram_weight", type=float, default=0.9, help="weight of the n-gram LM"
+    )
+    return parser
+
+
+def write_arpa(text, arpa, order, vocab_size, discount):
+    """Estimate an interpolated absolute discounting n-gram LM."""
+    sentences = []
+    for path in text:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                words = re.findall(r"[a-z']+", line.lower())
+                if len(words) >= 3:
+                    sentences.append(words)
+    vocab = Counter(w for words in sentences for w in words)
+    vocab = {w for w, _ in vocab.most_common(vocab_size - 3)}
+
+    counts = [Counter() for _ in range(order + 1)]
+    for words in sentences:
+        words = ["<s>"] + [w if w in vocab else "<unk>" for w in words] + ["</s>"]
+        for n in range(1, order + 1):
+            for i in range(len(words) - n + 1):
+                counts[n][tuple(words[i : i + n])] += 1
+    del counts[1][("<s>",)]
+
+    total = sum(counts[1].values())
+    probs = [None, {g: c / total for g, c in counts[1].items()}]
+    probs[1][("<s>",)] = 0.0
+    probs[1].setdefault(("<unk>",), 0.0)
+    backoffs = {}
+    for n in range(2, order + 1):
+        context_counts, context_types = Counter(), Counter()
+        for g, c in counts[n].items():
+            context_counts[g[:-1]] += c
+            context_types[g[:-1]] += 1
+        for h, c in context_counts.items():
+            backoffs[h] = discount * context_types[h] / c
+        probs.append(
+            {
+                g: (c - discount) / context_counts[g[:-1]]
+                + backoffs[g[:-1]] * probs[n - 1][g[1:]]
+                for g, c in counts[n].items()
+            }
+        )
+
+    with open(arpa, "w", encoding="utf-8") as f:
+        f.write("\n\\data\\\n")
+        for n in range(1, order + 1):
+            f.write(f"ngram {n}={len(probs[n])}\n")
+        for n in range(1, order + 1):
+            f.write(f"\n\\{n}-grams:\n")
+            for g, p in probs[n].items():
+                logp = math.log10(p) if p > 0 else -99.0
+                line = f"{logp:.7f}\t{' '.join(g)}"
+                if n < order:
+                    line += f"\t{math.log10(backoffs.get(g, 1.0)):.7f}"
+                f.write(line + "\n")
+        f.write("\n\\end\\\n")
+    return ["<blank>", "<unk>"] + sorted(vocab) + ["<eos>"]
+
+
+def read_vocab(arpa):
+    words, order = [], 0
+    with open(arpa, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith("\\"):
+                order = 1 if line == "\\1-grams:" else 0
+            elif order == 1 and line:
+                words.append(line.split()[1])
+    words = [w for w in words if w not in ("<s>", "</s>", "<unk>")]
+    return ["<blank>", "<unk>"] + words + ["<eos>"]
+
+
+class RandomDecoder(BatchScorerInterface):
+    """Score the tokens with the rows of x, one row for each output step."""
+
+    def score(self, y, state, x):
+        return torch.log_softmax(x[len(y) - 1], dim=-1), None
+
+    def batch_score(self, ys, states, xs):
+        return torch.log_softmax(xs[:, ys.size(1) - 1], dim=-1), states
+
+
+class CountingNgramScorer(NgramFullScorer):
+    """Count the successor score lookups and the cache hits."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.num_calls = 0
+        self.num_hits = 0
+
+    def successor_scores(self, y, state):
+        self.num_calls += 1
+        self.num_hits += state in self.successor_cache
+        return super().successor_scores(y, state)
+
+
+def main():
+    args = get_parser().parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        if args.arpa is None:
+            arpa = str(Path(tmpdir) / f"{args.order}gram.arpa")
+            token_list = write_arpa(
+                args.text, arpa, args.order, args.vocab_size, args.discount
+            )
+        else:
+            arpa = args.arpa
+            token_list = read_vocab(arpa)
+
+        with open(arpa, encoding="utf-8") as f:
+            counts = []
+            for line in f:
+                if line.startswith("ngram "):
+                    counts.append(line.split("=")[1].strip())
+                elif counts and not line.strip():
+                    break
+
+        scorers = {
+            "per-token loop": CountingNgramScorer(arpa, token_list, cache_size=0),
+            "cache + kenlm loop": CountingNgramScorer(
+                arpa, token_list, cache_size=args.cache_size
+            ),
+            "cache + tensor ops": CountingNgramScorer(
+                arpa, token_list, cache_size=args.cache_size
+            ),
+        }
+        scorers["per-token loop"].arpa = None
+        scorers["cache + kenlm loop"].arpa = None
+    order = scorers["cache + tensor ops"].arpa.order
+
+    vocab_size = len(token_list)
+    torch.manual_seed(0)
+    xs = [
+        3 * torch.randn(args.output_len + 1, vocab_size) for _ in range(args.num_utts)
+    ]
+
+    print(f"{order}-gram LM, {vocab_size} tokens, n-gram counts: {', '.join(counts)}")
+    print("| mode | utterances/s | speedup | cache hit rate | identical |")
+    print("|---|---|---|---|---|")
+    expected, base = None, None
+    for mode, ngram in scorers.items():
+        beam = BatchBeamSearch(
+            beam_size=args.beam_size,
+            vocab_size=vocab_size,
+            weights={"decoder": 1.0, "ngram": args.ngram_weight, "length_bonus": 1.0},
+            scorers={
+                "decoder": RandomDecoder(),
+                "ngram": ngram,
+                "length_bonus": LengthBonus(vocab_size),
+            },
+            sos=vocab_size - 1,
+            eos=vocab_size - 1,
+        )
+        start = time.perf_counter()
+        with torch.no_grad():
+            hyps = [
+                beam(x=x, maxlenratio=-args.output_len)[0].yseq.tolist() for x in xs
+            ]
+        throughput = len(xs) / (time.perf_counter() - start)
+        if expected is None:
+            expected, base = hyps, throughput
+        print(
+            f"| {mode} | {throughput:.3f} | {throughput / base:.2f}x "
+            f"| {ngram.num_hits / ngram.num_calls:.3f} | {hyps == expected} |"
+        )
+
+
+if __name__ == "__main__":
+    main()
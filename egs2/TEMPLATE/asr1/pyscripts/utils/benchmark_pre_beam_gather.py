@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+
+"""Benchmark the pre-beam candidate gathering of BatchBeamSearch.
+
+Decodes random utterances with BatchBeamSearch using a decoder, an LM and
+the length bonus, with the full search over the vocabulary (pre_beam_gather
+off) and with the scores gathered only for the pre-beam candidates of the
+decoder (pre_beam_gather on). The decoder and the LM return precomputed
+log-probabilities, so that the time of the search itself is measured, which
+is what pre_beam_gather reduces. Reports the time of a search step, the
+decoding throughput (utterances/s) and the ratio of the hypotheses which are
+identical to the full search. They can differ, since the full search can
+select the tokens out of the decoder's pre-beam with the LM scores.
+"""
+
+import argparse
+import logging
+import time
+
+import torch
+
+from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.scorer_interface import BatchScorerInterface
+from espnet.nets.scorers.length_bonus import LengthBonus
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark the pre-beam candidate gathering of BatchBeamSearch"
+    )
+    parser.add_argument(
+        "--vocab_sizes",
+        type=int,
+        nargs="+",
+        default=[5000, 50000],
+        help="vocabulary sizes to benchmark",
+    )
+    parser.add_argument(
+        "--num_utts", type=int, default=10, help="number of the utterances"
+    )
+    parser.add_argument("--beam_size", type=int, default=10, help="beam size")
+    parser.add_argument(
+        "--output_len", type=int, default=30, help="length of the hypotheses"
+    )
+    parser.add_argument("--lm_weight", type=float, default=0.3, help="LM weight")
+    parser.add_argument(
+        "--num_rows",
+        type=int,
+        default=64,
+        help="number of the precomputed score rows of each scorer",
+    )
+    parser.add_argument("--nthreads", type=int, default=1, help="CPU threads")
+    parser.add_argument("--device", type=str, default="cpu", help="device")
+    return parser
+
+
+class PrecomputedScorer(BatchScorerInterface):
+    """Return a precomputed row of log-probabilities chosen by the prefix and x."""
+
+    def __init__(self, scores):
+        self.scores = scores
+
+    def _rows(self, ys, xs):
+        rows = ys[:, -1] * 7 + ys.size(1) + xs[:, 0, 0].long()
+        return rows % self.scores.size(0)
+
+    def score(self, y, state, x):
+        return self.scores[self._rows(y[None], x[None])[0]], None
+
+    def batch_score(self, ys, states, xs):
+        return self.scores[self._rows(ys, xs)], states
+
+
+class TimedBatchBeamSearch(BatchBeamSearch):
+    """Measure the time and the number of the search steps."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.elapsed = 0.0
+        self.num_steps = 0
+
+    def search(self, running_hyps, x, pre_x=None):
+        start = time.perf_counter()
+        best = super().search(running_hyps, x, pre_x)
+        if x.is_cuda:
+            torch.cuda.synchronize()
+        self.elapsed += time.perf_counter() - start
+        self.num_steps += 1
+        return best
+
+
+@torch.no_grad()
+def main():
+    args = get_parser().parse_args()
+    logging.basicConfig(level=logging.ERROR, format="%(message)s")
+    torch.set_num_threads(args.nthreads)
+
+    print(
+        "| vocab size | pre_beam_gather | step (ms) | utterances/s | speedup "
+        "| identical |"
+    )
+    print("|---|---|---|---|---|---|")
+    for vocab_size in args.vocab_sizes:
+        torch.manual_seed(0)
+        scorers = {
+            k: PrecomputedScorer(
+                torch.log_softmax(
+                    3 * torch.randn(args.num_rows, vocab_size, device=args.device),
+                    dim=-1,
+                )
+            )
+            for k in ["decoder", "lm"]
+        }
+        # the utterance index in x selects the rows of the scores
+        xs = [
+            torch.full((10, 2), float(i), device=args.device)
+            for i in range(args.num_utts)
+        ]
+
+        expected, base = None, None
+        for pre_beam_gather in [False, True]:
+            beam = TimedBatchBeamSearch(
+                beam_size=args.beam_size,
+                vocab_size=vocab_size,
+                weights={"decoder": 1.0, "lm": args.lm_weight, "length_bonus": 1.0},
+                scorers=dict(scorers, length_bonus=LengthBonus(vocab_size)),
+                sos=vocab_size - 1,
+                eos=vocab_size - 1,
+                pre_beam_score_key="decoder",
+                pre_beam_gather=pre_beam_gather,
+            ).to(args.device)
+            beam(x=xs[0], maxlenratio=-args.output_len)  # warm-up
+            beam.elapsed, beam.num_steps = 0.0, 0
+
+            start = time.perf_counter()
+            hyps = [
+                beam(x=x, maxlenratio=-args.output_len)[0].yseq.tolist() for x in xs
+            ]
+            throughput = len(xs) / (time.perf_counter() - start)
+            if expected is None:
+                expected, base = hyps, throughput
+            identical = sum(h == e for h, e in zip(hyps, expected)) / len(xs)
+            print(
+                f"| {vocab_size} | {pre_beam_gather} "
+                f"| {1000 * beam.elapsed / beam.num_steps:.2f} | {throughput:.2f} "
+                f"| {throughput / base:.2f}x | {identical:.2f} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
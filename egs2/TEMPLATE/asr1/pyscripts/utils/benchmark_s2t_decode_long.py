@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+
+"""Benchmark the batched long-form decoding of the S2T Speech2Text.
+
+Builds a randomly initialized OWSM-like model and decodes the fixed-length
+segments of a long input with Speech2Text.decode_long(batch_size=N), which
+runs the encoder and the beam search (including the CTC prefix scoring if
+--ctc_weights has a non-zero weight) for N segments together. batch_size=1
+decodes the same segments one by one, so the rows differ only in the batching.
+Reports the decoding throughput (segments/s), the speedup over batch_size=1
+and whether the utterances are identical to batch_size=1.
+"""
+
+import argparse
+import logging
+import tempfile
+import time
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import torch
+
+from espnet2.bin.s2t_inference import Speech2Text
+from espnet2.tasks.s2t import S2TTask
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        description="benchmark the batched long-form decoding of S2T"
+    )
+    parser.add_argument(
+        "--batch_sizes",
+        type=int,
+        nargs="+",
+        default=[1, 4, 8],
+        help="numbers of the segments decoded together",
+    )
+    parser.add_argument(
+        "--ctc_weights",
+        type=float,
+        nargs="+",
+        default=[0.0, 0.3],
+        help="CTC weights in joint decoding",
+    )
+    parser.add_argument(
+        "--num_segments", type=int, default=8, help="number of the segments"
+    )
+    parser.add_argument(
+        "--segment_len", type=float, default=10.0, help="segment length in seconds"
+    )
+    parser.add_argument("--beam_size", type=int, default=5, help="beam size")
+    parser.add_argument(
+        "--output_len", type=int, default=20, help="length of the hypotheses"
+    )
+    parser.add_argument("--vocab_size", type=int, default=5000, help="vocabulary")
+    parser.add_argument("--unit", type=int, default=256, help="attention units")
+    parser.add_argument("--layer", type=int, default=4, help="number of layers")
+    parser.add_argument("--device", type=str, default="cpu", help="device")
+    return parser
+
+
+def build_model(output_dir: Path, args) -> Tuple[Path, str]:
+    resolution = 0.02
+    num_times = int(round(args.segment_len / resolution)) + 1
+    times = [f"<{i * resolution:.2f}>" for i in range(num_times)]
+    specials = ["<blank>", "<unk>", "<na>", "<nospeech>", "<eng>", "<asr>"]
+    specials.append("<notimestamps>")
+    tail = ["<sos>", "<eos>", "<sop>"]
+    num_words = args.vocab_size - len(specials) - len(times) - len(tail)
+    assert num_words > 0, f"vocab_size is too small: {args.vocab_size}"
+    token_list = output_dir / "tokens.txt"
+    token_list.write_text(
+        "\n".join(specials + times + [f"w{i}" for i in range(num_words)] + tail) + "\n"
+    )
+    S2TTask.main(
+        cmd=[
+            "--dry_run",
+            "true",
+            "--output_dir",
+            str(output_dir),
+            "--token_list",
+            str(token_list),
+            "--token_type",
+            "word",
+            "--encoder",
+            "transformer",
+            "--encoder_conf",
+            f"output_size={args.unit}",
+            "--encoder_conf",
+            f"num_blocks={args.layer}",
+            "--encoder_conf",
+            f"linear_units={4 * args.unit}",
+            "--decoder",
+            "transformer",
+            "--decoder_conf",
+            f"num_blocks={args.layer}",
+            "--decoder_conf",
+            f"linear_units={4 * args.unit}",
+            "--preprocessor_conf",
+            "notime_symbol='<notimestamps>'",
+            "--preprocessor_conf",
+            f"first_time_symbol='{times[0]}'",
+            "--preprocessor_conf",
+            f"last_time_symbol='{times[-1]}'",
+            "--preprocessor_conf",
+            f"speech_length={args.segment_len}",
+            "--preprocessor_conf",
+            "fs=16000",
+            "--preprocessor_conf",
+            f"speech_resolution={resolution}",
+        ]
+    )
+    return output_dir / "config.yaml", times[-2]
+
+
+def main():
+    args = get_parser().parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    torch.manual_seed(0)
+    speech = np.random.randn(int(args.num_segments * args.segment_len * 16000))
+
+    print("| ctc_weight | batch_size | segments/s | speedup | identical |")
+    print("|---|---|---|---|---|")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        config, end_time_threshold = build_model(Path(tmpdir), args)
+        for ctc_weight in args.ctc_weights:
+            torch.manual_seed(0)
+            speech2text = Speech2Text(
+                s2t_train_config=config,
+                device=args.device,
+                beam_size=args.beam_size,
+                maxlenratio=-args.output_len,
+                ctc_weight=ctc_weight,
+            )
+
+            def decode(speech, batch_size):
+                # decode_long(batch_size=1) restarts the segments at the incomplete
+                # utterances, so call the batched decoding to keep the segments
+                return speech2text._decode_long_batched(
+                    torch.tensor(speech),
+                    batch_size=batch_size,
+                    end_time_id_threshold=speech2text.converter.token2id[
+                        end_time_threshold
+                    ],
+                    lang_sym="<eng>",
+                    task_sym="<asr>",
+                    skip_last_chunk_threshold=0.2,
+                )
+
+            decode(speech[: int(args.segment_len * 16000)], 1)  # warm-up
+            expected, base = None, None
+            for batch_size in args.batch_sizes:
+                start = time.perf_counter()
+                utterances = decode(speech, batch_size)
+                if args.device.startswith("cuda"):
+                    torch.cuda.synchronize()
+                throughput = args.num_segments / (time.perf_counter() - start)
+                if expected is None:
+                    expected, base = utterances, throughput
+                print(
+                    f"| {ctc_weight} | {batch_size} | {throughput:.3f} "
+                    f"| {throughput / base:.2f}x | {utterances == expected} |"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,591 @@
+#!/usr/bin/env python3
+
+#  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
+
+"""Evaluate generated speech with multiple metrics in batches.
+
+Unified runner of the metrics of evaluate_secs.py, evaluate_pseudomos.py,
+evaluate_speechbertscore.py and calculate_speech_metrics.py for large
+evaluation sets:
+
+    - The metric models are loaded once in each worker process.
+    - The utterances are sorted by length and batched by the number of samples,
+      so that the padding is small.
+    - The batches are distributed over the worker processes (and devices).
+    - The features of the groundtruth audios (speaker embeddings and SSL
+      features) can be cached on the disk across the runs with --cache_dir,
+      since the same references are evaluated for every generation run.
+
+The results are written in the same format as the single-metric scripts,
+i.e., "{outdir}/utt2{metric}" and "{outdir}/{metric}_avg_result.txt".
+"""
+
+import argparse
+import fnmatch
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import librosa
+import numpy as np
+import soundfile as sf
+import torch
+
+from espnet2.train.preprocess_cache import PreprocessCache
+
+# NOTE: make pyscripts importable when this file is run as a script
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from pyscripts.utils.batch_utils import make_batches  # noqa: E402
+
+METRICS = ("secs", "pmos", "spbs", "stoi", "estoi", "snr", "si_snr")
+
+
+def find_files(
+    root_dir: str, query: List[str] = ["*.flac", "*.wav"], include_root_dir: bool = True
+) -> List[str]:
+    """Find files recursively.
+
+    Args:
+        root_dir (str): Root root_dir to find.
+        query (List[str]): Query to find.
+        include_root_dir (bool): If False, root_dir name is not included.
+
+    Returns:
+        List[str]: List of found filenames.
+
+    """
+    files = []
+    for root, dirnames, filenames in os.walk(root_dir, followlinks=True):
+        for q in query:
+            for filename in fnmatch.filter(filenames, q):
+                files.append(os.path.join(root, filename))
+    if not include_root_dir:
+        files = [file_.replace(root_dir + "/", "") for file_ in files]
+
+    return files
+
+
+def _get_basename(path: str) -> str:
+    return os.path.splitext(os.path.split(path)[-1])[0]
+
+
+def read_wavdir_or_wavscp(wavdir_or_wavscp: str) -> Dict[str, str]:
+    """Return the audio paths keyed by the utterance IDs.
+
+    The utterance IDs are the basenames of the files in the directory
+    or the keys of wav.scp.
+    """
+    if os.path.isdir(wavdir_or_wavscp):
+        files = sorted(find_files(wavdir_or_wavscp))
+        return {_get_basename(path): path for path in files}
+    files = {}
+    with open(wavdir_or_wavscp) as f:
+        for line in f:
+            utt_id, path = line.strip().split(None, 1)
+            if path.endswith("|"):
+                raise ValueError("Not supported wav.scp format.")
+            files[utt_id] = path
+    return files
+
+
+def match_files(
+    gen_files: Dict[str, str], gt_files: Dict[str, str]
+) -> List[Tuple[str, str, str]]:
+    """Return (utt_id, gen_path, gt_path) of the generated utterances.
+
+    The groundtruth of each generated utterance is the one with the same ID,
+    or the one whose basename is included in the generated path as in
+    evaluate_secs.py.
+    """
+    items = []
+    for utt_id, gen_path in gen_files.items():
+        if utt_id in gt_files:
+            items.append((utt_id, gen_path, gt_files[utt_id]))
+            continue
+        matched = [k for k, v in gt_files.items() if _get_basename(v) in gen_path]
+        if len(matched) != 1:
+            raise ValueError(f"Failed to find the groundtruth of {gen_path}.")
+        items.append((matched[0], gen_path, gt_files[matched[0]]))
+    return items
+
+
+def load_wav(path: str) -> Tuple[np.ndarray, int]:
+    """Load the audio as a mono float32 waveform."""
+    x, fs = sf.read(path, dtype="float32", always_2d=True)
+    return x.mean(axis=1), fs
+
+
+def resample(x: np.ndarray, fs: int, target_fs: int) -> np.ndarray:
+    if fs == target_fs:
+        return x
+    return librosa.resample(x, orig_sr=fs, target_sr=target_fs)
+
+
+def peak_normalize(x: np.ndarray) -> np.ndarray:
+    amax = np.amax(np.absolute(x))
+    return x / amax if amax > 0 else x
+
+
+def pad_batch(xs: List[np.ndarray]) -> torch.Tensor:
+    padded = np.zeros((len(xs), max(len(x) for x in xs)), dtype=np.float32)
+    for i, x in enumerate(xs):
+        padded[i, : len(x)] = x
+    return torch.from_numpy(padded)
+
+
+class Metric:
+    """Metric of the batches of the generated utterances.
+
+    The metrics with requires_reference compare the generated utterances with
+    the features of the groundtruth audios given by reference_features,
+    which are cached on the disk if cache_reference is True.
+    """
+
+    name = ""
+    requires_reference = False
+    cache_reference = False
+
+    def config(self) -> Dict[str, Any]:
+        """Return the configuration which determines the reference features."""
+        return dict(metric=self.name)
+
+    def reference_features(
+        self, wavs: List[Tuple[np.ndarray, int]]
+    ) -> List[Dict[str, np.ndarray]]:
+        """Return the features of the groundtruth audios."""
+        return [dict(wav=x, fs=np.array(fs)) for x, fs in wavs]
+
+    def __call__(
+        self,
+        wavs: List[Tuple[np.ndarray, int]],
+        refs: Optional[List[Dict[str, np.ndarray]]] = None,
+    ) -> List[float]:
+        """Return the scores of the generated utterances."""
+        raise NotImplementedError
+
+
+class SECSMetric(Metric):
+    """Speaker embedding cosine similarity with the speechbrain x-vectors."""
+
+    name = "secs"
+    requires_reference = True
+    cache_reference = True
+
+    def __init__(self, pretrained_model: str, device: str):
+        from speechbrain.dataio.preprocess import AudioNormalizer
+        from speechbrain.pretrained import EncoderClassifier
+
+        self.pretrained_model = pretrained_model
+        self.device = device
+        self.audio_norm = AudioNormalizer()
+        self.model = EncoderClassifier.from_hparams(
+            source=pretrained_model, run_opts={"device": device}
+        )
+
+    def config(self) -> Dict[str, Any]:
+        return dict(metric=self.name, pretrained_model=self.pretrained_model)
+
+    @torch.no_grad()
+    def embed(self, wavs: List[Tuple[np.ndarray, int]]) -> np.ndarray:
+        xs = [
+            self.audio_norm(torch.from_numpy(peak_normalize(x)), fs).numpy()
+            for x, fs in wavs
+        ]
+        lengths = torch.tensor([len(x) for x in xs], dtype=torch.float32)
+        embeds = self.model.encode_batch(
+            pad_batch(xs).to(self.device), (lengths / lengths.max()).to(self.device)
+        )
+        return embeds[:, 0].cpu().numpy()
+
+    def reference_features(self, wavs):
+        return [dict(embed=embed) for embed in self.embed(wavs)]
+
+    def __call__(self, wavs, refs=None):
+        scores = []
+        for embed, ref in zip(self.embed(wavs), refs):
+            ref_embed = ref["embed"]
+            scores.append(
+                float(
+                    np.dot(embed, ref_embed)
+                    / (np.linalg.norm(embed) * np.linalg.norm(ref_embed))
+                )
+            )
+        return scores
+
+
+class PseudoMOSMetric(Metric):
+    """Pseudo MOS predicted by UTMOS."""
+
+    name = "pmos"
+
+    def __init__(self, mos_toolkit: str, device: str):
+        if mos_toolkit != "utmos":
+            raise NotImplementedError(f"Not supported {mos_toolkit}.")
+        self.device = device
+        self.predictor = torch.hub.load(
+            "tarepan/SpeechMOS:v1.2.0", "utmos22_strong"
+        ).to(device)
+
+    @torch.no_grad()
+    def __call__(self, wavs, refs=None):
+        # the utterances are resampled to the same sampling rate for the batch
+        fs = wavs[0][1]
+        xs = pad_batch([resample(x, x_fs, fs) for x, x_fs in wavs])
+        scores = self.predictor(xs.to(self.device), fs)
+        return [score.item() for score in scores]
+
+
+class SpeechBERTScoreMetric(Metric):
+    """SpeechBERTScore (https://arxiv.org/abs/2401.16812) with WavLM features."""
+
+    name = "spbs"
+    requires_reference = True
+    cache_reference = True
+    fs = 16000
+
+    def __init__(self, device: str):
+        from discrete_speech_metrics import SpeechBERTScore
+
+        # Using the best configuration of SpeechBERTScore.
+        self.metric = SpeechBERTScore(
+            sr=self.fs, model_type="wavlm-large", layer=14, use_gpu="cuda" in device
+        )
+
+    def config(self) -> Dict[str, Any]:
+        return dict(metric=self.name, model_type="wavlm-large", layer=14)
+
+    @torch.no_grad()
+    def features(self, wavs: List[Tuple[np.ndarray, int]]) -> List[np.ndarray]:
+        # SSL features depend on the padding, so extract them one by one
+        feats = []
+        for x, fs in wavs:
+            feat = self.metric.process_feats(peak_normalize(resample(x, fs, self.fs)))
+            if isinstance(feat, torch.Tensor):
+                feat = feat.float().cpu().numpy()
+            feats.append(feat.reshape(-1, feat.shape[-1]))
+        return feats
+
+    def reference_features(self, wavs):
+        return [dict(feats=feat) for feat in self.features(wavs)]
+
+    def __call__(self, wavs, refs=None):
+        scores = []
+        for feat, ref in zip(self.features(wavs), refs):
+            # precision of BERTScore, as used in evaluate_speechbertscore.py
+            feat = feat / np.linalg.norm(feat, axis=1, keepdims=True)
+            ref_feat = ref["feats"]
+            ref_feat = ref_feat / np.linalg.norm(ref_feat, axis=1, keepdims=True)
+            scores.append(float((feat @ ref_feat.T).max(axis=1).mean()))
+        return scores
+
+
+class SignalMetric(Metric):
+    """Signal-level metrics of calculate_speech_metrics.py.
+
+    The generated utterance is resampled to the sampling rate of the groundtruth
+    and both are trimmed to the shorter length.
+    """
+
+    requires_reference = True
+
+    def __init__(self, name: str):
+        assert name in ("stoi", "estoi", "snr", "si_snr"), name
+        self.name = name
+        if name == "snr":
+            from espnet2.enh.loss.criterions.time_domain import SNRLoss
+
+            self.loss = SNRLoss()
+        elif name == "si_snr":
+            from espnet2.enh.loss.criterions.time_domain import SISNRLoss
+
+            self.loss = SISNRLoss()
+
+    @torch.no_grad()
+    def __call__(self, wavs, refs=None):
+        scores = []
+        for (x, fs), ref in zip(wavs, refs):
+            ref_x, ref_fs = ref["wav"], int(ref["fs"])
+            x = resample(x, fs, ref_fs)
+            length = min(len(x), len(ref_x))
+            x, ref_x = x[:length], ref_x[:length]
+            if self.name in ("stoi", "estoi"):
+                from pystoi import stoi
+
+                score = stoi(ref_x, x, fs_sig=ref_fs, extended=self.name == "estoi")
+            else:
+                score = -float(
+                    self.loss(torch.from_numpy(ref_x[None]), torch.from_numpy(x[None]))
+                )
+            scores.append(float(score))
+        return scores
+
+
+def build_metric(name: str, args: argparse.Namespace, device: str) -> Metric:
+    if name == "secs":
+        return SECSMetric(args.secs_pretrained_model, device)
+    elif name == "pmos":
+        return PseudoMOSMetric(args.mos_toolkit, device)
+    elif name == "spbs":
+        return SpeechBERTScoreMetric(device)
+    else:
+        return SignalMetric(name)
+
+
+def _file_key(path: str) -> Dict[str, str]:
+    # the cache is invalidated when the file is updated
+    stat = os.stat(path)
+    return dict(
+        path=os.path.abspath(path), size=str(stat.st_size), mtime=str(stat.st_mtime_ns)
+    )
+
+
+def evaluate(
+    items: List[List[Tuple[str, str, Optional[str]]]],
+    args: argparse.Namespace,
+    device: str,
+) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Tuple[int, int]]]:
+    """Evaluate the batches of the utterances.
+
+    Args:
+        items (List[List[Tuple[str, str, Optional[str]]]]): Batches of
+            (utt_id, gen_path, gt_path).
+        args (argparse.Namespace): Arguments of the metrics.
+        device (str): Inference device of the metric models.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Scores of the utterances for each metric.
+        Dict[str, Tuple[int, int]]: Hits and misses of the reference cache
+            for each metric.
+    """
+    torch.set_num_threads(args.nthreads)
+    if "cuda" in device and not torch.cuda.is_available():
+        device = "cpu"
+    metrics = [build_metric(name, args, device) for name in args.metrics]
+    caches = {
+        metric.name: PreprocessCache(args.cache_dir, metric.config())
+        for metric in metrics
+        if metric.cache_reference and args.cache_dir is not None
+    }
+
+    scores = {metric.name: {} for metric in metrics}
+    for batch in items:
+        wavs = [load_wav(gen_path) for _, gen_path, _ in batch]
+        gt_wavs = {}
+        for metric in metrics:
+            refs = None
+            if metric.requires_reference:
+                cache = caches.get(metric.name)
+                refs = [None] * len(batch)
+                if cache is not None:
+                    refs = [cache.get(_file_key(gt_path)) for _, _, gt_path in batch]
+                missing = [i for i, ref in enumerate(refs) if ref is None]
+                if len(missing) > 0:
+                    for i in missing:
+                        if i not in gt_wavs:
+                            gt_wavs[i] = load_wav(batch[i][2])
+                    feats = metric.reference_features([gt_wavs[i] for i in missing])
+                    for i, feat in zip(missing, feats):
+                        refs[i] = feat
+                        if cache is not None:
+                            cache.put(_file_key(batch[i][2]), feat)
+            for (utt_id, _, _), score in zip(batch, metric(wavs, refs)):
+                logging.debug(f"{utt_id} {metric.name} {score:.4f}")
+                scores[metric.name][utt_id] = score
+
+    cache_stats = {name: (cache.hits, cache.misses) for name, cache in caches.items()}
+    return scores, cache_stats
+
+
+def get_parser() -> argparse.Namespace:
+    """Get argument parser."""
+    parser = argparse.ArgumentParser(
+        description="Evaluate generated speech with multiple metrics in batches."
+    )
+    parser.add_argument(
+        "gen_wavdir_or_wavscp",
+        type=str,
+        help="Path of directory or wav.scp for generated waveforms.",
+    )
+    parser.add_argument(
+        "gt_wavdir_or_wavscp",
+        type=str,
+        nargs="?",
+        help="Path of directory or wav.scp for ground truth waveforms. "
+        "Required for the metrics other than pmos.",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        nargs="+",
+        default=["secs", "pmos"],
+        choices=METRICS,
+        help="Metrics to evaluate.",
+    )
+    parser.add_argument(
+        "--outdir",
+        type=str,
+        help="Path of directory to write the results.",
+    )
+
+    # batching and parallelization related
+    parser.add_argument(
+        "--batch_size",
+        default=16,
+        type=int,
+        help="Maximum number of the utterances in a batch.",
+    )
+    parser.add_argument(
+        "--batch_bins",
+        default=None,
+        type=int,
+        help="Maximum number of the samples in a batch including the padding.",
+    )
+    parser.add_argument(
+        "--nj",
+        default=1,
+        type=int,
+        help="Number of the worker processes, each of which loads the models.",
+    )
+    parser.add_argument(
+        "--devices",
+        type=str,
+        nargs="+",
+        default=["cuda:0"],
+        help="Inference devices assigned to the workers in the round-robin manner.",
+    )
+    parser.add_argument(
+        "--nthreads",
+        default=1,
+        type=int,
+        help="Number of the CPU threads of each worker.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=None,
+        help="Directory to cache the features of the ground truth waveforms "
+        "across the runs.",
+    )
+
+    # metric related
+    parser.add_argument(
+        "--secs_pretrained_model",
+        default="speechbrain/spkrec-ecapa-voxceleb",
+        type=str,
+        help="Speechbrain pretrained model for SECS.",
+    )
+    parser.add_argument(
+        "--mos_toolkit",
+        type=str,
+        default="utmos",
+        choices=["utmos"],
+        help="Toolkit to calculate pseudo MOS.",
+    )
+    parser.add_argument(
+        "--verbose",
+        default=1,
+        type=int,
+        help="Verbosity level. Higher is more logging.",
+    )
+    return parser
+
+
+def main():
+    """Run the evaluation."""
+    args = get_parser().parse_args()
+
+    # logging info
+    if args.verbose > 1:
+        logging.basicConfig(
+            level=logging.DEBUG,
+            format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+        )
+    elif args.verbose > 0:
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+        )
+    else:
+        logging.basicConfig(
+            level=logging.WARN,
+            format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+        )
+        logging.warning("Skip DEBUG/INFO messages")
+
+    # find files
+    gen_files = read_wavdir_or_wavscp(args.gen_wavdir_or_wavscp)
+    if len(gen_files) == 0:
+        raise FileNotFoundError("Not found any generated audio files.")
+    if args.gt_wavdir_or_wavscp is not None:
+        gt_files = read_wavdir_or_wavscp(args.gt_wavdir_or_wavscp)
+        items = match_files(gen_files, gt_files)
+    elif any(metric != "pmos" for metric in args.metrics):
+        raise ValueError(f"gt_wavdir_or_wavscp is required for {args.metrics}.")
+    else:
+        items = [(utt_id, path, None) for utt_id, path in gen_files.items()]
+    logging.info("The number of utterances = %d" % len(items))
+
+    # make batches of the utterances with similar lengths
+    lengths = [sf.info(gen_path).frames for _, gen_path, _ in items]
+    batches = [
+        [items[i] for i in batch]
+        for batch in make_batches(lengths, args.batch_size, args.batch_bins)
+    ]
+    logging.info(f"The number of batches = {len(batches)}")
+
+    start_time = time.perf_counter()
+    nj = min(args.nj, len(batches))
+    jobs = [
+        (batches[i::nj], args, args.devices[i % len(args.devices)]) for i in range(nj)
+    ]
+    if nj == 1:
+        results = [evaluate(*jobs[0])]
+    else:
+        # spawn is safe with CUDA and the threads of the parent process
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(nj) as pool:
+            results = [pool.apply_async(evaluate, job) for job in jobs]
+            results = [result.get() for result in results]
+    elapsed = time.perf_counter() - start_time
+    logging.info(
+        f"Evaluated {len(items)} utterances in {elapsed:.1f} sec "
+        f"({len(items) / elapsed:.2f} utterances/sec)"
+    )
+
+    scores = {metric: {} for metric in args.metrics}
+    cache_stats = {}
+    for job_scores, job_cache_stats in results:
+        for metric, metric_scores in job_scores.items():
+            scores[metric].update(metric_scores)
+        for metric, (hits, misses) in job_cache_stats.items():
+            total_hits, total_misses = cache_stats.get(metric, (0, 0))
+            cache_stats[metric] = (total_hits + hits, total_misses + misses)
+    for metric, (hits, misses) in cache_stats.items():
+        logging.info(f"Reference cache of {metric}: hits={hits}, misses={misses}")
+
+    # write results
+    if args.outdir is None:
+        if os.path.isdir(args.gen_wavdir_or_wavscp):
+            args.outdir = args.gen_wavdir_or_wavscp
+        else:
+            args.outdir = os.path.dirname(args.gen_wavdir_or_wavscp)
+    os.makedirs(args.outdir, exist_ok=True)
+    for metric, metric_scores in scores.items():
+        values = np.array(list(metric_scores.values()))
+        mean, std = np.mean(values), np.std(values)
+        logging.info(f"{metric} average: {mean:.4f} ± {std:.4f}")
+        with open(f"{args.outdir}/utt2{metric}", "w") as f:
+            for utt_id in sorted(metric_scores.keys()):
+                f.write(f"{utt_id} {metric_scores[utt_id]:.4f}\n")
+        with open(f"{args.outdir}/{metric}_avg_result.txt", "w") as f:
+            f.write(f"#utterances: {len(metric_scores)}\n")
+            f.write(f"Average: {mean:.4f} ± {std:.4f}")
+
+    logging.info("Successfully finished the evaluation.")
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,7 @@ import joblib
 import numpy as np
 from sklearn.cluster import MiniBatchKMeans
 
+from espnet2.utils.types import str2bool
 from espnet.utils.cli_readers import file_reader_helper
 
 logging.basicConfig(
@@ -42,6 +43,19 @@ def get_parser():
     parser.add_argument("--max_no_improvement", default=100, type=int)
     parser.add_argument("--n_init", default=20, type=int)
     parser.add_argument("--reassignment_ratio", default=0.0, type=float)
+    parser.add_argument(
+        "--streaming",
+        default=False,
+        type=str2bool,
+        help="Read the feature shards from disk in mini-batches and update the "
+        "model with partial_fit, instead of loading all the features in memory",
+    )
+    parser.add_argument(
+        "--num_passes",
+        default=1,
+        type=int,
+        help="Number of passes over the feature shards in the streaming mode",
+    )
 
     parser.add_argument(
         "--in_filetype",
@@ -124,6 +138,58 @@ def load_feature(rspecifiers, in_filetype, percent):
     return feat
 
 
+def iterate_feature_batches(rspecifiers, in_filetype, percent, batch_size):
+    """Yield shuffled mini-batches of at least `batch_size` frames.
+
+    The utterances are sampled with the probability of `percent`
+    (all utterances if it is negative), and the frames are shuffled within
+    a buffer of `batch_size` frames.
+    """
+    buffer, num_frames = [], 0
+    for rspecifier in rspecifiers:
+        for utt, feat in file_reader_helper(rspecifier, in_filetype):
+            if 0 <= percent < random.random():
+                continue
+            buffer.append(feat)
+            num_frames += len(feat)
+            if num_frames >= batch_size:
+                batch = np.concatenate(buffer, axis=0)
+                yield batch[np.random.permutation(len(batch))]
+                buffer, num_frames = [], 0
+    if num_frames > 0:
+        batch = np.concatenate(buffer, axis=0)
+        yield batch[np.random.permutation(len(batch))]
+
+
+def learn_kmeans_streaming(
+    km_model, rspecifiers, in_filetype, percent, batch_size, num_passes
+):
+    """Train the model with partial_fit on mini-batches read from disk.
+
+    The first mini-batch also initializes the centroids,
+    so it should have enough frames compared to `n_clusters`.
+    """
+    assert percent <= 1.0
+    if not isinstance(rspecifiers, list):
+        rspecifiers = [rspecifiers]
+
+    for i in range(num_passes):
+        inertia, num_frames = 0.0, 0
+        for batch in iterate_feature_batches(
+            rspecifiers, in_filetype, percent, batch_size
+        ):
+            if hasattr(km_model, "cluster_centers_"):
+                # inertia of the batch before the update
+                inertia -= km_model.score(batch)
+            num_frames += len(batch)
+            km_model.partial_fit(batch)
+        logger.info(
+            f"pass {i + 1}/{num_passes}: {num_frames} frames, "
+            f"inertia: {inertia / max(num_frames, 1):.5f}"
+        )
+    return km_model
+
+
 def learn_kmeans(
     rspecifier,
     in_filetype,
@@ -138,9 +204,11 @@ def learn_kmeans(
     n_init,
     reassignment_ratio,
     max_no_improvement,
+    streaming=False,
+    num_passes=1,
 ):
     np.random.seed(seed)
-    feat = load_feature(rspecifier, in_filetype, percent)
+    random.seed(seed)
     km_model = get_km_model(
         n_clusters,
         init,
@@ -152,6 +220,15 @@ def learn_kmeans(
         reassignment_ratio,
         seed,
     )
+    if streaming:
+        learn_kmeans_streaming(
+            km_model, rspecifier, in_filetype, percent, batch_size, num_passes
+        )
+        joblib.dump(km_model, km_path)
+        logger.info("finished successfully")
+        return
+
+    feat = load_feature(rspecifier, in_filetype, percent)
     km_model.fit(feat)
     joblib.dump(km_model, km_path)
 
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""test of batch_utils."""
+
+from pyscripts.utils.batch_utils import make_batches
+
+
+def test_make_batches_batch_size():
+    lengths = [3, 10, 5, 8, 1]
+    # sorted by length in descending order
+    assert make_batches(lengths, batch_size=2) == [[1, 3], [2, 0], [4]]
+    assert make_batches(lengths, batch_size=10) == [[1, 3, 2, 0, 4]]
+    assert make_batches(lengths, batch_size=1) == [[1], [3], [2], [0], [4]]
+
+
+def test_make_batches_batch_bins():
+    lengths = [3, 10, 5, 8, 1]
+    # the padded samples are the length of the first (longest) one times the size
+    assert make_batches(lengths, batch_size=10, batch_bins=20) == [
+        [1, 3],
+        [2, 0, 4],
+    ]
+    # the utterance longer than batch_bins forms a batch by itself
+    assert make_batches(lengths, batch_size=10, batch_bins=6) == [
+        [1],
+        [3],
+        [2],
+        [0, 4],
+    ]
+    # both limits
+    assert make_batches(lengths, batch_size=2, batch_bins=20) == [
+        [1, 3],
+        [2, 0],
+        [4],
+    ]
+
+
+def test_make_batches_empty():
+    assert make_batches([], batch_size=2) == []
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""test of evaluate_speech_batch."""
+
+import argparse
+
+import numpy as np
+import pyscripts.utils.evaluate_speech_batch as evaluate_speech_batch
+import pytest
+import soundfile as sf
+import torch
+from pyscripts.utils.evaluate_speech_batch import (
+    Metric,
+    PseudoMOSMetric,
+    SECSMetric,
+    SpeechBERTScoreMetric,
+    evaluate,
+    match_files,
+    read_wavdir_or_wavscp,
+)
+
+
+def test_match_files():
+    gt_files = {"utt1": "gt/utt1.wav", "utt2": "gt/utt2.wav"}
+    gen_files = {"utt1": "gen/utt1.wav", "utt2_gen": "gen/utt2_gen.wav"}
+    assert match_files(gen_files, gt_files) == [
+        ("utt1", "gen/utt1.wav", "gt/utt1.wav"),
+        # the groundtruth whose basename is included in the generated path
+        ("utt2", "gen/utt2_gen.wav", "gt/utt2.wav"),
+    ]
+
+
+@pytest.mark.parametrize(
+    "gen_files",
+    [
+        {"utt3": "gen/utt3.wav"},
+        # ambiguous
+        {"utt1_utt2": "gen/utt1_utt2.wav"},
+    ],
+)
+def test_match_files_not_found(gen_files):
+    gt_files = {"utt1": "gt/utt1.wav", "utt2": "gt/utt2.wav"}
+    with pytest.raises(ValueError):
+        match_files(gen_files, gt_files)
+
+
+def test_read_wavdir_or_wavscp(tmp_path):
+    for name in ["a", "b"]:
+        sf.write(tmp_path / f"{name}.wav", np.zeros(16), 16000)
+    files = read_wavdir_or_wavscp(str(tmp_path))
+    assert files == {name: str(tmp_path / f"{name}.wav") for name in ["a", "b"]}
+
+    wavscp = tmp_path / "wav.scp"
+    wavscp.write_text(f"utt_a {tmp_path}/a.wav\n")
+    assert read_wavdir_or_wavscp(str(wavscp)) == {"utt_a": f"{tmp_path}/a.wav"}
+
+
+class LengthMetric(Metric):
+    """Ratio of the generated length to the length of the reference feature."""
+
+    name = "length"
+    requires_reference = True
+    cache_reference = True
+
+    def __init__(self):
+        self.num_references = 0
+
+    def reference_features(self, wavs):
+        self.num_references += len(wavs)
+        return [dict(length=np.array(len(x))) for x, _ in wavs]
+
+    def __call__(self, wavs, refs=None):
+        return [len(x) / float(ref["length"]) for (x, _), ref in zip(wavs, refs)]
+
+
+class NoReferenceMetric(Metric):
+    name = "noref"
+
+    def __call__(self, wavs, refs=None):
+        assert refs is None
+        return [float(len(x)) for x, _ in wavs]
+
+
+@pytest.fixture
+def batches(tmp_path):
+    items = []
+    for i in range(3):
+        gen_path, gt_path = tmp_path / f"gen{i}.wav", tmp_path / f"gt{i}.wav"
+        sf.write(gen_path, np.random.randn(100 * (i + 1)), 16000)
+        sf.write(gt_path, np.random.randn(200), 16000)
+        items.append((f"utt{i}", str(gen_path), str(gt_path)))
+    return [items[:2], items[2:]]
+
+
+def run_evaluate(batches, cache_dir, monkeypatch):
+    metrics = {}
+
+    def build_metric(name, args, device):
+        metrics[name] = dict(length=LengthMetric, noref=NoReferenceMetric)[name]()
+        return metrics[name]
+
+    monkeypatch.setattr(evaluate_speech_batch, "build_metric", build_metric)
+    args = argparse.Namespace(
+        metrics=["length", "noref"], nthreads=1, cache_dir=cache_dir
+    )
+    scores, cache_stats = evaluate(batches, args, "cpu")
+    return scores, cache_stats, metrics["length"].num_references
+
+
+def test_evaluate_reference_cache(batches, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    scores, cache_stats, num_references = run_evaluate(batches, cache_dir, monkeypatch)
+    expected = dict(
+        length=dict(utt0=0.5, utt1=1.0, utt2=1.5),
+        noref=dict(utt0=100.0, utt1=200.0, utt2=300.0),
+    )
+    assert scores == expected
+    assert cache_stats == dict(length=(0, 3))
+    assert num_references == 3
+
+    # The features of the references are loaded from the cache
+    scores, cache_stats, num_references = run_evaluate(batches, cache_dir, monkeypatch)
+    assert scores == expected
+    assert cache_stats == dict(length=(3, 0))
+    assert num_references == 0
+
+    # The cache is invalidated by updating the reference
+    sf.write(batches[1][0][2], np.random.randn(600), 16000)
+    scores, cache_stats, num_references = run_evaluate(batches, cache_dir, monkeypatch)
+    assert scores["length"]["utt2"] == 0.5
+    assert cache_stats == dict(length=(2, 1))
+    assert num_references == 1
+
+
+def test_evaluate_without_cache(batches, monkeypatch):
+    scores, cache_stats, num_references = run_evaluate(batches, None, monkeypatch)
+    assert scores["length"] == dict(utt0=0.5, utt1=1.0, utt2=1.5)
+    assert cache_stats == {}
+    assert num_references == 3
+
+
+class DummyEncoderClassifier:
+    def encode_batch(self, wavs, wav_lens):
+        # means of the unpadded samples and of their first half
+        lengths = (wav_lens * wavs.size(1)).round().long()
+        embeds = [
+            torch.stack([wav[:length].mean(), wav[: length // 2].mean()])
+            for wav, length in zip(wavs, lengths)
+        ]
+        return torch.stack(embeds)[:, None]  # (B, 1, 2)
+
+
+def test_SECSMetric():
+    metric = SECSMetric.__new__(SECSMetric)
+    metric.device = "cpu"
+    metric.audio_norm = lambda x, fs: x
+    metric.model = DummyEncoderClassifier()
+
+    x = np.random.rand(100).astype(np.float32)
+    refs = metric.reference_features([(x, 16000), (x[:50], 16000)])
+    # the padding does not affect the embeddings
+    x_ = x[:50] / np.abs(x[:50]).max()
+    np.testing.assert_allclose(refs[1]["embed"], [x_.mean(), x_[:25].mean()], rtol=1e-5)
+
+    scores = metric([(x, 16000), (-x, 16000)], refs[:1] * 2)
+    np.testing.assert_allclose(scores, [1.0, -1.0], rtol=1e-5)
+
+
+class DummyPredictor:
+    def __init__(self):
+        self.inputs = []
+
+    def __call__(self, xs, fs):
+        self.inputs.append((xs, fs))
+        return xs.sum(dim=1)
+
+
+def test_PseudoMOSMetric():
+    metric = PseudoMOSMetric.__new__(PseudoMOSMetric)
+    metric.device = "cpu"
+    metric.predictor = DummyPredictor()
+
+    x = np.ones(160, dtype=np.float32)
+    scores = metric([(x, 16000), (x[:40], 8000)])
+    # the utterances are resampled to the sampling rate of the first one
+    ((xs, fs),) = metric.predictor.inputs
+    assert fs == 16000
+    assert xs.shape == (2, 160)
+    np.testing.assert_allclose(scores, [160.0, 80.0], rtol=0.05)
+
+
+class DummySpeechBERTScore:
+    def process_feats(self, x):
+        # frames of 4 samples as the features
+        return torch.from_numpy(x[: len(x) // 4 * 4].reshape(1, -1, 4))
+
+
+def test_SpeechBERTScoreMetric():
+    metric = SpeechBERTScoreMetric.__new__(SpeechBERTScoreMetric)
+    metric.metric = DummySpeechBERTScore()
+
+    x = np.random.rand(64).astype(np.float32)
+    refs = metric.reference_features([(x, 16000)])
+    assert refs[0]["feats"].shape == (16, 4)
+
+    y = np.random.rand(64).astype(np.float32)
+    scores = metric([(x, 16000), (y, 16000)], refs * 2)
+    assert scores[0] == pytest.approx(1.0)
+    assert scores[1] < 1.0
+    # the features of the other sampling rate are extracted after resampling
+    (score,) = metric([(x[::2], 8000)], refs)
+    assert 0.0 < score <= 1.0 + 1e-6
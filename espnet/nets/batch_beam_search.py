@@ -8,6 +8,7 @@ from packaging.version import parse as V
 from torch.nn.utils.rnn import pad_sequence
 
 from espnet.nets.beam_search import BeamSearch, Hypothesis
+from espnet.nets.e2e_asr_common import end_detect
 
 is_torch_1_9_plus = V(torch.__version__) >= V("1.9.0")
 
@@ -127,6 +128,32 @@ class BatchBeamSearch(BeamSearch):
         new_token_ids = top_ids % self.n_vocab
         return prev_hyp_ids, new_token_ids, prev_hyp_ids, new_token_ids
 
+    def batch_beam_gathered(
+        self, weighted_scores: torch.Tensor, ids: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Batch-compute topk token ids when only pre-beam candidates are scored.
+
+        Args:
+            weighted_scores (torch.Tensor): The weighted sum scores for
+                the pre-beam candidates. Its shape is `(n_beam, self.pre_beam_size)`.
+            ids (torch.Tensor): The token ids of the candidates.
+                Its shape is `(n_beam, self.pre_beam_size)`.
+
+        Returns:
+            Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+                The topk full (prev_hyp, new_token) ids, partial (prev_hyp, new_token)
+                ids, and the flattened indices of `weighted_scores` for them.
+                Their shapes are all `(self.beam_size,)`
+
+        """
+        top_ids = weighted_scores.view(-1).topk(self.beam_size)[1]
+        if is_torch_1_9_plus:
+            prev_hyp_ids = torch.div(top_ids, ids.size(1), rounding_mode="trunc")
+        else:
+            prev_hyp_ids = top_ids // ids.size(1)
+        new_token_ids = ids.view(-1)[top_ids]
+        return prev_hyp_ids, new_token_ids, prev_hyp_ids, new_token_ids, top_ids
+
     def init_hyp(self, x: torch.Tensor) -> BatchHypothesis:
         """Get an initial hypothesis data.
 
@@ -184,14 +211,17 @@ class BatchBeamSearch(BeamSearch):
         scores = dict()
         states = dict()
         for k, d in self.full_scorers.items():
-            if "decoder" in k and self.return_hs:
-                (scores[k], hs), states[k] = d.batch_score(
-                    hyp.yseq, hyp.states[k], x, return_hs=self.return_hs
-                )
-            elif "decoder" in k and pre_x is not None:
-                scores[k], states[k] = d.batch_score(hyp.yseq, hyp.states[k], x, pre_x)
-            else:
-                scores[k], states[k] = d.batch_score(hyp.yseq, hyp.states[k], x)
+            with self.record(k, "scorer", type="full", n_hyps=len(hyp)):
+                if "decoder" in k and self.return_hs:
+                    (scores[k], hs), states[k] = d.batch_score(
+                        hyp.yseq, hyp.states[k], x, return_hs=self.return_hs
+                    )
+                elif "decoder" in k and pre_x is not None:
+                    scores[k], states[k] = d.batch_score(
+                        hyp.yseq, hyp.states[k], x, pre_x
+                    )
+                else:
+                    scores[k], states[k] = d.batch_score(hyp.yseq, hyp.states[k], x)
 
         if self.return_hs:
             return hs, scores, states
@@ -225,14 +255,15 @@ class BatchBeamSearch(BeamSearch):
         scores = dict()
         states = dict()
         for k, d in self.part_scorers.items():
-            if "ctc" in k and pre_x is not None:
-                scores[k], states[k] = d.batch_score_partial(
-                    hyp.yseq, ids, hyp.states[k], pre_x
-                )
-            else:
-                scores[k], states[k] = d.batch_score_partial(
-                    hyp.yseq, ids, hyp.states[k], x
-                )
+            with self.record(k, "scorer", type="partial", n_hyps=len(hyp)):
+                if "ctc" in k and pre_x is not None:
+                    scores[k], states[k] = d.batch_score_partial(
+                        hyp.yseq, ids, hyp.states[k], pre_x
+                    )
+                else:
+                    scores[k], states[k] = d.batch_score_partial(
+                        hyp.yseq, ids, hyp.states[k], x
+                    )
         return scores, states
 
     def merge_states(self, states: Any, part_states: Any, part_idx: int) -> Any:
@@ -276,9 +307,6 @@ class BatchBeamSearch(BeamSearch):
         n_batch = len(running_hyps)
         part_ids = None  # no pre-beam
         # batch scoring
-        weighted_scores = torch.zeros(
-            n_batch, self.n_vocab, dtype=x.dtype, device=x.device
-        )
         if self.return_hs:
             hs, scores, states = self.score_full(
                 running_hyps,
@@ -296,70 +324,115 @@ class BatchBeamSearch(BeamSearch):
                 ),
             )
 
-        for k in self.full_scorers:
-            weighted_scores += self.weights[k] * scores[k]
-        # partial scoring
-        if self.do_pre_beam:
-            pre_beam_scores = (
-                weighted_scores
-                if self.pre_beam_score_key == "full"
-                else scores[self.pre_beam_score_key]
+        if self.pre_beam_gather:
+            # Select the candidates by the primary scorer first, and compute
+            # the weighted scores of shape (n_batch, pre_beam_size + 1) on them.
+            # <eos> is always kept as a candidate as CTC prefix scoring does,
+            # so that the hypotheses can end even if <eos> is out of the pre-beam.
+            with self.record("pre_beam", "topk"):
+                eos = torch.full(
+                    (n_batch, 1), self.eos, dtype=torch.int64, device=x.device
+                )
+                pre_beam_scores = scores[self.pre_beam_score_key].scatter(
+                    1, eos, float("-inf")
+                )
+                part_ids = torch.cat(
+                    (torch.topk(pre_beam_scores, self.pre_beam_size, dim=-1)[1], eos),
+                    dim=1,
+                )
+            weighted_scores = torch.zeros(
+                part_ids.shape, dtype=x.dtype, device=x.device
+            )
+            for k in self.full_scorers:
+                weighted_scores += self.weights[k] * scores[k].gather(1, part_ids)
+        else:
+            weighted_scores = torch.zeros(
+                n_batch, self.n_vocab, dtype=x.dtype, device=x.device
             )
-            part_ids = torch.topk(pre_beam_scores, self.pre_beam_size, dim=-1)[1]
+            for k in self.full_scorers:
+                weighted_scores += self.weights[k] * scores[k]
+            # partial scoring
+            if self.do_pre_beam:
+                pre_beam_scores = (
+                    weighted_scores
+                    if self.pre_beam_score_key == "full"
+                    else scores[self.pre_beam_score_key]
+                )
+                with self.record("pre_beam", "topk"):
+                    part_ids = torch.topk(pre_beam_scores, self.pre_beam_size, dim=-1)[
+                        1
+                    ]
         # NOTE(takaaki-hori): Unlike BeamSearch, we assume that score_partial returns
         # full-size score matrices, which has non-zero scores for part_ids and zeros
         # for others.
         part_scores, part_states = self.score_partial(running_hyps, part_ids, x, pre_x)
         for k in self.part_scorers:
-            weighted_scores += self.weights[k] * part_scores[k]
+            if self.pre_beam_gather:
+                weighted_scores += self.weights[k] * part_scores[k].gather(1, part_ids)
+            else:
+                weighted_scores += self.weights[k] * part_scores[k]
         # add previous hyp scores
         weighted_scores += running_hyps.score.to(
             dtype=x.dtype, device=x.device
         ).unsqueeze(1)
 
+        with self.record("beam", "topk"):
+            if self.pre_beam_gather:
+                beam_ids = self.batch_beam_gathered(weighted_scores, part_ids)
+                # scores of the selected hyps in weighted_scores[prev_hyp, local_id]
+                best_scores = weighted_scores.view(-1)[beam_ids[-1]]
+                beam_ids = beam_ids[:-1]
+            else:
+                beam_ids = self.batch_beam(weighted_scores, part_ids)
+                best_scores = weighted_scores[beam_ids[0], beam_ids[1]]
+
         # TODO(karita): do not use list. use batch instead
         # see also https://github.com/espnet/espnet/pull/1402#discussion_r354561029
         # update hyps
-        best_hyps = []
-        prev_hyps = self.unbatchfy(running_hyps)
-        for (
-            full_prev_hyp_id,
-            full_new_token_id,
-            part_prev_hyp_id,
-            part_new_token_id,
-        ) in zip(*self.batch_beam(weighted_scores, part_ids)):
-            prev_hyp = prev_hyps[full_prev_hyp_id]
-            if self.return_hs:
-                new_hs = prev_hyp.hs + [hs[full_prev_hyp_id].squeeze(0)]
-            else:
-                new_hs = []
-            best_hyps.append(
-                Hypothesis(
-                    score=weighted_scores[full_prev_hyp_id, full_new_token_id],
-                    yseq=self.append_token(prev_hyp.yseq, full_new_token_id),
-                    scores=self.merge_scores(
-                        prev_hyp.scores,
-                        {k: v[full_prev_hyp_id] for k, v in scores.items()},
-                        full_new_token_id,
-                        {k: v[part_prev_hyp_id] for k, v in part_scores.items()},
-                        part_new_token_id,
-                    ),
-                    states=self.merge_states(
-                        {
-                            k: self.full_scorers[k].select_state(v, full_prev_hyp_id)
-                            for k, v in states.items()
-                        },
-                        {
-                            k: self.part_scorers[k].select_state(
-                                v, part_prev_hyp_id, part_new_token_id
-                            )
-                            for k, v in part_states.items()
-                        },
-                        part_new_token_id,
-                    ),
-                    hs=new_hs,
+        with self.record("merge", "select_state"):
+            best_hyps = []
+            prev_hyps = self.unbatchfy(running_hyps)
+            for (
+                best_score,
+                full_prev_hyp_id,
+                full_new_token_id,
+                part_prev_hyp_id,
+                part_new_token_id,
+            ) in zip(best_scores, *beam_ids):
+                prev_hyp = prev_hyps[full_prev_hyp_id]
+                if self.return_hs:
+                    new_hs = prev_hyp.hs + [hs[full_prev_hyp_id].squeeze(0)]
+                else:
+                    new_hs = []
+                best_hyps.append(
+                    Hypothesis(
+                        score=best_score,
+                        yseq=self.append_token(prev_hyp.yseq, full_new_token_id),
+                        scores=self.merge_scores(
+                            prev_hyp.scores,
+                            {k: v[full_prev_hyp_id] for k, v in scores.items()},
+                            full_new_token_id,
+                            {k: v[part_prev_hyp_id] for k, v in part_scores.items()},
+                            part_new_token_id,
+                        ),
+                        states=self.merge_states(
+                            {
+                                k: self.full_scorers[k].select_state(
+                                    v, full_prev_hyp_id
+                                )
+                                for k, v in states.items()
+                            },
+                            {
+                                k: self.part_scorers[k].select_state(
+                                    v, part_prev_hyp_id, part_new_token_id
+                                )
+                                for k, v in part_states.items()
+                            },
+                            part_new_token_id,
+                        ),
+                        hs=new_hs,
+                    )
                 )
-            )
         return self.batchfy(best_hyps)
 
     def post_process(
@@ -427,3 +500,200 @@ class BatchBeamSearch(BeamSearch):
                 ended_hyps.append(hyp)
         remained_ids = torch.nonzero(is_eos == 0, as_tuple=False).view(-1).cpu()
         return self._batch_select(running_hyps, remained_ids)
+
+    def batch_forward(
+        self,
+        xs: torch.Tensor,
+        maxlenratio: float = 0.0,
+        minlenratio: float = 0.0,
+    ) -> List[List[Hypothesis]]:
+        """Perform beam search for multiple utterances at the same time.
+
+        The running hypotheses of all the utterances are scored by one call of
+        each scorer, and the beam is pruned for each utterance separately.
+        Each utterance gets the same result as `forward`.
+        The partial scorers should implement `batch_init_state_multi` and
+        `batch_score_partial_multi` (e.g., CTC prefix scorer), as their states
+        are held for all the utterances.
+
+        Args:
+            xs (torch.Tensor): Encoded speech features of the same length (B, T, D)
+            maxlenratio (float): Input length ratio to obtain max output length.
+                See `forward` for details.
+            minlenratio (float): Input length ratio to obtain min output length.
+                See `forward` for details.
+
+        Returns:
+            List[List[Hypothesis]]: N-best decoding results for each utterance
+
+        """
+        if self.return_hs or self.pre_beam_gather:
+            raise NotImplementedError(
+                "batch_forward does not support return_hs and pre_beam_gather"
+            )
+        for k, d in self.part_scorers.items():
+            if not hasattr(d, "batch_score_partial_multi"):
+                raise NotImplementedError(
+                    f"{k} does not support scoring multiple utterances"
+                )
+        if maxlenratio == 0:
+            maxlen = xs.size(1)
+        elif maxlenratio < 0:
+            maxlen = -1 * int(maxlenratio)
+        else:
+            maxlen = max(1, int(maxlenratio * xs.size(1)))
+        if minlenratio < 0:
+            minlen = -1 * int(minlenratio)
+        else:
+            minlen = int(minlenratio * xs.size(1))
+
+        running_hyps = self.batchfy([self.unbatchfy(self.init_hyp(x))[0] for x in xs])
+        for k, d in self.part_scorers.items():
+            init_state = d.batch_init_state_multi(xs)
+            running_hyps.states[k][:] = [init_state] * len(xs)
+        # the utterance index of each running hypothesis
+        utt_ids = torch.arange(xs.size(0))
+        ended_hyps = [[] for _ in range(xs.size(0))]
+        for i in range(maxlen):
+            logger.debug("position " + str(i))
+            with self.record("search", "step", n_hyps=len(running_hyps)):
+                best, utt_ids = self.batch_search(running_hyps, utt_ids, xs)
+            with self.record("post_process", "post_process"):
+                ended = []
+                running_hyps = self.post_process(
+                    i, maxlen, minlen, maxlenratio, best, ended
+                )
+                # post_process appends the ended hyps in the order of the batch
+                is_eos = (
+                    best.yseq[torch.arange(len(best)), best.length - 1] == self.eos
+                ).cpu()
+                if i >= minlen:
+                    for utt_id, hyp in zip(utt_ids[is_eos].tolist(), ended):
+                        ended_hyps[utt_id].append(hyp)
+                utt_ids = utt_ids[~is_eos]
+
+            # end detection for each utterance
+            if maxlenratio == 0.0:
+                keep = torch.ones(len(utt_ids), dtype=torch.bool)
+                for utt_id in utt_ids.unique().tolist():
+                    if end_detect([h.asdict() for h in ended_hyps[utt_id]], i):
+                        logger.info(f"end detected at {i} for utterance {utt_id}")
+                        keep[utt_ids == utt_id] = False
+                if not keep.all():
+                    remained_ids = torch.nonzero(keep, as_tuple=False).view(-1)
+                    running_hyps = self._batch_select(running_hyps, remained_ids)
+                    utt_ids = utt_ids[keep]
+            if len(running_hyps) == 0:
+                logger.info("no hypothesis. Finish decoding.")
+                break
+
+        nbest_hyps = []
+        for x, hyps in zip(xs, ended_hyps):
+            if self.normalize_length:
+                hyps = sorted(
+                    hyps, key=lambda x: x.score / (len(x.yseq) - 1), reverse=True
+                )
+            else:
+                hyps = sorted(hyps, key=lambda x: x.score, reverse=True)
+            if len(hyps) == 0 and minlenratio >= 0.1:
+                # decode again with smaller minlenratio as `forward` does
+                hyps = self.forward(x, maxlenratio, max(0.0, minlenratio - 0.1))
+            nbest_hyps.append(hyps)
+        return nbest_hyps
+
+    def batch_search(
+        self, running_hyps: BatchHypothesis, utt_ids: torch.Tensor, xs: torch.Tensor
+    ) -> Tuple[BatchHypothesis, torch.Tensor]:
+        """Search new tokens for the running hypotheses of multiple utterances.
+
+        Args:
+            running_hyps (BatchHypothesis): Running hypotheses on beam
+            utt_ids (torch.Tensor): Utterance index of each running hypothesis
+            xs (torch.Tensor): Encoded speech features (B, T, D)
+
+        Returns:
+            Tuple[BatchHypothesis, torch.Tensor]: Best hypotheses sorted
+                for each utterance, and their utterance indices
+
+        """
+        n_batch = len(running_hyps)
+        scores, states = self.score_full(running_hyps, xs[utt_ids.to(xs.device)])
+        weighted_scores = torch.zeros(
+            n_batch, self.n_vocab, dtype=xs.dtype, device=xs.device
+        )
+        for k in self.full_scorers:
+            weighted_scores += self.weights[k] * scores[k]
+        # partial scoring as `search` does
+        part_ids = None
+        if self.do_pre_beam:
+            pre_beam_scores = (
+                weighted_scores
+                if self.pre_beam_score_key == "full"
+                else scores[self.pre_beam_score_key]
+            )
+            with self.record("pre_beam", "topk"):
+                part_ids = torch.topk(pre_beam_scores, self.pre_beam_size, dim=-1)[1]
+        part_scores, part_states = dict(), dict()
+        for k, d in self.part_scorers.items():
+            with self.record(k, "scorer", type="partial", n_hyps=n_batch):
+                part_scores[k], part_states[k] = d.batch_score_partial_multi(
+                    running_hyps.yseq, part_ids, running_hyps.states[k], utt_ids
+                )
+            weighted_scores += self.weights[k] * part_scores[k]
+        weighted_scores += running_hyps.score.to(
+            dtype=xs.dtype, device=xs.device
+        ).unsqueeze(1)
+
+        with self.record("beam", "topk"):
+            beam_ids = []
+            for utt_id in utt_ids.unique().tolist():
+                hyp_ids = torch.nonzero(utt_ids == utt_id, as_tuple=False).view(-1)
+                top_scores, top_ids = (
+                    weighted_scores[hyp_ids.to(xs.device)].view(-1).topk(self.beam_size)
+                )
+                top_ids = top_ids.cpu()
+                if is_torch_1_9_plus:
+                    prev_hyp_ids = torch.div(
+                        top_ids, self.n_vocab, rounding_mode="trunc"
+                    )
+                else:
+                    prev_hyp_ids = top_ids // self.n_vocab
+                beam_ids += zip(
+                    top_scores,
+                    hyp_ids[prev_hyp_ids].tolist(),
+                    (top_ids % self.n_vocab).tolist(),
+                    [utt_id] * len(top_ids),
+                )
+
+        with self.record("merge", "select_state"):
+            best_hyps = []
+            prev_hyps = self.unbatchfy(running_hyps)
+            for best_score, prev_hyp_id, new_token_id, _ in beam_ids:
+                prev_hyp = prev_hyps[prev_hyp_id]
+                best_hyps.append(
+                    Hypothesis(
+                        score=best_score,
+                        yseq=self.append_token(prev_hyp.yseq, new_token_id),
+                        scores=self.merge_scores(
+                            prev_hyp.scores,
+                            {k: v[prev_hyp_id] for k, v in scores.items()},
+                            new_token_id,
+                            {k: v[prev_hyp_id] for k, v in part_scores.items()},
+                            new_token_id,
+                        ),
+                        states=self.merge_states(
+                            {
+                                k: self.full_scorers[k].select_state(v, prev_hyp_id)
+                                for k, v in states.items()
+                            },
+                            {
+                                k: self.part_scorers[k].select_state(
+                                    v, prev_hyp_id, new_token_id
+                                )
+                                for k, v in part_states.items()
+                            },
+                            new_token_id,
+                        ),
+                    )
+                )
+        return self.batchfy(best_hyps), torch.tensor([b[-1] for b in beam_ids])
@@ -394,7 +394,8 @@ class BatchBeamSearchOnline(BatchBeamSearch):
         self.extend(h, self.running_hyps)
         while self.process_idx < maxlen:
             logging.debug("position " + str(self.process_idx))
-            best = self.search(self.running_hyps, h)
+            with self.record("search", "step", n_hyps=len(self.running_hyps)):
+                best = self.search(self.running_hyps, h)
 
             if self.process_idx == maxlen - 1:
                 # end decoding
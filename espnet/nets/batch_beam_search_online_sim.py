@@ -155,7 +155,8 @@ class BatchBeamSearchOnlineSim(BatchBeamSearch):
 
             while process_idx < maxlen:
                 logging.debug("position " + str(process_idx))
-                best = self.search(running_hyps, h)
+                with self.record("search", "step", n_hyps=len(running_hyps)):
+                    best = self.search(running_hyps, h)
 
                 if process_idx == maxlen - 1:
                     # end decoding
@@ -1,6 +1,7 @@
 """Beam search module."""
 
 import logging
+from contextlib import nullcontext
 from itertools import chain
 from typing import Any, Dict, List, NamedTuple, Tuple, Union
 
@@ -48,6 +49,7 @@ class BeamSearch(torch.nn.Module):
         return_hs: bool = False,
         hyp_primer: List[int] = None,
         normalize_length: bool = False,
+        pre_beam_gather: bool = False,
     ):
         """Initialize beam search.
 
@@ -68,6 +70,10 @@ class BeamSearch(torch.nn.Module):
             return_hs (bool): Whether to return hidden intermediates
             normalize_length (bool): If true, select the best ended hypotheses
                 based on length-normalized scores rather than the accumulated scores
+            pre_beam_gather (bool): If true, the pre-beam candidates are selected
+                by the scorer of `pre_beam_score_key` alone (plus <eos>), and
+                the scores of the other scorers are summed only for the candidates
+                instead of the whole vocabulary. Only used by `BatchBeamSearch`.
 
         """
         super().__init__()
@@ -117,8 +123,29 @@ class BeamSearch(torch.nn.Module):
             and self.pre_beam_size < self.n_vocab
             and len(self.part_scorers) > 0
         )
+        if pre_beam_gather and pre_beam_score_key not in self.full_scorers:
+            raise ValueError(
+                "pre_beam_gather requires pre_beam_score_key to be one of "
+                f"{list(self.full_scorers)}, but got {pre_beam_score_key}"
+            )
+        self.pre_beam_gather = pre_beam_gather and self.pre_beam_size < self.n_vocab
         self.return_hs = return_hs
         self.normalize_length = normalize_length
+        # espnet.nets.beam_search_profiler.BeamSearchProfiler (opt-in)
+        self.profiler = None
+
+    def record(self, name: str, category: str, **args):
+        """Return a context to time a part of the search if profiling is enabled.
+
+        Args:
+            name (str): Event name, e.g. the scorer name
+            category (str): Event category, e.g. "scorer" or "topk"
+            **args: Extra information attached to the event
+
+        """
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.record(name, category, **args)
 
     def set_hyp_primer(self, hyp_primer: List[int] = None) -> None:
         """Set the primer sequence for decoding.
@@ -194,14 +221,15 @@ class BeamSearch(torch.nn.Module):
         scores = dict()
         states = dict()
         for k, d in self.full_scorers.items():
-            if "decoder" in k and self.return_hs:
-                scores[k], hs, states[k] = d.score(
-                    hyp.yseq, hyp.states[k], x, return_hs=self.return_hs
-                )
-            elif pre_x is not None:
-                scores[k], states[k] = d.score(hyp.yseq, hyp.states[k], x, pre_x)
-            else:
-                scores[k], states[k] = d.score(hyp.yseq, hyp.states[k], x)
+            with self.record(k, "scorer", type="full"):
+                if "decoder" in k and self.return_hs:
+                    scores[k], hs, states[k] = d.score(
+                        hyp.yseq, hyp.states[k], x, return_hs=self.return_hs
+                    )
+                elif pre_x is not None:
+                    scores[k], states[k] = d.score(hyp.yseq, hyp.states[k], x, pre_x)
+                else:
+                    scores[k], states[k] = d.score(hyp.yseq, hyp.states[k], x)
 
         if self.return_hs:
             return hs, scores, states
@@ -228,7 +256,8 @@ class BeamSearch(torch.nn.Module):
         scores = dict()
         states = dict()
         for k, d in self.part_scorers.items():
-            scores[k], states[k] = d.score_partial(hyp.yseq, ids, hyp.states[k], x)
+            with self.record(k, "scorer", type="partial"):
+                scores[k], states[k] = d.score_partial(hyp.yseq, ids, hyp.states[k], x)
         return scores, states
 
     def beam(
@@ -350,36 +379,41 @@ class BeamSearch(torch.nn.Module):
                     if self.pre_beam_score_key == "full"
                     else scores[self.pre_beam_score_key]
                 )
-                part_ids = torch.topk(pre_beam_scores, self.pre_beam_size)[1]
+                with self.record("pre_beam", "topk"):
+                    part_ids = torch.topk(pre_beam_scores, self.pre_beam_size)[1]
             part_scores, part_states = self.score_partial(hyp, part_ids, x)
             for k in self.part_scorers:
                 weighted_scores[part_ids] += self.weights[k] * part_scores[k]
             # add previous hyp score
             weighted_scores += hyp.score
 
+            with self.record("beam", "topk"):
+                top_ids, local_ids = self.beam(weighted_scores, part_ids)
+
             # update hyps
-            for j, part_j in zip(*self.beam(weighted_scores, part_ids)):
-                # will be (2 x beam at most)
-                if self.return_hs:
-                    new_hs = hyp.hs + [hs.squeeze(0)]
-                else:
-                    new_hs = []
-                best_hyps.append(
-                    Hypothesis(
-                        score=weighted_scores[j],
-                        yseq=self.append_token(hyp.yseq, j),
-                        scores=self.merge_scores(
-                            hyp.scores, scores, j, part_scores, part_j
-                        ),
-                        states=self.merge_states(states, part_states, part_j),
-                        hs=new_hs,
+            with self.record("merge", "select_state"):
+                for j, part_j in zip(top_ids, local_ids):
+                    # will be (2 x beam at most)
+                    if self.return_hs:
+                        new_hs = hyp.hs + [hs.squeeze(0)]
+                    else:
+                        new_hs = []
+                    best_hyps.append(
+                        Hypothesis(
+                            score=weighted_scores[j],
+                            yseq=self.append_token(hyp.yseq, j),
+                            scores=self.merge_scores(
+                                hyp.scores, scores, j, part_scores, part_j
+                            ),
+                            states=self.merge_states(states, part_states, part_j),
+                            hs=new_hs,
+                        )
                     )
-                )
 
-            # sort and prune 2 x beam -> beam
-            best_hyps = sorted(best_hyps, key=lambda x: x.score, reverse=True)[
-                : min(len(best_hyps), self.beam_size)
-            ]
+                # sort and prune 2 x beam -> beam
+                best_hyps = sorted(best_hyps, key=lambda x: x.score, reverse=True)[
+                    : min(len(best_hyps), self.beam_size)
+                ]
         return best_hyps
 
     def forward(
@@ -434,11 +468,13 @@ class BeamSearch(torch.nn.Module):
         ended_hyps = []
         for i in range(maxlen):
             logger.debug("position " + str(i))
-            best = self.search(running_hyps, x, pre_x=pre_x)
+            with self.record("search", "step", n_hyps=len(running_hyps)):
+                best = self.search(running_hyps, x, pre_x=pre_x)
             # post process of one iteration
-            running_hyps = self.post_process(
-                i, maxlen, minlen, maxlenratio, best, ended_hyps
-            )
+            with self.record("post_process", "post_process"):
+                running_hyps = self.post_process(
+                    i, maxlen, minlen, maxlenratio, best, ended_hyps
+                )
             # end detection
             if maxlenratio == 0.0 and end_detect([h.asdict() for h in ended_hyps], i):
                 logger.info(f"end detected at {i}")
@@ -229,7 +229,8 @@ class PartiallyARBeamSearch(BatchBeamSearch):
 
         for i in range(maxlen):
             logging.debug("position " + str(i))
-            best = self.search(running_hyps, x)  # PartiallyARHypothesis
+            with self.record("search", "step", n_hyps=running_hyps.yseq.size(0)):
+                best = self.search(running_hyps, x)  # PartiallyARHypothesis
 
             # post process of one iteration
             # running_hyps is BatchHypothesis
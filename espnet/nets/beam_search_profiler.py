@@ -0,0 +1,233 @@
+"""Profiler to record where the time goes in beam search."""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import torch
+
+from espnet2.utils.types import str2bool
+
+
+class BeamSearchProfiler:
+    """Record the wall time of each part of beam search.
+
+    The beam search modules call `record()` around the scorers
+    (category "scorer"), the pre-beam and beam top-k ("topk"),
+    the state selection of the new hypotheses ("select_state"),
+    the post-processing ("post_process") and each search step ("step").
+    The step events also keep the number of running hypotheses.
+
+    Examples:
+        >>> profiler = BeamSearchProfiler()
+        >>> beam_search.profiler = profiler
+        >>> nbest = beam_search(x)
+        >>> profiler.summary()["scorer/decoder"]["total"]
+        >>> profiler.save("exp/decode")
+
+    The statistics are accumulated as the events are recorded, and only the
+    first `max_trace_events` events are kept for the trace, so the memory
+    and the trace size are bounded for long decoding runs.
+
+    """
+
+    def __init__(self, synchronize: bool = False, max_trace_events: int = 100000):
+        """Initialize class.
+
+        Args:
+            synchronize (bool): Whether to synchronize CUDA before reading
+                the clock. Without it, the time of asynchronous GPU kernels
+                is attributed to the event which waits for their results.
+            max_trace_events (int): The maximum number of the events kept for
+                the Chrome trace. The later events are only aggregated in
+                `summary()`. A negative value keeps all the events.
+
+        """
+        self.synchronize = synchronize and torch.cuda.is_available()
+        self.max_trace_events = max_trace_events
+        self.reset()
+
+    def _now(self) -> float:
+        if self.synchronize:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    @contextmanager
+    def record(self, name: str, category: str, **args):
+        """Record the time spent in the `with` block as one event.
+
+        Args:
+            name (str): Event name, e.g. the scorer name
+            category (str): Event category, e.g. "scorer" or "topk"
+            **args: Extra information attached to the event
+
+        """
+        start = self._now()
+        try:
+            yield
+        finally:
+            end = self._now()
+            dur = end - start
+            with self._lock:
+                stats = self._stats[f"{category}/{name}"]
+                stats["count"] += 1
+                stats["total"] += dur
+                stats["max"] = max(stats["max"], dur)
+                if "n_hyps" in args:
+                    stats["hyps"] += args["n_hyps"]
+                    stats["hyps_count"] += 1
+                if 0 <= self.max_trace_events <= len(self.events):
+                    self.num_dropped_events += 1
+                else:
+                    self.events.append(
+                        dict(
+                            name=name,
+                            cat=category,
+                            start=start - self._origin,
+                            dur=dur,
+                            tid=threading.get_ident(),
+                            args=args,
+                        )
+                    )
+
+    def reset(self):
+        """Clear the recorded events and statistics."""
+        self._lock = threading.Lock()
+        self._stats = defaultdict(
+            lambda: dict(count=0, total=0.0, max=0.0, hyps=0, hyps_count=0)
+        )
+        self.events: List[Dict[str, Any]] = []
+        self.num_dropped_events = 0
+        self._origin = time.perf_counter()
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Return the statistics of the events by "{category}/{name}".
+
+        The statistics are accumulated for all the events, including those
+        dropped from the trace.
+
+        Returns:
+            Dict[str, Dict[str, float]]: count, total, mean and max time in seconds
+                for each event type. The "step" entries also have the mean number
+                of running hypotheses per step as "mean_hyps".
+
+        """
+        retval = {}
+        with self._lock:
+            for key, stats in self._stats.items():
+                retval[key] = dict(
+                    count=stats["count"],
+                    total=stats["total"],
+                    mean=stats["total"] / stats["count"],
+                    max=stats["max"],
+                )
+                if stats["hyps_count"] > 0:
+                    retval[key]["mean_hyps"] = stats["hyps"] / stats["hyps_count"]
+        return retval
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Convert the events into the Chrome trace event format.
+
+        The output can be loaded in chrome://tracing or https://ui.perfetto.dev.
+        Only the first `max_trace_events` events are included.
+        """
+        return dict(
+            traceEvents=[
+                dict(
+                    name=e["name"],
+                    cat=e["cat"],
+                    ph="X",
+                    ts=e["start"] * 1e6,
+                    dur=e["dur"] * 1e6,
+                    pid=0,
+                    tid=e["tid"],
+                    args=e["args"],
+                )
+                for e in self.events
+            ],
+            displayTimeUnit="ms",
+            otherData=dict(num_dropped_events=self.num_dropped_events),
+        )
+
+    def save(self, output_dir: Union[Path, str]):
+        """Write "beam_search_profile.json" and "beam_search_trace.json".
+
+        Args:
+            output_dir: The directory to write the summary and the Chrome trace
+
+        """
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with (output_dir / "beam_search_profile.json").open("w") as f:
+            json.dump(self.summary(), f, indent=2)
+        with (output_dir / "beam_search_trace.json").open("w") as f:
+            json.dump(self.chrome_trace(), f)
+
+
+def set_beam_search_profiler(obj: Any, profiler: BeamSearchProfiler) -> int:
+    """Attach the profiler to all the beam search modules held by `obj`.
+
+    Args:
+        obj: An inference wrapper, e.g. `Speech2Text` in espnet2/bin
+        profiler: The profiler to be attached
+
+    Returns:
+        int: The number of beam search modules found in `obj`
+
+    """
+    from espnet.nets.beam_search import BeamSearch
+
+    n = 0
+    for v in vars(obj).values():
+        if isinstance(v, BeamSearch):
+            v.profiler = profiler
+            n += 1
+    return n
+
+
+def add_beam_search_profiler_arguments(group: argparse._ActionsContainer):
+    """Add --profile_beam_search to the parser of an inference script.
+
+    Args:
+        group: The parser or the argument group to add the option to
+
+    """
+    group.add_argument(
+        "--profile_beam_search",
+        type=str2bool,
+        default=False,
+        help="Record the time spent in each scorer and search step, and write "
+        "beam_search_profile.json and beam_search_trace.json (Chrome trace format) "
+        "to the output directory",
+    )
+
+
+def build_beam_search_profiler(
+    obj: Any, profile_beam_search: bool
+) -> Optional[BeamSearchProfiler]:
+    """Build a profiler and attach it to the beam search modules held by `obj`.
+
+    Args:
+        obj: An inference wrapper, e.g. `Speech2Text` in espnet2/bin
+        profile_beam_search: The value of --profile_beam_search
+
+    Returns:
+        Optional[BeamSearchProfiler]: The attached profiler, or None if
+            profile_beam_search is False or `obj` has no beam search module
+
+    """
+    if not profile_beam_search:
+        return None
+    profiler = BeamSearchProfiler()
+    if set_beam_search_profiler(obj, profiler) == 0:
+        logging.warning(
+            "No beam search module is found. --profile_beam_search is ignored."
+        )
+        return None
+    return profiler
@@ -250,17 +250,22 @@ class Postnet(torch.nn.Module):
                 )
             ]
 
-    def forward(self, xs):
+    def forward(self, xs, masks=None):
         """Calculate forward propagation.
 
         Args:
             xs (Tensor): Batch of the sequences of padded input tensors (B, idim, Tmax).
+            masks (BoolTensor, optional): Batch of masks indicating padded part
+                (B, 1, Tmax). If given, the padded part of the inputs of each layer
+                is filled with zeros.
 
         Returns:
             Tensor: Batch of padded output tensor. (B, odim, Tmax).
 
         """
         for i in range(len(self.postnet)):
+            if masks is not None:
+                xs = xs.masked_fill(masks, 0.0)
             xs = self.postnet[i](xs)
         return xs
 
@@ -0,0 +1,306 @@
+"""Cross-utterance batched scoring service for full scorers (e.g., LMs)."""
+
+import copy
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Any, List, Optional, Tuple
+
+import torch
+
+from espnet.nets.scorer_interface import BatchScorerInterface
+
+logger = logging.getLogger(__name__)
+
+
+class _ScoringRequest:
+    """A `batch_score` call waiting for the result from the service."""
+
+    def __init__(self, ys: torch.Tensor, states: List[Any]):
+        self.ys = ys
+        self.states = states
+        self.scores = None
+        self.new_states = None
+        self.error = None
+        self.done = threading.Event()
+
+    def signature(self) -> Tuple:
+        """Return the key to find the requests which can be stacked together.
+
+        Requests can be merged if their prefixes have the same length
+        (e.g., the caches of TransformerLM are stacked along the batch axis)
+        and all of them are either the first step (no state) or not.
+        """
+        return (
+            self.ys.size(1),
+            self.ys.device,
+            len(self.states) > 0 and self.states[0] is None,
+        )
+
+
+class BatchScoringService:
+    """Coalesce `batch_score` calls from concurrently decoded utterances.
+
+    A beam search only scores `beam` hypotheses per step, which is a tiny batch
+    for a neural LM. When several utterances are decoded in parallel threads,
+    this service collects their requests for a short time window and runs
+    the wrapped scorer once on the stacked batch.
+
+    The wrapped scorer must not depend on the encoder feature `xs`,
+    which holds for language models (e.g., `TransformerLM`, `SequentialRNNLM`).
+
+    Examples:
+        >>> service = BatchScoringService(lm, max_batch_size=256, max_wait=0.002)
+        >>> with service:
+        ...     # Use ServiceScorer(service) as "lm" scorer in each decoding thread
+        ...     beam_search = BatchBeamSearch(
+        ...         scorers={"decoder": decoder, "lm": ServiceScorer(service)}, ...
+        ...     )
+        >>> logging.info(f"mean batch size: {service.mean_batch_size}")
+
+    """
+
+    def __init__(
+        self,
+        scorer: BatchScorerInterface,
+        max_batch_size: int = 256,
+        max_wait: float = 0.002,
+    ):
+        """Initialize class.
+
+        Args:
+            scorer (BatchScorerInterface): The full scorer to be shared
+            max_batch_size (int): The maximum number of hypotheses in one call
+            max_wait (float): The maximum time in seconds to wait for
+                other requests after the first one is received
+
+        """
+        assert isinstance(scorer, BatchScorerInterface), type(scorer)
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._thread = None
+
+        # statistics
+        self.num_requests = 0
+        self.num_hyps = 0
+        self.num_calls = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        """Return the average number of hypotheses scored in one call."""
+        return self.num_hyps / max(self.num_calls, 1)
+
+    def start(self):
+        """Start the background scoring thread."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background scoring thread after the pending requests."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+            logger.info(
+                f"{self.num_requests} requests were scored by {self.num_calls} calls "
+                f"(mean batch size: {self.mean_batch_size:.1f})"
+            )
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def batch_score(
+        self, ys: torch.Tensor, states: List[Any]
+    ) -> Tuple[torch.Tensor, Optional[List[Any]]]:
+        """Score new token batch through the service.
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            states (List[Any]): Scorer states for prefix tokens.
+
+        Returns:
+            tuple[torch.Tensor, List[Any]]: Tuple of
+                batchfied scores for next token with shape of `(n_batch, n_vocab)`
+                and next state list for ys.
+
+        """
+        if self._thread is None:
+            raise RuntimeError("The scoring service is not started")
+        request = _ScoringRequest(ys, states)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.scores, request.new_states
+
+    def _loop(self):
+        stopping = False
+        while not stopping:
+            request = self._queue.get()
+            if request is None:
+                break
+            pending = [request]
+            n_hyps = len(request.ys)
+            deadline = time.monotonic() + self.max_wait
+            while n_hyps < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                pending.append(request)
+                n_hyps += len(request.ys)
+
+            groups = defaultdict(list)
+            for request in pending:
+                groups[request.signature()].append(request)
+            for requests in groups.values():
+                self._run(requests)
+
+    def _run(self, requests: List[_ScoringRequest]):
+        try:
+            ys = torch.cat([r.ys for r in requests], dim=0)
+            states = [s for r in requests for s in r.states]
+            with torch.no_grad():
+                scores, new_states = self.scorer.batch_score(ys, states, None)
+            self.num_requests += len(requests)
+            self.num_hyps += len(ys)
+            self.num_calls += 1
+
+            offset = 0
+            for r in requests:
+                n = len(r.ys)
+                r.scores = scores[offset : offset + n]
+                if new_states is not None:
+                    r.new_states = new_states[offset : offset + n]
+                offset += n
+        except Exception as e:
+            for r in requests:
+                r.error = e
+        finally:
+            for r in requests:
+                r.done.set()
+
+
+class ServiceScorer(BatchScorerInterface):
+    """Scorer interface wrapper to route `batch_score` to BatchScoringService."""
+
+    def __init__(self, service: BatchScoringService):
+        """Initialize class.
+
+        Args:
+            service (BatchScoringService): The shared scoring service
+
+        """
+        self.service = service
+        self.scorer = service.scorer
+
+    def init_state(self, x: torch.Tensor) -> Any:
+        """Get an initial state for decoding."""
+        return self.scorer.init_state(x)
+
+    def batch_init_state(self, x: torch.Tensor) -> Any:
+        """Get an initial state for decoding."""
+        return self.scorer.batch_init_state(x)
+
+    def select_state(self, state: Any, i: int, new_id: int = None) -> Any:
+        """Select state with relative ids in the main beam search."""
+        return self.scorer.select_state(state, i, new_id)
+
+    def final_score(self, state: Any) -> float:
+        """Score eos (optional)."""
+        return self.scorer.final_score(state)
+
+    def score(self, y: torch.Tensor, state: Any, x: torch.Tensor) -> Tuple[Any, Any]:
+        """Score new token.
+
+        Args:
+            y (torch.Tensor): 1D torch.int64 prefix tokens.
+            state: Scorer state for prefix tokens
+            x (torch.Tensor): The encoder feature that generates ys.
+
+        Returns:
+            tuple[torch.Tensor, Any]: Tuple of
+                scores for next token that has a shape of `(n_vocab)`
+                and next state for ys
+
+        """
+        scores, states = self.service.batch_score(y.unsqueeze(0), [state])
+        return scores[0], None if states is None else states[0]
+
+    def batch_score(
+        self, ys: torch.Tensor, states: List[Any], xs: torch.Tensor
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Score new token batch.
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            states (List[Any]): Scorer states for prefix tokens.
+            xs (torch.Tensor):
+                The encoder feature that generates ys (n_batch, xlen, n_feat).
+
+        Returns:
+            tuple[torch.Tensor, List[Any]]: Tuple of
+                batchfied scores for next token with shape of `(n_batch, n_vocab)`
+                and next state list for ys.
+
+        """
+        return self.service.batch_score(ys, states)
+
+
+def _copy_scorer(scorer: Any) -> Any:
+    """Deep-copy `scorer` while sharing the parameters and buffers of its modules."""
+    if isinstance(scorer, torch.nn.Module):
+        modules = [scorer]
+    else:
+        modules = [v for v in vars(scorer).values() if isinstance(v, torch.nn.Module)]
+    memo = {
+        id(t): t for m in modules for t in itertools.chain(m.parameters(), m.buffers())
+    }
+    return copy.deepcopy(scorer, memo)
+
+
+def use_scoring_service(beam_search, service: BatchScoringService, name: str = "lm"):
+    """Return a shallow copy of `beam_search` scoring `name` through `service`.
+
+    The other scorers are copied as well, so that the states which they keep per
+    utterance (e.g. the CTC prefix scorer and the attention of the RNN decoder)
+    are not shared, while their parameters and buffers are shared. Each decoding
+    thread can then use its own copy while the scorer `name` is batched across
+    them.
+
+    Args:
+        beam_search (BeamSearch): The beam search with the full scorer `name`
+        service (BatchScoringService): The service wrapping the same scorer
+        name (str): The name of the scorer
+
+    Returns:
+        BeamSearch: The copy of `beam_search`
+
+    """
+    if name not in beam_search.full_scorers:
+        raise ValueError(f"{name} is not a full scorer of the beam search")
+    scorers = {
+        k: ServiceScorer(service) if k == name else _copy_scorer(v)
+        for k, v in beam_search.scorers.items()
+    }
+    beam_search = copy.copy(beam_search)
+    beam_search.scorers = scorers
+    beam_search.full_scorers = {k: scorers[k] for k in beam_search.full_scorers}
+    beam_search.part_scorers = {k: scorers[k] for k in beam_search.part_scorers}
+    return beam_search
@@ -125,6 +125,76 @@ class CTCPrefixScorer(BatchPartialScorerInterface):
         )
         return self.impl(y, batch_state, ids)
 
+    def batch_init_state_multi(self, xs: torch.Tensor):
+        """Get an initial state for decoding multiple utterances at the same time.
+
+        Args:
+            xs (torch.Tensor): The encoded feature tensors of the same length
+                (n_utts, T, D)
+
+        Returns: initial state
+
+        """
+        logp = self.ctc.log_softmax(xs)
+        xlens = torch.full((logp.size(0),), logp.size(1), dtype=torch.long)
+        self.impl = CTCPrefixScoreTH(logp, xlens, 0, self.eos)
+        return None
+
+    def batch_score_partial_multi(self, y, ids, state, utt_ids):
+        """Score new token for the hypotheses of multiple utterances.
+
+        The hypotheses are arranged to the (n_utts, n_hyps) slots of
+        CTCPrefixScoreTH, where n_hyps is the largest number of the hypotheses
+        of an utterance, and the empty slots are filled with copies of
+        a hypothesis, whose scores are discarded.
+
+        Args:
+            y (torch.Tensor): Prefix tokens of the hypotheses (n_batch, L)
+            ids (torch.Tensor): torch.int64 next token to score (n_batch, n_ids)
+            state: decoder states for the prefix tokens
+            utt_ids (torch.Tensor): Utterance index of each hypothesis (n_batch,)
+
+        Returns:
+            tuple[torch.Tensor, Any]:
+                Tuple of a score tensor for y that has a shape `(n_batch, n_vocab)`
+                and next state for ys
+
+        """
+        n_utts = self.impl.batch
+        counts = [0] * n_utts
+        ranks = []
+        for utt_id in utt_ids.tolist():
+            ranks.append(counts[utt_id])
+            counts[utt_id] += 1
+        n_hyps = max(counts)
+        # the slot of each hypothesis: utt_id * n_hyps + its rank in the utterance
+        slots = utt_ids.cpu() * n_hyps + torch.tensor(ranks, dtype=torch.long)
+        src = torch.zeros(n_utts * n_hyps, dtype=torch.long)
+        src[slots] = torch.arange(len(slots))
+
+        batch_state = (
+            (
+                torch.stack([state[i][0] for i in src.tolist()], dim=2),
+                torch.stack([state[i][1] for i in src.tolist()]),
+                state[0][2],
+                state[0][3],
+            )
+            if state[0] is not None
+            else None
+        )
+        src = src.to(y.device)
+        scores, (r, log_psi, f_min, f_max, scoring_idmap) = self.impl(
+            y[src], batch_state, ids[src] if ids is not None else None
+        )
+        slots = slots.to(scores.device)
+        return scores[slots], (
+            r[:, :, slots],
+            log_psi[slots],
+            f_min,
+            f_max,
+            scoring_idmap[slots] if scoring_idmap is not None else None,
+        )
+
     def extend_prob(self, x: torch.Tensor):
         """Extend probs for decoding.
 
@@ -1,6 +1,7 @@
 """Ngram lm implement."""
 
 from abc import ABC
+from collections import OrderedDict
 
 import kenlm
 import torch
@@ -8,6 +9,139 @@ import torch
 from espnet.nets.scorer_interface import BatchScorerInterface, PartialScorerInterface
 
 
+def is_arpa(ngram_model):
+    """Check whether the ngram model file is in the ARPA format.
+
+    Args:
+        ngram_model: ngram model path
+
+    Returns:
+        bool: True for an ARPA file, False for a kenlm binary file
+
+    """
+    with open(ngram_model, "rb") as f:
+        return f.read(1024).lstrip().startswith(b"\\data\\")
+
+
+class ArpaSuccessors:
+    """Successor scores of the ARPA n-grams as tensors.
+
+    The score of a token w following a context h is log10 p(h w) if the n-gram
+    h w is in the model, or else the backoff weight of h plus the score of w
+    following h without its first word. Starting from the unigram scores of the
+    whole vocabulary, each suffix of the context adds its backoff weight to all
+    the tokens and overwrites the tokens of its n-grams, from the shortest
+    suffix to the longest one. This gives the same scores as kenlm BaseScore.
+
+    The n-grams are kept in flat tensors grouped by their context, so the
+    successors of a context are a slice of them.
+
+    """
+
+    def __init__(self, arpa, token_list):
+        """Initialize ArpaSuccessors.
+
+        Args:
+            arpa: ARPA file path
+            token_list: token list with "</s>" as the end of sentence
+
+        """
+        self.word_ids = {}
+        self.contexts = {}
+        unigram, backoffs = [], []
+        context_ids, words, logps = [], [], []
+        order = 0
+        with open(arpa, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("ngram "):
+                    continue
+                if line.startswith("\\"):
+                    if line.endswith("-grams:"):
+                        order = int(line[1:].split("-")[0])
+                    continue
+                if order == 0:
+                    continue
+                fields = line.split()
+                logp = float(fields[0])
+                if order == 1:
+                    self.word_ids[fields[1]] = len(unigram)
+                    unigram.append(logp)
+                    ids = (len(unigram) - 1,)
+                else:
+                    ids = tuple(self.word_ids[w] for w in fields[1 : order + 1])
+                    context_ids.append(self._context_id(ids[:-1], backoffs))
+                    words.append(ids[-1])
+                    logps.append(logp)
+                if len(fields) > order + 1 and float(fields[order + 1]) != 0.0:
+                    backoffs[self._context_id(ids, backoffs)] = float(fields[order + 1])
+        if "<unk>" not in self.word_ids:
+            # kenlm adds <unk> with this log10 probability if the model lacks it
+            self.word_ids["<unk>"] = len(unigram)
+            unigram.append(-100.0)
+        self.order = order
+        self.unk = self.word_ids["<unk>"]
+        self.unigram = torch.tensor(unigram, dtype=torch.float32)
+        self.backoffs = backoffs
+
+        context_ids = torch.tensor(context_ids, dtype=torch.long)
+        sorted_ids = torch.argsort(context_ids, stable=True)
+        self.words = torch.tensor(words, dtype=torch.long)[sorted_ids]
+        self.logps = torch.tensor(logps, dtype=torch.float32)[sorted_ids]
+        counts = torch.bincount(context_ids, minlength=len(backoffs))
+        self.offsets = [0] + torch.cumsum(counts, 0).tolist()
+
+        self.token_ids = torch.tensor(
+            [self.word_ids.get(w, self.unk) for w in token_list], dtype=torch.long
+        )
+
+    def _context_id(self, context, backoffs):
+        context_id = self.contexts.get(context)
+        if context_id is None:
+            context_id = self.contexts[context] = len(backoffs)
+            backoffs.append(0.0)
+        return context_id
+
+    def context(self, y, token_list):
+        """Get the context of the prefix used by the model.
+
+        Args:
+            y: prefix tokens starting with <sos>
+            token_list: token list with "</s>" as the end of sentence
+
+        Returns:
+            tuple: ids of the last (order - 1) words including <s>
+
+        """
+        n = self.order - 1
+        if n == 0:
+            return ()
+        words = [token_list[t] for t in y[1:].tolist()[-n:]]
+        if len(words) < n:
+            words.insert(0, "<s>")
+        return tuple(self.word_ids.get(w, self.unk) for w in words)
+
+    def scores(self, context):
+        """Score all the tokens following the context.
+
+        Args:
+            context: ids of the context words
+
+        Returns:
+            torch.Tensor: torch.float32 scores with shape of `(n_vocab,)`
+
+        """
+        scores = self.unigram
+        for i in reversed(range(len(context))):
+            context_id = self.contexts.get(context[i:])
+            if context_id is None:
+                continue
+            start, end = self.offsets[context_id], self.offsets[context_id + 1]
+            scores = scores + self.backoffs[context_id]
+            scores[self.words[start:end]] = self.logps[start:end]
+        return scores[self.token_ids]
+
+
 class Ngrambase(ABC):
     """Ngram base implemented through ScorerInterface."""
 
@@ -30,6 +164,22 @@ class Ngrambase(ABC):
         self.lm.NullContextWrite(state)
         return state
 
+    def next_state(self, y, state):
+        """Advance the LM state with the last token of the prefix.
+
+        Args:
+            y: previous char
+            state: previous state
+
+        Returns:
+            kenlm.State: the state after reading y[-1]
+
+        """
+        out_state = kenlm.State()
+        ys = self.chardict[y[-1]] if y.shape[0] > 1 else "<s>"
+        self.lm.BaseScore(state, ys, out_state)
+        return out_state
+
     def score_partial_(self, y, next_token, state, x):
         """Score interface for both full and partial scorer.
 
@@ -45,9 +195,7 @@ class Ngrambase(ABC):
                 and next state list for ys.
 
         """
-        out_state = kenlm.State()
-        ys = self.chardict[y[-1]] if y.shape[0] > 1 else "<s>"
-        self.lm.BaseScore(state, ys, out_state)
+        out_state = self.next_state(y, state)
         scores = torch.empty_like(next_token, dtype=x.dtype, device=y.device)
         for i, j in enumerate(next_token):
             scores[i] = self.lm.BaseScore(
@@ -59,6 +207,63 @@ class Ngrambase(ABC):
 class NgramFullScorer(Ngrambase, BatchScorerInterface):
     """Fullscorer for ngram."""
 
+    def __init__(self, ngram_model, token_list, cache_size=1024):
+        """Initialize NgramFullScorer.
+
+        If ngram_model is an ARPA file, its n-grams are also loaded into tensors
+        and the successor scores are computed with tensor ops along the backoff
+        chain. A kenlm binary file does not expose its n-grams, so the tokens are
+        then scored one by one with kenlm.
+
+        Args:
+            ngram_model: ngram model path
+            token_list: token list from dict or model.json
+            cache_size: the maximum number of LM states whose successor
+                scores over the whole vocabulary are kept in the LRU cache
+
+        """
+        super().__init__(ngram_model, token_list)
+        self.cache_size = cache_size
+        self.successor_cache = OrderedDict()
+        self.arpa = (
+            ArpaSuccessors(ngram_model, self.chardict) if is_arpa(ngram_model) else None
+        )
+
+    def successor_scores(self, y, state):
+        """Score all the tokens in the vocabulary following the prefix.
+
+        The scores only depend on the LM state, so they are cached by the state
+        (kenlm.State is hashable) and shared among hypotheses and decoding steps.
+
+        Args:
+            y: prefix tokens
+            state: LM state after reading y
+
+        Returns:
+            torch.Tensor: torch.float32 scores with shape of `(n_vocab,)`
+
+        """
+        scores = self.successor_cache.get(state)
+        if scores is not None:
+            self.successor_cache.move_to_end(state)
+            return scores
+
+        if self.arpa is not None:
+            scores = self.arpa.scores(self.arpa.context(y, self.chardict))
+        else:
+            scores = torch.tensor(
+                [
+                    self.lm.BaseScore(state, w, self.tmpkenlmstate)
+                    for w in self.chardict
+                ],
+                dtype=torch.float32,
+            )
+        if self.cache_size > 0:
+            self.successor_cache[state] = scores
+            if len(self.successor_cache) > self.cache_size:
+                self.successor_cache.popitem(last=False)
+        return scores
+
     def score(self, y, state, x):
         """Score interface for both full and partial scorer.
 
@@ -73,7 +278,30 @@ class NgramFullScorer(Ngrambase, BatchScorerInterface):
                 and next state list for ys.
 
         """
-        return self.score_partial_(y, torch.tensor(range(self.charlen)), state, x)
+        out_state = self.next_state(y, state)
+        scores = self.successor_scores(y, out_state)
+        return scores.to(dtype=x.dtype, device=y.device), out_state
+
+    def batch_score(self, ys, states, xs):
+        """Score new token batch.
+
+        Args:
+            ys (torch.Tensor): torch.int64 prefix tokens (n_batch, ylen).
+            states (List[Any]): Scorer states for prefix tokens.
+            xs (torch.Tensor):
+                The encoder feature that generates ys (n_batch, xlen, n_feat).
+
+        Returns:
+            tuple[torch.Tensor, List[Any]]: Tuple of
+                batchfied scores for next token with shape of `(n_batch, n_vocab)`
+                and next state list for ys.
+
+        """
+        out_states = [self.next_state(y, state) for y, state in zip(ys, states)]
+        scores = torch.stack(
+            [self.successor_scores(y, s) for y, s in zip(ys, out_states)]
+        )
+        return scores.to(dtype=xs.dtype, device=ys.device), out_states
 
 
 class NgramPartScorer(Ngrambase, PartialScorerInterface):
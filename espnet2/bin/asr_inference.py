@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 import argparse
+import collections
 import copy
 import logging
+import queue
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from distutils.version import LooseVersion
 from itertools import groupby
 from pathlib import Path
@@ -42,9 +45,17 @@ from espnet2.utils.types import str2bool, str2triple_str, str_or_none
 from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.batch_beam_search_online_sim import BatchBeamSearchOnlineSim
 from espnet.nets.beam_search import BeamSearch, Hypothesis
+from espnet.nets.beam_search_profiler import (
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+)
 from espnet.nets.beam_search_timesync import BeamSearchTimeSync
 from espnet.nets.pytorch_backend.transformer.subsampling import TooShortUttError
 from espnet.nets.scorer_interface import BatchScorerInterface
+from espnet.nets.scorers.batch_service import (
+    BatchScoringService,
+    use_scoring_service,
+)
 from espnet.nets.scorers.ctc import CTCPrefixScorer
 from espnet.nets.scorers.length_bonus import LengthBonus
 from espnet.utils.cli_utils import get_commandline_args
@@ -760,6 +771,12 @@ def inference(
     threshold_probability: float,
     max_seq_len: int,
     max_mask_parallel: int,
+    profile_beam_search: bool = False,
+    read_ahead: int = 0,
+    start_index: int = 0,
+    num_shards: int = 1,
+    shard_id: int = 0,
+    lm_service_threads: int = 1,
 ):
     if batch_size > 1:
         raise NotImplementedError("batch decoding is not implemented")
@@ -824,6 +841,7 @@ def inference(
         model_tag=model_tag,
         **speech2text_kwargs,
     )
+    beam_search_profiler = build_beam_search_profiler(speech2text, profile_beam_search)
 
     # 3. Build data-iterator
     loader = ASRTask.build_streaming_iterator(
@@ -836,29 +854,80 @@ def inference(
         collate_fn=ASRTask.build_collate_fn(speech2text.asr_train_args, False),
         allow_variable_data_keys=allow_variable_data_keys,
         inference=True,
+        start_index=start_index,
+        read_ahead=read_ahead,
+        num_shards=num_shards,
+        shard_id=shard_id,
     )
 
-    # 7 .Start for-loop
-    # FIXME(kamo): The output format should be discussed about
-    with DatadirWriter(output_dir) as writer:
+    def decode(speech2text, keys, batch):
+        # N-best list of (text, token, token_int, hyp_object)
+        try:
+            return speech2text(**batch)
+        except TooShortUttError as e:
+            logging.warning(f"Utterance {keys} {e}")
+            hyp = Hypothesis(score=0.0, scores={}, states={}, yseq=[])
+            results = [[" ", ["<space>"], [2], hyp]] * nbest
+            if enh_s2t_task:
+                num_spk = getattr(speech2text.asr_model.enh_model, "num_spk", 1)
+                results = [results for _ in range(num_spk)]
+            return results
+
+    def iterate_batches():
         for keys, batch in loader:
             assert isinstance(batch, dict), type(batch)
             assert all(isinstance(s, str) for s in keys), keys
             _bs = len(next(iter(batch.values())))
             assert len(keys) == _bs, f"{len(keys)} != {_bs}"
             batch = {k: v[0] for k, v in batch.items() if not k.endswith("_lengths")}
-
-            # N-best list of (text, token, token_int, hyp_object)
+            yield keys, batch
+
+    def iterate_results():
+        if lm_service_threads <= 1:
+            for keys, batch in iterate_batches():
+                yield keys, decode(speech2text, keys, batch)
+            return
+
+        # Decode the utterances in parallel threads, each with its own copy of
+        # the beam search, and batch their LM calls across the utterances
+        full_scorers = getattr(speech2text.beam_search, "full_scorers", {})
+        if "lm" not in full_scorers:
+            raise ValueError("--lm_service_threads requires beam search with LM")
+        if ngram_file is not None:
+            # NgramPartScorer and NgramFullScorer share a kenlm scratch state
+            raise ValueError("--lm_service_threads does not support --ngram_file")
+        service = BatchScoringService(full_scorers["lm"])
+        decoders = queue.Queue()
+        for _ in range(lm_service_threads):
+            decoder = copy.copy(speech2text)
+            decoder.beam_search = use_scoring_service(speech2text.beam_search, service)
+            decoders.put(decoder)
+
+        def decode_with_service(keys, batch):
+            decoder = decoders.get()
             try:
-                results = speech2text(**batch)
-            except TooShortUttError as e:
-                logging.warning(f"Utterance {keys} {e}")
-                hyp = Hypothesis(score=0.0, scores={}, states={}, yseq=[])
-                results = [[" ", ["<space>"], [2], hyp]] * nbest
-                if enh_s2t_task:
-                    num_spk = getattr(speech2text.asr_model.enh_model, "num_spk", 1)
-                    results = [results for _ in range(num_spk)]
+                return decode(decoder, keys, batch)
+            finally:
+                decoders.put(decoder)
+
+        with service, ThreadPoolExecutor(lm_service_threads) as executor:
+            # keep the order of the utterances with a bounded number of pending ones
+            pending = collections.deque()
+            for keys, batch in iterate_batches():
+                pending.append(
+                    (keys, executor.submit(decode_with_service, keys, batch))
+                )
+                if len(pending) >= 2 * lm_service_threads:
+                    keys, future = pending.popleft()
+                    yield keys, future.result()
+            while len(pending) > 0:
+                keys, future = pending.popleft()
+                yield keys, future.result()
 
+    # 7 .Start for-loop
+    # FIXME(kamo): The output format should be discussed about
+    with DatadirWriter(output_dir) as writer:
+        for keys, results in iterate_results():
             # Only supporting batch_size==1
             key = keys[0]
             if enh_s2t_task or multi_asr:
@@ -909,6 +978,9 @@ def inference(
                             " ".join(text)
                         )
 
+    if beam_search_profiler is not None:
+        beam_search_profiler.save(output_dir)
+
 
 def get_parser():
     parser = config_argparse.ArgumentParser(
@@ -956,6 +1028,30 @@ def get_parser():
     )
     group.add_argument("--key_file", type=str_or_none)
     group.add_argument("--allow_variable_data_keys", type=str2bool, default=False)
+    group.add_argument(
+        "--read_ahead",
+        type=int,
+        default=0,
+        help="The number of the samples loaded in advance in a background thread",
+    )
+    group.add_argument(
+        "--start_index",
+        type=int,
+        default=0,
+        help="Skip the first start_index utterances, e.g. to resume the decoding",
+    )
+    group.add_argument(
+        "--num_shards",
+        type=int,
+        default=1,
+        help="Split the utterances in round-robin into num_shards shards",
+    )
+    group.add_argument(
+        "--shard_id",
+        type=int,
+        default=0,
+        help="Decode the shard_id-th shard of the utterances",
+    )
 
     group = parser.add_argument_group("The model configuration related")
     group.add_argument(
@@ -1044,6 +1140,14 @@ def get_parser():
     )
 
     group = parser.add_argument_group("Beam-search related")
+    group.add_argument(
+        "--lm_service_threads",
+        type=int,
+        default=1,
+        help="If > 1, decode this number of utterances in parallel threads "
+        "and batch their LM scoring calls across the utterances",
+    )
+    add_beam_search_profiler_arguments(group)
     group.add_argument(
         "--batch_size",
         type=int,
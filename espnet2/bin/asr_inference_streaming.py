@@ -27,6 +27,10 @@ from espnet2.utils import config_argparse
 from espnet2.utils.types import str2bool, str2triple_str, str_or_none
 from espnet.nets.batch_beam_search_online import BatchBeamSearchOnline
 from espnet.nets.beam_search import Hypothesis
+from espnet.nets.beam_search_profiler import (
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+)
 from espnet.nets.pytorch_backend.transformer.subsampling import TooShortUttError
 from espnet.nets.scorer_interface import BatchScorerInterface
 from espnet.nets.scorers.ctc import CTCPrefixScorer
@@ -390,6 +394,7 @@ def inference(
     disable_repetition_detection: bool,
     encoded_feat_length_limit: int,
     decoder_text_length_limit: int,
+    profile_beam_search: bool = False,
 ):
     if batch_size > 1:
         raise NotImplementedError("batch decoding is not implemented")
@@ -433,6 +438,7 @@ def inference(
         decoder_text_length_limit=decoder_text_length_limit,
         encoded_feat_length_limit=encoded_feat_length_limit,
     )
+    beam_search_profiler = build_beam_search_profiler(speech2text, profile_beam_search)
 
     # 3. Build data-iterator
     loader = ASRTask.build_streaming_iterator(
@@ -493,6 +499,9 @@ def inference(
                 if text is not None:
                     ibest_writer["text"][key] = text
 
+    if beam_search_profiler is not None:
+        beam_search_profiler.save(output_dir)
+
 
 def get_parser():
     parser = config_argparse.ArgumentParser(
@@ -557,6 +566,7 @@ def get_parser():
     group.add_argument("--word_lm_file", type=str)
 
     group = parser.add_argument_group("Beam-search related")
+    add_beam_search_profiler_arguments(group)
     group.add_argument(
         "--batch_size",
         type=int,
@@ -1,11 +1,16 @@
 #!/usr/bin/env python3
 import argparse
+import itertools
+import json
 import logging
+import multiprocessing
 import re
+import shutil
 import sys
 from pathlib import Path
-from typing import Dict, List, Union
+from typing import Dict, List, Optional, Union
 
+import fast_bss_eval
 import librosa
 import numpy as np
 import torch
@@ -18,9 +23,13 @@ from espnet2.fileio.datadir_writer import DatadirWriter
 from espnet2.fileio.sound_scp import SoundScpReader
 from espnet2.train.dataset import kaldi_loader
 from espnet2.utils import config_argparse
-from espnet2.utils.types import str2bool
+from espnet2.utils.types import float_or_none, str2bool
 from espnet.utils.cli_utils import get_commandline_args
 
+# Per-process scoring context (readers, DNSMOS model, ...).
+# It is built once in each worker of the process pool.
+_context = {}
+
 si_snr_loss = SISNRLoss()
 
 
@@ -48,12 +57,98 @@ def read_audio(reader, key, audio_format="sound"):
         raise ValueError(f"Unknown audio format: {audio_format}")
 
 
-@typechecked
-def scoring(
-    output_dir: str,
+def pairwise_si_snr(
+    ref: np.ndarray, inf: np.ndarray, clamp_db: Optional[float] = None
+) -> np.ndarray:
+    """Compute SI-SNR between all reference/estimate pairs in one batched call.
+
+    Without clamp_db, the scores are computed in the input dtype and a perfect
+    estimate gives inf. With clamp_db, they are computed in float64 and limited
+    to [-clamp_db, clamp_db], so that a perfect estimate gives a finite score.
+
+    Args:
+        ref: (num_ref, n_samples)
+        inf: (num_inf, n_samples)
+        clamp_db: The maximum absolute value of the scores in dB
+    Returns:
+        si_snr: (num_ref, num_inf), si_snr[i, j] = SI-SNR(ref[i], inf[j])
+    """
+    if clamp_db is None:
+        dtype = np.result_type(ref.dtype, inf.dtype)
+    else:
+        dtype = np.float64
+    with torch.no_grad():
+        loss = fast_bss_eval.si_sdr_loss(
+            est=torch.from_numpy(inf.astype(dtype, copy=False)),
+            ref=torch.from_numpy(ref.astype(dtype, copy=False)),
+            zero_mean=True,
+            clamp_db=clamp_db,
+            pairwise=True,
+        )
+    if clamp_db is None:
+        return -loss.numpy()
+    return np.clip(-loss.numpy(), -clamp_db, clamp_db)
+
+
+def best_permutation(score_mat: np.ndarray) -> np.ndarray:
+    """Find the permutation maximizing the mean score over all speakers.
+
+    All permutations are evaluated with a single gather on the score matrix.
+
+    Args:
+        score_mat: (num_spk, num_spk), score_mat[i, j] is the score of
+            assigning the j-th estimate to the i-th reference
+    Returns:
+        perm: (num_spk,), perm[i] is the estimate index for the i-th reference
+    """
+    num_spk = score_mat.shape[0]
+    perms = np.array(list(itertools.permutations(range(num_spk))))
+    scores = score_mat[np.arange(num_spk), perms].mean(axis=-1)
+    return perms[scores.argmax()]
+
+
+def build_dnsmos(dnsmos_args: Dict):
+    if dnsmos_args["mode"] == "local":
+        from espnet2.enh.layers.dnsmos import DNSMOS_local
+
+        if not Path(dnsmos_args["primary_model"]).exists():
+            raise ValueError(
+                f"The primary model '{dnsmos_args['primary_model']}' doesn't exist."
+                " You can download the model from https://github.com/microsoft/"
+                "DNS-Challenge/tree/master/DNSMOS/DNSMOS/sig_bak_ovr.onnx"
+            )
+        if not Path(dnsmos_args["p808_model"]).exists():
+            raise ValueError(
+                f"The P808 model '{dnsmos_args['p808_model']}' doesn't exist."
+                " You can download the model from https://github.com/microsoft/"
+                "DNS-Challenge/tree/master/DNSMOS/DNSMOS/model_v8.onnx"
+            )
+        dnsmos = DNSMOS_local(
+            dnsmos_args["primary_model"],
+            dnsmos_args["p808_model"],
+            use_gpu=dnsmos_args["use_gpu"],
+            convert_to_torch=dnsmos_args["convert_to_torch"],
+        )
+        logging.warning("Using local DNSMOS models for evaluation")
+
+    elif dnsmos_args["mode"] == "web":
+        from espnet2.enh.layers.dnsmos import DNSMOS_web
+
+        if not dnsmos_args["auth_key"]:
+            raise ValueError(
+                "Please specify the authentication key for access to the Web-API. "
+                "You can apply for the AUTH_KEY at https://github.com/microsoft/"
+                "DNS-Challenge/blob/master/DNSMOS/README.md#to-use-the-web-api"
+            )
+        dnsmos = DNSMOS_web(dnsmos_args["auth_key"])
+        logging.warning("Using the DNSMOS Web-API for evaluation")
+    else:
+        raise ValueError(f"Unknown DNSMOS mode: {dnsmos_args['mode']}")
+    return dnsmos
+
+
+def init_context(
     dtype: str,
-    log_level: Union[int, str],
-    key_file: str,
     ref_scp: List[str],
     inf_scp: List[str],
     ref_channel: int,
@@ -62,64 +157,272 @@ def scoring(
     use_dnsmos: bool,
     dnsmos_args: Dict,
     use_pesq: bool,
+    perm_criterion: str,
+    si_snr_clamp_db: Optional[float],
+    sample_rate: int,
+    num_threads: Optional[int] = None,
 ):
+    """Build the readers and metric models used by `score_key`.
 
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    This is called once in the main process for the sequential mode, or once
+    in every worker process for the parallel mode, so that each worker owns
+    its own file handles and models.
+    """
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+
+    ref_readers, ref_audio_format = get_readers(ref_scp, dtype)
+    inf_readers, inf_audio_format = get_readers(inf_scp, dtype)
+    _context.update(
+        ref_readers=ref_readers,
+        ref_audio_format=ref_audio_format,
+        inf_readers=inf_readers,
+        inf_audio_format=inf_audio_format,
+        num_ref=len(ref_scp),
+        ref_channel=ref_channel,
+        flexible_numspk=flexible_numspk,
+        is_tse=is_tse,
+        dnsmos=build_dnsmos(dnsmos_args) if use_dnsmos else None,
+        use_pesq=use_pesq,
+        perm_criterion=perm_criterion,
+        si_snr_clamp_db=si_snr_clamp_db,
+        sample_rate=sample_rate,
     )
 
-    if use_dnsmos:
-        if dnsmos_args["mode"] == "local":
-            from espnet2.enh.layers.dnsmos import DNSMOS_local
 
-            if not Path(dnsmos_args["primary_model"]).exists():
-                raise ValueError(
-                    f"The primary model '{dnsmos_args['primary_model']}' doesn't exist."
-                    " You can download the model from https://github.com/microsoft/"
-                    "DNS-Challenge/tree/master/DNSMOS/DNSMOS/sig_bak_ovr.onnx"
+def score_key(key: str) -> Dict[str, str]:
+    """Compute all the metrics for one utterance.
+
+    Args:
+        key: utterance ID
+    Returns:
+        scores: mapping from the output file name (e.g. "STOI_spk1")
+            to the value to be written for this key
+    """
+    ctx = _context
+    ref_readers, inf_readers = ctx["ref_readers"], ctx["inf_readers"]
+    ref_audio_format = ctx["ref_audio_format"]
+    inf_audio_format = ctx["inf_audio_format"]
+    ref_channel = ctx["ref_channel"]
+    flexible_numspk = ctx["flexible_numspk"]
+    sample_rate = ctx["sample_rate"]
+    dnsmos = ctx["dnsmos"]
+    clamp_db = ctx["si_snr_clamp_db"]
+
+    if not flexible_numspk:
+        ref_audios = [
+            read_audio(ref_reader, key, audio_format=ref_audio_format)
+            for ref_reader in ref_readers
+        ]
+        inf_audios = [
+            read_audio(inf_reader, key, audio_format=inf_audio_format)
+            for inf_reader in inf_readers
+        ]
+    else:
+        ref_audios = [
+            read_audio(ref_reader, key, audio_format=ref_audio_format)
+            for ref_reader in ref_readers
+            if key in ref_reader.keys()
+        ]
+        inf_audios = [
+            read_audio(inf_reader, key, audio_format=inf_audio_format)
+            for inf_reader in inf_readers
+            if key in inf_reader.keys()
+        ]
+    ref = np.array(ref_audios)
+    inf = np.array(inf_audios)
+    num_ref, num_inf = len(ref_audios), len(inf_audios)
+    if ref.ndim > inf.ndim:
+        # multi-channel reference and single-channel output
+        ref = ref[..., ref_channel]
+    elif ref.ndim < inf.ndim:
+        # single-channel reference and multi-channel output
+        inf = inf[..., ref_channel]
+    elif ref.ndim == inf.ndim == 3:
+        # multi-channel reference and output
+        ref = ref[..., ref_channel]
+        inf = inf[..., ref_channel]
+    if not flexible_numspk:
+        assert ref.shape == inf.shape, (ref.shape, inf.shape)
+        num_spk = ref.shape[0]
+    else:
+        # epsilon value to avoid divergence
+        # caused by zero-value, e.g., log(0)
+        eps = 0.000001
+        # if num_spk of ref > num_spk of inf
+        if ref.shape[0] > inf.shape[0]:
+            p = np.full((ref.shape[0] - inf.shape[0], inf.shape[1]), eps, inf.dtype)
+            inf = np.concatenate([inf, p])
+            num_spk = ref.shape[0]
+        # if num_spk of ref < num_spk of inf
+        elif ref.shape[0] < inf.shape[0]:
+            p = np.full((inf.shape[0] - ref.shape[0], ref.shape[1]), eps, ref.dtype)
+            ref = np.concatenate([ref, p])
+            num_spk = inf.shape[0]
+        else:
+            num_spk = ref.shape[0]
+
+    if ctx["perm_criterion"] == "si_snr" or clamp_db is not None:
+        # (num_spk, num_spk) SI-SNR of every reference/estimate pair
+        si_snr_mat = pairwise_si_snr(ref, inf, clamp_db=clamp_db)
+        # The eps padding of flexible_numspk is all zeros after the zero-mean
+        # normalization, so its SI-SNR is meaningless. Every permutation has the
+        # same number of padded pairs, so setting them to a constant keeps the
+        # permutation depending only on the real pairs. With clamp_db, the
+        # constant is the lowest score, which a missing or extra speaker gets.
+        padded = np.ones_like(si_snr_mat, dtype=bool)
+        padded[:num_ref, :num_inf] = False
+        si_snr_mat[padded] = 0.0 if clamp_db is None else -clamp_db
+    if ctx["perm_criterion"] == "si_snr" and not ctx["is_tse"]:
+        perm = best_permutation(si_snr_mat)
+        sdr, sir, sar, _ = bss_eval_sources(ref, inf[perm], compute_permutation=False)
+    else:
+        sdr, sir, sar, perm = bss_eval_sources(
+            ref, inf, compute_permutation=not ctx["is_tse"]
+        )
+
+    scores = {}
+    for i in range(num_spk):
+        j = int(perm[i])
+        stoi_score = stoi(ref[i], inf[j], fs_sig=sample_rate)
+        estoi_score = stoi(ref[i], inf[j], fs_sig=sample_rate, extended=True)
+        if clamp_db is None:
+            si_snr_score = -float(
+                si_snr_loss(
+                    torch.from_numpy(ref[i][None, ...]),
+                    torch.from_numpy(inf[j][None, ...]),
                 )
-            if not Path(dnsmos_args["p808_model"]).exists():
+            )
+        else:
+            si_snr_score = float(si_snr_mat[i, j])
+        if dnsmos:
+            with torch.no_grad():
+                dnsmos_score = dnsmos(inf[j], sample_rate)
+            scores[f"OVRL_spk{i + 1}"] = str(float(dnsmos_score["OVRL"]))
+            scores[f"SIG_spk{i + 1}"] = str(float(dnsmos_score["SIG"]))
+            scores[f"BAK_spk{i + 1}"] = str(float(dnsmos_score["BAK"]))
+            scores[f"P808_MOS_spk{i + 1}"] = str(float(dnsmos_score["P808_MOS"]))
+        if ctx["use_pesq"]:
+            from pesq import PesqError, pesq
+
+            if sample_rate == 8000:
+                mode = "nb"
+                pesq_sr = sample_rate
+                ref_ = ref[i]
+                inf_ = inf[j]
+            elif sample_rate == 16000:
+                mode = "wb"
+                pesq_sr = sample_rate
+                ref_ = ref[i]
+                inf_ = inf[j]
+            elif sample_rate > 16000:
+                mode = "wb"
+                pesq_sr = 16000
+                ref_ = librosa.resample(ref[i], orig_sr=sample_rate, target_sr=16000)
+                inf_ = librosa.resample(inf[j], orig_sr=sample_rate, target_sr=16000)
+                logging.warning(
+                    "The sample rate is higher than 16000 Hz. "
+                    "PESQ is calculated in the wideband mode and "
+                    "the signal is resampled to 16 kHz."
+                )
+            else:
                 raise ValueError(
-                    f"The P808 model '{dnsmos_args['p808_model']}' doesn't exist."
-                    " You can download the model from https://github.com/microsoft/"
-                    "DNS-Challenge/tree/master/DNSMOS/DNSMOS/model_v8.onnx"
+                    "sample rate must be 8000 or 16000 for PESQ evaluation, "
+                    f"but got {sample_rate}"
                 )
-            dnsmos = DNSMOS_local(
-                dnsmos_args["primary_model"],
-                dnsmos_args["p808_model"],
-                use_gpu=dnsmos_args["use_gpu"],
-                convert_to_torch=dnsmos_args["convert_to_torch"],
+            pesq_score = pesq(
+                pesq_sr,
+                ref_,
+                inf_,
+                mode=mode,
+                on_error=PesqError.RETURN_VALUES,
             )
-            logging.warning("Using local DNSMOS models for evaluation")
+            if pesq_score == PesqError.NO_UTTERANCES_DETECTED:
+                logging.warning(
+                    f"[PESQ] Error: No utterances detected for {key}. "
+                    "Skipping this utterance."
+                )
+            else:
+                scores[f"PESQ_{mode.upper()}_spk{i + 1}"] = str(pesq_score)
+        scores[f"STOI_spk{i + 1}"] = str(stoi_score * 100)  # in percentage
+        scores[f"ESTOI_spk{i + 1}"] = str(estoi_score * 100)
+        scores[f"SI_SNR_spk{i + 1}"] = str(si_snr_score)
+        scores[f"SDR_spk{i + 1}"] = str(sdr[i])
+        scores[f"SAR_spk{i + 1}"] = str(sar[i])
+        scores[f"SIR_spk{i + 1}"] = str(sir[i])
+        # save permutation assigned script file
+        if i < ctx["num_ref"] and j < num_inf:
+            if inf_audio_format == "sound":
+                scores[f"wav_spk{i + 1}"] = inf_readers[j].data[key]
+            elif inf_audio_format == "kaldi_ark":
+                # NOTE: SegmentsExtractor is not supported
+                scores[f"wav_spk{i + 1}"] = inf_readers[j].loader._dict[key]
+            else:
+                raise ValueError(f"Unknown audio format: {inf_audio_format}")
+    return scores
 
-        elif dnsmos_args["mode"] == "web":
-            from espnet2.enh.layers.dnsmos import DNSMOS_web
 
-            if not dnsmos_args["auth_key"]:
-                raise ValueError(
-                    "Please specify the authentication key for access to the Web-API. "
-                    "You can apply for the AUTH_KEY at https://github.com/microsoft/"
-                    "DNS-Challenge/blob/master/DNSMOS/README.md#to-use-the-web-api"
-                )
-            dnsmos = DNSMOS_web(dnsmos_args["auth_key"])
-            logging.warning("Using the DNSMOS Web-API for evaluation")
-    else:
-        dnsmos = None
+def _score_key_with_id(key: str):
+    return key, score_key(key)
+
+
+def load_finished_scores(chunk_dir: Path) -> Dict[str, Dict[str, str]]:
+    """Load the scores of already finished keys from the chunk files.
+
+    A line which is not completely written (e.g. the job was killed while
+    writing it) is ignored and the corresponding key is scored again.
+    """
+    finished = {}
+    for chunk in sorted(chunk_dir.glob("chunk.*.jsonl")):
+        with chunk.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                finished[record["key"]] = record["scores"]
+    return finished
+
+
+@typechecked
+def scoring(
+    output_dir: str,
+    dtype: str,
+    log_level: Union[int, str],
+    key_file: str,
+    ref_scp: List[str],
+    inf_scp: List[str],
+    ref_channel: int,
+    flexible_numspk: bool,
+    is_tse: bool,
+    use_dnsmos: bool,
+    dnsmos_args: Dict,
+    use_pesq: bool,
+    num_workers: int = 1,
+    resume: bool = False,
+    perm_criterion: str = "sdr",
+    si_snr_clamp_db: Optional[float] = None,
+):
+
+    logging.basicConfig(
+        level=log_level,
+        format="%(asctime)s (%(module)s:%(lineno)d) %(levelname)s: %(message)s",
+    )
 
     if use_pesq:
         try:
-            from pesq import PesqError, pesq
+            import pesq  # noqa
 
             logging.warning("Using the PESQ package for evaluation")
         except ImportError:
             raise ImportError("Please install pesq and retry: pip install pesq")
-    else:
-        pesq = None
 
     if not flexible_numspk:
         assert len(ref_scp) == len(inf_scp), ref_scp
-    num_spk = len(ref_scp)
+    if perm_criterion not in ("sdr", "si_snr"):
+        raise ValueError(f"Unknown perm_criterion: {perm_criterion}")
+    if num_workers < 1:
+        raise ValueError(f"num_workers must be a positive integer: {num_workers}")
 
     keys = [
         line.rstrip().split(maxsplit=1)[0] for line in open(key_file, encoding="utf-8")
@@ -142,144 +445,68 @@ def scoring(
     if not flexible_numspk:
         for inf_reader, ref_reader in zip(inf_readers, ref_readers):
             assert inf_reader.keys() == ref_reader.keys()
-
-    with DatadirWriter(output_dir) as writer:
-        for n, key in enumerate(keys):
-            logging.info(f"[{n}] Scoring {key}")
-            if not flexible_numspk:
-                ref_audios = [
-                    read_audio(ref_reader, key, audio_format=ref_audio_format)
-                    for ref_reader in ref_readers
-                ]
-                inf_audios = [
-                    read_audio(inf_reader, key, audio_format=inf_audio_format)
-                    for inf_reader in inf_readers
-                ]
-            else:
-                ref_audios = [
-                    read_audio(ref_reader, key, audio_format=ref_audio_format)
-                    for ref_reader in ref_readers
-                    if key in ref_reader.keys()
-                ]
-                inf_audios = [
-                    read_audio(inf_reader, key, audio_format=inf_audio_format)
-                    for inf_reader in inf_readers
-                    if key in inf_reader.keys()
-                ]
-            ref = np.array(ref_audios)
-            inf = np.array(inf_audios)
-            if ref.ndim > inf.ndim:
-                # multi-channel reference and single-channel output
-                ref = ref[..., ref_channel]
-            elif ref.ndim < inf.ndim:
-                # single-channel reference and multi-channel output
-                inf = inf[..., ref_channel]
-            elif ref.ndim == inf.ndim == 3:
-                # multi-channel reference and output
-                ref = ref[..., ref_channel]
-                inf = inf[..., ref_channel]
-            if not flexible_numspk:
-                assert ref.shape == inf.shape, (ref.shape, inf.shape)
-            else:
-                # epsilon value to avoid divergence
-                # caused by zero-value, e.g., log(0)
-                eps = 0.000001
-                # if num_spk of ref > num_spk of inf
-                if ref.shape[0] > inf.shape[0]:
-                    p = np.full((ref.shape[0] - inf.shape[0], inf.shape[1]), eps)
-                    inf = np.concatenate([inf, p])
-                    num_spk = ref.shape[0]
-                # if num_spk of ref < num_spk of inf
-                elif ref.shape[0] < inf.shape[0]:
-                    p = np.full((inf.shape[0] - ref.shape[0], ref.shape[1]), eps)
-                    ref = np.concatenate([ref, p])
-                    num_spk = inf.shape[0]
-                else:
-                    num_spk = ref.shape[0]
-
-            sdr, sir, sar, perm = bss_eval_sources(
-                ref, inf, compute_permutation=not is_tse
+    del ref_readers, inf_readers
+
+    # The scores are first appended to "chunk" files key by key, so that
+    # an interrupted job can be resumed from the last completed key.
+    chunk_dir = Path(output_dir) / ".scoring_chunks"
+    if resume and chunk_dir.exists():
+        finished = load_finished_scores(chunk_dir)
+        logging.info(f"Resuming: {len(finished)} keys have already been scored")
+    else:
+        if chunk_dir.exists():
+            shutil.rmtree(chunk_dir)
+        finished = {}
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    num_chunks = len(list(chunk_dir.glob("chunk.*.jsonl")))
+    chunk_path = chunk_dir / f"chunk.{num_chunks}.jsonl"
+    todo = [key for key in keys if key not in finished]
+
+    context_args = (
+        dtype,
+        ref_scp,
+        inf_scp,
+        ref_channel,
+        flexible_numspk,
+        is_tse,
+        use_dnsmos,
+        dnsmos_args,
+        use_pesq,
+        perm_criterion,
+        si_snr_clamp_db,
+        sample_rate,
+    )
+    with chunk_path.open("w", encoding="utf-8") as fout:
+        if num_workers == 1:
+            init_context(*context_args)
+            results = map(_score_key_with_id, todo)
+            pool = None
+        else:
+            # Each worker builds its own readers and models
+            pool = multiprocessing.Pool(
+                num_workers, initializer=init_context, initargs=(*context_args, 1)
+            )
+            results = pool.imap_unordered(
+                _score_key_with_id,
+                todo,
+                chunksize=max(1, min(16, len(todo) // (num_workers * 4))),
             )
+        try:
+            for n, (key, scores) in enumerate(results, len(finished)):
+                logging.info(f"[{n}] Scored {key}")
+                finished[key] = scores
+                fout.write(json.dumps({"key": key, "scores": scores}) + "\n")
+                fout.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
 
-            for i in range(num_spk):
-                stoi_score = stoi(ref[i], inf[int(perm[i])], fs_sig=sample_rate)
-                estoi_score = stoi(
-                    ref[i], inf[int(perm[i])], fs_sig=sample_rate, extended=True
-                )
-                si_snr_score = -float(
-                    si_snr_loss(
-                        torch.from_numpy(ref[i][None, ...]),
-                        torch.from_numpy(inf[int(perm[i])][None, ...]),
-                    )
-                )
-                if dnsmos:
-                    with torch.no_grad():
-                        dnsmos_score = dnsmos(inf[int(perm[i])], sample_rate)
-                    writer[f"OVRL_spk{i + 1}"][key] = str(float(dnsmos_score["OVRL"]))
-                    writer[f"SIG_spk{i + 1}"][key] = str(float(dnsmos_score["SIG"]))
-                    writer[f"BAK_spk{i + 1}"][key] = str(float(dnsmos_score["BAK"]))
-                    writer[f"P808_MOS_spk{i + 1}"][key] = str(
-                        float(dnsmos_score["P808_MOS"])
-                    )
-                if pesq:
-                    if sample_rate == 8000:
-                        mode = "nb"
-                        ref_ = ref[i]
-                        inf_ = inf[int(perm[i])]
-                    elif sample_rate == 16000:
-                        mode = "wb"
-                        ref_ = ref[i]
-                        inf_ = inf[int(perm[i])]
-                    elif sample_rate > 16000:
-                        mode = "wb"
-                        ref_ = librosa.resample(
-                            ref[i], orig_sr=sample_rate, target_sr=16000
-                        )
-                        inf_ = librosa.resample(
-                            inf[int(perm[i])], orig_sr=sample_rate, target_sr=16000
-                        )
-                        sample_rate = 16000
-                        logging.warning(
-                            "The sample rate is higher than 16000 Hz. "
-                            "PESQ is calculated in the wideband mode and "
-                            "the signal is resampled to 16 kHz."
-                        )
-                    else:
-                        raise ValueError(
-                            "sample rate must be 8000 or 16000 for PESQ evaluation, "
-                            f"but got {sample_rate}"
-                        )
-                    pesq_score = pesq(
-                        sample_rate,
-                        ref_,
-                        inf_,
-                        mode=mode,
-                        on_error=PesqError.RETURN_VALUES,
-                    )
-                    if pesq_score == PesqError.NO_UTTERANCES_DETECTED:
-                        logging.warning(
-                            f"[PESQ] Error: No utterances detected for {key}. "
-                            "Skipping this utterance."
-                        )
-                    else:
-                        writer[f"PESQ_{mode.upper()}_spk{i + 1}"][key] = str(pesq_score)
-                writer[f"STOI_spk{i + 1}"][key] = str(stoi_score * 100)  # in percentage
-                writer[f"ESTOI_spk{i + 1}"][key] = str(estoi_score * 100)
-                writer[f"SI_SNR_spk{i + 1}"][key] = str(si_snr_score)
-                writer[f"SDR_spk{i + 1}"][key] = str(sdr[i])
-                writer[f"SAR_spk{i + 1}"][key] = str(sar[i])
-                writer[f"SIR_spk{i + 1}"][key] = str(sir[i])
-                # save permutation assigned script file
-                if i < len(ref_scp):
-                    if inf_audio_format == "sound":
-                        writer[f"wav_spk{i + 1}"][key] = inf_readers[perm[i]].data[key]
-                    elif inf_audio_format == "kaldi_ark":
-                        # NOTE: SegmentsExtractor is not supported
-                        writer[f"wav_spk{i + 1}"][key] = inf_readers[
-                            perm[i]
-                        ].loader._dict[key]
-                    else:
-                        raise ValueError(f"Unknown audio format: {inf_audio_format}")
+    with DatadirWriter(output_dir) as writer:
+        for key in keys:
+            for name, value in finished[key].items():
+                writer[name][key] = value
+    shutil.rmtree(chunk_dir)
 
 
 def get_parser():
@@ -325,6 +552,39 @@ def get_parser():
     group.add_argument("--ref_channel", type=int, default=0)
     group.add_argument("--flexible_numspk", type=str2bool, default=False)
     group.add_argument("--is_tse", type=str2bool, default=False)
+    group.add_argument(
+        "--perm_criterion",
+        type=str,
+        choices=("sdr", "si_snr"),
+        default="sdr",
+        help="Metric used to find the best permutation between references and "
+        "estimates. 'sdr' uses the permutation from bss_eval_sources, while "
+        "'si_snr' searches all permutations on the pairwise SI-SNR matrix",
+    )
+    group.add_argument(
+        "--si_snr_clamp_db",
+        type=float_or_none,
+        default=None,
+        help="If set, SI_SNR is computed in float64 and clamped to "
+        "[-si_snr_clamp_db, si_snr_clamp_db], which keeps the scores of perfect "
+        "estimates finite, and the missing or extra speakers of flexible_numspk "
+        "get -si_snr_clamp_db. By default, SI_SNR is computed with SISNRLoss "
+        "as in the previous versions",
+    )
+
+    group = parser.add_argument_group("Parallelism related")
+    group.add_argument(
+        "--num_workers",
+        type=int,
+        default=1,
+        help="The number of worker processes used for scoring",
+    )
+    group.add_argument(
+        "--resume",
+        type=str2bool,
+        default=False,
+        help="Resume scoring from the keys finished in a previous interrupted run",
+    )
 
     group = parser.add_argument_group("DNSMOS related")
     group.add_argument("--use_dnsmos", type=str2bool, default=False)
@@ -20,6 +20,10 @@ from espnet2.utils import config_argparse
 from espnet2.utils.types import str2bool, str2triple_str, str_or_none
 from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.beam_search import BeamSearch, Hypothesis
+from espnet.nets.beam_search_profiler import (
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+)
 from espnet.nets.scorer_interface import BatchScorerInterface
 from espnet.nets.scorers.length_bonus import LengthBonus
 from espnet.utils.cli_utils import get_commandline_args
@@ -306,6 +310,7 @@ def inference(
     quantize_lm: bool,
     quantize_modules: List[str],
     quantize_dtype: str,
+    profile_beam_search: bool = False,
 ):
     if batch_size > 1:
         raise NotImplementedError("batch decoding is not implemented")
@@ -350,6 +355,7 @@ def inference(
         model_tag=model_tag,
         **generatetext_kwargs,
     )
+    beam_search_profiler = build_beam_search_profiler(generatetext, profile_beam_search)
 
     # 3. Build data iterator
     loader = LMTask.build_streaming_iterator(
@@ -391,6 +397,9 @@ def inference(
                 if text is not None:
                     ibest_writer["text"][key] = text
 
+    if beam_search_profiler is not None:
+        beam_search_profiler.save(output_dir)
+
 
 def get_parser():
     parser = config_argparse.ArgumentParser(
@@ -498,6 +507,7 @@ def get_parser():
     )
 
     group = parser.add_argument_group("Beam-search related")
+    add_beam_search_profiler_arguments(group)
     group.add_argument(
         "--batch_size",
         type=int,
@@ -27,6 +27,10 @@ from espnet2.utils import config_argparse
 from espnet2.utils.types import str2bool, str2triple_str, str_or_none
 from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.beam_search import BeamSearch, Hypothesis
+from espnet.nets.beam_search_profiler import (
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+)
 from espnet.nets.scorer_interface import BatchScorerInterface
 from espnet.nets.scorers.length_bonus import LengthBonus
 from espnet.utils.cli_utils import get_commandline_args
@@ -545,6 +549,7 @@ def inference(
     vocoder_config: Optional[str],
     vocoder_file: Optional[str],
     vocoder_tag: Optional[str],
+    profile_beam_search: bool = False,
 ):
     """Run text-to-speech inference."""
     if batch_size > 1:
@@ -597,6 +602,9 @@ def inference(
         vocoder_tag=vocoder_tag,
         **speech2speech_kwargs,
     )
+    beam_search_profiler = build_beam_search_profiler(
+        speech2speech, profile_beam_search
+    )
 
     # 3. Build data-iterator
     loader = S2STTask.build_streaming_iterator(
@@ -769,6 +777,9 @@ def inference(
     if output_dict.get("st_subtask_token") is not None:
         shutil.rmtree(output_dict / "st_subtask")
 
+    if beam_search_profiler is not None:
+        beam_search_profiler.save(output_dir)
+
 
 def get_parser():
     """Get argument parser."""
@@ -918,6 +929,7 @@ def get_parser():
     )
 
     group = parser.add_argument_group("Beam-search (discrete unit/multi-pass) related")
+    add_beam_search_profiler_arguments(group)
     group.add_argument("--nbest", type=int, default=1, help="Output N-best hypotheses")
     group.add_argument("--beam_size", type=int, default=20, help="Beam size")
     group.add_argument("--penalty", type=float, default=0.0, help="Insertion penalty")
@@ -4,6 +4,7 @@
 """Perform CTC segmentation to align utterances within audio files using OWSM-CTC."""
 
 import argparse
+import copy
 import logging
 import sys
 from pathlib import Path
@@ -170,6 +171,7 @@ class CTCSegmentation:
     choices_time_stamps = ["auto", "fixed"]
     text_converter = "tokenize"
     choices_text_converter = ["tokenize", "classic"]
+    restrict_vocab = False
     warned_about_misconfiguration = False
     config = CtcSegmentationParameters()
 
@@ -305,6 +307,14 @@ class CTCSegmentation:
                 Set at module initialization.
 
         Parameters for alignment:
+            restrict_vocab: If True, only the CTC posteriors of the tokens that
+                appear in the text (and blank) are kept. They are stored as
+                float16, which reduces the memory of the posterior matrix from
+                ``T x V`` to ``T x |tokens in text|``, e.g., for long audio
+                files and models with a large vocabulary. Note that
+                ``ctc_segmentation`` makes a transient float32 copy of the
+                matrix, so the peak memory is about 3 times the float16 matrix.
+                Default: False.
             min_window_size: Minimum number of frames considered for a single
                 utterance. The current default value of 8000 corresponds to
                 roughly 4 minutes (depending on ASR model) and should be OK in
@@ -351,6 +361,8 @@ class CTCSegmentation:
                 )
             self.text_converter = kwargs["text_converter"]
         # Parameters for alignment
+        if "restrict_vocab" in kwargs:
+            self.restrict_vocab = bool(kwargs["restrict_vocab"])
         if "min_window_size" in kwargs:
             assert isinstance(kwargs["min_window_size"], int)
             self.config.min_window_size = kwargs["min_window_size"]
@@ -390,11 +402,18 @@ class CTCSegmentation:
         return timing_cfg
 
     @torch.no_grad()
-    def get_lpz(self, speech: Union[torch.Tensor, np.ndarray]):
+    def get_lpz(
+        self,
+        speech: Union[torch.Tensor, np.ndarray],
+        token_ids: Optional[np.ndarray] = None,
+    ):
         """Obtain CTC posterior log probabilities for given speech data.
 
         Args:
             speech: Speech input.
+            token_ids: If given, only these columns of the CTC posteriors are
+                gathered on the device for each buffer batch, and the result
+                is stored as float16 (see ``get_token_ids``).
 
         Returns:
             lpz: Numpy vector with CTC log posterior probabilities.
@@ -436,7 +455,11 @@ class CTCSegmentation:
 
         valid_speech_samples = speech.size(0) * chunk_len
 
-        unmerged = []
+        if token_ids is not None:
+            token_ids = torch.as_tensor(token_ids, dtype=torch.long, device=self.device)
+
+        lpz = None
+        offset = 0
         for idx in range(0, speech.size(0), batch_size):
             cur_speech = speech[idx : idx + batch_size]
             cur_speech_lengths = cur_speech.new_full(
@@ -484,11 +507,18 @@ class CTCSegmentation:
             enc = enc[:, context_frames:-context_frames]
 
             batched_log_p = self.ctc.log_softmax(enc).detach()  # (B, T'', V)
+            if token_ids is not None:
+                batched_log_p = batched_log_p[..., token_ids].half()  # (B, T'', V')
 
-            unmerged.append(batched_log_p.reshape(-1, batched_log_p.size(-1)).cpu())
+            log_p = batched_log_p.reshape(-1, batched_log_p.size(-1)).cpu().numpy()
+            if lpz is None:
+                # All buffers have the same number of frames
+                num_frames = batched_log_p.size(1) * speech.size(0)
+                lpz = np.empty((num_frames, log_p.shape[1]), dtype=log_p.dtype)
+            lpz[offset : offset + len(log_p)] = log_p
+            offset += len(log_p)
 
-        lpz = torch.cat(unmerged, dim=0).numpy()  # (time, V)
-        return lpz, valid_speech_samples
+        return lpz, valid_speech_samples  # (time, V)
 
     def _split_text(self, text):
         """Convert text to list and extract utterance IDs."""
@@ -508,7 +538,73 @@ class CTCSegmentation:
             text = [utt[1] for utt in utt_ids_and_text]
         return utt_ids, text
 
-    def prepare_segmentation_task(self, text, lpz, name=None, speech_len=None):
+    def _prepare_ground_truth(self, text):
+        """Split and tokenize text to obtain the ground truth matrix."""
+        config = self.config
+        # `text` is needed in the form of a list.
+        utt_ids, text = self._split_text(text)
+
+        # Obtain utterance & label sequence from text
+        if self.text_converter == "tokenize":
+
+            def _tokenize(text):
+                text = self.preprocess_fn.text_cleaner(text)
+                tokens = self.preprocess_fn.tokenizer.text2tokens(text)
+                text_ints = self.preprocess_fn.token_id_converter.tokens2ids(tokens)
+                text_ints = np.array(text_ints, dtype=np.int64)
+                return text_ints
+
+            # list of str --tokenize--> list of np.array
+            token_list = [_tokenize(utt) for utt in text]
+
+            # filter out any instances of the <unk> token
+            unk = config.char_list.index("<unk>")
+            token_list = [utt[utt != unk] for utt in token_list]
+            ground_truth_mat, utt_begin_indices = prepare_token_list(config, token_list)
+
+        else:
+            assert self.text_converter == "classic"
+            text = [self.preprocess_fn.text_cleaner(utt) for utt in text]
+            token_list = [
+                "".join(self.preprocess_fn.tokenizer.text2tokens(utt)) for utt in text
+            ]
+            token_list = [utt.replace("<unk>", "") for utt in token_list]
+            ground_truth_mat, utt_begin_indices = prepare_text(config, token_list)
+        return utt_ids, text, ground_truth_mat, utt_begin_indices
+
+    def get_token_ids(self, text) -> np.ndarray:
+        """Obtain the ids of the tokens that are needed to align the text.
+
+        Args:
+            text: List or multiline-string with utterance ground truths.
+
+        Returns:
+            token_ids: Sorted token ids in the ground truth, including blank.
+        """
+        _, _, ground_truth_mat, _ = self._prepare_ground_truth(text)
+        return self._get_token_ids(self.config, ground_truth_mat)
+
+    @staticmethod
+    def _get_token_ids(config, ground_truth_mat):
+        token_ids = ground_truth_mat[ground_truth_mat >= 0]
+        return np.union1d(token_ids, [config.blank])
+
+    @staticmethod
+    def _restrict_vocab(config, ground_truth_mat, token_ids):
+        """Map the token indices onto the columns of a restricted lpz."""
+        columns = np.full(len(config.char_list), -1, dtype=np.int64)
+        columns[token_ids] = np.arange(len(token_ids))
+        valid = ground_truth_mat >= 0
+        ground_truth_mat = np.where(valid, columns[ground_truth_mat], -1)
+        assert (ground_truth_mat[valid] >= 0).all(), "token_ids do not match text"
+        config = copy.copy(config)
+        config.blank = int(columns[config.blank])
+        config.char_list = [config.char_list[i] for i in token_ids]
+        return ground_truth_mat, config
+
+    def prepare_segmentation_task(
+        self, text, lpz, name=None, speech_len=None, token_ids=None, ground_truth=None
+    ):
         """Preprocess text, and gather text and lpz into a task object.
 
         Text is pre-processed and tokenized depending on configuration.
@@ -550,6 +646,11 @@ class CTCSegmentation:
                 of speech and length of lpz. If None is given, make sure the
                 timing parameters are correct, see time_stamps for reference!
                 Default: None.
+            token_ids: Token ids of the columns in ``lpz``, if ``lpz`` is
+                restricted to the tokens in the text. Default: None.
+            ground_truth: The output of ``_prepare_ground_truth(text)``, if
+                it is already computed, so as not to tokenize the text again.
+                Default: None.
 
         Returns:
             task: CTCSegmentationTask object that can be passed to
@@ -563,35 +664,13 @@ class CTCSegmentation:
             timing_cfg = self.get_timing_config(speech_len, lpz_len)
             config.set(**timing_cfg)
 
-        # `text` is needed in the form of a list.
-        utt_ids, text = self._split_text(text)
-
-        # Obtain utterance & label sequence from text
-        if self.text_converter == "tokenize":
-
-            def _tokenize(text):
-                text = self.preprocess_fn.text_cleaner(text)
-                tokens = self.preprocess_fn.tokenizer.text2tokens(text)
-                text_ints = self.preprocess_fn.token_id_converter.tokens2ids(tokens)
-                text_ints = np.array(text_ints, dtype=np.int64)
-                return text_ints
-
-            # list of str --tokenize--> list of np.array
-            token_list = [_tokenize(utt) for utt in text]
-
-            # filter out any instances of the <unk> token
-            unk = config.char_list.index("<unk>")
-            token_list = [utt[utt != unk] for utt in token_list]
-            ground_truth_mat, utt_begin_indices = prepare_token_list(config, token_list)
-
-        else:
-            assert self.text_converter == "classic"
-            text = [self.preprocess_fn.text_cleaner(utt) for utt in text]
-            token_list = [
-                "".join(self.preprocess_fn.tokenizer.text2tokens(utt)) for utt in text
-            ]
-            token_list = [utt.replace("<unk>", "") for utt in token_list]
-            ground_truth_mat, utt_begin_indices = prepare_text(config, token_list)
+        if ground_truth is None:
+            ground_truth = self._prepare_ground_truth(text)
+        utt_ids, text, ground_truth_mat, utt_begin_indices = ground_truth
+        if token_ids is not None:
+            ground_truth_mat, config = self._restrict_vocab(
+                config, ground_truth_mat, token_ids
+            )
 
         task = CTCSegmentationTask(
             config=config,
@@ -665,10 +744,17 @@ class CTCSegmentation:
 
         if fs is not None:
             self.set_config(fs=fs)
+        # The text is tokenized once for the token ids and the task
+        ground_truth = self._prepare_ground_truth(text)
+        token_ids = None
+        if self.restrict_vocab:
+            token_ids = self._get_token_ids(self.config, ground_truth[2])
         # Get log CTC posterior probabilities
-        lpz, valid_speech_samples = self.get_lpz(speech)
+        lpz, valid_speech_samples = self.get_lpz(speech, token_ids)
         # Conflate text & lpz & config as a segmentation task object
-        task = self.prepare_segmentation_task(text, lpz, name, valid_speech_samples)
+        task = self.prepare_segmentation_task(
+            text, lpz, name, valid_speech_samples, token_ids, ground_truth
+        )
         # Apply CTC segmentation
         segments = self.get_segments(task)
         task.set(**segments)
@@ -836,6 +922,14 @@ def get_parser():
         choices=CTCSegmentation.choices_text_converter,
         help="How CTC segmentation handles text.",
     )
+    group.add_argument(
+        "--restrict_vocab",
+        type=str2bool,
+        default=False,
+        help="Only keep the CTC posteriors of the tokens in the text and blank"
+        " (as float16) to reduce the memory usage for long audio files."
+        " The alignment makes a transient float32 copy of them.",
+    )
 
     group = parser.add_argument_group("Input/output arguments")
     group.add_argument(
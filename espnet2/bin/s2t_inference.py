@@ -26,6 +26,10 @@ from espnet2.utils import config_argparse
 from espnet2.utils.types import str2bool, str2triple_str, str_or_none
 from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.beam_search import BeamSearch, Hypothesis
+from espnet.nets.beam_search_profiler import (
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+)
 from espnet.nets.pytorch_backend.transformer.subsampling import TooShortUttError
 from espnet.nets.scorer_interface import BatchScorerInterface
 from espnet.nets.scorers.ctc import CTCPrefixScorer
@@ -182,6 +186,7 @@ class Speech2Text:
         penalty: float = 0.0,
         nbest: int = 1,
         normalize_length: bool = False,
+        pre_beam_gather: bool = False,
         quantize_s2t_model: bool = False,
         quantize_lm: bool = False,
         quantize_modules: List[str] = ["Linear"],
@@ -296,6 +301,12 @@ class Speech2Text:
                 max_mask_parallel=max_mask_parallel,
             )
         else:
+            if ctc_weight == 1.0:
+                pre_beam_score_key = None
+            elif pre_beam_gather:
+                pre_beam_score_key = "decoder"
+            else:
+                pre_beam_score_key = "full"
             beam_search = BeamSearch(
                 beam_size=beam_size,
                 weights=weights,
@@ -304,8 +315,9 @@ class Speech2Text:
                 eos=s2t_model.eos,
                 vocab_size=len(token_list),
                 token_list=token_list,
-                pre_beam_score_key=None if ctc_weight == 1.0 else "full",
+                pre_beam_score_key=pre_beam_score_key,
                 normalize_length=normalize_length,
+                pre_beam_gather=pre_beam_gather and ctc_weight < 1.0,
             )
 
             # TODO(karita): make all scorers batchfied
@@ -499,6 +511,9 @@ class Speech2Text:
         nbest_hyps = self.beam_search(
             x=enc, maxlenratio=self.maxlenratio, minlenratio=self.minlenratio
         )
+        return self._hyps_to_results(nbest_hyps)
+
+    def _hyps_to_results(self, nbest_hyps: List[Hypothesis]) -> ListOfHypothesis:
         nbest_hyps = nbest_hyps[: self.nbest]
 
         results = []
@@ -563,6 +578,7 @@ class Speech2Text:
         lang_sym: Optional[str] = None,
         task_sym: Optional[str] = None,
         skip_last_chunk_threshold: float = 0.2,
+        batch_size: int = 1,
     ):
         """Decode unsegmented long-form speech.
 
@@ -572,6 +588,12 @@ class Speech2Text:
             init_text: text used as condition for the first segment
             end_time_threshold: the last utterance is considered as incomplete
                 if its end timestamp exceeds this threshold
+            batch_size (int): decode this number of fixed-length segments together
+                in parallel. Only used if condition_on_prev_text is False.
+                NOTE: the segmentation differs from batch_size=1. The segments are
+                fixed in advance instead of starting at the incomplete last
+                utterance of the previous segment, and an incomplete utterance is
+                merged with the first utterance of the next segment.
 
         Returns:
             utterances: list of tuples of (start_time, end_time, text)
@@ -602,6 +624,21 @@ class Speech2Text:
             ), f"speech of size {speech.size()} is not supported"
             speech = speech.squeeze(1)  # (nsamples, 1) --> (nsamples,)
 
+        if batch_size > 1 and not condition_on_prev_text:
+            logging.warning(
+                "The segments are fixed in advance with batch_size > 1, "
+                "and the incomplete utterances are merged across the segments "
+                "instead of restarting the next segment at them."
+            )
+            return self._decode_long_batched(
+                speech,
+                batch_size=batch_size,
+                end_time_id_threshold=end_time_id_threshold,
+                lang_sym=lang_sym,
+                task_sym=task_sym,
+                skip_last_chunk_threshold=skip_last_chunk_threshold,
+            )
+
         utterances = []
         offset = 0
         text_prev = init_text
@@ -682,6 +719,160 @@ class Speech2Text:
 
         return utterances
 
+    @torch.no_grad()
+    def _decode_long_batched(
+        self,
+        speech: torch.Tensor,
+        batch_size: int,
+        end_time_id_threshold: int,
+        lang_sym: str,
+        task_sym: str,
+        skip_last_chunk_threshold: float,
+    ):
+        """Decode the fixed-length segments of long-form speech in batches.
+
+        Unlike the sequential decoding, the next segment does not start at
+        an incomplete last utterance. Instead, the incomplete utterance is merged
+        with the first utterance of the next segment if it starts within the same
+        margin as `end_time_threshold` leaves before the end of a segment.
+        """
+        fs = self.preprocessor_conf["fs"]
+        segment_len = int(self.preprocessor_conf["speech_length"] * fs)
+        first_time_id = self.converter.token2id[
+            self.preprocessor_conf["first_time_symbol"]
+        ]
+        last_time_id = self.converter.token2id[
+            self.preprocessor_conf["last_time_symbol"]
+        ]
+        resolution = self.preprocessor_conf["speech_resolution"]
+        margin_ids = last_time_id - end_time_id_threshold
+
+        offsets = []
+        for offset in range(0, len(speech), segment_len):
+            if (len(speech) - offset) / fs < skip_last_chunk_threshold:
+                logging.warning(
+                    "Skip the last chunk as it's too short: "
+                    f"{(len(speech) - offset) / fs:.2f}s"
+                )
+            else:
+                offsets.append(offset)
+
+        lang_id = self.converter.token2id[lang_sym]
+        task_id = self.converter.token2id[task_sym]
+        self.beam_search.set_hyp_primer([self.s2t_model.sos, lang_id, task_id])
+        batch_forward = (
+            isinstance(self.beam_search, BatchBeamSearch)
+            and all(
+                hasattr(d, "batch_score_partial_multi")
+                for d in self.beam_search.part_scorers.values()
+            )
+            and not self.beam_search.return_hs
+            and not self.beam_search.pre_beam_gather
+            and not isinstance(self.s2t_model.decoder, S4Decoder)
+        )
+        if not batch_forward:
+            logging.warning(
+                "Multi-utterance beam search is not supported with the current "
+                "scorers. Only the encoder is batched."
+            )
+
+        # 1. Decode all the segments
+        token_ints = []
+        for idx in range(0, len(offsets), batch_size):
+            segments = [
+                F.pad(
+                    speech[offset : offset + segment_len],
+                    (0, max(0, offset + segment_len - len(speech))),
+                )
+                for offset in offsets[idx : idx + batch_size]
+            ]
+            logging.info(
+                f"Decoding segments {idx + 1}-{idx + len(segments)} of {len(offsets)}"
+            )
+            batch_speech = torch.stack(segments).to(getattr(torch, self.dtype))
+            lengths = batch_speech.new_full(
+                [len(segments)], dtype=torch.long, fill_value=segment_len
+            )
+            batch = {"speech": batch_speech, "speech_lengths": lengths}
+            batch = to_device(batch, device=self.device)
+            enc, _ = self.s2t_model.encode(**batch)
+            if isinstance(enc, tuple):
+                enc = enc[0]
+
+            if batch_forward:
+                results = [
+                    self._hyps_to_results(nbest_hyps)
+                    for nbest_hyps in self.beam_search.batch_forward(
+                        enc, maxlenratio=self.maxlenratio, minlenratio=self.minlenratio
+                    )
+                ]
+            else:
+                results = [self._decode_single_sample(e) for e in enc]
+            for result in results:
+                # NOTE(yifan): sos and eos have been removed
+                # remove lang and task in the best hyp
+                token_ints.append(result[0][2][2:] if len(result) > 0 else [])
+
+        # 2. Get utterances from the timestamps
+        utterances = []
+        pending = None  # the incomplete last utterance of the previous segment
+        for offset, token_int in zip(offsets, token_ints):
+            time_pos = [
+                idx
+                for idx, tok in enumerate(token_int)
+                if tok >= first_time_id and tok <= last_time_id
+            ]
+            # NOTE(yifan): this is an edge case with only a start time
+            if len(time_pos) == 1:
+                token_int.append(last_time_id)
+                time_pos.append(len(token_int) - 1)
+
+            incomplete = False
+            if len(time_pos) % 2 == 1:  # The last utterance only has start time
+                token_int.append(last_time_id)
+                time_pos.append(len(token_int) - 1)
+                incomplete = True
+            elif len(time_pos) > 2 and token_int[time_pos[-1]] > end_time_id_threshold:
+                incomplete = True
+
+            num_utts = len(time_pos) // 2
+            for i in range(num_utts):
+                start_id = token_int[time_pos[2 * i]]
+                utt = [
+                    round((start_id - first_time_id) * resolution + offset / fs, 2),
+                    round(
+                        (token_int[time_pos[2 * i + 1]] - first_time_id) * resolution
+                        + offset / fs,
+                        2,
+                    ),
+                    token_int[time_pos[2 * i] + 1 : time_pos[2 * i + 1]],
+                ]
+                if pending is not None:
+                    if i == 0 and start_id - first_time_id <= margin_ids:
+                        # Continuation of the incomplete utterance
+                        utt = [pending[0], utt[1], pending[2] + utt[2]]
+                    else:
+                        utterances.append(pending)
+                    pending = None
+                if incomplete and i == num_utts - 1:
+                    pending = utt
+                else:
+                    utterances.append(utt)
+            if num_utts == 0 and pending is not None:
+                utterances.append(pending)
+                pending = None
+        if pending is not None:
+            utterances.append(pending)
+
+        return [
+            (
+                start,
+                end,
+                self.tokenizer.tokens2text(self.converter.ids2tokens(token_int)),
+            )
+            for start, end, token_int in utterances
+        ]
+
     @staticmethod
     def from_pretrained(
         model_tag: Optional[str] = None,
@@ -729,6 +920,7 @@ def inference(
     penalty: float,
     nbest: int,
     normalize_length: bool,
+    pre_beam_gather: bool,
     num_workers: int,
     log_level: Union[int, str],
     data_path_and_name_and_type: Sequence[Tuple[str, str, str]],
@@ -755,8 +947,11 @@ def inference(
     threshold_probability: float,
     max_seq_len: int,
     max_mask_parallel: int,
+    profile_beam_search: bool = False,
+    long_form: bool = False,
+    end_time_threshold: str = "<29.00>",
 ):
-    if batch_size > 1:
+    if batch_size > 1 and not long_form:
         raise NotImplementedError("batch decoding is not implemented")
     if word_lm_train_config is not None:
         raise NotImplementedError("Word LM is not implemented")
@@ -776,6 +971,7 @@ def inference(
     # NOTE(yifan): < and > cannot be passed in command line
     lang_sym = f"<{lang_sym.lstrip('<').rstrip('>')}>"
     task_sym = f"<{task_sym.lstrip('<').rstrip('>')}>"
+    end_time_threshold = f"<{end_time_threshold.lstrip('<').rstrip('>')}>"
 
     # 1. Set random-seed
     set_all_random_seed(seed)
@@ -800,6 +996,7 @@ def inference(
         penalty=penalty,
         nbest=nbest,
         normalize_length=normalize_length,
+        pre_beam_gather=pre_beam_gather,
         quantize_s2t_model=quantize_s2t_model,
         quantize_lm=quantize_lm,
         quantize_modules=quantize_modules,
@@ -816,15 +1013,22 @@ def inference(
         model_tag=model_tag,
         **speech2text_kwargs,
     )
+    beam_search_profiler = build_beam_search_profiler(speech2text, profile_beam_search)
 
     # 3. Build data-iterator
+    # NOTE: the preprocessor trims the speech to the fixed length,
+    # while decode_long segments the unsegmented speech by itself.
     loader = S2TTask.build_streaming_iterator(
         data_path_and_name_and_type,
         dtype=dtype,
-        batch_size=batch_size,
+        batch_size=1 if long_form else batch_size,
         key_file=key_file,
         num_workers=num_workers,
-        preprocess_fn=S2TTask.build_preprocess_fn(speech2text.s2t_train_args, False),
+        preprocess_fn=(
+            None
+            if long_form
+            else S2TTask.build_preprocess_fn(speech2text.s2t_train_args, False)
+        ),
         collate_fn=S2TTask.build_collate_fn(speech2text.s2t_train_args, False),
         allow_variable_data_keys=allow_variable_data_keys,
         inference=True,
@@ -840,6 +1044,23 @@ def inference(
             assert len(keys) == _bs, f"{len(keys)} != {_bs}"
             batch = {k: v[0] for k, v in batch.items() if not k.endswith("_lengths")}
 
+            if long_form:
+                # List of (start_time, end_time, text) of the utterances
+                utterances = speech2text.decode_long(
+                    batch["speech"],
+                    end_time_threshold=end_time_threshold,
+                    lang_sym=lang_sym,
+                    task_sym=task_sym,
+                    batch_size=batch_size,
+                )
+                ibest_writer = writer["1best_recog"]
+                ibest_writer["text"][keys[0]] = " ".join(u[2] for u in utterances)
+                for i, (start, end, text) in enumerate(utterances):
+                    utt_id = f"{keys[0]}_{i:04d}"
+                    ibest_writer["segments"][utt_id] = f"{keys[0]} {start} {end}"
+                    ibest_writer["segments_text"][utt_id] = text
+                continue
+
             # N-best list of (text, token, token_int, text_nospecial, hyp_object)
             try:
                 results = speech2text(**batch)
@@ -879,6 +1100,9 @@ def inference(
                         text
                     )
 
+    if beam_search_profiler is not None:
+        beam_search_profiler.save(output_dir)
+
 
 def get_parser():
     parser = config_argparse.ArgumentParser(
@@ -979,6 +1203,23 @@ def get_parser():
         help="Predict timestamps.",
     )
 
+    group = parser.add_argument_group("Long-form decoding related")
+    group.add_argument(
+        "--long_form",
+        type=str2bool,
+        default=False,
+        help="Decode unsegmented long-form speech with timestamps by decode_long. "
+        "The utterances are written to 1best_recog/segments and "
+        "1best_recog/segments_text",
+    )
+    group.add_argument(
+        "--end_time_threshold",
+        type=str,
+        default="<29.00>",
+        help="The last utterance of a segment is considered as incomplete "
+        "if its end timestamp exceeds this threshold",
+    )
+
     group = parser.add_argument_group("Quantization related")
     group.add_argument(
         "--quantize_s2t_model",
@@ -1011,11 +1252,14 @@ def get_parser():
     )
 
     group = parser.add_argument_group("Beam-search related")
+    add_beam_search_profiler_arguments(group)
     group.add_argument(
         "--batch_size",
         type=int,
         default=1,
-        help="The batch size for inference",
+        help="The batch size for inference. With --long_form true, "
+        "the number of the fixed-length segments decoded together. Note that "
+        "the segmentation differs if it is greater than 1 (see decode_long)",
     )
     group.add_argument("--nbest", type=int, default=1, help="Output N-best hypotheses")
     group.add_argument("--beam_size", type=int, default=20, help="Beam size")
@@ -1051,6 +1295,14 @@ def get_parser():
         default=False,
         help="If true, best hypothesis is selected by length-normalized scores",
     )
+    group.add_argument(
+        "--pre_beam_gather",
+        type=str2bool,
+        default=False,
+        help="If true, select the pre-beam candidates by the decoder scores and "
+        "sum the scores of the other scorers only for the candidates. "
+        "This reduces the per-step cost with large vocabularies",
+    )
 
     group = parser.add_argument_group("Text converter related")
     group.add_argument(
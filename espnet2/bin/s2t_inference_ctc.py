@@ -26,6 +26,10 @@ from espnet2.utils.types import str2bool, str2triple_str, str_or_none
 from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.batch_beam_search_online_sim import BatchBeamSearchOnlineSim
 from espnet.nets.beam_search import BeamSearch, Hypothesis
+from espnet.nets.beam_search_profiler import (
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+)
 from espnet.nets.pytorch_backend.nets_utils import pad_list
 from espnet.nets.pytorch_backend.transformer.subsampling import TooShortUttError
 from espnet.nets.scorer_interface import BatchScorerInterface
@@ -1062,6 +1066,7 @@ def inference(
     lang_sym: str,
     task_sym: str,
     generate_interctc_outputs: bool,
+    profile_beam_search: bool = False,
 ):
     if batch_size > 1:
         raise NotImplementedError("batch decoding is not implemented")
@@ -1121,6 +1126,7 @@ def inference(
         model_tag=model_tag,
         **speech2text_kwargs,
     )
+    beam_search_profiler = build_beam_search_profiler(speech2text, profile_beam_search)
 
     # 3. Build data-iterator
     loader = S2TTask.build_streaming_iterator(
@@ -1185,6 +1191,9 @@ def inference(
                         text
                     )
 
+    if beam_search_profiler is not None:
+        beam_search_profiler.save(output_dir)
+
 
 def get_parser():
     parser = config_argparse.ArgumentParser(
@@ -1308,6 +1317,7 @@ def get_parser():
     )
 
     group = parser.add_argument_group("Beam-search related")
+    add_beam_search_profiler_arguments(group)
     group.add_argument(
         "--batch_size",
         type=int,
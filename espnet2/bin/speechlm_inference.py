@@ -7,8 +7,9 @@ import argparse
 import json
 import logging
 import sys
+import time
 from pathlib import Path
-from typing import Any, List, Optional, Sequence, Tuple, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 import torch
 import torchaudio
@@ -16,6 +17,10 @@ from kaldiio import WriteHelper
 from packaging.version import parse as V  # noqa
 from typeguard import typechecked
 
+from espnet2.speechlm.continuous_batching import (
+    ContinuousBatchingScheduler,
+    summarize_requests,
+)
 from espnet2.speechlm.core_lm.abs_core_lm import SpeechLMInferenceOptions
 from espnet2.speechlm.definitions import tasks as speechlm_tasks
 from espnet2.tasks.speechlm import SpeechLMTask
@@ -50,6 +55,7 @@ class SpeechLM:
         minlenratio: float = 10.0,
         modality: str = "codec",
         post_processor_conf: dict = {},
+        max_batch_size: int = 1,
     ):
         """Initialize SpeechLM module."""
 
@@ -61,6 +67,7 @@ class SpeechLM:
         self.device = device
         self.dtype = dtype
         self.train_args = train_args
+        self.max_batch_size = max_batch_size
 
         # token_mask
         token_bias = train_args.token_bias
@@ -136,13 +143,71 @@ class SpeechLM:
         if gen_tokens is None and gen_scores is None:
             return None, None, None
 
-        # post-processing
+        return self._post_process(gen_tokens), gen_tokens, gen_scores
+
+    def batch_generate(
+        self, batches: Iterable[Tuple[str, Dict[str, torch.Tensor]]]
+    ) -> Iterator[Tuple[str, List[Any], List[torch.Tensor], List[torch.Tensor]]]:
+        """Run SpeechLM inference of the examples with continuous batching.
+
+        The examples are decoded together by ContinuousBatchingScheduler with
+        at most max_batch_size sequences. The examples are read from batches
+        only when there are less than max_batch_size waiting requests,
+        so the finished sequences are replaced by the new ones immediately.
+
+        Args:
+            batches: Iterable of the keys and the batches of single examples,
+                which have the same items as the arguments of __call__.
+
+        Yields:
+            Tuple of the key, the generated contents, the tokens and the scores
+                of each example in the finishing order. The contents, the tokens
+                and the scores are None if no sample finishes.
+        """
+        scheduler = ContinuousBatchingScheduler(
+            self.model.corelm, self.inference_opts, max_batch_size=self.max_batch_size
+        )
+        batches = iter(batches)
+        exhausted, finished = False, []
+        start = time.perf_counter()
+        while True:
+            while not exhausted and scheduler.num_waiting < self.max_batch_size:
+                try:
+                    key, batch = next(batches)
+                except StopIteration:
+                    exhausted = True
+                    break
+                dec_seq = batch["dec_seq"][0, : batch["dec_seq_lengths"][0]]
+                prefix_len = int(batch["prefix_len"].view(-1)[0])
+                # the token dec_seq[prefix_len] is the start token as in __call__
+                scheduler.submit(
+                    dec_seq[:prefix_len], dec_seq[prefix_len + 1 :], key=key
+                )
+            if scheduler.idle:
+                break
+
+            for request in scheduler.step():
+                finished.append(request)
+                gen_tokens, gen_scores = request.result()
+                if len(gen_tokens) == 0:
+                    yield request.key, None, None, None
+                else:
+                    contents = self._post_process(gen_tokens)
+                    yield request.key, contents, gen_tokens, gen_scores
+
+        if len(finished) > 0:
+            stats = summarize_requests(finished, time.perf_counter() - start)
+            logging.info(
+                "Continuous batching: "
+                + ", ".join(f"{k}={v:.3f}" for k, v in stats.items())
+            )
+
+    def _post_process(self, gen_tokens: List[torch.Tensor]) -> List[Any]:
         generated = []
         for gen_token in gen_tokens:
             gen_token = gen_token - self.bias
             generated.append(self.post_processor(gen_token))
-
-        return generated, gen_tokens, gen_scores
+        return generated
 
     @staticmethod
     def from_pretrained(
@@ -180,6 +245,7 @@ def inference(
     minlenratio: float = 0.0,
     maxlenratio: float = 10.0,
     inference_nj: Optional[int] = 1,
+    max_batch_size: int = 1,
     # post_processor related
     postprocessor: str = None,
     postprocessor_conf: dict = {},
@@ -226,6 +292,7 @@ def inference(
         minlenratio=minlenratio,
         modality=output_modality,
         post_processor_conf=postprocessor_conf,
+        max_batch_size=max_batch_size,
     )
 
     speechlm = SpeechLM.from_pretrained(model_tag=model_tag, **speechlm_kwargs)
@@ -254,17 +321,24 @@ def inference(
     token_writer = WriteHelper(f'ark:{str(output_dir / "token" / "token")}.ark')
     score_writer = WriteHelper(f'ark:{str(output_dir / "score" / "score")}.ark')
 
-    for _, (keys, batch) in enumerate(loader, 1):
-        assert isinstance(batch, dict), type(batch)
-        assert all(isinstance(s, str) for s in keys), keys
-        _bs = len(next(iter(batch.values())))
-        assert _bs == 1, _bs
+    def iterate_examples():
+        for _, (keys, batch) in enumerate(loader, 1):
+            assert isinstance(batch, dict), type(batch)
+            assert all(isinstance(s, str) for s in keys), keys
+            _bs = len(next(iter(batch.values())))
+            assert _bs == 1, _bs
 
-        batch = to_device(batch, device=device)
-        key = keys[0]
-        logging.info(f"Inference on example: {key}")
+            batch = to_device(batch, device=device)
+            logging.info(f"Inference on example: {keys[0]}")
+            yield keys[0], batch
+
+    if max_batch_size > 1:
+        # continuous batching: the results are in the finishing order
+        results = speechlm.batch_generate(iterate_examples())
+    else:
+        results = ((key, *speechlm(**batch)) for key, batch in iterate_examples())
 
-        contents, tokens, scores = speechlm(**batch)
+    for key, contents, tokens, scores in results:
         if contents is None:
             logging.info(f"fail on example: {key}")
             continue
@@ -426,6 +500,15 @@ def get_parser():
         help="nj used in inference, should be the same/smaller than the nq in train",
     )
 
+    group.add_argument(
+        "--max_batch_size",
+        type=int,
+        default=1,
+        help="If larger than 1, decode the examples together with continuous "
+        "batching, i.e., at most max_batch_size sequences are decoded in each step "
+        "and the finished ones are replaced by the next examples immediately.",
+    )
+
     group = parser.add_argument_group("Postprocessor related")
 
     return parser
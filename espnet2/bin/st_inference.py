@@ -24,6 +24,10 @@ from espnet2.utils import config_argparse
 from espnet2.utils.types import str2bool, str2triple_str, str_or_none
 from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.beam_search import BeamSearch, Hypothesis
+from espnet.nets.beam_search_profiler import (
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+)
 from espnet.nets.pytorch_backend.transformer.subsampling import TooShortUttError
 from espnet.nets.scorer_interface import BatchScorerInterface
 from espnet.nets.scorers.ctc import CTCPrefixScorer
@@ -698,6 +702,7 @@ def inference(
     ctc_greedy: bool,
     hugging_face_decoder: bool,
     hugging_face_decoder_max_length: int,
+    profile_beam_search: bool = False,
 ):
     if batch_size > 1:
         raise NotImplementedError("batch decoding is not implemented")
@@ -762,6 +767,7 @@ def inference(
         model_tag=model_tag,
         **speech2text_kwargs,
     )
+    beam_search_profiler = build_beam_search_profiler(speech2text, profile_beam_search)
 
     # 3. Build data-iterator
     loader = STTask.build_streaming_iterator(
@@ -829,6 +835,9 @@ def inference(
                     if text is not None:
                         ibest_writer["asr_text"][key] = text
 
+    if beam_search_profiler is not None:
+        beam_search_profiler.save(output_dir)
+
 
 def get_parser():
     parser = config_argparse.ArgumentParser(
@@ -952,6 +961,7 @@ def get_parser():
     )
 
     group = parser.add_argument_group("Beam-search related")
+    add_beam_search_profiler_arguments(group)
     group.add_argument(
         "--batch_size",
         type=int,
@@ -8,7 +8,7 @@ import shutil
 import sys
 import time
 from pathlib import Path
-from typing import Any, Dict, Optional, Sequence, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import soundfile as sf
@@ -17,10 +17,15 @@ from packaging.version import parse as V
 from typeguard import typechecked
 
 from espnet2.fileio.npy_scp import NpyScpWriter
+from espnet2.gan_tts.utils.streaming_vocoder import (
+    StreamingVocoder,
+    estimate_receptive_field,
+)
 from espnet2.gan_tts.vits import VITS
 from espnet2.tasks.tts import TTSTask
 from espnet2.torch_utils.device_funcs import to_device
 from espnet2.torch_utils.set_all_random_seed import set_all_random_seed
+from espnet2.train.preprocess_cache import LRUPreprocessCache
 from espnet2.tts.fastspeech import FastSpeech
 from espnet2.tts.fastspeech2 import FastSpeech2
 from espnet2.tts.tacotron2 import Tacotron2
@@ -28,6 +33,7 @@ from espnet2.tts.transformer import Transformer
 from espnet2.tts.utils import DurationCalculator
 from espnet2.utils import config_argparse
 from espnet2.utils.types import str2bool, str2triple_str, str_or_none
+from espnet.nets.pytorch_backend.nets_utils import pad_list
 from espnet.utils.cli_utils import get_commandline_args
 
 
@@ -85,8 +91,20 @@ class Text2Speech:
         seed: int = 777,
         always_fix_seed: bool = False,
         prefer_normalized_feats: bool = False,
+        text_cache_size: int = 0,
+        text_cache_dir: Union[Path, str, None] = None,
     ):
-        """Initialize Text2Speech module."""
+        """Initialize Text2Speech module.
+
+        Args:
+            text_cache_size (int): Number of the texts whose token ids are cached
+                in memory to skip the text frontend (cleaner and g2p) for the
+                repeated texts. No cache if 0.
+            text_cache_dir (Union[Path, str, None]): Directory to persist the cache
+                of the token ids across the processes.
+            The others are the same as the command line options of inference.
+
+        """
 
         # setup model
         model, train_args = TTSTask.build_model_from_file(
@@ -102,11 +120,29 @@ class Text2Speech:
         self.feats_extract = model.feats_extract
         self.duration_calculator = DurationCalculator()
         self.preprocess_fn = TTSTask.build_preprocess_fn(train_args, False)
+        self.text_cache = None
+        if text_cache_size > 0 and self.preprocess_fn is not None:
+            self.text_cache = LRUPreprocessCache(
+                text_cache_size,
+                dict(
+                    token_type=getattr(train_args, "token_type", None),
+                    token_list=getattr(train_args, "token_list", None),
+                    bpemodel=getattr(train_args, "bpemodel", None),
+                    non_linguistic_symbols=getattr(
+                        train_args, "non_linguistic_symbols", None
+                    ),
+                    cleaner=getattr(train_args, "cleaner", None),
+                    g2p=getattr(train_args, "g2p", None),
+                ),
+                cache_dir=text_cache_dir,
+            )
         self.use_teacher_forcing = use_teacher_forcing
         self.seed = seed
         self.always_fix_seed = always_fix_seed
         self.vocoder = None
         self.prefer_normalized_feats = prefer_normalized_feats
+        # (left, right) context frames of the vocoder in the streaming synthesis
+        self.vocoder_context = None
         if self.tts.require_vocoder:
             vocoder = TTSTask.build_vocoder_from_file(
                 vocoder_config, vocoder_file, model, device
@@ -157,7 +193,84 @@ class Text2Speech:
         decode_conf: Optional[Dict[str, Any]] = None,
     ) -> Dict[str, torch.Tensor]:
         """Run text-to-speech."""
+        output_dict = self._generate(
+            text, speech, durations, spembs, sids, lids, decode_conf
+        )
+
+        # apply vocoder (mel-to-wav)
+        if self.vocoder is not None:
+            wav = self.vocoder(self._vocoder_input(output_dict))
+            output_dict.update(wav=wav)
+
+        return output_dict
+
+    @torch.no_grad()
+    @typechecked
+    def stream_call(
+        self,
+        text: Union[str, torch.Tensor, np.ndarray],
+        speech: Union[torch.Tensor, np.ndarray, None] = None,
+        durations: Union[torch.Tensor, np.ndarray, None] = None,
+        spembs: Union[torch.Tensor, np.ndarray, None] = None,
+        sids: Union[torch.Tensor, np.ndarray, None] = None,
+        lids: Union[torch.Tensor, np.ndarray, None] = None,
+        decode_conf: Optional[Dict[str, Any]] = None,
+        chunk_size: int = 32,
+        crossfade: int = 0,
+    ) -> Iterator[torch.Tensor]:
+        """Run text-to-speech and yield the waveform chunk by chunk.
+
+        The features are generated at once and converted into the waveform
+        by the vocoder chunk by chunk (see StreamingVocoder), so the playback can
+        start after the first chunk. The context frames of each chunk are
+        estimated from the receptive field of the vocoder at the first call.
+        The text2wav models (e.g., VITS) yield the whole waveform at once.
+
+        Args:
+            chunk_size (int): Number of the frames of each chunk.
+            crossfade (int): Number of the frames to crossfade between the chunks.
+            The others are the same as __call__().
+
+        Yields:
+            Tensor: Waveform chunk (T_chunk_wav,).
+
+        """
+        output_dict = self._generate(
+            text, speech, durations, spembs, sids, lids, decode_conf
+        )
+        if self.vocoder is None:
+            if output_dict.get("wav") is not None:
+                yield output_dict["wav"]
+            return
+
+        input_feat = self._vocoder_input(output_dict)
+        if self.vocoder_context is None:
+            self.vocoder_context = estimate_receptive_field(
+                self.vocoder,
+                input_feat.size(-1),
+                device=input_feat.device,
+                dtype=input_feat.dtype,
+            )
+            logging.info(f"Context frames of the vocoder: {self.vocoder_context}")
+        streaming_vocoder = StreamingVocoder(
+            self.vocoder,
+            input_feat.size(-1),
+            chunk_size=chunk_size,
+            context=self.vocoder_context,
+            crossfade=crossfade,
+        )
+        yield from streaming_vocoder(input_feat)
 
+    def _generate(
+        self,
+        text: Union[str, torch.Tensor, np.ndarray],
+        speech: Union[torch.Tensor, np.ndarray, None],
+        durations: Union[torch.Tensor, np.ndarray, None],
+        spembs: Union[torch.Tensor, np.ndarray, None],
+        sids: Union[torch.Tensor, np.ndarray, None],
+        lids: Union[torch.Tensor, np.ndarray, None],
+        decode_conf: Optional[Dict[str, Any]],
+    ) -> Dict[str, torch.Tensor]:
         # check inputs
         if self.use_speech and speech is None:
             raise RuntimeError("Missing required argument: 'speech'")
@@ -170,7 +283,7 @@ class Text2Speech:
 
         # prepare batch
         if isinstance(text, str):
-            text = self.preprocess_fn("<dummy>", dict(text=text))["text"]
+            text = self._preprocess_text(text)
         batch = dict(text=text)
         if speech is not None:
             batch.update(speech=speech)
@@ -200,19 +313,146 @@ class Text2Speech:
             duration, focus_rate = self.duration_calculator(output_dict["att_w"])
             output_dict.update(duration=duration, focus_rate=focus_rate)
 
-        # apply vocoder (mel-to-wav)
+        return output_dict
+
+    def _preprocess_text(self, text: str) -> np.ndarray:
+        if self.text_cache is None:
+            return self.preprocess_fn("<dummy>", dict(text=text))["text"]
+        inputs = dict(text=text)
+        outputs = self.text_cache.get(inputs)
+        if outputs is None:
+            outputs = dict(text=self.preprocess_fn("<dummy>", dict(text=text))["text"])
+            self.text_cache.put(inputs, outputs)
+        return outputs["text"]
+
+    def _vocoder_input(self, output_dict: Dict[str, torch.Tensor]) -> torch.Tensor:
+        if self.prefer_normalized_feats or output_dict.get("feat_gen_denorm") is None:
+            return output_dict["feat_gen"]
+        else:
+            return output_dict["feat_gen_denorm"]
+
+    @torch.no_grad()
+    @typechecked
+    def batch_call(
+        self,
+        texts: Sequence[Union[str, torch.Tensor, np.ndarray]],
+        spembs: Union[torch.Tensor, np.ndarray, None] = None,
+        sids: Union[torch.Tensor, np.ndarray, None] = None,
+        lids: Union[torch.Tensor, np.ndarray, None] = None,
+        decode_conf: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, torch.Tensor]]:
+        """Run text-to-speech for the batch of texts.
+
+        If the model supports the batch inference (see `use_batch_inference`),
+        the padded texts are synthesized in one forward pass, the padded features
+        are converted in one vocoder call and the outputs are trimmed for each text.
+        Otherwise, the texts are synthesized one by one.
+
+        Args:
+            texts: Sequence of texts or token id sequences.
+            spembs: Speaker embeddings (B, spk_embed_dim).
+            sids: Speaker IDs (B, 1).
+            lids: Language IDs (B, 1).
+            decode_conf: Decoding configs to overwrite the default ones.
+
+        Returns:
+            List[Dict[str, Tensor]]: Output dict of each text as in `__call__`.
+
+        """
+        if not self.use_batch_inference:
+            return [
+                self(
+                    text,
+                    spembs=None if spembs is None else spembs[i],
+                    sids=None if sids is None else sids[i],
+                    lids=None if lids is None else lids[i],
+                    decode_conf=decode_conf,
+                )
+                for i, text in enumerate(texts)
+            ]
+
+        # check inputs
+        if self.use_sids and sids is None:
+            raise RuntimeError("Missing required argument: 'sids'")
+        if self.use_lids and lids is None:
+            raise RuntimeError("Missing required argument: 'lids'")
+        if self.use_spembs and spembs is None:
+            raise RuntimeError("Missing required argument: 'spembs'")
+
+        # prepare batch
+        texts = [
+            self._preprocess_text(text) if isinstance(text, str) else text
+            for text in texts
+        ]
+        texts = [torch.as_tensor(text) for text in texts]
+        batch = dict(
+            text=pad_list(texts, 0),
+            text_lengths=torch.tensor([len(text) for text in texts]),
+        )
+        if spembs is not None:
+            batch.update(spembs=spembs)
+        if sids is not None:
+            batch.update(sids=sids)
+        if lids is not None:
+            batch.update(lids=lids)
+        batch = to_device(batch, self.device)
+
+        # overwrite the decode configs if provided
+        cfg = self.decode_conf
+        if decode_conf is not None:
+            cfg = self.decode_conf.copy()
+            cfg.update(decode_conf)
+
+        # inference
+        if self.always_fix_seed:
+            set_all_random_seed(self.seed)
+        output_dict = self.model.batch_inference(**batch, **cfg)
+
+        # apply vocoder (mel-to-wav) for the padded features at once
         if self.vocoder is not None:
-            if (
-                self.prefer_normalized_feats
-                or output_dict.get("feat_gen_denorm") is None
-            ):
-                input_feat = output_dict["feat_gen"]
-            else:
-                input_feat = output_dict["feat_gen_denorm"]
-            wav = self.vocoder(input_feat)
-            output_dict.update(wav=wav)
+            wav, wav_lengths = self._batch_vocode(
+                self._vocoder_input(output_dict), output_dict["feat_gen_lengths"]
+            )
+            output_dict.update(wav=wav, wav_lengths=wav_lengths)
+
+        # trim the padded outputs along the time axis, and pass the other outputs
+        # (e.g. per-item scalars) through
+        lengths = {
+            k: output_dict[f"{k}_lengths"]
+            for k in ("feat_gen", "wav")
+            if f"{k}_lengths" in output_dict
+        }
+        if "feat_gen" in lengths:
+            lengths.update(feat_gen_denorm=lengths["feat_gen"])
+        if "text_lengths" in output_dict:
+            for k in ("duration", "pitch", "energy"):
+                lengths[k] = output_dict["text_lengths"]
+        output_dicts = []
+        for i in range(len(texts)):
+            output_dicts.append(
+                {
+                    k: v[i, : lengths[k][i]] if k in lengths else v[i]
+                    for k, v in output_dict.items()
+                    if not k.endswith("_lengths")
+                }
+            )
+        return output_dicts
+
+    def _batch_vocode(
+        self, feats: torch.Tensor, feats_lengths: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        if hasattr(self.vocoder, "batch_forward"):
+            return self.vocoder.batch_forward(feats, feats_lengths)
+        wavs = [
+            self.vocoder(feat[:length]) for feat, length in zip(feats, feats_lengths)
+        ]
+        wav_lengths = torch.tensor([len(wav) for wav in wavs], device=feats.device)
+        return pad_list(wavs, 0.0), wav_lengths
 
-        return output_dict
+    @property
+    def use_batch_inference(self) -> bool:
+        """Return the batch inference is supported or not."""
+        return hasattr(self.tts, "batch_inference") and not self.use_speech
 
     @property
     def fs(self) -> Optional[int]:
@@ -337,8 +577,6 @@ def inference(
     vocoder_tag: Optional[str],
 ):
     """Run text-to-speech inference."""
-    if batch_size > 1:
-        raise NotImplementedError("batch decoding is not implemented")
     if ngpu > 1:
         raise NotImplementedError("only single GPU decoding is supported")
     logging.basicConfig(
@@ -381,6 +619,11 @@ def inference(
         **text2speech_kwargs,
     )
 
+    if batch_size > 1 and not text2speech.use_batch_inference:
+        raise NotImplementedError(
+            f"batch decoding is not implemented for {text2speech.tts.__class__}"
+        )
+
     # 3. Build data-iterator
     if not text2speech.use_speech:
         data_path_and_name_and_type = list(
@@ -428,119 +671,160 @@ def inference(
     ) as duration_writer, open(
         output_dir / "focus_rates/focus_rates", "w"
     ) as focus_rate_writer:
+        total_time, total_wav_time = 0.0, 0.0
         for idx, (keys, batch) in enumerate(loader, 1):
             assert isinstance(batch, dict), type(batch)
             assert all(isinstance(s, str) for s in keys), keys
             _bs = len(next(iter(batch.values())))
-            assert _bs == 1, _bs
-
-            # Change to single sequence and remove *_length
-            # because inference() requires 1-seq, not mini-batch.
-            batch = {k: v[0] for k, v in batch.items() if not k.endswith("_lengths")}
+            assert _bs == len(keys), (_bs, len(keys))
 
             start_time = time.perf_counter()
-            output_dict = text2speech(**batch)
-
-            key = keys[0]
-            insize = next(iter(batch.values())).size(0) + 1
-            if output_dict.get("feat_gen") is not None:
-                # standard text2mel model case
-                feat_gen = output_dict["feat_gen"]
+            if batch_size > 1:
+                insizes = (batch["text_lengths"] + 1).tolist()
+                output_dicts = text2speech.batch_call(
+                    [t[:l] for t, l in zip(batch["text"], batch["text_lengths"])],
+                    spembs=batch.get("spembs"),
+                    sids=batch.get("sids"),
+                    lids=batch.get("lids"),
+                )
+            else:
+                # Change to single sequence and remove *_length
+                # because inference() requires 1-seq, not mini-batch.
+                batch = {
+                    k: v[0] for k, v in batch.items() if not k.endswith("_lengths")
+                }
+                insizes = [next(iter(batch.values())).size(0) + 1]
+                output_dicts = [text2speech(**batch)]
+            elapsed_time = time.perf_counter() - start_time
+            total_time += elapsed_time
+
+            # the items of a batch are synthesized together, so the speed and
+            # RTF are measured for the whole batch
+            if output_dicts[0].get("feat_gen") is not None:
+                num_frames = sum(o["feat_gen"].size(0) for o in output_dicts)
                 logging.info(
                     "inference speed = {:.1f} frames / sec.".format(
-                        int(feat_gen.size(0)) / (time.perf_counter() - start_time)
+                        num_frames / elapsed_time
                     )
                 )
-                logging.info(f"{key} (size:{insize}->{feat_gen.size(0)})")
-                if feat_gen.size(0) == insize * maxlenratio:
-                    logging.warning(f"output length reaches maximum length ({key}).")
-
-                norm_writer[key] = output_dict["feat_gen"].cpu().numpy()
-                shape_writer.write(
-                    f"{key} " + ",".join(map(str, output_dict["feat_gen"].shape)) + "\n"
-                )
-                if output_dict.get("feat_gen_denorm") is not None:
-                    denorm_writer[key] = output_dict["feat_gen_denorm"].cpu().numpy()
             else:
-                # end-to-end text2wav model case
-                wav = output_dict["wav"]
+                num_points = sum(o["wav"].size(0) for o in output_dicts)
                 logging.info(
                     "inference speed = {:.1f} points / sec.".format(
-                        int(wav.size(0)) / (time.perf_counter() - start_time)
+                        num_points / elapsed_time
                     )
                 )
-                logging.info(f"{key} (size:{insize}->{wav.size(0)})")
-
-            if output_dict.get("duration") is not None:
-                # Save duration and fucus rates
-                duration_writer.write(
-                    f"{key} "
-                    + " ".join(map(str, output_dict["duration"].long().cpu().numpy()))
-                    + "\n"
-                )
-
-            if output_dict.get("focus_rate") is not None:
-                focus_rate_writer.write(
-                    f"{key} {float(output_dict['focus_rate']):.5f}\n"
-                )
+            if text2speech.fs is not None and output_dicts[0].get("wav") is not None:
+                wav_time = sum(len(o["wav"]) for o in output_dicts) / text2speech.fs
+                total_wav_time += wav_time
+                if wav_time > 0:
+                    logging.info(
+                        f"RTF = {elapsed_time / wav_time:.4f} "
+                        f"(batch_size={len(output_dicts)})"
+                    )
 
-            if output_dict.get("att_w") is not None:
-                # Plot attention weight
-                att_w = output_dict["att_w"].cpu().numpy()
+            for key, insize, output_dict in zip(keys, insizes, output_dicts):
+                if output_dict.get("feat_gen") is not None:
+                    # standard text2mel model case
+                    feat_gen = output_dict["feat_gen"]
+                    logging.info(f"{key} (size:{insize}->{feat_gen.size(0)})")
+                    if feat_gen.size(0) == insize * maxlenratio:
+                        logging.warning(
+                            f"output length reaches maximum length ({key})."
+                        )
+
+                    norm_writer[key] = output_dict["feat_gen"].cpu().numpy()
+                    shape_writer.write(
+                        f"{key} "
+                        + ",".join(map(str, output_dict["feat_gen"].shape))
+                        + "\n"
+                    )
+                    if output_dict.get("feat_gen_denorm") is not None:
+                        denorm_writer[key] = (
+                            output_dict["feat_gen_denorm"].cpu().numpy()
+                        )
+                else:
+                    # end-to-end text2wav model case
+                    wav = output_dict["wav"]
+                    logging.info(f"{key} (size:{insize}->{wav.size(0)})")
+
+                if output_dict.get("duration") is not None:
+                    # Save duration and fucus rates
+                    duration_writer.write(
+                        f"{key} "
+                        + " ".join(
+                            map(str, output_dict["duration"].long().cpu().numpy())
+                        )
+                        + "\n"
+                    )
 
-                if att_w.ndim == 2:
-                    att_w = att_w[None][None]
-                elif att_w.ndim != 4:
-                    raise RuntimeError(f"Must be 2 or 4 dimension: {att_w.ndim}")
+                if output_dict.get("focus_rate") is not None:
+                    focus_rate_writer.write(
+                        f"{key} {float(output_dict['focus_rate']):.5f}\n"
+                    )
 
-                w, h = plt.figaspect(att_w.shape[0] / att_w.shape[1])
-                fig = plt.Figure(
-                    figsize=(
-                        w * 1.3 * min(att_w.shape[0], 2.5),
-                        h * 1.3 * min(att_w.shape[1], 2.5),
+                if output_dict.get("att_w") is not None:
+                    # Plot attention weight
+                    att_w = output_dict["att_w"].cpu().numpy()
+
+                    if att_w.ndim == 2:
+                        att_w = att_w[None][None]
+                    elif att_w.ndim != 4:
+                        raise RuntimeError(f"Must be 2 or 4 dimension: {att_w.ndim}")
+
+                    w, h = plt.figaspect(att_w.shape[0] / att_w.shape[1])
+                    fig = plt.Figure(
+                        figsize=(
+                            w * 1.3 * min(att_w.shape[0], 2.5),
+                            h * 1.3 * min(att_w.shape[1], 2.5),
+                        )
+                    )
+                    fig.suptitle(f"{key}")
+                    axes = fig.subplots(att_w.shape[0], att_w.shape[1])
+                    if len(att_w) == 1:
+                        axes = [[axes]]
+                    for ax, att_w in zip(axes, att_w):
+                        for ax_, att_w_ in zip(ax, att_w):
+                            ax_.imshow(att_w_.astype(np.float32), aspect="auto")
+                            ax_.set_xlabel("Input")
+                            ax_.set_ylabel("Output")
+                            ax_.xaxis.set_major_locator(MaxNLocator(integer=True))
+                            ax_.yaxis.set_major_locator(MaxNLocator(integer=True))
+
+                    fig.set_tight_layout({"rect": [0, 0.03, 1, 0.95]})
+                    fig.savefig(output_dir / f"att_ws/{key}.png")
+                    fig.clf()
+
+                if output_dict.get("prob") is not None:
+                    # Plot stop token prediction
+                    prob = output_dict["prob"].cpu().numpy()
+
+                    fig = plt.Figure()
+                    ax = fig.add_subplot(1, 1, 1)
+                    ax.plot(prob)
+                    ax.set_title(f"{key}")
+                    ax.set_xlabel("Output")
+                    ax.set_ylabel("Stop probability")
+                    ax.set_ylim(0, 1)
+                    ax.grid(which="both")
+
+                    fig.set_tight_layout(True)
+                    fig.savefig(output_dir / f"probs/{key}.png")
+                    fig.clf()
+
+                if output_dict.get("wav") is not None:
+                    # TODO(kamo): Write scp
+                    sf.write(
+                        f"{output_dir}/wav/{key}.wav",
+                        output_dict["wav"].cpu().numpy(),
+                        text2speech.fs,
+                        "PCM_16",
                     )
-                )
-                fig.suptitle(f"{key}")
-                axes = fig.subplots(att_w.shape[0], att_w.shape[1])
-                if len(att_w) == 1:
-                    axes = [[axes]]
-                for ax, att_w in zip(axes, att_w):
-                    for ax_, att_w_ in zip(ax, att_w):
-                        ax_.imshow(att_w_.astype(np.float32), aspect="auto")
-                        ax_.set_xlabel("Input")
-                        ax_.set_ylabel("Output")
-                        ax_.xaxis.set_major_locator(MaxNLocator(integer=True))
-                        ax_.yaxis.set_major_locator(MaxNLocator(integer=True))
-
-                fig.set_tight_layout({"rect": [0, 0.03, 1, 0.95]})
-                fig.savefig(output_dir / f"att_ws/{key}.png")
-                fig.clf()
-
-            if output_dict.get("prob") is not None:
-                # Plot stop token prediction
-                prob = output_dict["prob"].cpu().numpy()
-
-                fig = plt.Figure()
-                ax = fig.add_subplot(1, 1, 1)
-                ax.plot(prob)
-                ax.set_title(f"{key}")
-                ax.set_xlabel("Output")
-                ax.set_ylabel("Stop probability")
-                ax.set_ylim(0, 1)
-                ax.grid(which="both")
-
-                fig.set_tight_layout(True)
-                fig.savefig(output_dir / f"probs/{key}.png")
-                fig.clf()
 
-            if output_dict.get("wav") is not None:
-                # TODO(kamo): Write scp
-                sf.write(
-                    f"{output_dir}/wav/{key}.wav",
-                    output_dict["wav"].cpu().numpy(),
-                    text2speech.fs,
-                    "PCM_16",
-                )
+    if total_wav_time > 0:
+        logging.info(
+            f"Total RTF = {total_time / total_wav_time:.4f} (batch_size={batch_size})"
+        )
 
     # remove files if those are not included in output dict
     if output_dict.get("feat_gen") is None:
@@ -1,10 +1,14 @@
 import collections.abc
+import hashlib
 import logging
-from mmap import mmap
+import os
+from array import array
+from mmap import ACCESS_READ, mmap
 from pathlib import Path
 from random import randint
-from typing import Dict, List, Optional, Set, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
+import numpy as np
 from typeguard import typechecked
 
 
@@ -254,3 +258,198 @@ class RandomTextReader(collections.abc.Mapping):
 
     def keys(self):
         return None
+
+
+def _hash_key(key: bytes) -> int:
+    # NOTE: builtin hash() is randomized for each process,
+    #   so it can't be used for the index saved in the file
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+class IndexedTextReader(collections.abc.Mapping):
+    """Reader class for random access to a large text file with 2 or more columns.
+
+    Instead of loading all the lines into a dict object, the file is
+    memory-mapped and only the index of the lines is kept, i.e.,
+    a sorted array of the 64-bit hashes of the keys and the byte offsets
+    of the lines. The value of a key is found by the binary search.
+    The index is built at the first time and cached to "{path}.index.npy"
+    (or `index_path`), which is memory-mapped as well,
+    so that the DataLoader workers share the pages of the text and the index.
+    The cached index is rebuilt if the size or the mtime of the text changes.
+
+    The returned values are the same as `read_2columns_text`,
+    or `read_multi_columns_text` if multi_columns=True.
+
+    Examples:
+        wav.scp:
+            key1 /some/path/a.wav
+            key2 /some/path/b.wav
+
+        >>> reader = IndexedTextReader('wav.scp')
+        >>> reader['key1']
+        '/some/path/a.wav'
+
+    """
+
+    @typechecked
+    def __init__(
+        self,
+        path: Union[Path, str],
+        multi_columns: bool = False,
+        index_path: Optional[Union[Path, str]] = None,
+    ):
+        super().__init__()
+        self.path = str(path)
+        self.multi_columns = multi_columns
+        if index_path is None:
+            index_path = self.path + ".index.npy"
+        self.index_path = str(index_path)
+
+        self._mm = None
+        self._index = None
+        self._index_on_disk = True
+        # NOTE: The stat is taken before building the index, so that the index
+        #   is rebuilt next time if the text is modified while building it.
+        stat = self._source_stat()
+        if not self._is_index_valid(stat):
+            index = self._build_index()
+            try:
+                tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    np.save(f, np.concatenate([stat[:, None], index], axis=1))
+                os.replace(tmp_path, self.index_path)
+            except OSError as e:
+                logging.warning(
+                    f"Failed to write the index to {self.index_path}, "
+                    f"so it is kept in memory: {e}"
+                )
+                self._index = index
+                self._index_on_disk = False
+
+    def _source_stat(self) -> np.ndarray:
+        # NOTE: The size is compared as well as the mtime in nanoseconds,
+        #   since the mtime can be preserved (e.g. cp -p, rsync -t)
+        #   or coarse-grained on some filesystems when the text is replaced.
+        st = os.stat(self.path)
+        return np.array([st.st_size, st.st_mtime_ns], dtype=np.uint64)
+
+    def _load_index_file(self) -> np.ndarray:
+        # The first column is the stat of the text when the index was built
+        return np.load(self.index_path, mmap_mode="r")
+
+    def _is_index_valid(self, stat: np.ndarray) -> bool:
+        if not os.path.exists(self.index_path):
+            return False
+        try:
+            index = self._load_index_file()
+        except (OSError, ValueError):
+            return False
+        return (
+            index.ndim == 2
+            and index.shape[0] == 2
+            and index.shape[1] > 0
+            and index.dtype == np.uint64
+            and np.array_equal(index[:, 0], stat)
+        )
+
+    @property
+    def mm(self) -> mmap:
+        if self._mm is None:
+            with open(self.path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    # mmap can't map an empty file
+                    self._mm = b""
+                else:
+                    self._mm = mmap(f.fileno(), 0, access=ACCESS_READ)
+        return self._mm
+
+    @property
+    def index(self) -> np.ndarray:
+        if self._index is None:
+            self._index = self._load_index_file()[:, 1:]
+        return self._index
+
+    def _iter_lines(self) -> Iterator[Tuple[int, bytes]]:
+        mm = self.mm
+        start = 0
+        while start < len(mm):
+            end = mm.find(b"\n", start)
+            if end < 0:
+                end = len(mm)
+            line = mm[start:end]
+            if line.strip():
+                yield start, line
+            start = end + 1
+
+    def _build_index(self) -> np.ndarray:
+        logging.info(f"Building the index of {self.path}")
+        hashes, offsets = array("Q"), array("Q")
+        for offset, line in self._iter_lines():
+            hashes.append(_hash_key(line.split(maxsplit=1)[0]))
+            offsets.append(offset)
+        # NOTE: (2, N) array instead of a structured array to keep
+        #   the hashes contiguous for the binary search
+        index = np.stack(
+            [np.frombuffer(hashes, np.uint64), np.frombuffer(offsets, np.uint64)]
+        ).reshape(2, -1)
+        index = index[:, np.lexsort((index[1], index[0]))]
+
+        # Check the duplicated keys among the lines with the same hash
+        same = np.nonzero(index[0, 1:] == index[0, :-1])[0]
+        for i in same:
+            k1 = self._read_line(index[1, i])[0]
+            k2 = self._read_line(index[1, i + 1])[0]
+            if k1 == k2:
+                raise RuntimeError(f"{k1} is duplicated ({self.path})")
+        return index
+
+    def _read_line(self, offset: int) -> Tuple[str, str]:
+        mm = self.mm
+        offset = int(offset)
+        end = mm.find(b"\n", offset)
+        if end < 0:
+            end = len(mm)
+        sps = mm[offset:end].decode("utf-8").rstrip().split(maxsplit=1)
+        if len(sps) == 1:
+            return sps[0], ""
+        return sps[0], sps[1]
+
+    def _find(self, key: str) -> Optional[str]:
+        hashes, offsets = self.index
+        h = np.uint64(_hash_key(key.encode("utf-8")))
+        i = int(np.searchsorted(hashes, h))
+        while i < len(hashes) and hashes[i] == h:
+            k, v = self._read_line(offsets[i])
+            if k == key:
+                return v
+            i += 1
+        return None
+
+    def __getitem__(self, key: str) -> Union[str, List[str]]:
+        v = self._find(key)
+        if v is None:
+            raise KeyError(key)
+        if self.multi_columns:
+            return v.split() if v != "" else [""]
+        return v
+
+    def __contains__(self, key) -> bool:
+        return isinstance(key, str) and self._find(key) is not None
+
+    def __len__(self) -> int:
+        return self.index.shape[1]
+
+    def __iter__(self) -> Iterator[str]:
+        # Iterate in the order of the lines as the dict object
+        for _, line in self._iter_lines():
+            yield line.split(maxsplit=1)[0].decode("utf-8")
+
+    def __getstate__(self):
+        # NOTE: mmap objects can't be pickled, e.g. for the spawned workers,
+        #   so they are opened again in the new process.
+        state = self.__dict__.copy()
+        state["_mm"] = None
+        if self._index_on_disk:
+            state["_index"] = None
+        return state
@@ -6,7 +6,11 @@ import numpy as np
 import soundfile
 from typeguard import typechecked
 
-from espnet2.fileio.read_text import read_2columns_text, read_multi_columns_text
+from espnet2.fileio.read_text import (
+    IndexedTextReader,
+    read_2columns_text,
+    read_multi_columns_text,
+)
 
 
 def soundfile_read(
@@ -113,6 +117,9 @@ class SoundScpReader(collections.abc.Mapping):
         but this option is disable by default
         because dict[str, list[str]] object is needed to be kept,
         but it increases the required amount of memory.
+
+        If indexed=True is given, the lines are read lazily
+        with IndexedTextReader instead of being kept in a dict object.
     """
 
     @typechecked
@@ -123,12 +130,16 @@ class SoundScpReader(collections.abc.Mapping):
         always_2d: bool = False,
         multi_columns: bool = False,
         concat_axis=1,
+        indexed: bool = False,
     ):
         self.fname = fname
         self.dtype = dtype
         self.always_2d = always_2d
 
-        if multi_columns:
+        if indexed:
+            # Read the lines lazily instead of keeping the dict object
+            self.data = IndexedTextReader(fname, multi_columns=multi_columns)
+        elif multi_columns:
             self.data, _ = read_multi_columns_text(fname)
         else:
             self.data = read_2columns_text(fname)
@@ -4,7 +4,7 @@
 """GAN-based Neural Codec abstrast class."""
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Union
+from typing import Any, Dict, Tuple, Union
 
 import torch
 
@@ -44,3 +44,23 @@ class AbsGANCodec(ABC, torch.nn.Module):
     ) -> torch.Tensor:
         """Return decoded waveform from codecs."""
         raise NotImplementedError
+
+    def encode_streaming(
+        self,
+        *args,
+        **kwargs,
+    ) -> Tuple[torch.Tensor, Any]:
+        """Return encoded codecs from a waveform chunk and the states."""
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support streaming encoding."
+        )
+
+    def decode_streaming(
+        self,
+        *args,
+        **kwargs,
+    ) -> Tuple[torch.Tensor, Any]:
+        """Return decoded waveform from a chunk of codecs and the states."""
+        raise NotImplementedError(
+            f"{self.__class__.__name__} does not support streaming decoding."
+        )
@@ -4,7 +4,7 @@
 """GAN-based neural codec ESPnet model."""
 
 from contextlib import contextmanager
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 import torch
 from packaging.version import parse as V
@@ -113,6 +113,34 @@ class ESPnetGANCodecModel(AbsGANESPnetModel):
 
         return self.codec.generator.encoder(audio)
 
+    def encode_streaming(
+        self,
+        audio: torch.Tensor,
+        states: Optional[Any] = None,
+        final: bool = False,
+        **kwargs,
+    ) -> Tuple[torch.Tensor, Any]:
+        """Codec Encoding Process of an audio chunk in streaming.
+
+        Args:
+            audio (Tensor): Audio waveform chunk
+                (B, 1, T_wav) or (B, T_wav) or (T_wav)
+            states (Optional[Any]): States from the previous chunk.
+            final (bool): Whether audio is the last chunk.
+
+        Returns:
+            Tensor: Generated codecs of the completed frames (N_stream, B, T)
+            Any: States for the next chunk.
+        """
+
+        # convert to [B, n_channle=1, n_sample] anyway
+        if audio.dim() == 1:
+            audio = audio.view(1, 1, -1)
+        elif audio.dim() == 2:
+            audio = audio.unsqueeze(1)
+
+        return self.codec.encode_streaming(audio, states, final=final, **kwargs)
+
     def decode(
         self,
         codes: torch.Tensor,
@@ -127,6 +155,25 @@ class ESPnetGANCodecModel(AbsGANESPnetModel):
         """
         return self.codec.decode(codes)
 
+    def decode_streaming(
+        self,
+        codes: torch.Tensor,
+        states: Optional[Any] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, Any]:
+        """Codec Decoding Process of a chunk of codes in streaming.
+
+        Args:
+            codes (Tensor): codec tokens [N_stream, B, T_chunk]
+            states (Optional[Any]): States from the previous chunk.
+            final (bool): Whether codes is the last chunk.
+
+        Returns:
+            Tensor: Generated waveform chunk (B, 1, n_sample)
+            Any: States for the next chunk.
+        """
+        return self.codec.decode_streaming(codes, states, final=final)
+
     def decode_continuous(
         self,
         z: torch.Tensor,
@@ -23,6 +23,7 @@ from espnet2.gan_codec.shared.encoder.seanet import (
     SEANetResnetBlock,
     apply_parametrization_norm,
     get_norm_module,
+    sequential_forward_streaming,
 )
 from espnet2.gan_codec.shared.encoder.snake_activation import Snake1d
 
@@ -122,6 +123,59 @@ class SConvTranspose1d(nn.Module):
             y = unpad1d(y, (padding_left, padding_right))
         return y
 
+    def forward_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[Dict[str, Any]] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, Dict[str, Any]]:
+        """Run the causal transposed convolution on a chunk of the input.
+
+        The outputs of each chunk are overlap-added with the tail of the previous
+        chunk, which is kept in the states without the bias. The samples are
+        emitted once no later input frame contributes to them, and the padding
+        is trimmed as in forward.
+
+        Args:
+            x (Tensor): Input chunk (B, C, T_chunk).
+            states (Optional[Dict[str, Any]]): States from the previous chunk.
+            final (bool): Whether x is the last chunk.
+
+        Returns:
+            Tensor: Output chunk (B, C', T_chunk'), which can be empty.
+            Dict[str, Any]: States for the next chunk.
+        """
+        assert self.causal, "Streaming requires causal convolutions."
+        convtr = self.convtr.convtr
+        kernel_size = convtr.kernel_size[0]
+        stride = convtr.stride[0]
+        padding_total = kernel_size - stride
+        padding_right = math.ceil(padding_total * self.trim_right_ratio)
+        if states is None:
+            states = {"tail": None, "skip": padding_total - padding_right}
+
+        tail = states["tail"]
+        y = x.new_zeros(x.shape[0], convtr.out_channels, 0)
+        if x.shape[-1] > 0:
+            y = convtr(x)
+            if tail is not None:
+                y = torch.cat(
+                    [y[..., :padding_total] + tail, y[..., padding_total:]], dim=-1
+                )
+            n_samples = x.shape[-1] * stride
+            y, tail = y[..., :n_samples], y[..., n_samples:]
+            if convtr.bias is not None:
+                tail = tail - convtr.bias[:, None]
+        if final and tail is not None:
+            if convtr.bias is not None:
+                tail = tail + convtr.bias[:, None]
+            y = torch.cat([y, tail[..., : padding_total - padding_right]], dim=-1)
+            tail = None
+
+        y = self.convtr.norm(y) if y.shape[-1] > 0 else y
+        skip = min(states["skip"], y.shape[-1])
+        return y[..., skip:], {"tail": tail, "skip": states["skip"] - skip}
+
 
 class SEANetDecoder(nn.Module):
     """SEANet decoder.
@@ -266,3 +320,26 @@ class SEANetDecoder(nn.Module):
     def forward(self, z):
         y = self.model(z)
         return y
+
+    def forward_streaming(
+        self,
+        z: torch.Tensor,
+        states: Optional[List[Any]] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Decode a chunk of the frames in streaming.
+
+        Requires the causal configuration. The concatenated outputs of the chunks
+        match the output of forward for the whole sequence.
+
+        Args:
+            z (Tensor): Frame chunk (B, dimension, T_chunk).
+            states (Optional[List[Any]]): States from the previous chunk.
+            final (bool): Whether z is the last chunk, which flushes the samples
+                left in the states.
+
+        Returns:
+            Tensor: Waveform (B, channels, T_wav) available so far.
+            List[Any]: States for the next chunk.
+        """
+        return sequential_forward_streaming(self.model, z, states, final=final)
@@ -8,10 +8,9 @@
 
 """Encodec SEANet-based encoder and decoder implementation."""
 
-
 import logging
 import math
-from typing import Any, Dict, List, Tuple, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import einops
 import numpy as np
@@ -113,6 +112,40 @@ def get_extra_padding_for_conv1d(
     return ideal_length - length
 
 
+def sequential_forward_streaming(
+    modules: nn.Sequential,
+    x: torch.Tensor,
+    states: Optional[List[Any]] = None,
+    final: bool = False,
+) -> Tuple[torch.Tensor, List[Any]]:
+    """Run the modules of nn.Sequential on a chunk of the input in streaming.
+
+    The modules with forward_streaming carry their states across the chunks,
+    and the others (activations) are applied to each chunk as they are
+    element-wise.
+
+    Args:
+        modules (nn.Sequential): Modules to run.
+        x (Tensor): Input chunk (B, C, T_chunk), which can be empty.
+        states (Optional[List[Any]]): States of the modules from the previous chunk.
+        final (bool): Whether x is the last chunk, which flushes the states.
+
+    Returns:
+        Tensor: Output chunk (B, C', T_chunk'), which can be empty.
+        List[Any]: States of the modules for the next chunk.
+    """
+    if states is None:
+        states = [None] * len(modules)
+    new_states = []
+    for module, state in zip(modules, states):
+        if hasattr(module, "forward_streaming"):
+            x, state = module.forward_streaming(x, state, final=final)
+        elif x.size(-1) > 0:
+            x = module(x)
+        new_states.append(state)
+    return x, new_states
+
+
 def pad1d(
     x: torch.Tensor, paddings: Tuple[int, int], mode: str = "zero", value: float = 0.0
 ):
@@ -228,6 +261,70 @@ class SConv1d(nn.Module):
             )
         return self.conv(x)
 
+    def forward_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[Dict[str, Any]] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, Dict[str, Any]]:
+        """Run the causal convolution on a chunk of the input.
+
+        The input frames which are not covered by a full window yet are kept
+        in the states, and the left padding and the extra padding at the end
+        are applied on the first and the final chunks, respectively, so that
+        the concatenated outputs match the output of forward.
+
+        Args:
+            x (Tensor): Input chunk (B, C, T_chunk).
+            states (Optional[Dict[str, Any]]): States from the previous chunk.
+            final (bool): Whether x is the last chunk.
+
+        Returns:
+            Tensor: Output chunk (B, C', T_chunk').
+            Dict[str, Any]: States for the next chunk.
+        """
+        assert self.causal, "Streaming requires causal convolutions."
+        kernel_size = self.conv.conv.kernel_size[0]
+        stride = self.conv.conv.stride[0]
+        dilation = self.conv.conv.dilation[0]
+        kernel_size = (kernel_size - 1) * dilation + 1
+        padding_total = kernel_size - stride
+        if states is None:
+            states = {"buffer": x[..., :0], "length": 0, "started": False}
+
+        buffer = torch.cat([states["buffer"], x], dim=-1)
+        length = states["length"] + x.shape[-1]
+        started = states["started"]
+        padding_left, padding_right = 0, 0
+        if not started:
+            if buffer.shape[-1] <= padding_total and not final:
+                # wait for enough frames for the (reflect) left padding
+                y = x.new_zeros(x.shape[0], self.conv.conv.out_channels, 0)
+                return y, {"buffer": buffer, "length": length, "started": False}
+            padding_left, started = padding_total, True
+        if final:
+            # same as get_extra_padding_for_conv1d for the whole input
+            n_frames = (length - kernel_size + padding_total) / stride + 1
+            padding_right = (
+                (math.ceil(n_frames) - 1) * stride
+                + (kernel_size - padding_total)
+                - length
+            )
+        if padding_left > 0 or padding_right > 0:
+            buffer = pad1d(buffer, (padding_left, padding_right), mode=self.pad_mode)
+
+        n_frames = max((buffer.shape[-1] - kernel_size) // stride + 1, 0)
+        if n_frames > 0:
+            y = self.conv(buffer[..., : (n_frames - 1) * stride + kernel_size])
+        else:
+            y = x.new_zeros(x.shape[0], self.conv.conv.out_channels, 0)
+        states = {
+            "buffer": buffer[..., n_frames * stride :],
+            "length": length,
+            "started": started,
+        }
+        return y, states
+
 
 class SLSTM(nn.Module):
     """LSTM without worrying about the hidden state, nor the layout of the data.
@@ -248,6 +345,22 @@ class SLSTM(nn.Module):
         y = y.permute(1, 2, 0)
         return y
 
+    def forward_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, Optional[Tuple[torch.Tensor, torch.Tensor]]]:
+        """Run the LSTM on a chunk of the input carrying the hidden states."""
+        if x.shape[-1] == 0:
+            return x, states
+        x = x.permute(2, 0, 1)
+        y, states = self.lstm(x, states)
+        if self.skip:
+            y = y + x
+        y = y.permute(1, 2, 0)
+        return y, states
+
 
 class SEANetResnetBlock(nn.Module):
     """Residual block from SEANet model.
@@ -327,6 +440,38 @@ class SEANetResnetBlock(nn.Module):
     def forward(self, x):
         return self.shortcut(x) + self.block(x)
 
+    def forward_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[Dict[str, Any]] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, Dict[str, Any]]:
+        """Run the residual block on a chunk of the input.
+
+        The residual branch can lag behind the shortcut while its convolutions
+        wait for the frames of the left padding, so the shortcut output is kept
+        until the residual branch catches up.
+        """
+        if states is None:
+            states = {"shortcut": None, "block": None, "pending": x[..., :0]}
+        if isinstance(self.shortcut, SConv1d):
+            shortcut, shortcut_states = self.shortcut.forward_streaming(
+                x, states["shortcut"], final=final
+            )
+        else:
+            shortcut, shortcut_states = self.shortcut(x), None
+        y, block_states = sequential_forward_streaming(
+            self.block, x, states["block"], final=final
+        )
+        shortcut = torch.cat([states["pending"], shortcut], dim=-1)
+        n_frames = y.shape[-1]
+        states = {
+            "shortcut": shortcut_states,
+            "block": block_states,
+            "pending": shortcut[..., n_frames:],
+        }
+        return shortcut[..., :n_frames] + y, states
+
 
 class SEANetEncoder(nn.Module):
     """SEANet encoder.
@@ -459,3 +604,27 @@ class SEANetEncoder(nn.Module):
 
     def forward(self, x):
         return self.model(x)
+
+    def forward_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[List[Any]] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Encode a chunk of the waveform in streaming.
+
+        Requires the causal configuration. The concatenated outputs of the chunks
+        match the output of forward for the whole waveform.
+
+        Args:
+            x (Tensor): Waveform chunk (B, channels, T_chunk) of any length.
+            states (Optional[List[Any]]): States from the previous chunk.
+            final (bool): Whether x is the last chunk, which flushes the frames
+                left in the states.
+
+        Returns:
+            Tensor: Encoded frames (B, dimension, T_frames) available so far,
+                which can be empty.
+            List[Any]: States for the next chunk.
+        """
+        return sequential_forward_streaming(self.model, x, states, final=final)
@@ -33,6 +33,7 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 """Core vector quantization implementation."""
+
 from typing import Any, Callable, Optional, Union
 
 import torch
@@ -96,6 +97,83 @@ def kmeans(samples, num_clusters: int, num_iters: int = 10):
     return means, bins
 
 
+class CodebookIndex:
+    """Nearest-codeword search of a fixed codebook for inference.
+
+    The squared norms of the codewords are computed once, and the squared norms
+    of the inputs are omitted since they don't change the nearest codeword.
+    The scores are computed for at most chunk_size vectors at a time, so that
+    the (N, V) distance matrix of long inputs is not materialized.
+
+    With low_precision, the scores are computed in float16 (bfloat16 on CPU)
+    and the num_candidates best codewords are re-scored in float32.
+    The rows whose candidates are not guaranteed to contain the nearest codeword
+    under the error bound of the low-precision matmul, i.e., close ties,
+    fall back to the float32 search. It is intended for GPUs, as the low-precision
+    matmul is often slower than float32 on CPUs.
+
+    Args:
+        embed (Tensor): Codebook (V, D).
+        chunk_size (Optional[int]): Number of the vectors searched at a time.
+            No chunking if None.
+        low_precision (bool): Whether to compute the scores in low precision.
+        num_candidates (int): Number of the candidates verified in float32.
+    """
+
+    def __init__(
+        self,
+        embed: torch.Tensor,
+        chunk_size: Optional[int] = 4096,
+        low_precision: bool = False,
+        num_candidates: int = 4,
+    ):
+        self.embed = embed.detach()
+        self.embed_norm = self.embed.pow(2).sum(1)  # (V,)
+        self.chunk_size = chunk_size
+        self.num_candidates = min(num_candidates, embed.size(0))
+        self.low_precision = low_precision and self.num_candidates < embed.size(0)
+        if self.low_precision:
+            dtype = torch.float16 if embed.is_cuda else torch.bfloat16
+            self.embed_lp = self.embed.to(dtype)
+            # bound of the score error relative to |x| * max|e|:
+            # 2 * (rounding of the inputs (2 eps) and the output (eps) of the dot)
+            self.error_scale = 8 * torch.finfo(dtype).eps * self.embed_norm.max().sqrt()
+
+    def search(self, x: torch.Tensor) -> torch.Tensor:
+        """Return the indices of the nearest codewords of x (N, D)."""
+        if self.chunk_size is None or x.size(0) <= self.chunk_size:
+            return self._search(x)
+        return torch.cat([self._search(c) for c in x.split(self.chunk_size)])
+
+    def _scores(self, x: torch.Tensor) -> torch.Tensor:
+        # -|x - e|^2 + |x|^2 = 2 x.e - |e|^2
+        return torch.addmm(-self.embed_norm, x, self.embed.t(), alpha=2)
+
+    def _search(self, x: torch.Tensor) -> torch.Tensor:
+        x = x.to(self.embed.dtype)
+        if not self.low_precision:
+            return self._scores(x).argmax(dim=-1)
+
+        scores = 2 * (x.to(self.embed_lp.dtype) @ self.embed_lp.t()).float()
+        scores = scores - self.embed_norm.float()
+        top_scores, candidates = scores.topk(self.num_candidates, dim=-1)
+
+        # re-score the candidates in float32
+        cand_embed = self.embed[candidates]  # (N, K, D)
+        cand_scores = 2 * torch.einsum("nd,nkd->nk", x, cand_embed)
+        cand_scores = cand_scores - self.embed_norm[candidates]
+        embed_ind = candidates.gather(1, cand_scores.argmax(dim=1, keepdim=True))[:, 0]
+
+        # The nearest codeword is in the candidates if the gap between the best
+        # and the last candidates exceeds twice the error bound. Otherwise, or if
+        # the scores overflow, search the rows in float32.
+        error = self.error_scale * x.norm(dim=1)
+        unverified = ~(top_scores[:, 0] - top_scores[:, -1] > 2 * error)
+        if unverified.any():
+            embed_ind[unverified] = self._scores(x[unverified]).argmax(dim=-1)
+        return embed_ind
+
+
 class EuclideanCodebook(nn.Module):
     """Codebook with Euclidean distance.
 
@@ -143,6 +221,12 @@ class EuclideanCodebook(nn.Module):
         self.register_buffer("embed", embed)
         self.register_buffer("embed_avg", embed.clone())
 
+        # options of the nearest-codeword search in inference, see CodebookIndex
+        self.search_chunk_size: Optional[int] = 4096
+        self.search_low_precision = False
+        self._index: Optional[CodebookIndex] = None
+        self._index_key = None
+
     @torch.jit.ignore
     def init_embed_(self, data):
         if self.inited:
@@ -178,7 +262,35 @@ class EuclideanCodebook(nn.Module):
         x = rearrange(x, "... d -> (...) d")
         return x
 
+    def train(self, mode: bool = True):
+        # the codebook is updated in-place during training
+        self._index = None
+        return super().train(mode)
+
+    def index(self) -> CodebookIndex:
+        """Return the search index of the codebook for inference.
+
+        The index is rebuilt when the codebook or the search options change.
+        """
+        key = (
+            self.embed.data_ptr(),
+            self.embed._version,
+            self.search_chunk_size,
+            self.search_low_precision,
+        )
+        if self._index is None or self._index_key != key:
+            self._index = CodebookIndex(
+                self.embed,
+                chunk_size=self.search_chunk_size,
+                low_precision=self.search_low_precision,
+            )
+            self._index_key = key
+        return self._index
+
     def quantize(self, x):
+        if not self.training:
+            return self.index().search(x)
+
         embed = self.embed.t()
         dist = -(
             x.pow(2).sum(1, keepdim=True)
@@ -254,6 +366,23 @@ class EuclideanCodebook(nn.Module):
         return quantize, embed_ind
 
 
+def set_codebook_search(
+    model: nn.Module, chunk_size: Optional[int] = 4096, low_precision: bool = False
+):
+    """Set the options of the nearest-codeword search of the codebooks in model.
+
+    Args:
+        model (nn.Module): Model with EuclideanCodebook, e.g., a codec model.
+        chunk_size (Optional[int]): Number of the vectors searched at a time.
+        low_precision (bool): Whether to compute the scores in low precision
+            and verify the close candidates in float32.
+    """
+    for module in model.modules():
+        if isinstance(module, EuclideanCodebook):
+            module.search_chunk_size = chunk_size
+            module.search_low_precision = low_precision
+
+
 class VectorQuantization(nn.Module):
     """Vector quantization implementation.
 
@@ -5,7 +5,7 @@
 import functools
 import math
 import random
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import torch
@@ -487,6 +487,48 @@ class SoundStream(AbsGANCodec):
         """
         return self.generator.decode(x)
 
+    def encode_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[List[Any]] = None,
+        final: bool = False,
+        **kwargs,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Run encoding of a waveform chunk in streaming.
+
+        Args:
+            x (Tensor): Input audio chunk (B, 1, T_chunk).
+            states (Optional[List[Any]]): States from the previous chunk.
+            final (bool): Whether x is the last chunk.
+
+        Returns:
+            Tensor: Generated codes of the completed frames (N_stream, B, T_code).
+            List[Any]: States for the next chunk.
+
+        """
+        return self.generator.encode_streaming(x, states, final=final, **kwargs)
+
+    def decode_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[List[Any]] = None,
+        final: bool = False,
+        **kwargs,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Run decoding of a chunk of codes in streaming.
+
+        Args:
+            x (Tensor): Input codes chunk (N_stream, B, T_code).
+            states (Optional[List[Any]]): States from the previous chunk.
+            final (bool): Whether x is the last chunk.
+
+        Returns:
+            Tensor: Generated waveform chunk (B, 1, T_wav).
+            List[Any]: States for the next chunk.
+
+        """
+        return self.generator.decode_streaming(x, states, final=final)
+
 
 class SoundStreamGenerator(nn.Module):
     """SoundStream generator module."""
@@ -662,6 +704,54 @@ class SoundStreamGenerator(nn.Module):
         resyn_audio = self.decoder(quantized)
         return resyn_audio
 
+    def encode_streaming(
+        self,
+        x: torch.Tensor,
+        states: Optional[List[Any]] = None,
+        target_bw: Optional[float] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Soundstream codec encoding of a waveform chunk in streaming.
+
+        Requires encdec_causal=True. The codes of the chunks concatenated along
+        time match the codes of encode for the whole waveform.
+
+        Args:
+            x (torch.Tensor): Input chunk of shape (B, 1, T_chunk).
+            states (Optional[List[Any]]): Encoder states from the previous chunk.
+            target_bw (Optional[float]): Target bandwidth.
+            final (bool): Whether x is the last chunk.
+        Returns:
+            torch.Tensor: neural codecs of the completed frames (N_stream, B, T).
+            List[Any]: Encoder states for the next chunk.
+        """
+        encoder_out, states = self.encoder.forward_streaming(x, states, final=final)
+        if target_bw is None:
+            bw = self.target_bandwidths[-1]
+        else:
+            bw = target_bw
+        codes = self.quantizer.encode(encoder_out, self.frame_rate, bw)
+        return codes, states
+
+    def decode_streaming(
+        self,
+        codes: torch.Tensor,
+        states: Optional[List[Any]] = None,
+        final: bool = False,
+    ) -> Tuple[torch.Tensor, List[Any]]:
+        """Soundstream codec decoding of a chunk of codes in streaming.
+
+        Args:
+            codes (torch.Tensor): neural codecs in shape (N_stream, B, T_chunk).
+            states (Optional[List[Any]]): Decoder states from the previous chunk.
+            final (bool): Whether codes is the last chunk.
+        Returns:
+            torch.Tensor: resynthesized audio of the chunk (B, 1, T_wav).
+            List[Any]: Decoder states for the next chunk.
+        """
+        quantized = self.quantizer.decode(codes)
+        return self.decoder.forward_streaming(quantized, states, final=final)
+
 
 class SoundStreamDiscriminator(nn.Module):
     """SoundStream discriminator module."""
@@ -1,2 +1,4 @@
 from espnet2.gan_tts.utils.get_random_segments import get_random_segments  # NOQA
 from espnet2.gan_tts.utils.get_random_segments import get_segments  # NOQA
+from espnet2.gan_tts.utils.streaming_vocoder import StreamingVocoder  # NOQA
+from espnet2.gan_tts.utils.streaming_vocoder import estimate_receptive_field  # NOQA
@@ -0,0 +1,213 @@
+"""Chunk-wise vocoder inference for streaming synthesis."""
+
+import logging
+from typing import Callable, Iterable, Iterator, Optional, Tuple, Union
+
+import numpy as np
+import torch
+
+
+def estimate_receptive_field(
+    inference: Callable[[torch.Tensor], torch.Tensor],
+    in_channels: int,
+    max_frames: int = 1024,
+    device: Union[str, torch.device] = "cpu",
+    dtype: torch.dtype = torch.float32,
+    seed: int = 0,
+) -> Tuple[int, int]:
+    """Estimate the receptive field of the vocoder in frames.
+
+    The receptive field is measured by perturbing the center frame of random
+    features and finding the output samples which are changed. The random seeds
+    are fixed in both calls, so the vocoders which sample noise (e.g.,
+    ParallelWaveGAN) can be measured as well. The vocoder is called with
+    the sequences doubled from 64 frames until the changed region doesn't reach
+    the edges, which works with any vocoder, e.g., the pretrained ones
+    decorated with torch.no_grad() and Griffin-Lim.
+
+    Args:
+        inference: Vocoder inference function which converts the features
+            (T_feats, in_channels) into the waveform (T_wav,) or (T_wav, C).
+        in_channels (int): Number of the channels of the features.
+        max_frames (int): Maximum number of frames used for the measurement.
+        device: Device of the features.
+        dtype: Data type of the features.
+        seed (int): Random seed.
+
+    Returns:
+        Tuple[int, int]: The numbers of the left and right context frames
+            which affect the output of a frame.
+
+    """
+    num_frames = 64
+    while True:
+        c = torch.randn(
+            num_frames, in_channels, generator=torch.Generator().manual_seed(seed)
+        ).to(device=device, dtype=dtype)
+        center = num_frames // 2
+        c_perturbed = c.clone()
+        c_perturbed[center] += 1.0
+
+        ys = []
+        for c_ in [c, c_perturbed]:
+            np_state = np.random.get_state()
+            with torch.random.fork_rng(devices=[]):
+                np.random.seed(seed)
+                torch.manual_seed(seed)
+                y = inference(c_)
+            np.random.set_state(np_state)
+            ys.append(torch.as_tensor(y).float().reshape(len(y), -1))
+        upsample_factor = round(len(ys[0]) / num_frames)
+        diff = (ys[0] - ys[1]).abs().max(dim=1).values
+        changed = torch.nonzero(diff > 1e-5 * ys[0].abs().max()).view(-1)
+        if len(changed) == 0:
+            return 0, 0
+        left = center - int(changed.min()) // upsample_factor
+        right = int(changed.max()) // upsample_factor - center
+        if left < center and right < num_frames - center - 1:
+            return left, right
+        if num_frames * 2 > max_frames:
+            logging.warning(
+                "The receptive field of the vocoder exceeds "
+                f"{num_frames // 2} frames. Use it as the context."
+            )
+            return left, right
+        num_frames *= 2
+
+
+class StreamingVocoder:
+    """Vocoder wrapper to convert the features into the waveform chunk by chunk.
+
+    Each chunk is converted together with the context frames on both sides, which
+    are determined from the receptive field of the vocoder by default, and the
+    samples of the context are discarded. With the context covering the receptive
+    field, the concatenated chunks are identical to the output of the whole
+    sequence for the deterministic vocoders (e.g., HiFiGAN and MelGAN). The chunks
+    can be overlapped with `crossfade` frames to smooth the boundaries of the
+    vocoders which sample noise or whose receptive field is truncated.
+
+    Examples:
+        >>> vocoder = HiFiGANGenerator()
+        >>> streaming_vocoder = StreamingVocoder(vocoder.inference, 80, chunk_size=32)
+        >>> for wav in streaming_vocoder(feats):  # (T_feats, 80)
+        ...     play(wav)
+
+    """
+
+    def __init__(
+        self,
+        inference: Callable[[torch.Tensor], torch.Tensor],
+        in_channels: int,
+        chunk_size: int = 32,
+        context: Optional[Tuple[int, int]] = None,
+        crossfade: int = 0,
+        max_context: int = 512,
+        device: Union[str, torch.device] = "cpu",
+        dtype: torch.dtype = torch.float32,
+    ):
+        """Initialize StreamingVocoder.
+
+        Args:
+            inference: Vocoder inference function which converts the features
+                (T_feats, in_channels) into the waveform (T_wav,) or (T_wav, C).
+            in_channels (int): Number of the channels of the features.
+            chunk_size (int): Number of the frames of each chunk.
+            context (Optional[Tuple[int, int]]): Numbers of the left and right
+                context frames. If None, estimated from the receptive field.
+            crossfade (int): Number of the frames to crossfade between the chunks.
+            max_context (int): Maximum number of the context frames on each side
+                used in the estimation of the receptive field.
+            device: Device of the features.
+            dtype: Data type of the features.
+
+        """
+        assert chunk_size > 0, chunk_size
+        assert 0 <= crossfade <= chunk_size, (crossfade, chunk_size)
+        self.inference = inference
+        self.chunk_size = chunk_size
+        self.crossfade = crossfade
+        if context is None:
+            context = estimate_receptive_field(
+                inference,
+                in_channels,
+                max_frames=2 * max_context,
+                device=device,
+                dtype=dtype,
+            )
+            logging.info(f"Context frames of the streaming vocoder: {context}")
+        self.left_context, self.right_context = context
+
+    def __call__(
+        self, feats: Union[torch.Tensor, Iterable[torch.Tensor]]
+    ) -> Iterator[torch.Tensor]:
+        """Convert the features into the waveform chunk by chunk.
+
+        Args:
+            feats: Feature tensor (T_feats, in_channels) or iterable of the chunks
+                of the features, e.g., from the incremental acoustic model.
+
+        Yields:
+            Tensor: Waveform chunk (T_chunk_wav,) or (T_chunk_wav, C).
+
+        """
+        if isinstance(feats, torch.Tensor):
+            feats = feats.split(self.chunk_size)
+
+        # buffer of the received frames starting from the frame index buf_start
+        buf, buf_start = None, 0
+        # number of the emitted frames and the tail of the last chunk
+        start, tail = 0, None
+        for chunk in feats:
+            buf = chunk if buf is None else torch.cat([buf, chunk])
+            while (
+                buf_start + len(buf)
+                >= start + self.chunk_size + self.crossfade + self.right_context
+            ):
+                wav, tail = self._vocode(buf, buf_start, start, tail, final=False)
+                yield wav
+                start += self.chunk_size
+                # drop the frames which are no longer needed
+                drop = max(start - self.left_context - buf_start, 0)
+                buf, buf_start = buf[drop:], buf_start + drop
+
+        # flush the remaining frames
+        while buf is not None and start < buf_start + len(buf):
+            final = start + self.chunk_size >= buf_start + len(buf)
+            wav, tail = self._vocode(buf, buf_start, start, tail, final=final)
+            yield wav
+            start += self.chunk_size
+
+    def _vocode(
+        self,
+        buf: torch.Tensor,
+        buf_start: int,
+        start: int,
+        tail: Optional[torch.Tensor],
+        final: bool,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
+        buf_end = buf_start + len(buf)
+        end = min(start + self.chunk_size, buf_end)
+        tail_end = end if final else min(end + self.crossfade, buf_end)
+        c_start = max(start - self.left_context, buf_start)
+        c_end = min(tail_end + self.right_context, buf_end)
+        wav = torch.as_tensor(
+            self.inference(buf[c_start - buf_start : c_end - buf_start])
+        )
+        upsample_factor = round(len(wav) / (c_end - c_start))
+
+        # discard the context and keep the tail to crossfade with the next chunk
+        offset = (start - c_start) * upsample_factor
+        wav, next_tail = (
+            wav[offset : offset + (end - start) * upsample_factor],
+            wav[
+                offset
+                + (end - start) * upsample_factor : offset
+                + (tail_end - start) * upsample_factor
+            ],
+        )
+        if tail is not None and len(tail) > 0:
+            n = min(len(tail), len(wav))
+            w = torch.linspace(0.0, 1.0, n + 2, device=wav.device, dtype=wav.dtype)
+            w = w[1:-1].view(-1, *([1] * (wav.dim() - 1)))
+            wav = torch.cat([tail[:n] * (1 - w) + wav[:n] * w, wav[n:]])
+        return wav, next_tail
@@ -2,15 +2,17 @@ import logging
 import re
 from collections import defaultdict
 from copy import deepcopy
+from functools import partial
 from math import inf
 from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 import torch
+from torch.utils.data import DataLoader, IterableDataset, default_collate
 from typeguard import typechecked
 
 from espnet2.iterators.abs_iter_factory import AbsIterFactory
-from espnet2.iterators.sequence_iter_factory import SequenceIterFactory
+from espnet2.iterators.sequence_iter_factory import SequenceIterFactory, worker_init_fn
 from espnet2.samplers.abs_sampler import AbsSampler
 
 DEFAULT_EXCLUDED_KEY_PREFIXES = ("utt2category", "utt2fs")
@@ -33,6 +35,12 @@ class ChunkIterFactory(AbsIterFactory):
       because IterFactory doesn't be given to the length information.
     - Since the first reason, "num_iters_per_epoch" can't be implemented
       for this iterator. Instead of it, "num_samples_per_epoch" is implemented.
+    - If "chunk_in_workers" is True and "num_workers" > 0, the samples are
+      split between the DataLoader workers, and each worker loads, chunks and
+      shuffles its own samples with a cache of "num_cache_chunks // num_workers"
+      chunks. The mini-batches are prefetched by the DataLoader,
+      so the training process doesn't wait for the chunking.
+      Note that the order of the mini-batches differs from the default mode.
 
     """
 
@@ -55,6 +63,7 @@ class ChunkIterFactory(AbsIterFactory):
         discard_short_samples: bool = True,
         default_fs: Optional[int] = None,
         chunk_max_abs_length: Optional[int] = None,
+        chunk_in_workers: bool = False,
     ):
         assert all(len(x) == 1 for x in batches), "batch-size must be 1"
 
@@ -107,6 +116,10 @@ class ChunkIterFactory(AbsIterFactory):
         # Whether to discard samples that shorter than the shortest chunk length
         self.discard_short_samples = discard_short_samples
         self.collate_fn = collate_fn
+        self.dataset = dataset
+        self.num_workers = num_workers
+        self.pin_memory = pin_memory
+        self.chunk_in_workers = chunk_in_workers
 
         # keys that satisfy either condition below will be excluded from the length
         # consistency check:
@@ -133,12 +146,38 @@ class ChunkIterFactory(AbsIterFactory):
         epoch: int,
         shuffle: Optional[bool] = None,
     ) -> Iterator[Tuple[List[str], Dict[str, torch.Tensor]]]:
-        per_sample_loader = self.per_sample_iter_factory.build_iter(epoch, shuffle)
-
         if shuffle is None:
             shuffle = self.shuffle
+
+        if self.chunk_in_workers and self.num_workers > 0:
+            dataset = _ChunkIterableDataset(
+                self,
+                self.per_sample_iter_factory.generate_batches(epoch, shuffle),
+                epoch,
+                shuffle,
+            )
+            # NOTE: The mini-batches are already made in the workers
+            return DataLoader(
+                dataset=dataset,
+                batch_size=None,
+                num_workers=self.num_workers,
+                pin_memory=self.pin_memory,
+                worker_init_fn=partial(worker_init_fn, base_seed=epoch + self.seed),
+            )
+
+        per_sample_loader = self.per_sample_iter_factory.build_iter(epoch, shuffle)
         state = np.random.RandomState(epoch + self.seed)
+        return self._generate_chunks(
+            per_sample_loader, shuffle, state, self.num_cache_chunks
+        )
 
+    def _generate_chunks(
+        self,
+        per_sample_loader: Iterator[Tuple[List[str], Dict[str, torch.Tensor]]],
+        shuffle: bool,
+        state: np.random.RandomState,
+        num_cache_chunks: int,
+    ) -> Iterator[Tuple[List[str], Dict[str, torch.Tensor]]]:
         # NOTE(kamo):
         #   This iterator supports multiple chunk lengths and
         #   keep chunks for each lengths here until collecting specified numbers
@@ -239,7 +278,7 @@ class ChunkIterFactory(AbsIterFactory):
                     cache_chunks[k] += [v for _ in range(N)]
             cache_id_list += [id_ for _ in range(N)]
 
-            if len(cache_id_list) > self.num_cache_chunks:
+            if len(cache_id_list) > num_cache_chunks:
                 cache_id_list, cache_chunks = yield from self._generate_mini_batches(
                     cache_id_list,
                     cache_chunks,
@@ -302,3 +341,51 @@ class ChunkIterFactory(AbsIterFactory):
             batches = {k: v[bs:] for k, v in batches.items()}
 
         return id_list, batches
+
+
+class _ChunkIterableDataset(IterableDataset):
+    """Generate the chunked mini-batches of ChunkIterFactory in each worker.
+
+    The samples are split between the workers in round-robin,
+    and each worker uses its own random state and cache of chunks.
+    """
+
+    def __init__(
+        self,
+        factory: ChunkIterFactory,
+        batches: List[List[str]],
+        epoch: int,
+        shuffle: bool,
+    ):
+        self.factory = factory
+        self.batches = batches
+        self.epoch = epoch
+        self.shuffle = shuffle
+
+    def _iter_samples(self, batches: List[List[str]]):
+        dataset = self.factory.dataset
+        collate_fn = self.factory.collate_fn
+        if collate_fn is None:
+            collate_fn = default_collate
+        for batch in batches:
+            yield collate_fn([dataset[key] for key in batch])
+
+    def __iter__(self):
+        worker_info = torch.utils.data.get_worker_info()
+        if worker_info is None:
+            worker_id, num_workers = 0, 1
+        else:
+            worker_id, num_workers = worker_info.id, worker_info.num_workers
+
+        state = np.random.RandomState(
+            [self.epoch + self.factory.seed, worker_id, num_workers]
+        )
+        num_cache_chunks = max(
+            self.factory.num_cache_chunks // num_workers, self.factory.batch_size
+        )
+        return self.factory._generate_chunks(
+            self._iter_samples(self.batches[worker_id::num_workers]),
+            self.shuffle,
+            state,
+            num_cache_chunks,
+        )
@@ -32,6 +32,24 @@ class RawSampler(AbsSampler):
         return list(self.batches)
 
 
+class EpochBatchSampler:
+    """Batch sampler whose batches are replaced at each epoch.
+
+    A DataLoader with persistent workers keeps the same batch sampler object,
+    so the batches of the new epoch are set to it instead of building
+    a new DataLoader.
+    """
+
+    def __init__(self, batches=()):
+        self.batches = list(batches)
+
+    def __len__(self):
+        return len(self.batches)
+
+    def __iter__(self):
+        return iter(self.batches)
+
+
 class SequenceIterFactory(AbsIterFactory):
     """Build iterator for each epoch.
 
@@ -40,6 +58,11 @@ class SequenceIterFactory(AbsIterFactory):
       guarantees reproducibility when resuming from middle of training process.
     - Enable to restrict the number of samples for one epoch. This features
       controls the interval number between training and evaluation.
+    - If "persistent_workers" is True and "num_workers" > 0, the DataLoader
+      is built only once and its workers are kept alive between epochs,
+      so that the dataset isn't pickled again and its caches are kept.
+      Only the batches are replaced for each epoch. Note that the random seed
+      of the workers is set only once in this mode.
 
     """
 
@@ -55,6 +78,7 @@ class SequenceIterFactory(AbsIterFactory):
         num_workers: int = 0,
         collate_fn=None,
         pin_memory: bool = False,
+        persistent_workers: bool = False,
     ):
 
         if not isinstance(batches, AbsSampler):
@@ -71,8 +95,43 @@ class SequenceIterFactory(AbsIterFactory):
         self.collate_fn = collate_fn
         # https://discuss.pytorch.org/t/what-is-the-disadvantage-of-using-pin-memory/1702
         self.pin_memory = pin_memory
+        self.persistent_workers = persistent_workers and num_workers > 0
+        self.loader = None
+        self.batch_sampler = None
 
     def build_iter(self, epoch: int, shuffle: bool = None) -> DataLoader:
+        batches = self.generate_batches(epoch, shuffle)
+
+        if self.persistent_workers:
+            if self.loader is None:
+                self.batch_sampler = EpochBatchSampler()
+                self.loader = self._build_loader(self.batch_sampler, epoch)
+            # NOTE: The sampler is iterated in the main process,
+            #   so the workers load the batches of the new epoch.
+            self.batch_sampler.batches = batches
+            return self.loader
+
+        return self._build_loader(batches, epoch)
+
+    def _build_loader(self, batches, epoch: int) -> DataLoader:
+        # For backward compatibility for pytorch DataLoader
+        if self.collate_fn is not None:
+            kwargs = dict(collate_fn=self.collate_fn)
+        else:
+            kwargs = {}
+
+        return DataLoader(
+            dataset=self.dataset,
+            batch_sampler=batches,
+            num_workers=self.num_workers,
+            pin_memory=self.pin_memory,
+            worker_init_fn=partial(worker_init_fn, base_seed=epoch + self.seed),
+            persistent_workers=self.persistent_workers,
+            **kwargs,
+        )
+
+    def generate_batches(self, epoch: int, shuffle: bool = None) -> list:
+        """Return the list of mini-batches (lists of keys) for the epoch."""
         if shuffle is None:
             shuffle = self.shuffle
 
@@ -137,12 +196,6 @@ class SequenceIterFactory(AbsIterFactory):
             if shuffle:
                 np.random.RandomState(epoch + self.seed).shuffle(batches)
 
-        # For backward compatibility for pytorch DataLoader
-        if self.collate_fn is not None:
-            kwargs = dict(collate_fn=self.collate_fn)
-        else:
-            kwargs = {}
-
         # reshuffle whole 'batches' so that elements within a batch can move
         # between different batches
         if self.shuffle_within_batch:
@@ -155,11 +208,4 @@ class SequenceIterFactory(AbsIterFactory):
             batches = _batches
             del _batches
 
-        return DataLoader(
-            dataset=self.dataset,
-            batch_sampler=batches,
-            num_workers=self.num_workers,
-            pin_memory=self.pin_memory,
-            worker_init_fn=partial(worker_init_fn, base_seed=epoch + self.seed),
-            **kwargs,
-        )
+        return batches
@@ -0,0 +1,541 @@
+"""Continuous batching of the SpeechLM inference requests."""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from espnet2.speechlm.core_lm.abs_core_lm import AbsCoreLM, SpeechLMInferenceOptions
+from espnet2.speechlm.core_lm.ar_multiscale import MultiScaleLM
+from espnet2.speechlm.core_lm.valle import ValleLM
+from espnet2.speechlm.net_utils import install_kv_cache_hook, logits_to_tokens
+
+
+class SpeechLMRequest:
+    """Inference request of ContinuousBatchingScheduler.
+
+    Args:
+        prefix (LongTensor): Prefix part of dec_seq (T, nq).
+        suffix (LongTensor): Suffix part of dec_seq (T, nq),
+            usually the target sequence for teacher-forcing.
+        key (str): Identifier of the request, e.g., the example name.
+    """
+
+    def __init__(
+        self,
+        prefix: torch.Tensor,
+        suffix: Optional[torch.Tensor] = None,
+        key: Optional[str] = None,
+    ):
+        self.prefix = prefix
+        self.suffix = suffix
+        self.key = key
+
+        self.tokens: Optional[List[torch.Tensor]] = None
+        self.scores: Optional[List[torch.Tensor]] = None
+        self.submit_time = time.perf_counter()
+        self.first_token_time: Optional[float] = None
+        self.finish_time: Optional[float] = None
+
+        self._samples = {}
+        self._num_running = 0
+        self._error: Optional[BaseException] = None
+        self._done = threading.Event()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def result(
+        self, timeout: Optional[float] = None
+    ) -> Tuple[List[torch.Tensor], List[torch.Tensor]]:
+        """Wait for the request to finish and return the results.
+
+        Returns:
+            List[LongTensor]: Generated tokens (T, nq) of the finished samples.
+                Samples which don't finish in the maximum length are discarded.
+            List[Tensor]: Scores (T, nq) of the generated tokens.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"The request {self.key} is not finished")
+        if self._error is not None:
+            raise self._error
+        return self.tokens, self.scores
+
+    @property
+    def latency(self) -> float:
+        return self.finish_time - self.submit_time
+
+    @property
+    def first_token_latency(self) -> float:
+        return self.first_token_time - self.submit_time
+
+    def _finish(self, error: Optional[BaseException] = None):
+        indices = sorted(self._samples)
+        self.tokens = [self._samples[i][0] for i in indices]
+        self.scores = [self._samples[i][1] for i in indices]
+        self.finish_time = time.perf_counter()
+        self._error = error
+        self._done.set()
+
+
+class _Sequence:
+    """An active sample of a request, which occupies a slot of the batch."""
+
+    def __init__(self, request: SpeechLMRequest, index: int, prev_tok: torch.Tensor):
+        self.request = request
+        self.index = index
+        self.prev_tok = prev_tok
+        self.tokens = []
+        self.scores = []
+
+    @property
+    def step(self) -> int:
+        return len(self.tokens)
+
+
+class ContinuousBatchingScheduler:
+    """Continuous batching scheduler of the auto-regressive SpeechLM inference.
+
+    The scheduler keeps a pool of at most max_batch_size active sequences and
+    runs the auto-regressive decoding steps of them as a batch. Unlike the
+    static batching, the sequences have independent lengths: each sequence stops
+    at its own <sos/eos> (or the maximum length) and the new requests are
+    admitted to the freed slots in the next step, so the batch stays full while
+    there are waiting requests.
+
+    The keys and values of the sequences are stored in the pooled buffers
+    (max_batch_size, T_max, D) of each attention layer, in which each sequence
+    has its own length, and the padded frames are masked in the attention.
+    The buffers are zero-initialized: a masked frame still has to be finite, as
+    a NaN in it makes the attention output NaN.
+    The prefix of a request is forwarded once and its cache is copied to
+    the nbest slots of the samples. The finished slots are refilled by moving
+    the last active sequence, so that the active sequences are always the first
+    rows of the buffers.
+
+    ValleLM and MultiScaleLM are supported. For ValleLM, the NAR stage of each
+    sample runs once it finishes the AR stage.
+
+    Examples:
+        >>> scheduler = ContinuousBatchingScheduler(corelm, opts, max_batch_size=8)
+        >>> requests = [scheduler.submit(prefix) for prefix in prefixes]
+        >>> scheduler.run()
+        >>> tokens, scores = requests[0].result()
+
+        Or serve the requests in the background thread:
+        >>> scheduler.start()
+        >>> tokens, scores = scheduler.submit(prefix).result()
+        >>> scheduler.stop()
+
+    """
+
+    def __init__(
+        self,
+        corelm: AbsCoreLM,
+        opts: SpeechLMInferenceOptions,
+        max_batch_size: int = 8,
+    ):
+        if isinstance(corelm, ValleLM):
+            self.decoder = corelm.ar_decoder
+        elif isinstance(corelm, MultiScaleLM):
+            self.decoder = corelm.g_decoders
+        else:
+            raise NotImplementedError(
+                f"Continuous batching is not supported for {type(corelm).__name__}"
+            )
+        if opts.nbest > max_batch_size:
+            raise ValueError(
+                f"nbest ({opts.nbest}) should not exceed "
+                f"max_batch_size ({max_batch_size})"
+            )
+
+        self.corelm = corelm
+        self.opts = opts
+        self.max_batch_size = max_batch_size
+
+        self.queue = queue.Queue()
+        self.waiting = deque()
+        self.active: List[_Sequence] = []
+        self.num_steps = 0
+
+        # key/value projection -> pooled buffer (max_batch_size, T_max, D)
+        self.buffers = {}
+        self.lengths = torch.zeros(max_batch_size, dtype=torch.long, device=opts.device)
+
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    @property
+    def num_waiting(self) -> int:
+        """Number of the requests which are not admitted yet."""
+        return self.queue.qsize() + len(self.waiting)
+
+    @property
+    def idle(self) -> bool:
+        return self.num_waiting == 0 and len(self.active) == 0
+
+    def submit(
+        self,
+        prefix: torch.Tensor,
+        suffix: Optional[torch.Tensor] = None,
+        key: Optional[str] = None,
+    ) -> SpeechLMRequest:
+        """Submit an inference request.
+
+        Args:
+            prefix (LongTensor): Prefix part of dec_seq (T, nq).
+            suffix (LongTensor): Suffix part of dec_seq (T, nq),
+                required for teacher-forcing.
+            key (str): Identifier of the request.
+
+        Returns:
+            SpeechLMRequest: The request, whose results are available by
+                SpeechLMRequest.result() after it finishes.
+        """
+        assert prefix.dim() == 2, prefix.size()
+        if self.opts.search_algo == "teacher_force" and suffix is None:
+            raise ValueError("suffix is required for teacher_force")
+        request = SpeechLMRequest(prefix, suffix, key)
+        self.queue.put(request)
+        return request
+
+    @torch.no_grad()
+    def step(self) -> List[SpeechLMRequest]:
+        """Admit the waiting requests and run a decoding step of the batch.
+
+        Returns:
+            List[SpeechLMRequest]: The requests which finish in this step.
+        """
+        self._admit()
+        if len(self.active) == 0:
+            return []
+        return self._decode()
+
+    def run(self) -> List[SpeechLMRequest]:
+        """Run the decoding steps until all the submitted requests finish.
+
+        Returns:
+            List[SpeechLMRequest]: The finished requests in the finishing order.
+        """
+        finished = []
+        while not self.idle:
+            finished.extend(self.step())
+        return finished
+
+    def start(self):
+        """Start to serve the submitted requests in a background thread."""
+        assert self._thread is None, "The scheduler is already started"
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after the current step."""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def _serve(self):
+        while not self._stop_event.is_set():
+            if self.idle:
+                try:
+                    self.waiting.append(self.queue.get(timeout=0.1))
+                except queue.Empty:
+                    continue
+            try:
+                self.step()
+            except Exception as e:
+                logging.exception("SpeechLM inference failed")
+                self._fail_all(e)
+
+    def _fail_all(self, error: BaseException):
+        self._admit_queue()
+        requests = {id(seq.request): seq.request for seq in self.active}
+        requests.update({id(request): request for request in self.waiting})
+        self.waiting.clear()
+        for request in requests.values():
+            request._finish(error)
+        self.active = []
+
+    def _admit_queue(self):
+        while True:
+            try:
+                self.waiting.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def _admit(self):
+        self._admit_queue()
+        while (
+            len(self.waiting) > 0
+            and len(self.active) + self.opts.nbest <= self.max_batch_size
+        ):
+            self._prefill(self.waiting.popleft())
+
+    def _reserve(self, length: int):
+        """Make the buffers hold at least length frames."""
+        for module, buffer in self.buffers.items():
+            if buffer.size(1) < length:
+                new_buffer = buffer.new_zeros(
+                    buffer.size(0), max(2 * buffer.size(1), length), buffer.size(2)
+                )
+                new_buffer[:, : buffer.size(1)] = buffer
+                self.buffers[module] = new_buffer
+
+    def _prefill(self, request: SpeechLMRequest):
+        opts = self.opts
+        prefix = request.prefix.to(opts.device)
+        if opts.search_algo == "teacher_force":
+            request.suffix = request.suffix.to(opts.device)
+            minlen = maxlen = request.suffix.size(0)
+        else:
+            minlen = int(len(prefix) * opts.minlenratio) if opts.minlenratio > 0 else 0
+            maxlen = int(len(prefix) * opts.maxlenratio)
+        request._minlen, request._maxlen = minlen, maxlen
+
+        # (1) forward the prefix once for all the samples
+        prefix_emb = self.corelm.emb(prefix.unsqueeze(0)).sum(dim=2)  # [1, T, D]
+        cache, hooks = install_kv_cache_hook(self.decoder, {})
+        _ = self.decoder(prefix_emb, kv_cache=cache)
+        for hook in hooks:
+            hook.remove()
+        request._prefix_emb = prefix_emb
+
+        # (2) copy the prefix cache to the slots of the samples
+        length = prefix_emb.size(1)
+        for module, value in cache.items():
+            if module not in self.buffers:
+                self.buffers[module] = value.new_zeros(
+                    self.max_batch_size, length + maxlen + 1, value.size(2)
+                )
+        self._reserve(length + 1)
+
+        nq = 1 if isinstance(self.corelm, ValleLM) else opts.nq
+        start = torch.full((nq,), opts.start, dtype=torch.long, device=opts.device)
+        for index in range(opts.nbest):
+            slot = len(self.active)
+            for module, value in cache.items():
+                self.buffers[module][slot, :length] = value[0]
+            self.lengths[slot] = length
+            self.active.append(_Sequence(request, index, start))
+        request._num_running = opts.nbest
+
+    def _decode(self) -> List[SpeechLMRequest]:
+        opts = self.opts
+        batch_size = len(self.active)
+        lengths = self.lengths[:batch_size]
+        max_length = int(lengths.max()) + 1
+        self._reserve(max_length)
+        batch_idx = torch.arange(batch_size, device=opts.device)
+
+        # (1) global/AR decoder forward of the batch with the pooled cache
+        def save_to_pool(module, _, output):
+            buffer = self.buffers[module]
+            buffer[batch_idx, lengths] = output[:, 0]
+            return buffer[:batch_size, :max_length]
+
+        hooks = [module.register_forward_hook(save_to_pool) for module in self.buffers]
+        prev_tok = torch.stack([seq.prev_tok for seq in self.active])  # [B, nq]
+        prev_emb = self.corelm.emb(prev_tok.unsqueeze(1)).sum(dim=2)  # [B, 1, D]
+        # True is to attend, [B, 1, 1, T]
+        mask = torch.arange(max_length, device=opts.device) <= lengths.unsqueeze(1)
+        try:
+            hidden = self.decoder(
+                prev_emb, mask=mask[:, None, None], pos=lengths.unsqueeze(1)
+            )  # [B, 1, D]
+        finally:
+            for hook in hooks:
+                hook.remove()
+        lengths += 1
+        self.num_steps += 1
+
+        # (2) predict the tokens with per-sequence eos masks
+        steps = [seq.step for seq in self.active]
+        allow_eos = torch.tensor(
+            [step >= seq.request._minlen for step, seq in zip(steps, self.active)],
+            device=opts.device,
+        )
+        if opts.search_algo == "teacher_force":
+            target = torch.stack(
+                [seq.request.suffix[step] for step, seq in zip(steps, self.active)]
+            )  # [B, nq]
+        else:
+            target = None
+
+        if isinstance(self.corelm, ValleLM):
+            logits = self.corelm.lm_head(hidden)  # [B, 1, V]
+            gen_tok, gen_score = logits_to_tokens(
+                logits.unsqueeze(2), opts, allow_eos=allow_eos, nq_level=0
+            )
+            gen_tok, gen_score = gen_tok[:, 0], gen_score[:, 0]  # [B, 1]
+            if target is not None:
+                target = target[:, :1]
+        else:
+            gen_tok, gen_score = self._local_inference(hidden, allow_eos, target)
+
+        prev_tok = gen_tok if target is None else target
+        finish = prev_tok[:, 0].eq(opts.eos).tolist()
+
+        # (3) update and retire the sequences
+        now = time.perf_counter()
+        finished, retired = [], []
+        for b, seq in enumerate(self.active):
+            seq.tokens.append(gen_tok[b])
+            seq.scores.append(gen_score[b])
+            seq.prev_tok = prev_tok[b]
+            request = seq.request
+            if request.first_token_time is None:
+                request.first_token_time = now
+
+            if finish[b] or seq.step >= request._maxlen:
+                if not finish[b]:
+                    logging.warning(
+                        f"A sample of {request.key} cannot finish in "
+                        f"{request._maxlen} steps. Consider increasing the maxlenratio"
+                    )
+                retired.append(b)
+                if self._finish(seq, valid=finish[b]):
+                    finished.append(request)
+
+        for b in reversed(retired):
+            last = len(self.active) - 1
+            if b != last:
+                length = int(self.lengths[last])
+                for buffer in self.buffers.values():
+                    buffer[b, :length] = buffer[last, :length]
+                self.lengths[b] = length
+                self.active[b] = self.active[last]
+            self.active.pop()
+
+        return finished
+
+    def _local_inference(
+        self,
+        g_hidden: torch.Tensor,
+        allow_eos: torch.Tensor,
+        target: Optional[torch.Tensor],
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Local loop of MultiScaleLM for the batch."""
+        opts = self.opts
+        l_cache, l_hooks = install_kv_cache_hook(
+            self.corelm.l_decoders, {}, max_len=opts.nq
+        )
+        l_generated = {"token": [], "score": []}
+        l_prev_emb = self.corelm.placeholder.tile(g_hidden.size(0), 1, 1)
+        for l_step in range(opts.nq):
+            l_hidden = self.corelm.l_decoders(l_prev_emb + g_hidden, kv_cache=l_cache)
+            logits = self.corelm.lm_head(l_hidden)
+            gen_tok, gen_score = logits_to_tokens(
+                logits.unsqueeze(2),
+                opts,
+                allow_eos=allow_eos if l_step == 0 else False,
+                nq_level=l_step,
+            )
+            gen_tok, gen_score = gen_tok[:, :, 0], gen_score[:, :, 0]  # [B, 1]
+
+            if target is not None:
+                l_prev_tok = target[:, l_step : l_step + 1]
+            else:
+                l_prev_tok = gen_tok
+            l_prev_emb = self.corelm.emb(l_prev_tok)
+
+            l_generated["token"].append(gen_tok)
+            l_generated["score"].append(gen_score)
+
+        for hook in l_hooks:
+            hook.remove()
+
+        gen_tokens = torch.cat(l_generated["token"], dim=1)  # [B, nq]
+        gen_scores = torch.cat(l_generated["score"], dim=1)
+        return gen_tokens, gen_scores
+
+    def _finish(self, seq: _Sequence, valid: bool) -> bool:
+        """Finalize a sample and return True if all the samples finish."""
+        request = seq.request
+        if valid:
+            tokens = torch.stack(seq.tokens)  # [T, nq]
+            scores = torch.stack(seq.scores)
+            if isinstance(self.corelm, ValleLM):
+                suffix = None
+                if self.opts.search_algo == "teacher_force":
+                    suffix = request.suffix[None, : len(tokens)]
+                nar_tokens, nar_scores = self.corelm.nar_inference(
+                    request._prefix_emb, tokens[None, :, 0], self.opts, suffix=suffix
+                )
+                tokens = torch.cat([tokens, nar_tokens[0]], dim=1)
+                scores = torch.cat([scores, nar_scores[0]], dim=1)
+            # exclude <sos/eos>
+            request._samples[seq.index] = (tokens[:-1], scores[:-1])
+
+        request._num_running -= 1
+        if request._num_running > 0:
+            return False
+        request._finish()
+        return True
+
+
+def summarize_requests(
+    requests: Sequence[SpeechLMRequest], elapsed: float
+) -> Dict[str, float]:
+    """Summarize the throughput and the latency of the finished requests.
+
+    Args:
+        requests (Sequence[SpeechLMRequest]): The finished requests.
+        elapsed (float): Elapsed time to process the requests in seconds.
+
+    Returns:
+        Dict[str, float]: The statistics.
+    """
+    latency = np.array([r.latency for r in requests])
+    first_token_latency = np.array(
+        [r.first_token_latency for r in requests if r.first_token_time is not None]
+    )
+    num_frames = sum(len(t) for r in requests for t in r.tokens)
+    return dict(
+        num_requests=len(requests),
+        num_frames=num_frames,
+        elapsed=elapsed,
+        requests_per_sec=len(requests) / elapsed,
+        frames_per_sec=num_frames / elapsed,
+        latency_mean=float(latency.mean()),
+        latency_p50=float(np.percentile(latency, 50)),
+        latency_p90=float(np.percentile(latency, 90)),
+        first_token_latency_mean=float(first_token_latency.mean()),
+    )
+
+
+def benchmark(
+    scheduler: ContinuousBatchingScheduler,
+    prefixes: Sequence[torch.Tensor],
+    suffixes: Optional[Sequence[torch.Tensor]] = None,
+) -> Dict[str, float]:
+    """Measure the throughput and the latency of the scheduler.
+
+    All the requests are submitted at once and processed until they finish,
+    i.e., the offline throughput and the latency under the full load.
+
+    Args:
+        scheduler (ContinuousBatchingScheduler): The scheduler.
+        prefixes (Sequence[LongTensor]): Prefixes of the requests (T, nq).
+        suffixes (Sequence[LongTensor]): Suffixes of the requests (T, nq).
+
+    Returns:
+        Dict[str, float]: The statistics, see summarize_requests.
+    """
+    if suffixes is None:
+        suffixes = [None] * len(prefixes)
+    start = time.perf_counter()
+    requests = [
+        scheduler.submit(prefix, suffix, key=str(i))
+        for i, (prefix, suffix) in enumerate(zip(prefixes, suffixes))
+    ]
+    scheduler.run()
+    stats = summarize_requests(requests, time.perf_counter() - start)
+    stats.update(num_steps=scheduler.num_steps)
+    return stats
@@ -154,16 +154,8 @@ class MultiScaleLM(AbsCoreLM):
         """
 
         # (1) global initialization
-        g_cache, g_hooks = install_kv_cache_hook(self.g_decoders, {})
-
-        # (2) Prefix forward
         prefix = prefix.expand(opts.nbest, -1, -1)
         suffix = suffix.expand(opts.nbest, -1, -1)
-        prefix_emb = self.emb(prefix).sum(2)
-        _ = self.g_decoders(prefix_emb, kv_cache=g_cache)
-
-        # (3) global loop
-        # (3.1) global initialization
         minlen = int(prefix.size(1) * opts.minlenratio) if opts.minlenratio > 0 else 0
         maxlen = int(prefix.size(1) * opts.maxlenratio)
         if opts.search_algo == "teacher_force":
@@ -171,6 +163,24 @@ class MultiScaleLM(AbsCoreLM):
             maxlen = suffix.size(1)
         logging.info(f"maxlen={maxlen}, minlen={minlen}, reflen={suffix.size(1)}")
 
+        # (2) Prefix forward
+        # The prefix is shared by all the samples, so it is processed only once.
+        g_cache, g_hooks = install_kv_cache_hook(self.g_decoders, {})
+        prefix_emb = self.emb(prefix[:1]).sum(2)
+        _ = self.g_decoders(prefix_emb, kv_cache=g_cache)
+        for hook in g_hooks:
+            hook.remove()
+
+        # The prefix cache is broadcast to the samples and copied into the static
+        # cache with the capacity of the prefix and all the global steps at the
+        # first step, i.e., copy-on-write.
+        g_cache = {k: v.expand(opts.nbest, -1, -1) for k, v in g_cache.items()}
+        g_cache, g_hooks = install_kv_cache_hook(
+            self.g_decoders, g_cache, max_len=prefix.size(1) + maxlen
+        )
+
+        # (3) global loop
+        # (3.1) global initialization
         finish_idx = torch.Tensor([-1]).expand(opts.nbest).long().to(opts.device)
 
         g_generated = {"token": [], "score": []}
@@ -185,7 +195,9 @@ class MultiScaleLM(AbsCoreLM):
             g_hidden = self.g_decoders(g_prev_emb, kv_cache=g_cache)  # [B, 1, D]
 
             # (3.2) local initialization
-            l_cache, l_hooks = install_kv_cache_hook(self.l_decoders, {})
+            l_cache, l_hooks = install_kv_cache_hook(
+                self.l_decoders, {}, max_len=opts.nq
+            )
 
             # (3.3) local loop
             l_generated = {"token": [], "score": []}
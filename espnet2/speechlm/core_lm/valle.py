@@ -164,16 +164,8 @@ class ValleLM(AbsCoreLM):
         """
 
         # (1) initialization
-        cache, hooks = install_kv_cache_hook(self.ar_decoder, {})
-
-        # (2) auto-regressive prefix forward on first code layer
         prefix = prefix.expand(opts.nbest, -1, -1)
         suffix = suffix.expand(opts.nbest, -1, -1)
-        prefix_emb = self.emb(prefix).sum(dim=2)  # [B, T, D]
-        _ = self.ar_decoder(prefix_emb, kv_cache=cache)
-
-        # (3) auto-regressive loop on first code layer
-        # (3.1) AR initialization
         minlen = int(prefix.size(1) * opts.minlenratio) if opts.minlenratio > 0 else 0
         maxlen = int(prefix.size(1) * opts.maxlenratio)
         if opts.search_algo == "teacher_force":
@@ -182,6 +174,25 @@ class ValleLM(AbsCoreLM):
             maxlen = suffix.size(1)
         logging.info(f"maxlen={maxlen}, minlen={minlen}, reflen={suffix.size(1)}")
 
+        # (2) auto-regressive prefix forward on first code layer
+        # The prefix is shared by all the samples, so it is processed only once.
+        cache, hooks = install_kv_cache_hook(self.ar_decoder, {})
+        prefix_emb = self.emb(prefix[:1]).sum(dim=2)  # [1, T, D]
+        _ = self.ar_decoder(prefix_emb, kv_cache=cache)
+        for hook in hooks:
+            hook.remove()
+        prefix_emb = prefix_emb.expand(opts.nbest, -1, -1)  # [B, T, D]
+
+        # The prefix cache is broadcast to the samples and copied into the static
+        # cache with the capacity of the prefix and all the AR steps at the first
+        # step, i.e., copy-on-write.
+        cache = {k: v.expand(opts.nbest, -1, -1) for k, v in cache.items()}
+        cache, hooks = install_kv_cache_hook(
+            self.ar_decoder, cache, max_len=prefix.size(1) + maxlen
+        )
+
+        # (3) auto-regressive loop on first code layer
+        # (3.1) AR initialization
         generated = {"token": [], "score": []}
         finish_idx = torch.Tensor([-1]).expand(opts.nbest).long().to(opts.device)
         prev_tok = torch.Tensor([opts.start]).tile(opts.nbest, 1).long().to(opts.device)
@@ -197,7 +208,7 @@ class ValleLM(AbsCoreLM):
                 nq_level=0,
             )
             # [B, 1, 1] -> [B, 1]
-            gen_tok, gen_score = gen_tok.squeeze(2), gen_tok.squeeze(2)
+            gen_tok, gen_score = gen_tok.squeeze(2), gen_score.squeeze(2)
 
             generated["token"].append(gen_tok)
             generated["score"].append(gen_score)
@@ -221,11 +232,11 @@ class ValleLM(AbsCoreLM):
 
         # (3.4) finalize auto-regressive
         valid_idx = finish_idx.ne(-1).nonzero(as_tuple=True)[0]
-        if len(valid_idx) < prefix.size(0):
-            logging.info(f"Only {len(valid_idx)} of {prefix.size(0)} are valid")
-        elif len(valid_idx) == 0:
+        if len(valid_idx) == 0:
             logging.warning("No valid examples. Return None")
             return None, None
+        elif len(valid_idx) < prefix.size(0):
+            logging.info(f"Only {len(valid_idx)} of {prefix.size(0)} are valid")
 
         finish_idx = finish_idx[valid_idx]
         prefix_emb, suffix = prefix_emb[valid_idx], suffix[valid_idx]
@@ -241,22 +252,65 @@ class ValleLM(AbsCoreLM):
         cache = {}
 
         # (4) non-auto-regressive loop on the remained code layers
-        # (4.1) NAR initialization
+        gen_tokens_nar, gen_scores_nar = self.nar_inference(
+            prefix_emb, gen_tokens_ar[:, :, 0], opts, suffix=suffix
+        )
+
+        # (5) combine AR and NAR results
+        gen_tokens = torch.cat([gen_tokens_ar, gen_tokens_nar], dim=2)  # [B, T, nq]
+        gen_scores = torch.cat([gen_scores_ar, gen_scores_nar], dim=2)
+
+        gen_tokens_list, gen_scores_list = [], []
+        for b in range(len(valid_idx)):
+            gen_tokens_list.append(gen_tokens[b][: finish_idx[b]])
+            gen_scores_list.append(gen_scores[b][: finish_idx[b]])
+
+        return gen_tokens_list, gen_scores_list
+
+    @torch.no_grad()
+    def nar_inference(
+        self,
+        prefix_emb: torch.Tensor,
+        ar_tokens: torch.Tensor,
+        opts: SpeechLMInferenceOptions,
+        suffix: torch.Tensor = None,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Vall-E NAR Inference of the remained code layers.
+
+        Args:
+            prefix_emb (Tensor): Embedding of the prefix part of dec_seq (B, T_p, D).
+            ar_tokens (LongTensor): Generated tokens of the first code layer
+                (B, T), including <sos/eos>.
+            opts (SpeechLMInferenceOptions): inference options.
+            suffix (LongTensor): suffix part of dec_seq (B, T, nq),
+                usually the target sequence for teacher-forcing.
+
+        Returns:
+            LongTensor: Generated tokens of the remained code layers (B, T, nq - 1).
+            Tensor: Scores of the generated tokens (B, T, nq - 1).
+        """
+        # (1) NAR initialization
         if opts.search_algo == "teacher_force":
             prev_tok = suffix[:, :, 0]
         else:
-            prev_tok = gen_tokens_ar[:, :, 0]
-        start_emb = self.emb.weight[opts.start].tile(opts.nbest, 1, 1)  # [B, 1, D]
+            prev_tok = ar_tokens
+        prefix_len = prefix_emb.size(1)
+        start_emb = self.emb.weight[opts.start].tile(
+            prefix_emb.size(0), 1, 1
+        )  # [B, 1, D]
         prev_emb = torch.cat(
             [prefix_emb[:, 1:], start_emb, self.emb(prev_tok)], dim=1
         )  # [B, T, D]
 
-        ones = torch.ones_like(valid_idx)
+        level_idx = torch.ones(
+            prefix_emb.size(0), dtype=torch.long, device=prefix_emb.device
+        )
         generated = {"token": [], "score": []}
-        # (4.2) NAR loop
+        # (2) NAR loop
         for step in range(1, opts.nq):
-            h_nar = self.nar_decoder(prev_emb, ones * step - 1)  # [B, T, D]
-            logits = self.lm_head(h_nar)  # [B, T, V]
+            h_nar = self.nar_decoder(prev_emb, level_idx * step - 1)  # [B, T, D]
+            # only the tokens after the prefix are predicted
+            logits = self.lm_head(h_nar[:, prefix_len:])  # [B, T, V]
             gen_tok, gen_score = logits_to_tokens(
                 logits.unsqueeze(2),
                 opts,
@@ -265,26 +319,16 @@ class ValleLM(AbsCoreLM):
             )
             gen_tok, gen_score = gen_tok.squeeze(2), gen_score.squeeze(2)  # [B, T]
 
-            generated["token"].append(gen_tok[:, prefix.size(1) :])
-            generated["score"].append(gen_score[:, prefix.size(1) :])
+            generated["token"].append(gen_tok)
+            generated["score"].append(gen_score)
 
             if opts.search_algo == "teacher_force":
                 prev_tok = suffix[:, :, step]
             else:
                 prev_tok = gen_tok
-            prev_emb[:, prefix.size(1) :] += self.emb(prev_tok)  # [B, T, D]
-            prev_emb[:, prefix.size(1) - 1 : prefix.size(1)] += start_emb
-
-        # (5) combine AR and NAR results
-        gen_tokens_nar = torch.stack(generated["token"], dim=2)  # [B, T, nq]
-        gen_scores_nar = torch.stack(generated["score"], dim=2)
-
-        gen_tokens = torch.cat([gen_tokens_ar, gen_tokens_nar], dim=2)  # [B, T, nq]
-        gen_scores = torch.cat([gen_scores_ar, gen_scores_nar], dim=2)
+            prev_emb[:, prefix_len:] += self.emb(prev_tok)  # [B, T, D]
+            prev_emb[:, prefix_len - 1 : prefix_len] += start_emb
 
-        gen_tokens_list, gen_scores_list = [], []
-        for b in range(len(valid_idx)):
-            gen_tokens_list.append(gen_tokens[b][: finish_idx[b]])
-            gen_scores_list.append(gen_scores[b][: finish_idx[b]])
-
-        return gen_tokens_list, gen_scores_list
+        gen_tokens = torch.stack(generated["token"], dim=2)  # [B, T, nq - 1]
+        gen_scores = torch.stack(generated["score"], dim=2)
+        return gen_tokens, gen_scores
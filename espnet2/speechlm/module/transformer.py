@@ -81,14 +81,16 @@ class MultiHeadAttention(nn.Module):
     def qkv_attention(
         self, q: Tensor, k: Tensor, v: Tensor, mask: Optional[Tensor] = None
     ):
-        if self.causal and mask is not None:
-            raise ValueError("mask is not allowed when the attention is causal")
-
         if self.causal and q.size(1) == k.size(1):
             causal = True
         else:
             causal = False
 
+        # mask is only allowed in incremental decoding when the attention is causal,
+        # e.g., to mask the padded cache of the sequences with different lengths.
+        if causal and mask is not None:
+            raise ValueError("mask is not allowed when the attention is causal")
+
         q = q.view(*q.shape[:2], self.n_head, -1).permute(0, 2, 1, 3)
         k = k.view(*k.shape[:2], self.n_head, -1).permute(0, 2, 1, 3)
         v = v.view(*v.shape[:2], self.n_head, -1).permute(0, 2, 1, 3)
@@ -162,13 +164,22 @@ class TransformerDecoder(nn.Module):
         self.causal = causal
 
     def forward(
-        self, x: Tensor, mask: torch.Tensor = None, kv_cache: Optional[dict] = None
+        self,
+        x: Tensor,
+        mask: torch.Tensor = None,
+        kv_cache: Optional[dict] = None,
+        pos: Optional[Tensor] = None,
     ):
-        if self.causal and mask is not None:
+        if self.causal and mask is not None and x.size(1) > 1:
             raise ValueError("Causal Transformer dones't allow mask")
 
-        offset = next(iter(kv_cache.values())).shape[1] if kv_cache else 0
-        x = x + self.pos_emb.weight[offset : offset + x.shape[1]].unsqueeze(0)
+        if pos is not None:
+            # positions of each sequence (B, T), e.g., for the sequences with
+            # different lengths decoded together.
+            x = x + self.pos_emb(pos)
+        else:
+            offset = next(iter(kv_cache.values())).shape[1] if kv_cache else 0
+            x = x + self.pos_emb.weight[offset : offset + x.shape[1]].unsqueeze(0)
 
         for block in self.blocks:
             x = block(x, mask=mask, kv_cache=kv_cache)
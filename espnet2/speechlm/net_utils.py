@@ -3,7 +3,7 @@
 # Copyright 2024 Jinchuan Tian
 #  Apache 2.0  (http://www.apache.org/licenses/LICENSE-2.0)
 
-from typing import Tuple
+from typing import Tuple, Union
 
 import torch
 
@@ -79,8 +79,32 @@ def ce_loss(
     return loss, stats, weight
 
 
-def install_kv_cache_hook(model, cache):
+def install_kv_cache_hook(model, cache, max_len: int = None):
+    """Install the hooks to cache the keys and values of the attention modules.
+
+    The cache maps each key/value projection module to the cached outputs
+    (B, T, D), which are returned by the projection in the following calls.
+    If max_len is given, the cache is a static one for inference: the buffers of
+    max_len frames are allocated at the first call and the outputs are written
+    in-place at the current position, instead of concatenating the whole cache
+    in every step. The cache holds the views of the filled part of the buffers,
+    so the usage of the cache is the same. The buffers are doubled if they
+    are full. As the buffers are overwritten in-place, the static cache is only
+    for the inference without gradients.
+
+    Args:
+        model (torch.nn.Module): The model to install the hooks.
+        cache (dict): The initial cache.
+        max_len (int): The capacity of the static cache. If None, the cache
+            grows by concatenation.
+
+    Returns:
+        dict: The cache.
+        List: The hook handles, which should be removed after inference.
+
+    """
     cache = {**cache} if cache is not None else {}
+    buffers = {}
     hooks = []
 
     def save_to_cache(module, _, output):
@@ -91,10 +115,28 @@ def install_kv_cache_hook(model, cache):
             cache[module] = torch.cat([cache[module], output], dim=1).detach()
         return cache[module]
 
+    def save_to_static_cache(module, _, output):
+        start = cache[module].size(1) if module in cache else 0
+        end = start + output.size(1)
+        buffer = buffers.get(module)
+        if buffer is None or end > buffer.size(1):
+            new_buffer = output.new_empty(
+                output.size(0),
+                max(max_len, end) if buffer is None else max(2 * buffer.size(1), end),
+                output.size(2),
+            )
+            if start > 0:
+                new_buffer[:, :start] = cache[module]
+            buffer = buffers[module] = new_buffer
+        buffer[:, start:end] = output
+        cache[module] = buffer[:, :end]
+        return cache[module]
+
     def install_hooks(layer: torch.nn.Module):
         if isinstance(layer, MultiHeadAttention):
-            hooks.append(layer.key.register_forward_hook(save_to_cache))
-            hooks.append(layer.value.register_forward_hook(save_to_cache))
+            hook = save_to_cache if max_len is None else save_to_static_cache
+            hooks.append(layer.key.register_forward_hook(hook))
+            hooks.append(layer.value.register_forward_hook(hook))
 
     model.apply(install_hooks)
     return cache, hooks
@@ -103,18 +145,24 @@ def install_kv_cache_hook(model, cache):
 def logits_to_tokens(
     logits: torch.Tensor,
     opts: SpeechLMInferenceOptions,
-    allow_eos: bool = True,
+    allow_eos: Union[bool, torch.Tensor] = True,
     nq_level: int = None,
 ):
     assert logits.dim() == 4
 
-    # (1) Apply mask
-    mask = opts.masks
-    if allow_eos:  # only predict eos in the first code
-        mask[..., 0, opts.eos] = False
+    # (1) Apply mask, only predict eos in the first code.
+    # allow_eos can be a BoolTensor (B,) to allow eos for each example.
+    # opts.masks is not modified in-place as it is shared by all the steps.
+    mask = opts.masks.unsqueeze(0)  # [1, nq, V]
+    if isinstance(allow_eos, torch.Tensor):
+        mask = mask.repeat(logits.size(0), 1, 1)  # [B, nq, V]
+        mask[allow_eos, 0, opts.eos] = False
+    elif allow_eos:
+        mask = mask.clone()
+        mask[:, 0, opts.eos] = False
     if nq_level is not None:
-        mask = mask[nq_level : nq_level + 1]
-    mask = mask.unsqueeze(0).unsqueeze(0)
+        mask = mask[:, nq_level : nq_level + 1]
+    mask = mask.unsqueeze(1)
     logits = logits.masked_fill_(mask, -1e20)
 
     # (2) token selection
@@ -221,6 +221,32 @@ class CodecTokenizer(AbsTokenizer):
 
         return codes
 
+    def encode_streaming(self, wavs, states=None, final=False):
+        """Convert a chunk of audio waveforms into codec codes in streaming.
+
+        The codes are emitted for the frames completed so far, and the states
+        carry the rest to the next chunk. Only supports the causal ESPnet codecs.
+
+        Input:
+            wavs (torch.Tensor): float tensor in shape [B, 1, n_sample_chunk],
+            states: states from the previous chunk, None for the first chunk,
+            final (bool): whether wavs is the last chunk
+        Output:
+            codes (torch.Tensor): Int tensor in shape [B, T_chunk, n_codebook]
+            states: states for the next chunk
+        """
+        assert wavs.dim() == 3 and wavs.size(1) == 1
+
+        if self.codec_choice == "ESPnet":
+            codes, states = self.codec.encode_streaming(wavs, states, final=final)
+            codes = codes.permute(1, 2, 0)[:, :, : self.n_codebook]
+        else:
+            raise NotImplementedError(
+                f"Codec {self.codec_choice} does not support `encode_streaming`."
+            )
+
+        return codes, states
+
     def encode_continuous(self, wavs):
         """Convert audio waveforms into continuous codec encoding results.
 
@@ -277,6 +303,28 @@ class CodecTokenizer(AbsTokenizer):
 
         return waveform
 
+    def decode_streaming(self, codes, states=None, final=False):
+        """Recover the waveform from a chunk of codes in streaming.
+
+        Input:
+            codes (torch.Tensor): Int tensor in shape [B, T_chunk, n_codebook]
+            states: states from the previous chunk, None for the first chunk,
+            final (bool): whether codes is the last chunk
+        Output:
+            waveform (torch.Tensor): float tensor in shape [B, n_sample_chunk]
+            states: states for the next chunk
+        """
+        if self.codec_choice == "ESPnet":
+            codes = codes.permute(2, 0, 1)
+            waveform, states = self.codec.decode_streaming(codes, states, final=final)
+            waveform = waveform.squeeze(1)
+        else:
+            raise NotImplementedError(
+                f"Codec {self.codec_choice} does not support `decode_streaming`."
+            )
+
+        return waveform, states
+
     def decode_continuous(self, z):
         """Recover the waveform from the continuous representations of codec.
 
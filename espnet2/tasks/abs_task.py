@@ -364,6 +364,13 @@ class AbsTask(ABC):
             default=1,
             help="The number of workers used for DataLoader",
         )
+        group.add_argument(
+            "--persistent_workers",
+            type=str2bool,
+            default=False,
+            help="Keep the DataLoader workers alive between epochs "
+            "for the sequence iterator. Used if num_workers > 0",
+        )
         group.add_argument(
             "--num_att_plot",
             type=int,
@@ -911,6 +918,14 @@ class AbsTask(ABC):
             default=True,
             help="Discard samples shorter than the minimum chunk length",
         )
+        group.add_argument(
+            "--chunk_in_workers",
+            type=str2bool,
+            default=False,
+            help="Make the chunks and mini-batches in the DataLoader workers "
+            "instead of the training process. Each worker shuffles its chunks with "
+            "num_cache_chunks // num_workers chunks. Used if num_workers > 0",
+        )
 
         group = parser.add_argument_group("Dataset related")
         _data_path_and_name_and_type_help = (
@@ -1860,6 +1875,7 @@ class AbsTask(ABC):
             num_workers=args.num_workers,
             collate_fn=iter_options.collate_fn,
             pin_memory=args.ngpu > 0,
+            persistent_workers=getattr(args, "persistent_workers", False),
         )
 
     @classmethod
@@ -2021,6 +2037,7 @@ class AbsTask(ABC):
             default_fs=args.chunk_default_fs,
             chunk_max_abs_length=args.chunk_max_abs_length,
             discard_short_samples=args.chunk_discard_short_samples,
+            chunk_in_workers=getattr(args, "chunk_in_workers", False),
         )
 
     @classmethod
@@ -2258,8 +2275,18 @@ class AbsTask(ABC):
         inference: bool = False,
         mode: Optional[str] = None,
         multi_task_dataset: bool = False,
+        num_shards: int = 1,
+        shard_id: int = 0,
+        start_index: int = 0,
+        read_ahead: int = 0,
     ) -> DataLoader:
-        """Build DataLoader using iterable dataset"""
+        """Build DataLoader using iterable dataset
+
+        The keys are split into num_shards shards and the shard_id-th shard is
+        iterated, e.g. the world size and the rank to split the data between
+        the ranks. By default, all the keys are iterated.
+        See IterableESPnetDataset for start_index and read_ahead.
+        """
         # For backward compatibility for pytorch DataLoader
         if collate_fn is not None:
             kwargs = dict(collate_fn=collate_fn)
@@ -2267,15 +2294,23 @@ class AbsTask(ABC):
             kwargs = {}
 
         if multi_task_dataset:
-            dataset_class = ESPnetMultiTaskDataset
+            dataset = ESPnetMultiTaskDataset(
+                data_path_and_name_and_type,
+                float_dtype=dtype,
+                preprocess=preprocess_fn,
+                key_file=key_file,
+            )
         else:
-            dataset_class = IterableESPnetDataset
-        dataset = dataset_class(
-            data_path_and_name_and_type,
-            float_dtype=dtype,
-            preprocess=preprocess_fn,
-            key_file=key_file,
-        )
+            dataset = IterableESPnetDataset(
+                data_path_and_name_and_type,
+                float_dtype=dtype,
+                preprocess=preprocess_fn,
+                key_file=key_file,
+                num_shards=num_shards,
+                shard_id=shard_id,
+                start_index=start_index,
+                read_ahead=read_ahead,
+            )
 
         if dataset.apply_utt2category:
             kwargs.update(batch_size=1)
@@ -36,6 +36,7 @@ from espnet2.fileio.rand_gen_dataset import (
     IntRandomGenerateDataset,
 )
 from espnet2.fileio.read_text import (
+    IndexedTextReader,
     RandomTextReader,
     load_num_sequence_text,
     read_2columns_text,
@@ -182,7 +183,13 @@ class AdapterForLabelScpReader(collections.abc.Mapping):
         return sample_time, sample_label
 
 
-def sound_loader(path, float_dtype=None, multi_columns=False, allow_multi_rates=False):
+def sound_loader(
+    path,
+    float_dtype=None,
+    multi_columns=False,
+    allow_multi_rates=False,
+    indexed=False,
+):
     # The file is as follows:
     #   utterance_id_A /some/where/a.wav
     #   utterance_id_B /some/where/a.flac
@@ -191,7 +198,11 @@ def sound_loader(path, float_dtype=None, multi_columns=False, allow_multi_rates=
     # like Kaldi e.g. "cat a.wav |".
     # NOTE(kamo): The audio signal is normalized to [-1,1] range.
     loader = SoundScpReader(
-        path, always_2d=False, dtype=float_dtype, multi_columns=multi_columns
+        path,
+        always_2d=False,
+        dtype=float_dtype,
+        multi_columns=multi_columns,
+        indexed=indexed,
     )
 
     # SoundScpReader.__getitem__() returns Tuple[int, ndarray],
@@ -199,6 +210,12 @@ def sound_loader(path, float_dtype=None, multi_columns=False, allow_multi_rates=
     return AdapterForSoundScpReader(loader, allow_multi_rates=allow_multi_rates)
 
 
+def indexed_sound_loader(path, float_dtype=None, allow_multi_rates=False):
+    return sound_loader(
+        path, float_dtype, allow_multi_rates=allow_multi_rates, indexed=True
+    )
+
+
 def multi_columns_sound_loader(path, float_dtype=None, allow_multi_rates=False):
     return sound_loader(
         path, float_dtype, multi_columns=True, allow_multi_rates=allow_multi_rates
@@ -255,6 +272,13 @@ DATA_TYPES = {
         "   utterance_id_b b.wav\n"
         "   ...",
     ),
+    "indexed_sound": dict(
+        func=indexed_sound_loader,
+        kwargs=["float_dtype", "allow_multi_rates"],
+        help="Same as 'sound', but the wav.scp is not loaded in memory. "
+        "The lines are read by the byte offsets cached to '{path}.index.npy' "
+        "and the file is memory-mapped, which is shared by DataLoader workers.",
+    ),
     "multi_columns_sound": dict(
         func=multi_columns_sound_loader,
         kwargs=["float_dtype", "allow_multi_rates"],
@@ -367,6 +391,13 @@ DATA_TYPES = {
         "   utterance_id_B foo bar\n"
         "   ...",
     ),
+    "indexed_text": dict(
+        func=IndexedTextReader,
+        kwargs=[],
+        help="Same as 'text', but the text file is not loaded in memory. "
+        "The lines are read by the byte offsets cached to '{path}.index.npy' "
+        "and the file is memory-mapped, which is shared by DataLoader workers.",
+    ),
     "random_text": dict(
         func=RandomTextReader,
         kwargs=[],
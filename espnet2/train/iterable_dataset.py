@@ -2,6 +2,8 @@
 
 import copy
 import json
+import queue
+import threading
 from io import StringIO
 from pathlib import Path
 from typing import Callable, Collection, Dict, Iterator, List, Optional, Tuple, Union
@@ -64,6 +66,51 @@ DATA_TYPES = {
     "text": lambda x: x,
 }
 
+_END = object()
+
+
+def read_ahead(iterator: Iterator, size: int) -> Iterator:
+    """Consume the iterator in a background thread.
+
+    Up to `size` items are read in advance, so that the I/O of the next items
+    overlaps with the processing of the current one.
+    Exceptions raised in the background thread are re-raised by the consumer.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def _put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _produce():
+        try:
+            for item in iterator:
+                if not _put((item, None)):
+                    return
+            _put((_END, None))
+        except Exception as e:
+            _put((None, e))
+
+    thread = threading.Thread(target=_produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item, error = buffer.get()
+            if error is not None:
+                raise error
+            if item is _END:
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
 
 class IterableESPnetDataset(IterableDataset):
     """Pytorch Dataset class for ESPNet.
@@ -75,6 +122,13 @@ class IterableESPnetDataset(IterableDataset):
         >>> for uid, data in dataset:
         ...     data
         {'input': per_utt_array, 'output': per_utt_array}
+
+    The keys are split in round-robin between `num_shards` shards
+    (e.g. one for each rank) and between the DataLoader workers in each shard.
+    The keys before `start_index` are skipped without loading the data,
+    which can be used to resume the iteration from a checkpointed position.
+    If `read_ahead` > 0, the data are loaded in a background thread
+    up to `read_ahead` samples in advance of the preprocessing.
     """
 
     @typechecked
@@ -88,11 +142,17 @@ class IterableESPnetDataset(IterableDataset):
         int_dtype: str = "long",
         key_file: Optional[Union[str, List]] = None,
         preprocess_prefix: Optional[str] = None,
+        num_shards: int = 1,
+        shard_id: int = 0,
+        start_index: int = 0,
+        read_ahead: int = 0,
     ):
         if len(path_name_type_list) == 0:
             raise ValueError(
                 '1 or more elements are required for "path_name_type_list"'
             )
+        if not 0 <= shard_id < num_shards:
+            raise ValueError(f"shard_id must be in [0, {num_shards}): {shard_id}")
 
         path_name_type_list = copy.deepcopy(path_name_type_list)
         self.preprocess = preprocess
@@ -103,6 +163,10 @@ class IterableESPnetDataset(IterableDataset):
         self.preprocess_prefix = (
             preprocess_prefix if preprocess_prefix is not None else ""
         )
+        self.num_shards = num_shards
+        self.shard_id = shard_id
+        self.start_index = start_index
+        self.read_ahead = read_ahead
 
         self.debug_info = {}
         non_iterable_list = []
@@ -148,6 +212,38 @@ class IterableESPnetDataset(IterableDataset):
         return _mes
 
     def __iter__(self) -> Iterator[Tuple[Union[str, int], Dict[str, np.ndarray]]]:
+        entries = self._iter_entries()
+        if self.read_ahead > 0:
+            entries = read_ahead(entries, self.read_ahead)
+
+        for uid, data in entries:
+            # 3. [Option] Apply preprocessing
+            #   e.g. espnet2.train.preprocessor:CommonPreprocessor
+            if self.preprocess is not None:
+                data = self.preprocess(self.preprocess_prefix + uid, data)
+
+            # 4. Force data-precision
+            for name in data:
+                value = data[name]
+                if not isinstance(value, np.ndarray):
+                    raise RuntimeError(
+                        f"All values must be converted to np.ndarray object "
+                        f'by preprocessing, but "{name}" is still {type(value)}.'
+                    )
+
+                # Cast to desired type
+                if value.dtype.kind == "f":
+                    value = value.astype(self.float_dtype)
+                elif value.dtype.kind == "i":
+                    value = value.astype(self.int_dtype)
+                else:
+                    raise NotImplementedError(f"Not supported dtype: {value.dtype}")
+                data[name] = value
+
+            yield uid, data
+
+    def _iter_entries(self) -> Iterator[Tuple[str, Dict[str, np.ndarray]]]:
+        """Yield the loaded data of the keys assigned to this shard and worker."""
         if self.key_file is not None:
             if isinstance(self.key_file, str):
                 uid_iter = (
@@ -167,15 +263,22 @@ class IterableESPnetDataset(IterableDataset):
         files = [open(lis[0], encoding="utf-8") for lis in self.path_name_type_list]
 
         worker_info = torch.utils.data.get_worker_info()
+        if worker_info is None:
+            num_workers, worker_id = 1, 0
+        else:
+            num_workers, worker_id = worker_info.num_workers, worker_info.id
+        # If num_shards>=2 or num_workers>=1, split keys
+        num_splits = self.num_shards * num_workers
+        split_id = self.shard_id * num_workers + worker_id
 
         linenum = 0
         count = 0
 
         for count, uid in enumerate(uid_iter, 1):
-            # If num_workers>=1, split keys
-            if worker_info is not None:
-                if (count - 1) % worker_info.num_workers != worker_info.id:
-                    continue
+            if count - 1 < self.start_index:
+                continue
+            if (count - 1) % num_splits != split_id:
+                continue
 
             # 1. Read a line from each file
             while True:
@@ -221,29 +324,6 @@ class IterableESPnetDataset(IterableDataset):
                 _, from_non_iterable = self.non_iterable_dataset[uid]
                 data.update(from_non_iterable)
 
-            # 3. [Option] Apply preprocessing
-            #   e.g. espnet2.train.preprocessor:CommonPreprocessor
-            if self.preprocess is not None:
-                data = self.preprocess(self.preprocess_prefix + uid, data)
-
-            # 4. Force data-precision
-            for name in data:
-                value = data[name]
-                if not isinstance(value, np.ndarray):
-                    raise RuntimeError(
-                        f"All values must be converted to np.ndarray object "
-                        f'by preprocessing, but "{name}" is still {type(value)}.'
-                    )
-
-                # Cast to desired type
-                if value.dtype.kind == "f":
-                    value = value.astype(self.float_dtype)
-                elif value.dtype.kind == "i":
-                    value = value.astype(self.int_dtype)
-                else:
-                    raise NotImplementedError(f"Not supported dtype: {value.dtype}")
-                data[name] = value
-
             yield uid, data
 
         if count == 0:
@@ -0,0 +1,187 @@
+"""On-disk cache for the deterministic stage of the preprocessing."""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+
+def _file_digest(path: Union[Path, str]) -> str:
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Return the hash of the preprocessing configuration.
+
+    The values which are paths of existing files (e.g. token_list and bpemodel)
+    are replaced with the digests of the file contents,
+    so that the cache is invalidated when the files are updated.
+    """
+
+    def _normalize(v):
+        if isinstance(v, (str, Path)) and os.path.isfile(v):
+            return "file:" + _file_digest(v)
+        elif isinstance(v, (list, tuple)):
+            return [_normalize(vv) for vv in v]
+        elif isinstance(v, dict):
+            return {k: _normalize(vv) for k, vv in v.items()}
+        return v
+
+    config = json.dumps(_normalize(config), sort_keys=True, default=str)
+    return hashlib.sha1(config.encode("utf-8")).hexdigest()[:16]
+
+
+class PreprocessCache:
+    """Content-addressed on-disk cache of the preprocessing outputs.
+
+    The entries are stored in "{cache_dir}/{config_hash}/{h[:2]}/{h}.pkl",
+    where h is the hash of the inputs of the cached stage,
+    i.e., the entries are invalidated when either the configuration
+    or the input data is changed. The first 2 characters of the hash shard
+    the entries into 256 sub-directories.
+    The files are written atomically, so the cache can be shared
+    by the DataLoader workers and multiple training processes.
+    The entries are pickled because loading npy/npz files costs more
+    than the cheap tokenizers, so only use a cache directory you trust.
+
+    Examples:
+        >>> cache = PreprocessCache("exp/preprocess_cache", dict(token_type="bpe"))
+        >>> outputs = cache.get(dict(text="hello world"))
+        >>> if outputs is None:
+        ...     outputs = dict(text=np.array([3, 4]))
+        ...     cache.put(dict(text="hello world"), outputs)
+
+    """
+
+    def __init__(self, cache_dir: Union[Path, str], config: Dict[str, Any]):
+        self.config_hash = config_hash(config)
+        self.cache_dir = Path(cache_dir) / self.config_hash
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, inputs: Dict[str, str]) -> Path:
+        key = json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+        h = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / h[:2] / f"{h}.pkl"
+
+    def get(self, inputs: Dict[str, str]) -> Optional[Dict[str, np.ndarray]]:
+        """Return the cached outputs for the inputs, or None if not cached."""
+        path = self._path(inputs)
+        try:
+            with path.open("rb") as f:
+                outputs = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError) as e:
+            if path.exists():
+                logging.warning(f"Failed to load the cache {path}: {e}")
+            self.misses += 1
+            return None
+        self.hits += 1
+        return outputs
+
+    def put(self, inputs: Dict[str, str], outputs: Dict[str, np.ndarray]):
+        """Write the outputs for the inputs to the cache."""
+        path = self._path(inputs)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f".{path.stem}.{os.getpid()}.tmp"
+        with tmp_path.open("wb") as f:
+            pickle.dump(outputs, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+class LRUPreprocessCache:
+    """In-memory LRU cache of the preprocessing outputs for inference.
+
+    Keeps the outputs of the max_size most recently used inputs in memory.
+    If cache_dir is given, it is backed by PreprocessCache on disk, i.e.,
+    the entries missing in memory are loaded from the disk, and the new entries
+    are also written to the disk, so that they persist across the processes.
+    The entries are bound to the configuration as in PreprocessCache.
+    The returned arrays are copies, so the callers can modify them.
+
+    Examples:
+        >>> cache = LRUPreprocessCache(1000, dict(token_type="phn", g2p="g2p_en"))
+        >>> outputs = cache.get(dict(text="Press one for sales."))
+        >>> if outputs is None:
+        ...     outputs = preprocess_fn("<dummy>", dict(text="Press one for sales."))
+        ...     cache.put(dict(text="Press one for sales."), outputs)
+        >>> cache.stats()["hit_rate"]
+
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        config: Dict[str, Any],
+        cache_dir: Optional[Union[Path, str]] = None,
+    ):
+        assert max_size > 0, max_size
+        self.max_size = max_size
+        self.disk_cache = (
+            PreprocessCache(cache_dir, config) if cache_dir is not None else None
+        )
+        self.entries: "OrderedDict[str, Dict[str, np.ndarray]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(inputs: Dict[str, str]) -> str:
+        return json.dumps(inputs, sort_keys=True, ensure_ascii=False)
+
+    def _insert(self, key: str, outputs: Dict[str, np.ndarray]):
+        with self.lock:
+            self.entries[key] = outputs
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def get(self, inputs: Dict[str, str]) -> Optional[Dict[str, np.ndarray]]:
+        """Return the cached outputs for the inputs, or None if not cached."""
+        key = self._key(inputs)
+        with self.lock:
+            outputs = self.entries.get(key)
+            if outputs is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+        if outputs is None and self.disk_cache is not None:
+            outputs = self.disk_cache.get(inputs)
+            if outputs is not None:
+                self.disk_hits += 1
+                self._insert(key, outputs)
+        if outputs is None:
+            self.misses += 1
+            return None
+        return {k: v.copy() for k, v in outputs.items()}
+
+    def put(self, inputs: Dict[str, str], outputs: Dict[str, np.ndarray]):
+        """Add the outputs for the inputs to the cache."""
+        outputs = {k: v.copy() for k, v in outputs.items()}
+        self._insert(self._key(inputs), outputs)
+        if self.disk_cache is not None:
+            self.disk_cache.put(inputs, outputs)
+
+    def stats(self) -> Dict[str, float]:
+        """Return the statistics of the cache.
+
+        The hit rate counts the hits both in memory and on the disk.
+        """
+        total = self.hits + self.disk_hits + self.misses
+        return dict(
+            size=len(self.entries),
+            hits=self.hits,
+            disk_hits=self.disk_hits,
+            misses=self.misses,
+            hit_rate=(self.hits + self.disk_hits) / total if total > 0 else 0.0,
+        )
@@ -21,6 +21,7 @@ from espnet2.text.hugging_face_token_id_converter import HuggingFaceTokenIDConve
 from espnet2.text.token_id_converter import TokenIDConverter
 from espnet2.text.whisper_token_id_converter import OpenAIWhisperTokenIDConverter
 from espnet2.text.whisper_tokenizer import OpenAIWhisperTokenizer
+from espnet2.train.preprocess_cache import PreprocessCache
 
 
 class AbsPreprocessor(ABC):
@@ -172,6 +173,8 @@ class CommonPreprocessor(AbsPreprocessor):
         # only use for whisper
         whisper_language: Optional[str] = None,
         whisper_task: Optional[str] = None,
+        # cache the outputs of the text processing if given
+        text_cache_dir: Optional[str] = None,
     ):
         super().__init__(train)
         self.train = train
@@ -186,6 +189,35 @@ class CommonPreprocessor(AbsPreprocessor):
         self.use_lang_prompt = use_lang_prompt
         self.use_nlp_prompt = use_nlp_prompt
 
+        if text_cache_dir is not None and token_type is not None:
+            # NOTE: The text processing is deterministic, so its outputs are
+            #   cached by the input strings. The speech processing including
+            #   the random augmentation is applied on the fly.
+            self.text_cache = PreprocessCache(
+                text_cache_dir,
+                dict(
+                    cls=type(self).__name__,
+                    token_type=token_type,
+                    token_list=token_list,
+                    bpemodel=bpemodel,
+                    text_cleaner=text_cleaner,
+                    g2p_type=g2p_type,
+                    unk_symbol=unk_symbol,
+                    space_symbol=space_symbol,
+                    non_linguistic_symbols=non_linguistic_symbols,
+                    delimiter=delimiter,
+                    nonsplit_symbol=nonsplit_symbol,
+                    aux_task_names=aux_task_names,
+                    text_name=text_name,
+                    use_lang_prompt=use_lang_prompt,
+                    use_nlp_prompt=use_nlp_prompt,
+                    whisper_language=whisper_language,
+                    whisper_task=whisper_task,
+                ),
+            )
+        else:
+            self.text_cache = None
+
         if token_type is not None:
             if token_list is None:
                 raise ValueError("token_list is required if token_type is not None")
@@ -539,13 +571,36 @@ class CommonPreprocessor(AbsPreprocessor):
                     data[name] = np.array(text_ints, dtype=np.int64)
         return data
 
+    def _cached_text_process(
+        self, data: Dict[str, Union[str, np.ndarray]]
+    ) -> Dict[str, np.ndarray]:
+        # The text processing only depends on the string entries
+        inputs = {k: v for k, v in data.items() if isinstance(v, str)}
+        if len(inputs) == 0:
+            return self._text_process(data)
+
+        outputs = self.text_cache.get(inputs)
+        if outputs is None:
+            keys = set(data)
+            data = self._text_process(data)
+            outputs = {k: v for k, v in data.items() if k in inputs or k not in keys}
+            if all(isinstance(v, np.ndarray) for v in outputs.values()):
+                self.text_cache.put(inputs, outputs)
+            return data
+
+        data.update(outputs)
+        return data
+
     @typechecked
     def __call__(
         self, uid: str, data: Dict[str, Union[str, np.ndarray]]
     ) -> Dict[str, np.ndarray]:
 
         data = self._speech_process(data)
-        data = self._text_process(data)
+        if self.text_cache is not None:
+            data = self._cached_text_process(data)
+        else:
+            data = self._text_process(data)
         return data
 
 
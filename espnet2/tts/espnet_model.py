@@ -304,3 +304,48 @@ class ESPnetTTSModel(AbsESPnetModel):
             output_dict.update(feat_gen_denorm=feat_gen_denorm)
 
         return output_dict
+
+    def batch_inference(
+        self,
+        text: torch.Tensor,
+        text_lengths: torch.Tensor,
+        spembs: Optional[torch.Tensor] = None,
+        sids: Optional[torch.Tensor] = None,
+        lids: Optional[torch.Tensor] = None,
+        **decode_config,
+    ) -> Dict[str, torch.Tensor]:
+        """Caclualte features of the batch of texts and return them as a dict.
+
+        Args:
+            text (Tensor): Padded text index tensor (B, T_text).
+            text_lengths (Tensor): Text length tensor (B,).
+            spembs (Optional[Tensor]): Speaker embedding tensor (B, D).
+            sids (Optional[Tensor]): Speaker ID tensor (B, 1).
+            lids (Optional[Tensor]): Language ID tensor (B, 1).
+
+        Returns:
+            Dict[str, Tensor]: Dict of padded outputs with "feat_gen_lengths".
+
+        """
+        if not hasattr(self.tts, "batch_inference"):
+            raise NotImplementedError(
+                f"{self.tts.__class__.__name__} does not support the batch inference."
+            )
+        input_dict = dict(text=text, text_lengths=text_lengths)
+        if spembs is not None:
+            input_dict.update(spembs=spembs)
+        if sids is not None:
+            input_dict.update(sids=sids)
+        if lids is not None:
+            input_dict.update(lids=lids)
+
+        output_dict = self.tts.batch_inference(**input_dict, **decode_config)
+
+        if self.normalize is not None and output_dict.get("feat_gen") is not None:
+            # NOTE: normalize.inverse is in-place operation
+            feat_gen_denorm = self.normalize.inverse(
+                output_dict["feat_gen"].clone(), output_dict["feat_gen_lengths"]
+            )[0]
+            output_dict.update(feat_gen_denorm=feat_gen_denorm)
+
+        return output_dict
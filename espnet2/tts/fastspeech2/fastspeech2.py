@@ -644,13 +644,17 @@ class FastSpeech2(AbsTTS):
         d_masks = make_pad_mask(ilens).to(xs.device)
 
         if self.stop_gradient_from_pitch_predictor:
-            p_outs = self.pitch_predictor(hs.detach(), d_masks.unsqueeze(-1))
+            p_outs = self.pitch_predictor(
+                hs.detach(), d_masks.unsqueeze(-1), is_inference
+            )
         else:
-            p_outs = self.pitch_predictor(hs, d_masks.unsqueeze(-1))
+            p_outs = self.pitch_predictor(hs, d_masks.unsqueeze(-1), is_inference)
         if self.stop_gradient_from_energy_predictor:
-            e_outs = self.energy_predictor(hs.detach(), d_masks.unsqueeze(-1))
+            e_outs = self.energy_predictor(
+                hs.detach(), d_masks.unsqueeze(-1), is_inference
+            )
         else:
-            e_outs = self.energy_predictor(hs, d_masks.unsqueeze(-1))
+            e_outs = self.energy_predictor(hs, d_masks.unsqueeze(-1), is_inference)
 
         if is_inference:
             d_outs = self.duration_predictor.inference(hs, d_masks)  # (B, T_text)
@@ -658,7 +662,13 @@ class FastSpeech2(AbsTTS):
             p_embs = self.pitch_embed(p_outs.transpose(1, 2)).transpose(1, 2)
             e_embs = self.energy_embed(e_outs.transpose(1, 2)).transpose(1, 2)
             hs = hs + e_embs + p_embs
-            hs = self.length_regulator(hs, d_outs, alpha)  # (B, T_feats, adim)
+            if xs.size(0) > 1:
+                # mask the padded frames in the batch inference
+                ds = self._regulate_durations(d_outs, d_masks, alpha)
+                hs = self.length_regulator(hs, ds)  # (B, T_feats, adim)
+                olens = ds.sum(dim=1) * self.reduction_factor
+            else:
+                hs = self.length_regulator(hs, d_outs, alpha)  # (B, T_feats, adim)
         else:
             d_outs = self.duration_predictor(hs, d_masks)
             # use groundtruth in training
@@ -668,7 +678,7 @@ class FastSpeech2(AbsTTS):
             hs = self.length_regulator(hs, ds)  # (B, T_feats, adim)
 
         # forward decoder
-        if olens is not None and not is_inference:
+        if olens is not None:
             if self.reduction_factor > 1:
                 olens_in = olens.new(
                     [
@@ -685,13 +695,20 @@ class FastSpeech2(AbsTTS):
         before_outs = self.feat_out(zs).view(
             zs.size(0), -1, self.odim
         )  # (B, T_feats, odim)
+        if is_inference and olens is not None:
+            # zero the padded frames not to affect the others in postnet
+            masks = make_pad_mask(olens, before_outs, 1)
+            before_outs = before_outs.masked_fill(masks, 0.0)
+            postnet_masks = masks.transpose(1, 2)[:, :1]  # (B, 1, T_feats)
+        else:
+            postnet_masks = None
 
         # postnet -> (B, T_feats//r * r, odim)
         if self.postnet is None:
             after_outs = before_outs
         else:
             after_outs = before_outs + self.postnet(
-                before_outs.transpose(1, 2)
+                before_outs.transpose(1, 2), postnet_masks
             ).transpose(1, 2)
 
         return before_outs, after_outs, d_outs, p_outs, e_outs
@@ -779,6 +796,106 @@ class FastSpeech2(AbsTTS):
             energy=e_outs[0],
         )
 
+    def batch_inference(
+        self,
+        text: torch.Tensor,
+        text_lengths: torch.Tensor,
+        spembs: Optional[torch.Tensor] = None,
+        sids: Optional[torch.Tensor] = None,
+        lids: Optional[torch.Tensor] = None,
+        alpha: float = 1.0,
+        use_teacher_forcing: bool = False,
+    ) -> Dict[str, torch.Tensor]:
+        """Generate the batch of features given the batch of padded characters.
+
+        The durations are predicted for the whole batch and the padded part is
+        masked in the variance predictors, the decoder and the postnet, so each
+        output trimmed by its length is the same as the output of inference().
+        The exception is the convolution in the encoder and decoder layers
+        (conformer, or positionwise_conv_kernel_size > 1), which still sees the
+        padded part, so with them the padded sequences can slightly differ.
+
+        Args:
+            text (LongTensor): Batch of padded token ids (B, T_text).
+            text_lengths (LongTensor): Batch of lengths of each input (B,).
+            spembs (Optional[Tensor]): Batch of speaker embeddings (B, spk_embed_dim).
+            sids (Optional[Tensor]): Batch of speaker IDs (B, 1).
+            lids (Optional[Tensor]): Batch of language IDs (B, 1).
+            alpha (float): Alpha to control the speed.
+            use_teacher_forcing (bool): Must be False. Teacher forcing is not
+                supported in the batch inference.
+
+        Returns:
+            Dict[str, Tensor]: Output dict including the following items:
+                * feat_gen (Tensor): Batch of padded features (B, T_feats, odim).
+                * feat_gen_lengths (LongTensor): Batch of feature lengths (B,).
+                * duration (Tensor): Batch of durations (B, T_text + 1), where
+                    the all 0 durations are filled with 1 as in inference().
+                * pitch (Tensor): Batch of pitch sequences (B, T_text + 1, 1).
+                * energy (Tensor): Batch of energy sequences (B, T_text + 1, 1).
+                * text_lengths (LongTensor): Lengths of the above sequences (B,).
+
+        """
+        if use_teacher_forcing:
+            raise NotImplementedError(
+                "Teacher forcing is not supported in the batch inference."
+            )
+        if self.use_gst:
+            raise NotImplementedError("GST is not supported in the batch inference.")
+        text = text[:, : text_lengths.max()]
+
+        # add eos at the last of sequence
+        xs = F.pad(text, [0, 1], "constant", self.padding_idx)
+        for i, l in enumerate(text_lengths):
+            xs[i, l] = self.eos
+        ilens = text_lengths + 1
+
+        _, outs, d_outs, p_outs, e_outs = self._forward(
+            xs,
+            ilens,
+            spembs=spembs,
+            sids=sids,
+            lids=lids,
+            is_inference=True,
+            alpha=alpha,
+        )  # (B, T_feats, odim)
+        d_masks = make_pad_mask(ilens).to(xs.device)
+        olens = self._regulate_durations(d_outs, d_masks, alpha).sum(dim=1)
+        olens = olens * self.reduction_factor
+
+        return dict(
+            feat_gen=outs,
+            feat_gen_lengths=olens,
+            duration=self._regulate_durations(d_outs, d_masks),
+            pitch=p_outs,
+            energy=e_outs,
+            text_lengths=ilens,
+        )
+
+    @staticmethod
+    def _regulate_durations(
+        ds: torch.Tensor, d_masks: torch.Tensor, alpha: float = 1.0
+    ) -> torch.Tensor:
+        """Apply the speed control to the batch of predicted durations.
+
+        As in the length regulator for the single sequence, the durations of
+        the sequence whose durations are all 0 are filled with 1,
+        but it is done for each sequence without touching the padded part.
+
+        Args:
+            ds (LongTensor): Batch of predicted durations (B, T_text).
+            d_masks (BoolTensor): Batch of masks indicating padded part (B, T_text).
+            alpha (float): Alpha to control the speed.
+
+        Returns:
+            LongTensor: Batch of durations for the length regulator (B, T_text).
+
+        """
+        if alpha != 1.0:
+            assert alpha > 0
+            ds = torch.round(ds.float() * alpha).long()
+        return ds.masked_fill(ds.sum(dim=1, keepdim=True).eq(0) & ~d_masks, 1)
+
     def _integrate_with_spk_embed(
         self, hs: torch.Tensor, spembs: torch.Tensor
     ) -> torch.Tensor:
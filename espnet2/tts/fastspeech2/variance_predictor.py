@@ -63,12 +63,20 @@ class VariancePredictor(torch.nn.Module):
             ]
         self.linear = torch.nn.Linear(n_chans, 1)
 
-    def forward(self, xs: torch.Tensor, x_masks: torch.Tensor = None) -> torch.Tensor:
+    def forward(
+        self,
+        xs: torch.Tensor,
+        x_masks: torch.Tensor = None,
+        is_inference: bool = False,
+    ) -> torch.Tensor:
         """Calculate forward propagation.
 
         Args:
             xs (Tensor): Batch of input sequences (B, Tmax, idim).
-            x_masks (ByteTensor): Batch of masks indicating padded part (B, Tmax).
+            x_masks (ByteTensor): Batch of masks indicating padded part (B, Tmax, 1).
+            is_inference (bool): Whether to zero the padded part of the inputs of
+                each convolutional layer, which makes the outputs of the padded
+                sequences the same as those of the unpadded ones.
 
         Returns:
             Tensor: Batch of predicted sequences (B, Tmax, 1).
@@ -76,6 +84,8 @@ class VariancePredictor(torch.nn.Module):
         """
         xs = xs.transpose(1, -1)  # (B, idim, Tmax)
         for f in self.conv:
+            if is_inference and x_masks is not None:
+                xs = xs.masked_fill(x_masks.transpose(1, 2), 0.0)
             xs = f(xs)  # (B, C, Tmax)
 
         xs = self.linear(xs.transpose(1, 2))  # (B, Tmax, 1)
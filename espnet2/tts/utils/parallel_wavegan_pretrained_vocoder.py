@@ -3,14 +3,17 @@
 
 """Wrapper class for the vocoder model trained with parallel_wavegan repo."""
 
+import inspect
 import logging
 import os
 from pathlib import Path
-from typing import Optional, Union
+from typing import Optional, Tuple, Union
 
 import torch
 import yaml
 
+from espnet.nets.pytorch_backend.nets_utils import pad_list
+
 
 class ParallelWaveGANPretrainedVocoder(torch.nn.Module):
     """Wrapper class to load the vocoder trained with parallel_wavegan repo."""
@@ -43,6 +46,15 @@ class ParallelWaveGANPretrainedVocoder(torch.nn.Module):
         if hasattr(self.vocoder, "mean"):
             self.normalize_before = True
 
+        # NOTE: The generators conditioned only on the features (e.g., MelGAN and
+        #   HiFiGAN) take the batch of padded features in forward(c, ...).
+        params = list(inspect.signature(self.vocoder.forward).parameters.values())
+        self.use_batch_forward = (
+            len(params) > 0
+            and params[0].name == "c"
+            and all(p.default is not p.empty for p in params[1:])
+        )
+
     @torch.no_grad()
     def forward(self, feats: torch.Tensor) -> torch.Tensor:
         """Generate waveform with pretrained vocoder.
@@ -58,3 +70,32 @@ class ParallelWaveGANPretrainedVocoder(torch.nn.Module):
             feats,
             normalize_before=self.normalize_before,
         ).view(-1)
+
+    @torch.no_grad()
+    def batch_forward(
+        self, feats: torch.Tensor, feats_lengths: torch.Tensor
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Generate the batch of waveforms with pretrained vocoder.
+
+        The padded features are converted in one forward pass if the generator
+        supports it, otherwise they are converted one by one.
+
+        Args:
+            feats (Tensor): Padded feature tensor (B, T_feats, #mels).
+            feats_lengths (Tensor): Feature length tensor (B,).
+
+        Returns:
+            Tensor: Padded waveform tensor (B, T_wav).
+            Tensor: Waveform length tensor (B,).
+
+        """
+        if not self.use_batch_forward:
+            wavs = [self(feat[:length]) for feat, length in zip(feats, feats_lengths)]
+            wav_lengths = feats_lengths.new_tensor([len(wav) for wav in wavs])
+            return pad_list(wavs, 0.0), wav_lengths
+
+        if self.normalize_before:
+            feats = (feats - self.vocoder.mean) / self.vocoder.scale
+        wav = self.vocoder(feats.transpose(1, 2)).view(feats.size(0), -1)
+        upsample_factor = wav.size(1) // feats.size(1)
+        return wav, feats_lengths * upsample_factor
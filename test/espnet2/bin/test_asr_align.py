@@ -120,3 +120,41 @@ def test_CTCSegmentation(asr_config_file):
     # test the ratio estimation (result: 509)
     ratio = aligner.estimate_samples_to_frames_ratio()
     assert 500 <= ratio <= 520
+
+
+@pytest.mark.parametrize("text_converter", ["tokenize", "classic"])
+@pytest.mark.execution_timeout(5)
+def test_CTCSegmentation_restrict_vocab(asr_config_file, text_converter):
+    """Check that the restricted CTC posteriors yield the same alignment."""
+    fs = 16000
+    text = ["HOTELS", "HOLIDAY'S STRATEGY", "ASSETS", "PROPERTY MANAGEMENT"]
+    speech = np.random.randn(100000)
+    aligner = CTCSegmentation(
+        asr_train_config=asr_config_file,
+        fs=fs,
+        kaldi_style_text=False,
+        text_converter=text_converter,
+        min_window_size=10,
+    )
+    token_ids = aligner.get_token_ids(text)
+    assert aligner.config.blank in token_ids
+    assert len(token_ids) < len(aligner.config.char_list)
+
+    lpz = aligner.get_lpz(speech)
+    restricted_lpz = aligner.get_lpz(speech, token_ids)
+    assert restricted_lpz.dtype == np.float16
+    np.testing.assert_allclose(restricted_lpz, lpz[:, token_ids], atol=1e-2)
+
+    task = aligner.prepare_segmentation_task(text, lpz, speech_len=len(speech))
+    restricted_task = aligner.prepare_segmentation_task(
+        text, lpz[:, token_ids], speech_len=len(speech), token_ids=token_ids
+    )
+    task.set(**aligner.get_segments(task))
+    restricted_task.set(**aligner.get_segments(restricted_task))
+    assert task.segments == restricted_task.segments
+    assert task.state_list == restricted_task.state_list
+
+    aligner.set_config(restrict_vocab=True)
+    segments = aligner(speech, text)
+    assert segments.lpz.shape == restricted_lpz.shape
+    aligner.set_config(restrict_vocab=False)
@@ -91,6 +91,44 @@ def test_Speech2Text(asr_config_file, lm_config_file):
         assert isinstance(hyp, Hypothesis)
 
 
+def test_main_lm_service_threads(tmp_path, asr_config_file, lm_config_file):
+    with (tmp_path / "speech.scp").open("w") as f:
+        for i in range(3):
+            np.save(tmp_path / f"utt{i}.npy", np.random.randn(1000 * (i + 1)))
+            f.write(f"utt{i} {tmp_path / f'utt{i}.npy'}\n")
+
+    def run(output_dir, threads):
+        main(
+            cmd=[
+                "--output_dir",
+                str(output_dir),
+                "--data_path_and_name_and_type",
+                f"{tmp_path / 'speech.scp'},speech,npy",
+                "--asr_train_config",
+                str(asr_config_file),
+                "--lm_train_config",
+                str(lm_config_file),
+                "--beam_size",
+                "2",
+                "--maxlenratio",
+                "-3",
+                "--lm_service_threads",
+                str(threads),
+            ]
+        )
+        with (output_dir / "1best_recog" / "token_int").open() as f:
+            return f.read()
+
+    # the parallel decoding yields the same hypotheses in the same order
+    expected = run(tmp_path / "sequential", 1)
+    assert run(tmp_path / "parallel", 2) == expected
+    assert [line.split()[0] for line in expected.splitlines()] == [
+        "utt0",
+        "utt1",
+        "utt2",
+    ]
+
+
 @pytest.mark.execution_timeout(10)
 def test_Speech2Text_quantized(asr_config_file, lm_config_file):
     speech2text = Speech2Text(
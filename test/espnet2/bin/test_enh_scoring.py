@@ -1,10 +1,19 @@
+import json
 from argparse import ArgumentParser
 
 import numpy as np
 import pytest
+import torch
 
-from espnet2.bin.enh_scoring import get_parser, main, scoring
-from espnet2.fileio.sound_scp import SoundScpWriter
+from espnet2.bin.enh_scoring import (
+    best_permutation,
+    get_parser,
+    main,
+    pairwise_si_snr,
+    scoring,
+)
+from espnet2.enh.loss.criterions.time_domain import SISNRLoss
+from espnet2.fileio.sound_scp import SoundScpReader, SoundScpWriter
 
 
 def test_get_parser():
@@ -47,3 +56,145 @@ def test_scoring(tmp_path, spk_scp, flexible_numspk, is_tse):
         },
         use_pesq=False,
     )
+
+
+@pytest.fixture
+def multi_spk_scp(tmp_path):
+    scps = []
+    for spk in range(2):
+        p = tmp_path / f"wav_spk{spk + 1}.scp"
+        w = SoundScpWriter(tmp_path / f"data_spk{spk + 1}", p)
+        for key in ("a", "b", "c"):
+            w[key] = 16000, np.random.randint(-100, 100, (16000,), dtype=np.int16)
+        w.close()
+        scps.append(str(p))
+    return scps
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+@pytest.mark.parametrize("perm_criterion", ["sdr", "si_snr"])
+def test_scoring_parallel(tmp_path, multi_spk_scp, num_workers, perm_criterion):
+    scoring(
+        output_dir=str(tmp_path / "output"),
+        dtype="float32",
+        log_level="INFO",
+        key_file=multi_spk_scp[0],
+        ref_scp=multi_spk_scp,
+        inf_scp=multi_spk_scp[::-1],
+        ref_channel=0,
+        flexible_numspk=False,
+        is_tse=False,
+        use_dnsmos=False,
+        dnsmos_args={},
+        use_pesq=False,
+        num_workers=num_workers,
+        perm_criterion=perm_criterion,
+    )
+    lines = (tmp_path / "output" / "SI_SNR_spk1").read_text().splitlines()
+    assert [line.split()[0] for line in lines] == ["a", "b", "c"]
+    assert not (tmp_path / "output" / ".scoring_chunks").exists()
+
+
+def test_scoring_resume(tmp_path, multi_spk_scp):
+    chunk_dir = tmp_path / "output" / ".scoring_chunks"
+    chunk_dir.mkdir(parents=True)
+    with (chunk_dir / "chunk.0.jsonl").open("w") as f:
+        f.write(json.dumps({"key": "a", "scores": {"SI_SNR_spk1": "dummy"}}) + "\n")
+        # partially written line of an interrupted job
+        f.write('{"key": "b", "sco')
+    scoring(
+        output_dir=str(tmp_path / "output"),
+        dtype="float32",
+        log_level="INFO",
+        key_file=multi_spk_scp[0],
+        ref_scp=multi_spk_scp,
+        inf_scp=multi_spk_scp,
+        ref_channel=0,
+        flexible_numspk=False,
+        is_tse=False,
+        use_dnsmos=False,
+        dnsmos_args={},
+        use_pesq=False,
+        resume=True,
+    )
+    lines = (tmp_path / "output" / "SI_SNR_spk1").read_text().splitlines()
+    assert lines[0] == "a dummy"
+    assert [line.split()[0] for line in lines] == ["a", "b", "c"]
+
+
+def test_best_permutation():
+    ref = np.random.randn(3, 8000)
+    inf = ref[[2, 0, 1]] + 0.01 * np.random.randn(3, 8000)
+    si_snr_mat = pairwise_si_snr(ref, inf)
+    assert si_snr_mat.shape == (3, 3)
+    np.testing.assert_array_equal(best_permutation(si_snr_mat), [1, 2, 0])
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_pairwise_si_snr_perfect_estimate(dtype):
+    ref = np.random.randn(2, 8000).astype(dtype)
+    si_snr_mat = pairwise_si_snr(ref, ref.copy(), clamp_db=100.0)
+    assert np.isfinite(si_snr_mat).all()
+    np.testing.assert_allclose(np.diag(si_snr_mat), 100.0)
+
+
+def read_scores(path):
+    return dict(line.split() for line in path.read_text().splitlines())
+
+
+@pytest.mark.parametrize("perm_criterion", ["sdr", "si_snr"])
+def test_scoring_si_snr_default(tmp_path, multi_spk_scp, perm_criterion):
+    scoring(
+        output_dir=str(tmp_path / "output"),
+        dtype="float32",
+        log_level="INFO",
+        key_file=multi_spk_scp[0],
+        ref_scp=multi_spk_scp,
+        inf_scp=multi_spk_scp[::-1],
+        ref_channel=0,
+        flexible_numspk=False,
+        is_tse=False,
+        use_dnsmos=False,
+        dnsmos_args={},
+        use_pesq=False,
+        perm_criterion=perm_criterion,
+    )
+    # The default SI_SNR is that of SISNRLoss without clamping
+    scores = read_scores(tmp_path / "output" / "SI_SNR_spk1")
+    reader = SoundScpReader(multi_spk_scp[0], dtype="float32")
+    for key, value in scores.items():
+        ref = torch.from_numpy(reader[key][1][None])
+        assert float(value) == -float(SISNRLoss()(ref, ref.clone()))
+
+
+@pytest.mark.parametrize("si_snr_clamp_db", [None, 100.0])
+@pytest.mark.parametrize("perm_criterion", ["sdr", "si_snr"])
+def test_scoring_flexible_numspk_padding(
+    tmp_path, multi_spk_scp, si_snr_clamp_db, perm_criterion
+):
+    scoring(
+        output_dir=str(tmp_path / "output"),
+        dtype="float32",
+        log_level="INFO",
+        key_file=multi_spk_scp[0],
+        ref_scp=multi_spk_scp,
+        inf_scp=multi_spk_scp[1:],
+        ref_channel=0,
+        flexible_numspk=True,
+        is_tse=False,
+        use_dnsmos=False,
+        dnsmos_args={},
+        use_pesq=False,
+        perm_criterion=perm_criterion,
+        si_snr_clamp_db=si_snr_clamp_db,
+    )
+    # The only estimate is assigned to the second reference it equals
+    spk1 = read_scores(tmp_path / "output" / "SI_SNR_spk1")
+    spk2 = read_scores(tmp_path / "output" / "SI_SNR_spk2")
+    if si_snr_clamp_db is None:
+        assert all(float(v) > 50 for v in spk2.values())
+    else:
+        np.testing.assert_allclose(
+            [float(v) for v in spk2.values()], si_snr_clamp_db, rtol=1e-6
+        )
+        assert all(float(v) == -si_snr_clamp_db for v in spk1.values())
@@ -140,3 +140,43 @@ def test_CTCSegmentation(s2t_config_file):
     segments_str = str(segments)
     first_line = segments_str.splitlines()[0]
     assert "foo_0000" == first_line.split(" ")[0]
+
+
+@pytest.mark.parametrize("text_converter", ["tokenize", "classic"])
+@pytest.mark.execution_timeout(5)
+def test_CTCSegmentation_restrict_vocab(s2t_config_file, text_converter):
+    """Check that the restricted CTC posteriors yield the same alignment."""
+    fs = 16000
+    text = ["HOTELS", "HOLIDAY'S STRATEGY", "ASSETS", "PROPERTY MANAGEMENT"]
+    speech = np.random.randn(200000)
+    aligner = CTCSegmentation(
+        s2t_train_config=s2t_config_file,
+        fs=fs,
+        batch_size=2,
+        context_len_in_secs=1,
+        kaldi_style_text=False,
+        text_converter=text_converter,
+        min_window_size=10,
+    )
+    token_ids = aligner.get_token_ids(text)
+    assert aligner.config.blank in token_ids
+    assert len(token_ids) < len(aligner.config.char_list)
+
+    lpz, speech_len = aligner.get_lpz(speech)
+    restricted_lpz, _ = aligner.get_lpz(speech, token_ids)
+    assert restricted_lpz.dtype == np.float16
+    np.testing.assert_allclose(restricted_lpz, lpz[:, token_ids], atol=1e-2)
+
+    task = aligner.prepare_segmentation_task(text, lpz, speech_len=speech_len)
+    restricted_task = aligner.prepare_segmentation_task(
+        text, lpz[:, token_ids], speech_len=speech_len, token_ids=token_ids
+    )
+    task.set(**aligner.get_segments(task))
+    restricted_task.set(**aligner.get_segments(restricted_task))
+    assert task.segments == restricted_task.segments
+    assert task.state_list == restricted_task.state_list
+
+    aligner.set_config(restrict_vocab=True)
+    segments = aligner(speech, text)
+    assert segments.lpz.shape == restricted_lpz.shape
+    aligner.set_config(restrict_vocab=False)
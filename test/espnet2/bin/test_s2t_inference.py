@@ -6,6 +6,7 @@ import pytest
 
 from espnet2.bin.s2t_inference import Speech2Text, get_parser, main
 from espnet2.tasks.s2t import S2TTask
+from espnet.nets.batch_beam_search import BatchBeamSearch
 from espnet.nets.beam_search import Hypothesis
 
 
@@ -131,3 +132,95 @@ def test_Speech2Text_quantized(s2t_config_file):
         assert isinstance(token_int[0], int)
         assert isinstance(text_nospecial, str)
         assert isinstance(hyp, Hypothesis)
+
+
+@pytest.fixture()
+def s2t_long_config_file(tmp_path: Path, token_list, request):
+    S2TTask.main(
+        cmd=[
+            "--dry_run",
+            "true",
+            "--output_dir",
+            str(tmp_path / "s2t_long"),
+            "--token_list",
+            str(token_list),
+            "--token_type",
+            "char",
+            "--decoder",
+            getattr(request, "param", "transformer"),
+            "--preprocessor_conf",
+            "notime_symbol='<notimestamps>'",
+            "--preprocessor_conf",
+            "first_time_symbol='<0.00>'",
+            "--preprocessor_conf",
+            "last_time_symbol='<1.00>'",
+            "--preprocessor_conf",
+            "fs=8000",
+            "--preprocessor_conf",
+            "speech_length=1",
+            "--preprocessor_conf",
+            "speech_resolution=1.0",
+        ]
+    )
+    return tmp_path / "s2t_long" / "config.yaml"
+
+
+@pytest.mark.parametrize("s2t_long_config_file", ["rnn", "transformer"], indirect=True)
+@pytest.mark.parametrize("ctc_weight", [0.0, 0.3])
+@pytest.mark.execution_timeout(20)
+def test_Speech2Text_decode_long_batched(s2t_long_config_file, ctc_weight, caplog):
+    speech2text = Speech2Text(
+        s2t_train_config=s2t_long_config_file,
+        beam_size=2,
+        maxlenratio=-5,
+        ctc_weight=ctc_weight,
+    )
+    speech = np.random.randn(28000)
+    utterances = speech2text.decode_long(
+        speech, end_time_threshold="<1.00>", batch_size=3
+    )
+    for start, end, text in utterances:
+        assert isinstance(start, float)
+        assert isinstance(end, float)
+        assert 0.0 <= start <= end <= 4.0
+        assert isinstance(text, str)
+    if isinstance(speech2text.beam_search, BatchBeamSearch):
+        # the beam search is batched as well as the encoder
+        assert "Multi-utterance beam search is not supported" not in caplog.text
+
+
+@pytest.mark.execution_timeout(20)
+def test_main_long_form(tmp_path: Path, s2t_long_config_file):
+    with (tmp_path / "speech.scp").open("w") as f:
+        for i in range(2):
+            np.save(tmp_path / f"utt{i}.npy", np.random.randn(20000 + 4000 * i))
+            f.write(f"utt{i} {tmp_path / f'utt{i}.npy'}\n")
+    main(
+        cmd=[
+            "--output_dir",
+            str(tmp_path / "decode"),
+            "--data_path_and_name_and_type",
+            f"{tmp_path / 'speech.scp'},speech,npy",
+            "--s2t_train_config",
+            str(s2t_long_config_file),
+            "--beam_size",
+            "2",
+            "--maxlenratio",
+            "-5",
+            "--ctc_weight",
+            "0.3",
+            "--long_form",
+            "true",
+            "--end_time_threshold",
+            "1.00",
+            "--batch_size",
+            "2",
+        ]
+    )
+    with (tmp_path / "decode" / "1best_recog" / "text").open() as f:
+        assert [line.split(maxsplit=1)[0] for line in f] == ["utt0", "utt1"]
+    with (tmp_path / "decode" / "1best_recog" / "segments").open() as f:
+        for line in f:
+            utt_id, key, start, end = line.split()
+            assert utt_id.startswith(key)
+            assert 0.0 <= float(start) <= float(end)
@@ -2,9 +2,12 @@ import string
 from argparse import ArgumentParser
 from pathlib import Path
 
+import numpy as np
 import pytest
+import torch
 
 from espnet2.bin.tts_inference import Text2Speech, get_parser, main
+from espnet2.gan_tts.hifigan import HiFiGANGenerator
 from espnet2.tasks.tts import TTSTask
 
 
@@ -57,3 +60,115 @@ def test_Text2Speech(config_file):
     text2speech = Text2Speech(train_config=config_file)
     text = "aiueo"
     text2speech(text)
+
+
+@pytest.fixture()
+def fastspeech2_config_file(tmp_path: Path, token_list):
+    # Write default configuration file
+    TTSTask.main(
+        cmd=[
+            "--dry_run",
+            "true",
+            "--output_dir",
+            str(tmp_path / "fastspeech2"),
+            "--token_list",
+            str(token_list),
+            "--token_type",
+            "char",
+            "--cleaner",
+            "none",
+            "--g2p",
+            "none",
+            "--normalize",
+            "none",
+            "--tts",
+            "fastspeech2",
+            "--tts_conf",
+            '{"adim": 4, "aheads": 2, "eunits": 4, "dunits": 4, "postnet_chans": 4}',
+        ]
+    )
+    return tmp_path / "fastspeech2" / "config.yaml"
+
+
+@pytest.mark.execution_timeout(20)
+def test_Text2Speech_batch_call(fastspeech2_config_file):
+    text2speech = Text2Speech(train_config=fastspeech2_config_file)
+    # NOTE: Griffin-Lim fails for too short outputs of the random model
+    text2speech.vocoder = None
+    assert text2speech.use_batch_inference
+    texts = ["abc", "def", "ab"]
+    for text, batch_output in zip(texts, text2speech.batch_call(texts)):
+        output = text2speech(text)
+        assert batch_output.keys() == output.keys()
+        for k, v in output.items():
+            assert batch_output[k].shape == v.shape, k
+
+
+@pytest.mark.execution_timeout(20)
+def test_Text2Speech_batch_call_untrimmed_outputs(fastspeech2_config_file):
+    text2speech = Text2Speech(train_config=fastspeech2_config_file)
+    text2speech.vocoder = None
+    batch_inference = text2speech.model.batch_inference
+
+    def _batch_inference(**kwargs):
+        output_dict = batch_inference(**kwargs)
+        # outputs without the time axis are passed through per item
+        output_dict.update(score=torch.arange(3.0), embed=torch.randn(3, 7))
+        return output_dict
+
+    text2speech.model.batch_inference = _batch_inference
+    for i, output in enumerate(text2speech.batch_call(["abc", "def", "ab"])):
+        assert output["score"].item() == i
+        assert output["embed"].shape == (7,)
+
+
+@pytest.mark.execution_timeout(20)
+def test_Text2Speech_stream_call(fastspeech2_config_file):
+    text2speech = Text2Speech(train_config=fastspeech2_config_file)
+    vocoder = HiFiGANGenerator(
+        in_channels=80,
+        channels=16,
+        upsample_scales=[4, 2],
+        upsample_kernel_sizes=[8, 4],
+        resblock_kernel_sizes=[3],
+        resblock_dilations=[[1, 3]],
+    ).eval()
+    text2speech.vocoder = lambda c: vocoder.inference(c).view(-1)
+    wav = text2speech("abcdefg")["wav"]
+    wavs = list(text2speech.stream_call("abcdefg", chunk_size=4))
+    assert text2speech.vocoder_context is not None
+    torch.testing.assert_close(torch.cat(wavs), wav, rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.execution_timeout(20)
+def test_Text2Speech_text_cache(fastspeech2_config_file, tmp_path):
+    text2speech = Text2Speech(
+        train_config=fastspeech2_config_file,
+        text_cache_size=2,
+        text_cache_dir=tmp_path / "text_cache",
+    )
+    text2speech.vocoder = None
+    texts = ["abc", "def", "abc", "ab"]
+    for text in texts:
+        text2speech(text)
+    stats = text2speech.text_cache.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (1, 0, 3)
+    # "def" and "ab" are evicted from the memory and loaded from the disk
+    text2speech.batch_call(texts)
+    stats = text2speech.text_cache.stats()
+    assert (stats["hits"], stats["disk_hits"], stats["misses"]) == (3, 2, 3)
+    for text in texts:
+        np.testing.assert_array_equal(
+            text2speech._preprocess_text(text),
+            text2speech.preprocess_fn("<dummy>", dict(text=text))["text"],
+        )
+
+    # the cache persists across the instances
+    text2speech = Text2Speech(
+        train_config=fastspeech2_config_file,
+        text_cache_size=2,
+        text_cache_dir=tmp_path / "text_cache",
+    )
+    text2speech.vocoder = None
+    text2speech("def")
+    assert text2speech.text_cache.stats()["disk_hits"] == 1
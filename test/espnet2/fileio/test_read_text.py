@@ -1,9 +1,12 @@
+import os
+import pickle
 from pathlib import Path
 
 import numpy as np
 import pytest
 
 from espnet2.fileio.read_text import (
+    IndexedTextReader,
     load_num_sequence_text,
     read_2columns_text,
     read_label,
@@ -96,3 +99,94 @@ def test_read_label(tmp_path: Path):
         f.write("abc 0.5 1.2 a 1.2 1.5 b\n")
     label = read_label(p)
     assert label == {"abc": [["0.5", "1.2", "a"], ["1.2", "1.5", "b"]]}
+
+
+@pytest.mark.parametrize("multi_columns", [True, False])
+def test_IndexedTextReader(tmp_path: Path, multi_columns):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        for i in range(100):
+            f.write(f"key{i} /some/path/{i}.wav /some/path/{i}_2.wav\n")
+        f.write("ghi\n")
+        f.write("jkl 日本語")
+    if multi_columns:
+        expected, _ = read_multi_columns_text(p)
+    else:
+        expected = read_2columns_text(p)
+
+    reader = IndexedTextReader(p, multi_columns=multi_columns)
+    assert (tmp_path / "dummy.scp.index.npy").exists()
+    assert len(reader) == len(expected)
+    assert list(reader) == list(expected)
+    for k, v in expected.items():
+        assert k in reader
+        assert reader[k] == v
+    assert "key100" not in reader
+    with pytest.raises(KeyError):
+        reader["key100"]
+
+    # The cached index is used and the reader can be pickled
+    index_stat = os.stat(str(p) + ".index.npy")
+    reader = pickle.loads(pickle.dumps(IndexedTextReader(p, multi_columns)))
+    assert dict(reader) == expected
+    assert os.stat(str(p) + ".index.npy").st_ino == index_stat.st_ino
+
+
+def test_IndexedTextReader_update(tmp_path: Path):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("abc /some/path/a.wav\n")
+    assert dict(IndexedTextReader(p)) == {"abc": "/some/path/a.wav"}
+
+    with p.open("a") as f:
+        f.write("def /some/path/b.wav\n")
+    # Make the index older than the text
+    os.utime(str(p) + ".index.npy", (0, 0))
+    assert dict(IndexedTextReader(p)) == {
+        "abc": "/some/path/a.wav",
+        "def": "/some/path/b.wav",
+    }
+
+
+def test_IndexedTextReader_replaced_with_preserved_mtime(tmp_path: Path):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("abc /some/path/a.wav\n")
+    mtime_ns = os.stat(p).st_mtime_ns
+    assert dict(IndexedTextReader(p)) == {"abc": "/some/path/a.wav"}
+
+    # Replaced by a text with a different size, e.g. by cp -p
+    with p.open("w") as f:
+        f.write("ab /some/path/b.wav\nc /some/path/c.wav\n")
+    os.utime(p, ns=(mtime_ns, mtime_ns))
+    assert dict(IndexedTextReader(p)) == {
+        "ab": "/some/path/b.wav",
+        "c": "/some/path/c.wav",
+    }
+
+    # Replaced by a text with the same size and a different mtime
+    with p.open("w") as f:
+        f.write("xy /some/path/d.wav\nz /some/path/e.wav\n")
+    os.utime(p, ns=(mtime_ns + 1, mtime_ns + 1))
+    assert dict(IndexedTextReader(p)) == {
+        "xy": "/some/path/d.wav",
+        "z": "/some/path/e.wav",
+    }
+
+
+def test_IndexedTextReader_old_index(tmp_path: Path):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("abc /some/path/a.wav\n")
+    # The index without the stat of the text is rebuilt
+    np.save(str(p) + ".index.npy", np.zeros((2, 1), dtype=np.uint64))
+    assert dict(IndexedTextReader(p)) == {"abc": "/some/path/a.wav"}
+
+
+def test_IndexedTextReader_duplicated(tmp_path: Path):
+    p = tmp_path / "dummy.scp"
+    with p.open("w") as f:
+        f.write("abc /some/path/a.wav\n")
+        f.write("abc /some/path/b.wav\n")
+    with pytest.raises(RuntimeError):
+        IndexedTextReader(p)
@@ -0,0 +1,69 @@
+import pytest
+import torch
+
+from espnet2.gan_codec.shared.quantizer.modules.core_vq import (
+    CodebookIndex,
+    ResidualVectorQuantization,
+    set_codebook_search,
+)
+
+
+def reference_search(embed, x):
+    dist = -(
+        x.pow(2).sum(1, keepdim=True)
+        - 2 * x @ embed.t()
+        + embed.pow(2).sum(1, keepdim=True).t()
+    )
+    return dist.max(dim=-1).indices
+
+
+@pytest.mark.parametrize("chunk_size", [None, 7])
+@pytest.mark.parametrize("low_precision", [False, True])
+@pytest.mark.parametrize("codebook_size", [3, 64])
+def test_CodebookIndex(chunk_size, low_precision, codebook_size):
+    embed = torch.randn(codebook_size, 8)
+    x = torch.randn(50, 8)
+    # inputs equal to the codewords
+    n = min(5, codebook_size)
+    x[:n] = embed[:n]
+    index = CodebookIndex(embed, chunk_size=chunk_size, low_precision=low_precision)
+    assert torch.equal(index.search(x), reference_search(embed, x))
+
+
+def test_CodebookIndex_low_precision_fallback():
+    # the codewords are too close to be distinguished in low precision
+    embed = torch.randn(1, 8) + 1e-4 * torch.randn(32, 8)
+    x = embed[torch.randint(0, 32, (20,))] + 1e-6 * torch.randn(20, 8)
+    index = CodebookIndex(embed, low_precision=True)
+    assert torch.equal(index.search(x), reference_search(embed, x))
+
+
+def reference_encode(rvq, x):
+    residual = x.transpose(1, 2).reshape(-1, x.size(1))
+    codes = []
+    for layer in rvq.layers:
+        embed = layer._codebook.embed
+        ind = reference_search(embed, residual)
+        residual = residual - embed[ind]
+        codes.append(ind.view(x.size(0), x.size(2)))
+    return torch.stack(codes)
+
+
+def test_ResidualVectorQuantization_encode():
+    rvq = ResidualVectorQuantization(
+        num_quantizers=3, dim=8, codebook_size=16, kmeans_init=False
+    ).eval()
+    x = torch.randn(2, 8, 20)
+    assert torch.equal(rvq.encode(x), reference_encode(rvq, x))
+    set_codebook_search(rvq, chunk_size=5, low_precision=True)
+    assert torch.equal(rvq.encode(x), reference_encode(rvq, x))
+
+    # the cached indices follow the updates of the codebooks
+    with torch.no_grad():
+        for layer in rvq.layers:
+            layer._codebook.embed.mul_(-1)
+    assert torch.equal(rvq.encode(x), reference_encode(rvq, x))
+    rvq.train()
+    rvq(x)  # EMA update of the codebooks
+    rvq.eval()
+    assert torch.equal(rvq.encode(x), reference_encode(rvq, x))
@@ -161,3 +161,55 @@ def test_dac(dict_g, dict_d, dict_loss, average, include):
     optimizer_d.zero_grad()
     loss_d.backward()
     optimizer_d.step()
+
+
+@pytest.mark.parametrize(
+    "dict_g, chunk_size",
+    [
+        ({}, 7),
+        (
+            {
+                "encdec_activation": "Snake",
+                "encdec_activation_params": {},
+                "decoder_final_activation": "Tanh",
+            },
+            16,
+        ),
+    ],
+)
+def test_dac_streaming(dict_g, chunk_size):
+    args_g = make_generator_args(
+        encdec_causal=True,
+        encdec_kernel_size=7,
+        encdec_residual_kernel_size=3,
+        encdec_last_kernel_size=3,
+        quantizer_kmeans_init=False,
+        **dict_g,
+    )
+    model_g = DACGenerator(**args_g).eval()
+    x = torch.randn(2, 1, 97)
+
+    with torch.no_grad():
+        codes = model_g.encode(x)
+        wav = model_g.decode(codes)
+
+        # stream the waveform chunk by chunk
+        chunks = x.split(chunk_size, dim=-1)
+        stream_codes, states = [], None
+        for i, chunk in enumerate(chunks):
+            code, states = model_g.encode_streaming(
+                chunk, states, final=i == len(chunks) - 1
+            )
+            stream_codes.append(code)
+        stream_codes = torch.cat(stream_codes, dim=-1)
+        assert torch.equal(stream_codes, codes)
+
+        # decode the codes frame by frame
+        stream_wav, states = [], None
+        for i in range(codes.size(-1)):
+            w, states = model_g.decode_streaming(
+                codes[..., i : i + 1], states, final=i == codes.size(-1) - 1
+            )
+            stream_wav.append(w)
+        stream_wav = torch.cat(stream_wav, dim=-1)
+        torch.testing.assert_close(stream_wav, wav)
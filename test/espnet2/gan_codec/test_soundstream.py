@@ -168,3 +168,50 @@ def test_soundstream(dict_g, dict_d, dict_loss, average, include):
     optimizer_d.zero_grad()
     loss_d.backward()
     optimizer_d.step()
+
+
+@pytest.mark.parametrize(
+    "dict_g, chunk_size",
+    [
+        ({}, 1),
+        ({}, 13),
+        ({"encdec_pad_mode": "constant", "encdec_true_skip": True}, 8),
+        ({"decoder_trim_right_ratio": 0.5, "encdec_lstm": 0}, 5),
+    ],
+)
+def test_soundstream_streaming(dict_g, chunk_size):
+    args_g = make_generator_args(
+        encdec_causal=True,
+        encdec_kernel_size=7,
+        encdec_residual_kernel_size=3,
+        encdec_last_kernel_size=3,
+        quantizer_kmeans_init=False,
+        **dict_g,
+    )
+    model_g = SoundStreamGenerator(**args_g).eval()
+    x = torch.randn(2, 1, 97)
+
+    with torch.no_grad():
+        codes = model_g.encode(x)
+        wav = model_g.decode(codes)
+
+        # stream the waveform chunk by chunk
+        chunks = x.split(chunk_size, dim=-1)
+        stream_codes, states = [], None
+        for i, chunk in enumerate(chunks):
+            code, states = model_g.encode_streaming(
+                chunk, states, final=i == len(chunks) - 1
+            )
+            stream_codes.append(code)
+        stream_codes = torch.cat(stream_codes, dim=-1)
+        assert torch.equal(stream_codes, codes)
+
+        # decode the codes frame by frame
+        stream_wav, states = [], None
+        for i in range(codes.size(-1)):
+            w, states = model_g.decode_streaming(
+                codes[..., i : i + 1], states, final=i == codes.size(-1) - 1
+            )
+            stream_wav.append(w)
+        stream_wav = torch.cat(stream_wav, dim=-1)
+        torch.testing.assert_close(stream_wav, wav)
@@ -0,0 +1,70 @@
+import pytest
+import torch
+
+from espnet2.gan_tts.hifigan import HiFiGANGenerator
+from espnet2.gan_tts.parallel_wavegan import ParallelWaveGANGenerator
+from espnet2.gan_tts.utils.streaming_vocoder import (
+    StreamingVocoder,
+    estimate_receptive_field,
+)
+
+
+def make_hifigan_generator():
+    generator = HiFiGANGenerator(
+        in_channels=5,
+        channels=16,
+        upsample_scales=[4, 2],
+        upsample_kernel_sizes=[8, 4],
+        resblock_kernel_sizes=[3, 5],
+        resblock_dilations=[[1, 3], [1, 3]],
+    )
+    generator.remove_weight_norm()
+    return generator.eval()
+
+
+def test_estimate_receptive_field():
+    conv = torch.nn.Conv1d(5, 8, kernel_size=7, padding=3)
+    with torch.no_grad():
+        left, right = estimate_receptive_field(
+            lambda c: conv(c.transpose(0, 1)[None])[0].transpose(0, 1), 5
+        )
+    assert (left, right) == (3, 3)
+
+
+@pytest.mark.parametrize("chunk_size", [8, 13])
+@pytest.mark.parametrize("crossfade", [0, 2])
+@pytest.mark.parametrize("iterable", [True, False])
+def test_StreamingVocoder(chunk_size, crossfade, iterable):
+    generator = make_hifigan_generator()
+    c = torch.randn(50, 5)
+    with torch.no_grad():
+        streaming_vocoder = StreamingVocoder(
+            generator.inference, 5, chunk_size=chunk_size, crossfade=crossfade
+        )
+        assert streaming_vocoder.left_context > 0
+        assert streaming_vocoder.right_context > 0
+        wavs = list(streaming_vocoder(c.split(3) if iterable else c))
+        wav = generator.inference(c)
+    assert len(wavs) == (50 + chunk_size - 1) // chunk_size
+    for w in wavs[:-1]:
+        assert len(w) == chunk_size * generator.upsample_factor
+    torch.testing.assert_close(torch.cat(wavs), wav, rtol=1e-4, atol=1e-4)
+
+
+def test_StreamingVocoder_noise_vocoder():
+    generator = ParallelWaveGANGenerator(
+        aux_channels=5,
+        layers=4,
+        stacks=2,
+        residual_channels=4,
+        gate_channels=8,
+        skip_channels=4,
+        upsample_params={"upsample_scales": [2, 2]},
+    ).eval()
+    c = torch.randn(30, 5)
+    with torch.no_grad():
+        streaming_vocoder = StreamingVocoder(
+            generator.inference, 5, chunk_size=8, crossfade=2
+        )
+        wav = torch.cat(list(streaming_vocoder(c)))
+    assert wav.shape == (30 * 4, 1)
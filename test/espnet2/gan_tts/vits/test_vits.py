@@ -459,6 +459,24 @@ def test_multi_speaker_vits_is_trainable_and_decodable(
         output_dict = model.inference(**inputs, use_teacher_forcing=True)
         assert output_dict["wav"].size(0) == inputs["feats"].size(0) * upsample_factor
 
+        # check batch inference
+        inputs = dict(
+            text=torch.randint(0, idim, (2, 5)),
+            text_lengths=torch.tensor([5, 3], dtype=torch.long),
+        )
+        if spks > 0:
+            inputs["sids"] = torch.randint(0, spks, (2, 1))
+        if langs > 0:
+            inputs["lids"] = torch.randint(0, langs, (2, 1))
+        if spk_embed_dim > 0:
+            inputs["spembs"] = torch.randn(2, spk_embed_dim)
+        output_dict = model.batch_inference(**inputs)
+        assert output_dict["wav"].size(1) == output_dict["wav_lengths"].max()
+        assert torch.equal(
+            output_dict["wav_lengths"],
+            output_dict["duration"].sum(1).clamp(min=1).long() * upsample_factor,
+        )
+
 
 @pytest.mark.skipif(
     not torch.cuda.is_available(),
@@ -662,3 +680,22 @@ def test_multi_speaker_vits_is_trainable_and_decodable_on_gpu(
         inputs = {k: v.to(device) for k, v in inputs.items()}
         output_dict = model.inference(**inputs, use_teacher_forcing=True)
         assert output_dict["wav"].size(0) == inputs["feats"].size(0) * upsample_factor
+
+        # check batch inference
+        inputs = dict(
+            text=torch.randint(0, idim, (2, 5)),
+            text_lengths=torch.tensor([5, 3], dtype=torch.long),
+        )
+        if spks > 0:
+            inputs["sids"] = torch.randint(0, spks, (2, 1))
+        if langs > 0:
+            inputs["lids"] = torch.randint(0, langs, (2, 1))
+        if spk_embed_dim > 0:
+            inputs["spembs"] = torch.randn(2, spk_embed_dim)
+        inputs = {k: v.to(device) for k, v in inputs.items()}
+        output_dict = model.batch_inference(**inputs)
+        assert output_dict["wav"].size(1) == output_dict["wav_lengths"].max()
+        assert torch.equal(
+            output_dict["wav_lengths"],
+            output_dict["duration"].sum(1).clamp(min=1).long() * upsample_factor,
+        )
@@ -116,3 +116,40 @@ def test_ChunkIterFactory_utt2category():
             elif k == "utt2category":
                 val = v[0].item()
                 assert all([vv.item() == val for vv in v])
+
+
+@pytest.mark.parametrize("num_workers", [1, 2])
+def test_ChunkIterFactory_chunk_in_workers(num_workers):
+    dataset = Dataset3(with_category=False)
+    collatefn = CommonCollateFn()
+    batches = [["a"], ["b"], ["c"], ["d"], ["e"], ["f"]]
+    kwargs = dict(
+        dataset=dataset,
+        batches=batches,
+        batch_size=2,
+        chunk_length=3,
+        chunk_shift_ratio=1.0,
+        shuffle=True,
+        num_workers=num_workers,
+        collate_fn=collatefn,
+    )
+    iter_factory = ChunkIterFactory(**kwargs)
+    worker_iter_factory = ChunkIterFactory(chunk_in_workers=True, **kwargs)
+
+    def get_chunks(it):
+        chunks = []
+        for ids, batch in it:
+            assert batch["data"].shape == (2, 3)
+            chunks += [(i, tuple(v.tolist())) for i, v in zip(ids, batch["data"])]
+        return sorted(chunks)
+
+    # Without the random offsets, the same chunks are generated in both modes
+    # (up to the incomplete last mini-batch of each worker)
+    chunks = get_chunks(iter_factory.build_iter(0, shuffle=False))
+    worker_chunks = get_chunks(worker_iter_factory.build_iter(0, shuffle=False))
+    assert set(worker_chunks) <= set(chunks)
+    assert len(worker_chunks) >= len(chunks) - 2 * num_workers
+    # The results are reproducible
+    assert get_chunks(worker_iter_factory.build_iter(1)) == get_chunks(
+        worker_iter_factory.build_iter(1)
+    )
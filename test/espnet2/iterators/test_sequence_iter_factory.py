@@ -1,3 +1,5 @@
+import os
+
 import pytest
 import torch
 
@@ -67,3 +69,34 @@ def test_SequenceIterFactory_deterministic(collate, num_iters_per_epoch):
     for i in range(1, 10):
         for v, v2 in zip(iter_factory.build_iter(i), iter_factory.build_iter(i)):
             assert (v == v2).all()
+
+
+class PidDataset:
+    def __getitem__(self, item):
+        return item, os.getpid()
+
+
+def test_SequenceIterFactory_persistent_workers():
+    batches = [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]]
+    kwargs = dict(
+        dataset=PidDataset(),
+        batches=batches,
+        num_iters_per_epoch=3,
+        shuffle=True,
+        num_workers=2,
+        collate_fn=lambda x: ([i for i, _ in x], {x[0][1]}),
+    )
+    iter_factory = SequenceIterFactory(**kwargs)
+    persistent_iter_factory = SequenceIterFactory(persistent_workers=True, **kwargs)
+
+    pids = set()
+    for i in range(1, 4):
+        seq = [ids for ids, _ in iter_factory.build_iter(i)]
+        seq2 = []
+        for ids, pid in persistent_iter_factory.build_iter(i):
+            seq2.append(ids)
+            pids |= pid
+        # The same batches as the non-persistent mode
+        assert seq == seq2
+    # The workers are reused across epochs
+    assert len(pids) == 2
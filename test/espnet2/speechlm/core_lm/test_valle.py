@@ -0,0 +1,46 @@
+from dataclasses import replace
+
+import pytest
+import torch
+
+from espnet2.speechlm.core_lm.abs_core_lm import SpeechLMInferenceOptions
+from espnet2.speechlm.core_lm.valle import ValleLM
+
+
+def get_model():
+    return ValleLM(
+        vocab_size=30, nq=3, att_unit=16, head=2, ar_layer=2, nar_layer=2, n_ctx=64
+    )
+
+
+def test_ValleLM_forward_backward():
+    model = get_model()
+    dec_seq = torch.randint(6, 30, (2, 12, 3))
+    dec_seq_lengths = torch.LongTensor([12, 9])
+    prefix_len = torch.LongTensor([4, 3])
+    loss, stats, weight = model(dec_seq, dec_seq_lengths, prefix_len=prefix_len)
+    loss.backward()
+
+
+@pytest.mark.parametrize("nbest", [1, 3])
+def test_ValleLM_inference(nbest):
+    model = get_model().eval()
+    prefix = torch.randint(6, 30, (1, 10, 3))
+    suffix = torch.randint(6, 30, (1, 8, 3))
+    suffix[0, -1, 0] = 5
+    opts = SpeechLMInferenceOptions(
+        search_algo="teacher_force",
+        nbest=nbest,
+        eos=5,
+        start=1,
+        masks=torch.zeros(3, 30, dtype=torch.bool),
+        nq=3,
+    )
+    tokens, scores = model.inference(prefix, opts, suffix=suffix)
+    assert len(tokens) == nbest
+
+    # all the samples share the prefix and are teacher-forced identically
+    _, ref_scores = model.inference(prefix, replace(opts, nbest=1), suffix=suffix)
+    for token, score in zip(tokens, scores):
+        assert token.shape == (7, 3)
+        torch.testing.assert_close(score, ref_scores[0])
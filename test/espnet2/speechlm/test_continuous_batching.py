@@ -0,0 +1,138 @@
+import pytest
+import torch
+
+from espnet2.speechlm.continuous_batching import ContinuousBatchingScheduler, benchmark
+from espnet2.speechlm.core_lm.abs_core_lm import SpeechLMInferenceOptions
+from espnet2.speechlm.core_lm.ar_multiscale import MultiScaleLM
+from espnet2.speechlm.core_lm.valle import ValleLM
+
+
+def get_model(corelm):
+    if corelm == "valle":
+        model = ValleLM(
+            vocab_size=30, nq=3, att_unit=16, head=2, ar_layer=2, nar_layer=2, n_ctx=64
+        )
+    else:
+        model = MultiScaleLM(
+            vocab_size=30,
+            nq=3,
+            g_att_unit=16,
+            g_head=2,
+            g_layer=2,
+            l_att_unit=16,
+            l_head=2,
+            l_layer=2,
+            n_ctx=64,
+        )
+    return model.eval()
+
+
+def get_opts(**kwargs):
+    masks = torch.zeros(3, 30, dtype=torch.bool)
+    masks[:, :6] = True
+    return SpeechLMInferenceOptions(eos=5, start=1, masks=masks, nq=3, **kwargs)
+
+
+@pytest.mark.parametrize("corelm", ["valle", "multiscale"])
+def test_ContinuousBatchingScheduler_teacher_force(corelm):
+    model = get_model(corelm)
+    opts = get_opts(search_algo="teacher_force", nbest=2)
+    examples = []
+    for i in range(5):
+        prefix = torch.randint(6, 30, (3 + 2 * i, 3))
+        suffix = torch.randint(6, 30, (10 - i, 3))
+        suffix[-1, 0] = opts.eos
+        examples.append((prefix, suffix))
+
+    # 2 requests are decoded together and the others are admitted later
+    scheduler = ContinuousBatchingScheduler(model, opts, max_batch_size=5)
+    requests = [scheduler.submit(prefix, suffix) for prefix, suffix in examples]
+    scheduler.run()
+    assert scheduler.idle
+
+    for (prefix, suffix), request in zip(examples, requests):
+        tokens, scores = model.inference(prefix[None], opts, suffix=suffix[None])
+        gen_tokens, gen_scores = request.result()
+        assert len(gen_tokens) == 2
+        for token, score, gen_token, gen_score in zip(
+            tokens, scores, gen_tokens, gen_scores
+        ):
+            assert torch.equal(token, gen_token)
+            torch.testing.assert_close(score, gen_score, rtol=1e-4, atol=1e-4)
+
+
+def test_ContinuousBatchingScheduler_uninitialized_memory(monkeypatch):
+    """The padded frames of the pooled buffers must not carry NaN to the rows."""
+    torch.manual_seed(0)
+    model = get_model("multiscale")
+    opts = get_opts(search_algo="teacher_force", nbest=1)
+    examples = []
+    for i in range(3):
+        prefix = torch.randint(6, 30, (3 + 4 * i, 3))
+        suffix = torch.randint(6, 30, (8 - 2 * i, 3))
+        suffix[-1, 0] = opts.eos
+        examples.append((prefix, suffix))
+    expected = [
+        model.inference(prefix[None], opts, suffix=suffix[None])
+        for prefix, suffix in examples
+    ]
+
+    # emulate the reused memory of the allocator, which may hold NaN
+    new_empty = torch.Tensor.new_empty
+    monkeypatch.setattr(
+        torch.Tensor,
+        "new_empty",
+        lambda self, *args, **kwargs: new_empty(self, *args, **kwargs).fill_(
+            float("nan")
+        ),
+    )
+    scheduler = ContinuousBatchingScheduler(model, opts, max_batch_size=3)
+    requests = [scheduler.submit(prefix, suffix) for prefix, suffix in examples]
+    scheduler.run()
+
+    for (tokens, scores), request in zip(expected, requests):
+        gen_tokens, gen_scores = request.result()
+        assert torch.isfinite(gen_scores[0]).all()
+        assert torch.equal(tokens[0], gen_tokens[0])
+        torch.testing.assert_close(scores[0], gen_scores[0], rtol=1e-4, atol=1e-4)
+
+
+def test_ContinuousBatchingScheduler_serve():
+    model = get_model("valle")
+    with torch.no_grad():
+        # make <sos/eos> likely to be sampled
+        model.emb.weight[5] *= 8
+    opts = get_opts(
+        search_algo="sampling", nbest=2, top_k=30, maxlenratio=3.0, minlenratio=0.5
+    )
+    masks = opts.masks.clone()
+
+    scheduler = ContinuousBatchingScheduler(model, opts, max_batch_size=4)
+    scheduler.start()
+    try:
+        requests = [scheduler.submit(torch.randint(6, 30, (6, 3))) for _ in range(6)]
+        for request in requests:
+            tokens, scores = request.result(timeout=60)
+            for token, score in zip(tokens, scores):
+                # <sos/eos> is allowed only after the minimum length
+                assert 3 <= len(token) < 18
+                assert not token[:, 0].eq(opts.eos).any()
+                assert token.shape == score.shape == (len(token), 3)
+    finally:
+        scheduler.stop()
+    # the masks are not modified in-place
+    assert torch.equal(opts.masks, masks)
+
+
+def test_benchmark():
+    model = get_model("multiscale")
+    opts = get_opts(search_algo="teacher_force")
+    prefixes = [torch.randint(6, 30, (4, 3)) for _ in range(3)]
+    suffixes = [torch.randint(6, 30, (5, 3)) for _ in range(3)]
+    for suffix in suffixes:
+        suffix[-1, 0] = opts.eos
+    scheduler = ContinuousBatchingScheduler(model, opts, max_batch_size=2)
+    stats = benchmark(scheduler, prefixes, suffixes)
+    assert stats["num_requests"] == 3
+    assert stats["num_frames"] == 12
+    assert stats["num_steps"] == 10
@@ -0,0 +1,46 @@
+import pytest
+import torch
+
+from espnet2.speechlm.module.transformer import TransformerDecoder
+from espnet2.speechlm.net_utils import install_kv_cache_hook
+
+
+@pytest.mark.parametrize("max_len", [None, 3, 20])
+def test_install_kv_cache_hook(max_len):
+    decoder = TransformerDecoder(n_ctx=32, n_state=8, n_head=2, n_layer=2).eval()
+    x = torch.randn(2, 12, 8)
+    with torch.no_grad():
+        expected = decoder(x)
+
+        cache, hooks = install_kv_cache_hook(decoder, {}, max_len=max_len)
+        hs = [decoder(x[:, :4], kv_cache=cache)]
+        for t in range(4, 12):
+            hs.append(decoder(x[:, t : t + 1], kv_cache=cache))
+        for hook in hooks:
+            hook.remove()
+
+    torch.testing.assert_close(torch.cat(hs, dim=1), expected)
+    assert all(v.shape == (2, 12, 8) for v in cache.values())
+
+
+def test_install_kv_cache_hook_shared_prefix():
+    decoder = TransformerDecoder(n_ctx=32, n_state=8, n_head=2, n_layer=2).eval()
+    prefix, x = torch.randn(1, 6, 8), torch.randn(3, 4, 8)
+    with torch.no_grad():
+        expected = decoder(torch.cat([prefix.expand(3, -1, -1), x], dim=1))[:, 6:]
+
+        cache, hooks = install_kv_cache_hook(decoder, {})
+        decoder(prefix, kv_cache=cache)
+        for hook in hooks:
+            hook.remove()
+        cache = {k: v.expand(3, -1, -1) for k, v in cache.items()}
+        shared = {k: v for k, v in cache.items()}
+
+        cache, hooks = install_kv_cache_hook(decoder, cache, max_len=10)
+        hs = [decoder(x[:, t : t + 1], kv_cache=cache) for t in range(4)]
+        for hook in hooks:
+            hook.remove()
+
+    torch.testing.assert_close(torch.cat(hs, dim=1), expected)
+    # the shared prefix cache is not written in place
+    assert all(v.size(1) == 6 for v in shared.values())
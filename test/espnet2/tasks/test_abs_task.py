@@ -132,3 +132,51 @@ def test_main(tmp_path):
             "1",
         ]
     )
+
+
+@pytest.fixture
+def text_float(tmp_path):
+    p = tmp_path / "text_float"
+    with p.open("w") as f:
+        for i in range(10):
+            f.write(f"utt{i} {i}\n")
+    return str(p)
+
+
+def build_streaming_keys(text_float, **kwargs):
+    loader = TestTask.build_streaming_iterator(
+        [(text_float, "x", "text_float")],
+        preprocess_fn=None,
+        collate_fn=CommonCollateFn(),
+        dtype="float32",
+        num_workers=0,
+        inference=True,
+        **kwargs,
+    )
+    return [key for keys, _ in loader for key in keys]
+
+
+def test_build_streaming_iterator(text_float):
+    assert build_streaming_keys(text_float) == [f"utt{i}" for i in range(10)]
+    assert build_streaming_keys(text_float, start_index=8, read_ahead=2) == [
+        "utt8",
+        "utt9",
+    ]
+    assert build_streaming_keys(text_float, num_shards=4, shard_id=1) == [
+        "utt1",
+        "utt5",
+        "utt9",
+    ]
+
+
+def test_build_streaming_iterator_distributed(text_float, monkeypatch):
+    # the keys are not sharded by the rank of torch.distributed unless asked
+    monkeypatch.setattr(torch.distributed, "is_initialized", lambda: True)
+    monkeypatch.setattr(torch.distributed, "get_world_size", lambda: 3)
+    monkeypatch.setattr(torch.distributed, "get_rank", lambda: 2)
+    assert build_streaming_keys(text_float) == [f"utt{i}" for i in range(10)]
+    assert build_streaming_keys(text_float, num_shards=3, shard_id=2) == [
+        "utt2",
+        "utt5",
+        "utt8",
+    ]
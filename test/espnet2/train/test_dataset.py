@@ -47,6 +47,20 @@ def test_ESPnetDataset_sound_scp(sound_scp):
     assert data["data1"].shape == (80000,)
 
 
+def test_ESPnetDataset_indexed_sound_scp(sound_scp):
+    dataset = ESPnetDataset(
+        path_name_type_list=[(sound_scp, "data1", "indexed_sound")],
+        preprocess=preprocess,
+    )
+    assert list(dataset) == ["a", "b"]
+
+    _, data = dataset["a"]
+    assert data["data1"].shape == (160000,)
+
+    _, data = dataset["b"]
+    assert data["data1"].shape == (80000,)
+
+
 @pytest.fixture
 def feats_scp(tmp_path):
     p = tmp_path / "feats.scp"
@@ -203,6 +217,19 @@ def test_ESPnetDataset_text(text):
     assert tuple(data["data7"]) == (1,)
 
 
+def test_ESPnetDataset_indexed_text(text):
+    dataset = ESPnetDataset(
+        path_name_type_list=[(text, "data7", "indexed_text")],
+        preprocess=preprocess,
+    )
+
+    _, data = dataset["a"]
+    assert tuple(data["data7"]) == (0,)
+
+    _, data = dataset["b"]
+    assert tuple(data["data7"]) == (1,)
+
+
 @pytest.fixture
 def text_float(tmp_path):
     p = tmp_path / "shape.txt"
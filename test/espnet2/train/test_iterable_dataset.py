@@ -2,6 +2,7 @@ import h5py
 import kaldiio
 import numpy as np
 import pytest
+from torch.utils.data import DataLoader
 
 from espnet2.fileio.npy_scp import NpyScpWriter
 from espnet2.fileio.sound_scp import SoundScpWriter
@@ -290,3 +291,80 @@ def test_ESPnetDataset_csv_int(csv_int):
             assert tuple(data["data8"]) == (0, 1, 2)
         if key == "b":
             assert tuple(data["data8"]) == (2, 3, 4)
+
+
+@pytest.fixture
+def text_int_many(tmp_path):
+    p = tmp_path / "text_int"
+    with p.open("w") as f:
+        for i in range(10):
+            f.write(f"utt{i} {i} {i + 1}\n")
+    return str(p)
+
+
+def test_ESPnetDataset_shards(text_int_many):
+    keys = []
+    for shard_id in range(3):
+        dataset = IterableESPnetDataset(
+            path_name_type_list=[(text_int_many, "data", "text_int")],
+            num_shards=3,
+            shard_id=shard_id,
+        )
+        keys.append([key for key, _ in dataset])
+    assert keys[0] == ["utt0", "utt3", "utt6", "utt9"]
+    assert sorted(sum(keys, [])) == [f"utt{i}" for i in range(10)]
+
+
+def test_ESPnetDataset_shards_with_workers(text_int_many):
+    keys = []
+    for shard_id in range(2):
+        dataset = IterableESPnetDataset(
+            path_name_type_list=[(text_int_many, "data", "text_int")],
+            num_shards=2,
+            shard_id=shard_id,
+        )
+        loader = DataLoader(dataset, batch_size=None, num_workers=2)
+        keys.append(sorted(key for key, _ in loader))
+    # 4 splits: (shard 0, worker 0), (shard 0, worker 1), (shard 1, worker 0), ...
+    assert keys[1] == ["utt2", "utt3", "utt6", "utt7"]
+    assert sorted(sum(keys, [])) == [f"utt{i}" for i in range(10)]
+
+
+def test_ESPnetDataset_start_index(text_int_many):
+    dataset = IterableESPnetDataset(
+        path_name_type_list=[(text_int_many, "data", "text_int")],
+        start_index=7,
+    )
+    results = list(dataset)
+    assert [key for key, _ in results] == ["utt7", "utt8", "utt9"]
+    assert tuple(results[0][1]["data"]) == (7, 8)
+
+
+def test_ESPnetDataset_read_ahead(text_int_many):
+    expected = list(
+        IterableESPnetDataset(
+            path_name_type_list=[(text_int_many, "data", "text_int")],
+        )
+    )
+    dataset = IterableESPnetDataset(
+        path_name_type_list=[(text_int_many, "data", "text_int")],
+        read_ahead=2,
+    )
+    results = list(dataset)
+    assert [key for key, _ in results] == [key for key, _ in expected]
+    for (_, data), (_, data2) in zip(results, expected):
+        np.testing.assert_array_equal(data["data"], data2["data"])
+
+    # Stop in the middle of the iteration
+    for i, _ in enumerate(dataset):
+        if i == 3:
+            break
+
+
+def test_ESPnetDataset_invalid_shard_id(text_int_many):
+    with pytest.raises(ValueError):
+        IterableESPnetDataset(
+            path_name_type_list=[(text_int_many, "data", "text_int")],
+            num_shards=2,
+            shard_id=2,
+        )
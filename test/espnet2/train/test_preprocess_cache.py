@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from espnet2.train.preprocess_cache import (
+    LRUPreprocessCache,
+    PreprocessCache,
+    config_hash,
+)
+from espnet2.train.preprocessor import CommonPreprocessor
+
+
+def test_config_hash(tmp_path):
+    token_list = tmp_path / "tokens.txt"
+    token_list.write_text("<blank>\na\nb\n")
+    h = config_hash(dict(token_type="char", token_list=str(token_list)))
+    assert h == config_hash(dict(token_list=str(token_list), token_type="char"))
+    assert h != config_hash(dict(token_type="bpe", token_list=str(token_list)))
+
+    # The digest of the file is used instead of the path
+    token_list.write_text("<blank>\na\nb\nc\n")
+    assert h != config_hash(dict(token_type="char", token_list=str(token_list)))
+
+
+def test_PreprocessCache(tmp_path):
+    cache = PreprocessCache(tmp_path, dict(token_type="char"))
+    assert cache.get(dict(text="a b")) is None
+    cache.put(dict(text="a b"), dict(text=np.array([1, 2])))
+    outputs = cache.get(dict(text="a b"))
+    np.testing.assert_array_equal(outputs["text"], np.array([1, 2]))
+    assert cache.get(dict(text="a b c")) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    # Another configuration doesn't share the entries
+    cache2 = PreprocessCache(tmp_path, dict(token_type="bpe"))
+    assert cache2.get(dict(text="a b")) is None
+
+
+def test_LRUPreprocessCache(tmp_path):
+    cache = LRUPreprocessCache(2, dict(token_type="char"), cache_dir=tmp_path)
+    for text in ["a", "b"]:
+        assert cache.get(dict(text=text)) is None
+        cache.put(dict(text=text), dict(text=np.array([len(text)])))
+    outputs = cache.get(dict(text="a"))
+    # the callers can modify the outputs
+    outputs["text"][0] = 100
+    np.testing.assert_array_equal(cache.get(dict(text="a"))["text"], [1])
+
+    # "b" is the least recently used one
+    cache.put(dict(text="c"), dict(text=np.array([3])))
+    assert list(cache.entries) == ['{"text": "a"}', '{"text": "c"}']
+    np.testing.assert_array_equal(cache.get(dict(text="b"))["text"], [1])
+    assert cache.stats() == dict(size=2, hits=2, disk_hits=1, misses=2, hit_rate=0.6)
+
+    # without the disk
+    cache = LRUPreprocessCache(1, dict(token_type="char"))
+    cache.put(dict(text="a"), dict(text=np.array([1])))
+    cache.put(dict(text="b"), dict(text=np.array([1])))
+    assert cache.get(dict(text="a")) is None
+
+
+@pytest.mark.parametrize("train", [True, False])
+def test_CommonPreprocessor_text_cache(tmp_path, train):
+    kwargs = dict(
+        train=train,
+        token_type="char",
+        token_list=["<blank>", "<unk>", "a", "b", "<space>"],
+        speech_volume_normalize=1.0,
+    )
+    preprocessor = CommonPreprocessor(**kwargs)
+    cached_preprocessor = CommonPreprocessor(
+        text_cache_dir=str(tmp_path / "cache"), **kwargs
+    )
+
+    for _ in range(2):
+        for text in ["a b", "b b a"]:
+            speech = np.random.randn(1600).astype(np.float32)
+            expected = preprocessor("uttid", dict(speech=speech, text=text))
+            data = cached_preprocessor("uttid", dict(speech=speech, text=text))
+            assert data.keys() == expected.keys()
+            for k, v in expected.items():
+                np.testing.assert_array_equal(data[k], v)
+    assert cached_preprocessor.text_cache.hits == 2
+    assert cached_preprocessor.text_cache.misses == 2
@@ -115,3 +115,71 @@ def test_fastspeech2(
         inputs.update(pitch=torch.tensor([2, 2, 0], dtype=torch.float).unsqueeze(-1))
         inputs.update(energy=torch.tensor([2, 2, 0], dtype=torch.float).unsqueeze(-1))
         model.inference(**inputs, use_teacher_forcing=True)
+
+
+@pytest.mark.parametrize("reduction_factor", [1, 3])
+@pytest.mark.parametrize("spks, spk_embed_dim", [(-1, None), (5, 2)])
+def test_fastspeech2_batch_inference(reduction_factor, spks, spk_embed_dim):
+    torch.manual_seed(0)
+    model = FastSpeech2(
+        idim=10,
+        odim=5,
+        adim=4,
+        aheads=2,
+        elayers=1,
+        eunits=4,
+        dlayers=1,
+        dunits=4,
+        postnet_layers=2,
+        postnet_chans=4,
+        postnet_filts=5,
+        reduction_factor=reduction_factor,
+        duration_predictor_layers=2,
+        duration_predictor_chans=4,
+        spks=spks,
+        spk_embed_dim=spk_embed_dim,
+    )
+    model.eval()
+    # NOTE: Make the predicted durations positive
+    torch.nn.init.constant_(model.duration_predictor.linear.bias, 2.0)
+
+    text = torch.randint(1, 9, (3, 4))
+    text_lengths = torch.tensor([4, 4, 2])
+    inputs = dict(text=text, text_lengths=text_lengths)
+    if spk_embed_dim is not None:
+        inputs.update(spembs=torch.randn(3, spk_embed_dim))
+    if spks > 0:
+        inputs.update(sids=torch.randint(0, spks, (3, 1)))
+    with torch.no_grad():
+        batch_outputs = model.batch_inference(**inputs)
+        feat_gen_lengths = batch_outputs["feat_gen_lengths"]
+        assert batch_outputs["feat_gen"].size(1) == feat_gen_lengths.max()
+        assert torch.equal(
+            batch_outputs["text_lengths"], text_lengths + 1
+        ), batch_outputs["text_lengths"]
+
+        # The trimmed outputs, including those of the padded input,
+        # are the same as the sequential ones
+        for i in range(3):
+            inputs_ = {k: v[i] for k, v in inputs.items() if k != "text_lengths"}
+            inputs_["text"] = inputs_["text"][: text_lengths[i]]
+            outputs = model.inference(**inputs_)
+            feat_len, text_len = feat_gen_lengths[i], text_lengths[i] + 1
+            assert feat_len == len(outputs["feat_gen"])
+            torch.testing.assert_close(
+                batch_outputs["feat_gen"][i, :feat_len],
+                outputs["feat_gen"],
+                atol=1e-4,
+                rtol=1e-4,
+            )
+            torch.testing.assert_close(
+                batch_outputs["duration"][i, :text_len], outputs["duration"]
+            )
+            assert not batch_outputs["duration"][i, text_len:].any()
+            for key in ["pitch", "energy"]:
+                torch.testing.assert_close(
+                    batch_outputs[key][i, :text_len],
+                    outputs[key],
+                    atol=1e-4,
+                    rtol=1e-4,
+                )
@@ -186,3 +186,161 @@ def test_batch_beam_search_equal(
         numpy.testing.assert_allclose(
             expected.score.cpu(), actual.score.cpu(), rtol=1e-6
         )
+
+
+@pytest.mark.parametrize("ctc_weight", [0.0, 0.3])
+def test_batch_beam_search_pre_beam_gather(ctc_weight):
+    torch.manual_seed(123)
+    model, x, ilens, y, data, train_args = prepare(
+        "transformer", transformer_args, mtlalpha=ctc_weight
+    )
+    model.eval()
+    char_list = train_args.char_list
+    lm = dynamic_import_lm("default", backend="pytorch")(len(char_list), lstm_lm)
+    lm.eval()
+    scorers = model.scorers()
+    scorers["lm"] = lm
+    scorers["length_bonus"] = LengthBonus(len(char_list))
+    weights = dict(decoder=1.0 - ctc_weight, ctc=ctc_weight, lm=0.5, length_bonus=0.1)
+    with torch.no_grad():
+        enc = model.encode(x[0, : ilens[0]])
+
+    nbests = []
+    for pre_beam_gather in (False, True):
+        # pre_beam_size = len(char_list) - 1: all the tokens are candidates
+        # since <eos> is always added in the pre_beam_gather mode
+        beam = BatchBeamSearch(
+            beam_size=2,
+            vocab_size=len(char_list),
+            weights=weights,
+            scorers=scorers,
+            token_list=char_list,
+            sos=model.sos,
+            eos=model.eos,
+            pre_beam_ratio=(len(char_list) - 1) / 2,
+            pre_beam_score_key="decoder",
+            pre_beam_gather=pre_beam_gather,
+        )
+        assert beam.pre_beam_gather == pre_beam_gather
+        beam.eval()
+        with torch.no_grad():
+            nbests.append(beam(x=enc, maxlenratio=0.0, minlenratio=0.0))
+
+    for hyp in nbests[1]:
+        expected = sum(weights[k] * v for k, v in hyp.scores.items())
+        numpy.testing.assert_allclose(hyp.score, expected, rtol=1e-5)
+    if ctc_weight == 0.0:
+        assert len(nbests[0]) == len(nbests[1])
+        for expected, actual in zip(*nbests):
+            assert expected.yseq.tolist() == actual.yseq.tolist()
+            numpy.testing.assert_allclose(expected.score, actual.score, rtol=1e-5)
+
+
+def test_batch_beam_search_pre_beam_gather_invalid_key():
+    vocab_size = 5
+    with pytest.raises(ValueError):
+        BatchBeamSearch(
+            beam_size=3,
+            vocab_size=vocab_size,
+            weights={"a": 0.5},
+            scorers={"a": LengthBonus(vocab_size)},
+            pre_beam_score_key="full",
+            pre_beam_gather=True,
+            sos=0,
+            eos=0,
+        )
+
+
+@pytest.mark.parametrize(
+    "lm_nn, lm_args", [("default", lstm_lm), ("transformer", transformer_lm)]
+)
+@pytest.mark.parametrize("maxlenratio, minlenratio", [(0.0, 0.0), (0.5, 0.1)])
+def test_batch_beam_search_batch_forward(lm_nn, lm_args, maxlenratio, minlenratio):
+    torch.manual_seed(123)
+    model, x, ilens, y, data, train_args = prepare("transformer", transformer_args)
+    model.eval()
+    char_list = train_args.char_list
+    lm = dynamic_import_lm(lm_nn, backend="pytorch")(len(char_list), lm_args)
+    lm.eval()
+    root = os.path.dirname(os.path.abspath(__file__))
+    scorers = model.scorers()
+    scorers["lm"] = lm
+    scorers["ngram"] = NgramFullScorer(
+        os.path.join(root, "beam_search_test.arpa"), char_list
+    )
+    scorers["length_bonus"] = LengthBonus(len(char_list))
+    weights = dict(decoder=1.0, lm=0.5, ngram=0.5, length_bonus=0.1)
+    beam = BatchBeamSearch(
+        beam_size=3,
+        vocab_size=len(char_list),
+        weights=weights,
+        scorers=scorers,
+        token_list=char_list,
+        sos=model.sos,
+        eos=model.eos,
+    )
+    beam.eval()
+    xs = torch.cat([x, torch.randn(1, *x.shape[1:])])
+    with torch.no_grad():
+        enc = torch.stack([model.encode(xi) for xi in xs])
+        nbests = beam.batch_forward(enc, maxlenratio, minlenratio)
+        assert len(nbests) == len(xs)
+        for e, actual in zip(enc, nbests):
+            expected = beam(x=e, maxlenratio=maxlenratio, minlenratio=minlenratio)
+            assert len(expected) == len(actual)
+            for h1, h2 in zip(expected, actual):
+                assert h1.yseq.tolist() == h2.yseq.tolist()
+                numpy.testing.assert_allclose(h1.score, h2.score, rtol=1e-5)
+
+
+@pytest.mark.parametrize("ctc_weight", [0.3, 1.0])
+def test_batch_beam_search_batch_forward_ctc(ctc_weight):
+    torch.manual_seed(123)
+    model, x, ilens, y, data, train_args = prepare(
+        "transformer", transformer_args, mtlalpha=0.5
+    )
+    model.eval()
+    beam = BatchBeamSearch(
+        beam_size=3,
+        vocab_size=len(train_args.char_list),
+        weights=dict(decoder=1.0 - ctc_weight, ctc=ctc_weight),
+        scorers=model.scorers(),
+        pre_beam_score_key=None if ctc_weight == 1.0 else "full",
+        sos=model.sos,
+        eos=model.eos,
+    )
+    beam.eval()
+    xs = torch.cat([x, torch.randn(2, *x.shape[1:])])
+    with torch.no_grad():
+        enc = torch.stack([model.encode(xi) for xi in xs])
+        nbests = beam.batch_forward(enc)
+        assert len(nbests) == len(xs)
+        for e, actual in zip(enc, nbests):
+            expected = beam(x=e)
+            assert len(expected) == len(actual)
+            for h1, h2 in zip(expected, actual):
+                assert h1.yseq.tolist() == h2.yseq.tolist()
+                numpy.testing.assert_allclose(h1.score, h2.score, rtol=1e-5)
+                assert h1.scores.keys() == h2.scores.keys()
+                for k in h1.scores:
+                    numpy.testing.assert_allclose(
+                        h1.scores[k], h2.scores[k], rtol=1e-5, atol=1e-5
+                    )
+
+
+def test_batch_beam_search_batch_forward_pre_beam_gather():
+    model, x, ilens, y, data, train_args = prepare(
+        "transformer", transformer_args, mtlalpha=0.5
+    )
+    beam = BatchBeamSearch(
+        beam_size=3,
+        vocab_size=len(train_args.char_list),
+        weights=dict(decoder=0.5, ctc=0.5),
+        scorers=model.scorers(),
+        pre_beam_score_key="decoder",
+        pre_beam_gather=True,
+        sos=model.sos,
+        eos=model.eos,
+    )
+    with pytest.raises(NotImplementedError):
+        beam.batch_forward(torch.randn(2, 5, transformer_args.adim))
@@ -0,0 +1,104 @@
+import threading
+
+import pytest
+import torch
+
+from espnet2.lm.seq_rnn_lm import SequentialRNNLM
+from espnet2.lm.transformer_lm import TransformerLM
+from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.scorers.batch_service import (
+    BatchScoringService,
+    ServiceScorer,
+    use_scoring_service,
+)
+from espnet.nets.scorers.length_bonus import LengthBonus
+
+
+def _decode(lm, x, vocab_size):
+    beam = BatchBeamSearch(
+        beam_size=3,
+        vocab_size=vocab_size,
+        weights={"lm": 1.0, "length_bonus": 1.0},
+        scorers={"lm": lm, "length_bonus": LengthBonus(vocab_size)},
+        sos=vocab_size - 1,
+        eos=vocab_size - 1,
+    )
+    with torch.no_grad():
+        return beam(x=x, maxlenratio=-5)
+
+
+@pytest.mark.parametrize(
+    "lm_class, lm_args",
+    [
+        (TransformerLM, dict(layer=1, unit=4, att_unit=4, embed_unit=4, head=1)),
+        (SequentialRNNLM, dict(rnn_type="lstm", unit=4, nlayers=1)),
+        (SequentialRNNLM, dict(rnn_type="gru", unit=4, nlayers=1)),
+    ],
+)
+def test_batch_scoring_service(lm_class, lm_args):
+    vocab_size = 7
+    torch.manual_seed(0)
+    lm = lm_class(vocab_size, **lm_args).eval()
+    xs = [torch.randn(10, 2) for _ in range(4)]
+    expected = [_decode(lm, x, vocab_size) for x in xs]
+
+    results = [None] * len(xs)
+    with BatchScoringService(lm, max_wait=0.01) as service:
+
+        def decode(i):
+            results[i] = _decode(ServiceScorer(service), xs[i], vocab_size)
+
+        threads = [threading.Thread(target=decode, args=(i,)) for i in range(len(xs))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert service.num_calls <= service.num_requests
+    for ref, hyp in zip(expected, results):
+        assert len(ref) == len(hyp)
+        for r, h in zip(ref, hyp):
+            assert r.yseq.tolist() == h.yseq.tolist()
+            assert torch.allclose(r.score, h.score, atol=1e-5)
+
+
+def test_batch_scoring_service_not_started():
+    lm = SequentialRNNLM(5, unit=4, nlayers=1)
+    with pytest.raises(RuntimeError):
+        ServiceScorer(BatchScoringService(lm)).batch_score(
+            torch.zeros(1, 1, dtype=torch.long), [None], None
+        )
+
+
+def test_use_scoring_service():
+    vocab_size = 7
+    torch.manual_seed(0)
+    lm = SequentialRNNLM(vocab_size, unit=4, nlayers=1).eval()
+    beam = BatchBeamSearch(
+        beam_size=3,
+        vocab_size=vocab_size,
+        weights={"lm": 1.0, "length_bonus": 1.0},
+        scorers={"lm": lm, "length_bonus": LengthBonus(vocab_size)},
+        sos=vocab_size - 1,
+        eos=vocab_size - 1,
+    )
+    x = torch.randn(10, 2)
+    with torch.no_grad():
+        expected = beam(x=x, maxlenratio=-5)
+
+    with BatchScoringService(lm) as service:
+        copied = use_scoring_service(beam, service)
+        with torch.no_grad():
+            results = copied(x=x, maxlenratio=-5)
+
+    # the original beam search is left untouched
+    assert beam.full_scorers["lm"] is lm
+    assert isinstance(copied.full_scorers["lm"], ServiceScorer)
+    assert copied.full_scorers["length_bonus"] is not beam.full_scorers["length_bonus"]
+    assert copied.scorers["length_bonus"] is copied.full_scorers["length_bonus"]
+    assert service.num_calls > 0
+    for r, h in zip(expected, results):
+        assert r.yseq.tolist() == h.yseq.tolist()
+
+    with pytest.raises(ValueError):
+        use_scoring_service(beam, service, name="ngram")
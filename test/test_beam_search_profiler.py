@@ -0,0 +1,113 @@
+import argparse
+import json
+
+import pytest
+import torch
+
+from espnet.nets.batch_beam_search import BatchBeamSearch
+from espnet.nets.beam_search import BeamSearch
+from espnet.nets.beam_search_profiler import (
+    BeamSearchProfiler,
+    add_beam_search_profiler_arguments,
+    build_beam_search_profiler,
+    set_beam_search_profiler,
+)
+from espnet.nets.scorers.length_bonus import LengthBonus
+
+
+@pytest.mark.parametrize("beam_search_class", [BeamSearch, BatchBeamSearch])
+def test_beam_search_profiler(tmp_path, beam_search_class):
+    vocab_size = 5
+    beam = beam_search_class(
+        beam_size=3,
+        vocab_size=vocab_size,
+        weights={"a": 0.5, "b": 0.5},
+        scorers={"a": LengthBonus(vocab_size), "b": LengthBonus(vocab_size)},
+        sos=vocab_size - 1,
+        eos=vocab_size - 1,
+    )
+
+    class Wrapper:
+        def __init__(self):
+            self.beam_search = beam
+
+    profiler = BeamSearchProfiler()
+    assert set_beam_search_profiler(Wrapper(), profiler) == 1
+    beam(x=torch.zeros(10, 2), maxlenratio=-4)
+
+    summary = profiler.summary()
+    assert summary["step/search"]["count"] == 4
+    assert summary["step/search"]["mean_hyps"] >= 1
+    for key in ("scorer/a", "scorer/b", "topk/beam", "select_state/merge"):
+        assert summary[key]["count"] > 0
+        assert summary[key]["total"] >= 0
+
+    profiler.save(tmp_path)
+    with (tmp_path / "beam_search_profile.json").open() as f:
+        assert json.load(f).keys() == summary.keys()
+    with (tmp_path / "beam_search_trace.json").open() as f:
+        trace = json.load(f)
+    assert len(trace["traceEvents"]) == len(profiler.events)
+    assert all(e["ph"] == "X" for e in trace["traceEvents"])
+
+
+def test_beam_search_profiler_max_trace_events(tmp_path):
+    profiler = BeamSearchProfiler(max_trace_events=3)
+    for i in range(5):
+        with profiler.record("search", "step", n_hyps=i):
+            pass
+    summary = profiler.summary()
+    # the statistics include the events dropped from the trace
+    assert summary["step/search"]["count"] == 5
+    assert summary["step/search"]["mean_hyps"] == 2
+    assert len(profiler.events) == 3
+    assert profiler.num_dropped_events == 2
+    trace = profiler.chrome_trace()
+    assert len(trace["traceEvents"]) == 3
+    assert trace["otherData"]["num_dropped_events"] == 2
+
+    profiler.reset()
+    assert profiler.summary() == {}
+    assert len(profiler.events) == 0
+
+
+def test_set_beam_search_profiler_without_beam_search():
+    class Wrapper:
+        def __init__(self):
+            self.model = torch.nn.Linear(1, 1)
+
+    assert set_beam_search_profiler(Wrapper(), BeamSearchProfiler()) == 0
+
+
+@pytest.mark.parametrize("profile_beam_search", ["true", "false"])
+def test_build_beam_search_profiler(profile_beam_search):
+    parser = argparse.ArgumentParser()
+    add_beam_search_profiler_arguments(parser.add_argument_group("group"))
+    args = parser.parse_args(["--profile_beam_search", profile_beam_search])
+
+    class Wrapper:
+        def __init__(self):
+            self.beam_search = BeamSearch(
+                beam_size=1,
+                vocab_size=2,
+                weights={"a": 1.0},
+                scorers={"a": LengthBonus(2)},
+                sos=1,
+                eos=1,
+            )
+
+    wrapper = Wrapper()
+    profiler = build_beam_search_profiler(wrapper, args.profile_beam_search)
+    if args.profile_beam_search:
+        assert isinstance(profiler, BeamSearchProfiler)
+        assert wrapper.beam_search.profiler is profiler
+    else:
+        assert profiler is None
+
+
+def test_build_beam_search_profiler_without_beam_search():
+    class Wrapper:
+        def __init__(self):
+            self.model = torch.nn.Linear(1, 1)
+
+    assert build_beam_search_profiler(Wrapper(), True) is None
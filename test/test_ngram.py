@@ -1,3 +1,4 @@
+import itertools
 import os
 from math import isclose
 
@@ -15,3 +16,66 @@ def test_ngram_build(test_sens):
     lm = kenlm.LanguageModel(os.path.join(root, "test.arpa"))
     assert isclose(lm.score(test_sens[0]), -1.04, rel_tol=0.01)
     assert isclose(lm.score(test_sens[1]), -1.18, rel_tol=0.01)
+
+
+def test_ngram_full_scorer_batch_score():
+    import torch
+
+    from espnet.nets.scorers.ngram import NgramFullScorer, NgramPartScorer
+
+    token_list = ["<blank>", "I", "like", "apple", "you", "love", "coffee", "<eos>"]
+    full = NgramFullScorer(os.path.join(root, "test.arpa"), token_list, cache_size=2)
+    part = NgramPartScorer(os.path.join(root, "test.arpa"), token_list)
+    x = torch.zeros(3, 2)
+    ys = torch.tensor([[7, 1, 2], [7, 4, 5], [7, 1, 2]])
+    states = []
+    for y in ys:
+        state = full.init_state(x)
+        for i in range(1, len(y)):
+            state = full.next_state(y[:i], state)
+        states.append(state)
+
+    scores, out_states = full.batch_score(ys, states, x.expand(len(ys), 3, 2))
+    assert scores.shape == (len(ys), len(token_list))
+    assert len(full.successor_cache) == 2
+    all_ids = torch.arange(len(token_list))
+    for y, state, score, out_state in zip(ys, states, scores, out_states):
+        expected, expected_state = part.score_partial(y, all_ids, state, x)
+        assert torch.allclose(score, expected)
+        assert out_state == expected_state
+        single, _ = full.score(y, state, x)
+        assert torch.allclose(single, expected)
+
+
+@pytest.mark.parametrize("arpa", ["test.arpa", "beam_search_test.arpa"])
+def test_ngram_full_scorer_arpa_successors(arpa):
+    import torch
+
+    from espnet.nets.scorers.ngram import NgramFullScorer, NgramPartScorer
+
+    lm = kenlm.LanguageModel(os.path.join(root, arpa))
+    words = ["I", "like", "apple", "you", "love", "coffee", "a", "e", "i", "o", "u"]
+    token_list = ["<blank>", "<unk>"] + words + ["<eos>"]
+    full = NgramFullScorer(os.path.join(root, arpa), token_list, cache_size=0)
+    part = NgramPartScorer(os.path.join(root, arpa), token_list)
+    assert full.arpa is not None and full.arpa.order == lm.order
+    x = torch.zeros(1, 2)
+    all_ids = torch.arange(len(token_list))
+    for length in range(4):
+        for prefix in itertools.product(range(len(token_list)), repeat=length):
+            y = torch.tensor([len(token_list) - 1, *prefix])
+            state = full.init_state(x)
+            for i in range(1, len(y)):
+                state = full.next_state(y[:i], state)
+            scores, _ = full.score(y, state, x)
+            expected, _ = part.score_partial(y, all_ids, state, x)
+            assert torch.allclose(scores, expected, atol=1e-5)
+
+
+def test_is_arpa(tmp_path):
+    from espnet.nets.scorers.ngram import is_arpa
+
+    binary = tmp_path / "test.bin"
+    binary.write_bytes(b"mmap lm http://kheafield.com/code format version 5\0")
+    assert is_arpa(os.path.join(root, "test.arpa"))
+    assert not is_arpa(binary)